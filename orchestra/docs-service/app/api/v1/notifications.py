@@ -5,13 +5,14 @@ GET /api/v1/notifications/since?t={iso_timestamp}
 
 from fastapi import APIRouter, Query, HTTPException
 from datetime import datetime
-from ...database import get_connection
+from ...database import get_connection, db_endpoint
 
 router = APIRouter(prefix="/api/v1/notifications", tags=["notifications"])
 
 
 @router.get("/since")
-async def get_docs_since(t: str = Query(..., description="ISO timestamp")):
+@db_endpoint
+def get_docs_since(t: str = Query(..., description="ISO timestamp")):
     """Documentos nuevos o modificados desde el timestamp dado."""
     try:
         # Validar formato
@@ -4,7 +4,7 @@ GET /api/v1/context/snapshot
 """
 
 from fastapi import APIRouter
-from ...database import get_connection
+from ...database import get_connection, db_endpoint
 
 router = APIRouter(prefix="/api/v1/context", tags=["context"])
 
@@ -12,7 +12,8 @@ VALID_WORKERS = ["worker-core", "worker-nlp", "worker-infra", "worker-ui"]
 
 
 @router.get("/snapshot")
-async def get_snapshot():
+@db_endpoint
+def get_snapshot():
     """Estado compacto del proyecto para el Arquitecto IA."""
     conn = get_connection()
     try:
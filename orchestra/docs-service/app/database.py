@@ -1,24 +1,124 @@
 """
 Base de datos SQLite con FTS5 para docs-service IANAE.
+
+Cada hilo reutiliza su propia conexión (WAL, busy_timeout y caché de
+sentencias preparadas); los endpoints ejecutan las consultas en un pool
+de hilos acotado para no bloquear el event loop.
 """
 
+import asyncio
+import functools
 import sqlite3
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 
 DB_PATH = os.environ.get("DOCS_DB_PATH", "./orchestra/data/docs.db")
 
+# Hilos (y por tanto conexiones) como máximo para las consultas
+DB_POOL_SIZE = int(os.environ.get("DOCS_DB_POOL_SIZE", "8"))
 
-def get_connection():
-    """Obtener conexión a la base de datos."""
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+# Milisegundos que espera una escritura con la base de datos bloqueada
+BUSY_TIMEOUT_MS = 5000
+
+# Sentencias preparadas que guarda cada conexión (sqlite3 usa 128 por defecto)
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexión reutilizable del hilo actual.
+
+    close() no la cierra: deshace lo no confirmado y la deja lista para la
+    siguiente petición del mismo hilo. close_connection() la cierra de verdad.
+    """
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def _close(self):
+        super().close()
+
+
+def _connect(path):
+    """Abrir y configurar una conexión nueva."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        factory=PooledConnection,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def get_connection():
+    """Obtener la conexión del hilo actual (se abre en el primer uso)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_PATH:
+        if conn is not None:
+            conn._close()
+        conn = _local.conn = _connect(DB_PATH)
+        _local.path = DB_PATH
     return conn
 
 
+def close_connection():
+    """Cerrar la conexión del hilo actual."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn._close()
+        _local.conn = None
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="docs-db")
+        return _executor
+
+
+async def run_db(func, *args, **kwargs):
+    """Ejecutar una función bloqueante de base de datos en el pool de hilos."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def db_endpoint(func):
+    """
+    Convierte un endpoint síncrono en asíncrono que corre en el pool de la BD.
+
+    FastAPI lee la firma del original (a través de __wrapped__), así que
+    parámetros y validación no cambian.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+    return wrapper
+
+
+def shutdown_pool():
+    """Parar el pool de hilos (las conexiones se cierran con sus hilos)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
 def init_db():
     """Inicializar esquema de la base de datos."""
     conn = get_connection()
@@ -69,4 +169,4 @@ def init_db():
         """)
         conn.commit()
     finally:
-        conn.close()
+        close_connection()
@@ -14,7 +14,7 @@ from pathlib import Path
 import json
 import re
 
-from .database import init_db, get_connection
+from .database import init_db, get_connection, db_endpoint
 from .api.v1.notifications import router as notifications_router
 from .api.v1.snapshot import router as snapshot_router
 
@@ -84,7 +84,8 @@ async def root():
 
 
 @app.get("/api/v1/docs")
-async def list_docs(limit: int = 50, category: Optional[str] = None):
+@db_endpoint
+def list_docs(limit: int = 50, category: Optional[str] = None):
     """Listar documentos."""
     conn = get_connection()
     try:
@@ -107,7 +108,8 @@ async def list_docs(limit: int = 50, category: Optional[str] = None):
 
 
 @app.post("/api/v1/docs")
-async def create_doc(doc: DocCreate):
+@db_endpoint
+def create_doc(doc: DocCreate):
     """Crear documento. Detecta duplicados por titulo+categoria en ultimas 24h."""
     conn = get_connection()
     try:
@@ -155,7 +157,8 @@ async def create_doc(doc: DocCreate):
 
 
 @app.get("/api/v1/docs/{doc_id}")
-async def get_doc(doc_id: int):
+@db_endpoint
+def get_doc(doc_id: int):
     """Obtener documento por ID."""
     conn = get_connection()
     try:
@@ -172,7 +175,8 @@ async def get_doc(doc_id: int):
 
 
 @app.put("/api/v1/docs/{doc_id}")
-async def update_doc(doc_id: int, updates: dict):
+@db_endpoint
+def update_doc(doc_id: int, updates: dict):
     """Actualizar documento."""
     conn = get_connection()
     try:
@@ -202,7 +206,8 @@ async def update_doc(doc_id: int, updates: dict):
 
 
 @app.get("/api/v1/search")
-async def search_docs(q: str, limit: int = 20):
+@db_endpoint
+def search_docs(q: str, limit: int = 20):
     """Búsqueda FTS5."""
     conn = get_connection()
     try:
@@ -223,7 +228,8 @@ async def search_docs(q: str, limit: int = 20):
 
 
 @app.put("/api/v1/docs/{doc_id}/workflow-status")
-async def update_workflow_status(doc_id: int, status_update: dict):
+@db_endpoint
+def update_workflow_status(doc_id: int, status_update: dict):
     """
     Actualizar workflow_status de un documento.
 
@@ -288,7 +294,8 @@ async def update_workflow_status(doc_id: int, status_update: dict):
 
 
 @app.get("/api/v1/worker/{worker_name}/pendientes")
-async def get_worker_pendientes(worker_name: str):
+@db_endpoint
+def get_worker_pendientes(worker_name: str):
     """Obtener pendientes de un worker."""
     conn = get_connection()
     try:
@@ -309,7 +316,8 @@ async def get_worker_pendientes(worker_name: str):
 
 
 @app.post("/api/v1/worker/{worker_name}/reporte")
-async def post_worker_report(worker_name: str, report: WorkerReport):
+@db_endpoint
+def post_worker_report(worker_name: str, report: WorkerReport):
     """Publicar reporte de un worker."""
     conn = get_connection()
     try:
@@ -333,7 +341,8 @@ async def post_worker_report(worker_name: str, report: WorkerReport):
 
 
 @app.get("/api/v1/metrics/system")
-async def get_system_metrics():
+@db_endpoint
+def get_system_metrics():
     """
     Métricas completas del sistema: daemon, workers, calidad.
     """
@@ -438,7 +447,8 @@ async def get_system_metrics():
 
 
 @app.get("/api/v1/alerts")
-async def get_system_alerts():
+@db_endpoint
+def get_system_alerts():
     """
     Detectar anomalías y problemas en el sistema.
 
@@ -594,7 +604,8 @@ async def get_system_alerts():
 
 
 @app.get("/api/v1/metrics/costs")
-async def get_cost_metrics():
+@db_endpoint
+def get_cost_metrics():
     """
     Metricas de costos LLM extraidas de reportes de workers.
     Parsea bloques <!-- COST_DATA: {...} --> y tambien el formato legacy
@@ -704,7 +715,8 @@ async def get_cost_metrics():
 
 
 @app.get("/api/v1/metrics/code")
-async def get_code_metrics():
+@db_endpoint
+def get_code_metrics():
     """
     Metricas de codigo real generado: archivos creados/modificados exitosamente.
     """
@@ -0,0 +1,321 @@
+"""
+Almacen frio para conceptos poco activos de IANAE.
+
+Los conceptos apartados se guardan en segmentos append-only en disco:
+vectores (base + actual) y aristas en formato CSR como .npy mapeados en
+memoria, mas un meta.json por segmento con nombres y metricas escalares.
+Extraer un concepto solo marca su fila como muerta en la mascara de vivos
+del segmento (escritura in-place de un byte), sin reescribir nada.
+
+La compactacion es incremental: tras cada escritura solo se reescriben los
+segmentos con demasiadas filas muertas y los grupos de factor_fusion
+segmentos de tamaño parecido (fusion por niveles, como un LSM). Cada fila
+se reescribe O(log n) veces en total y nunca se recorre el almacen entero
+desde la ruta de activacion.
+"""
+import glob
+import json
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+# Campos escalares de un concepto que viajan en el meta.json del segmento
+_CAMPOS_ESCALARES = ('creado', 'activaciones', 'ultima_activacion', 'fuerza',
+                     'categoria', 'conexiones_proyecto', 'edad_cuando_apartado')
+
+
+class AlmacenFrio:
+    """
+    Segmentos mmap de conceptos frios con indice nombre -> (segmento, fila).
+
+    Un registro es el dict que devuelve ConceptosLucas.eliminar_concepto:
+    'base', 'actual', 'conexiones' [(destino, peso)] y campos escalares.
+    """
+
+    def __init__(self, ruta_dir: str, dim_vector: int, umbral_compactacion: float = 0.5,
+                 factor_fusion: int = 8):
+        self.ruta_dir = ruta_dir
+        self.dim_vector = dim_vector
+        self.umbral_compactacion = umbral_compactacion
+        self.factor_fusion = factor_fusion
+        os.makedirs(ruta_dir, exist_ok=True)
+
+        self._segmentos: Dict[int, dict] = {}
+        self._ubicacion: Dict[str, tuple] = {}          # nombre -> (seg_id, fila)
+        self._vecinos: Dict[str, Set[str]] = defaultdict(set)  # destino -> conceptos frios
+        self._siguiente_id = 1
+        self._abrir()
+
+    # === Ciclo de vida de segmentos ===
+
+    def _ruta(self, seg_id: int, sufijo: str) -> str:
+        return os.path.join(self.ruta_dir, f"seg_{seg_id:06d}.{sufijo}")
+
+    def _abrir(self):
+        """Carga los segmentos completos (los que tienen meta.json) del directorio."""
+        for ruta_meta in sorted(glob.glob(os.path.join(self.ruta_dir, "seg_*.meta.json"))):
+            seg_id = int(os.path.basename(ruta_meta)[4:10])
+            self._cargar_segmento(seg_id)
+            self._siguiente_id = max(self._siguiente_id, seg_id + 1)
+
+    def _cargar_segmento(self, seg_id: int):
+        with open(self._ruta(seg_id, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        seg = {
+            'meta': meta,
+            'vec': np.load(self._ruta(seg_id, "vec.npy"), mmap_mode='r'),
+            'indptr': np.load(self._ruta(seg_id, "indptr.npy"), mmap_mode='r'),
+            'indices': np.load(self._ruta(seg_id, "indices.npy"), mmap_mode='r'),
+            'pesos': np.load(self._ruta(seg_id, "pesos.npy"), mmap_mode='r'),
+            'vivos': np.load(self._ruta(seg_id, "vivos.npy"), mmap_mode='r+'),
+        }
+        self._segmentos[seg_id] = seg
+
+        destinos = meta['destinos']
+        for fila in np.flatnonzero(seg['vivos']):
+            nombre = meta['nombres'][fila]
+            anterior = self._ubicacion.get(nombre)
+            if anterior is not None:
+                # Un segmento posterior gana: marcar la copia vieja como muerta
+                self._marcar_muerto(*anterior)
+            self._ubicacion[nombre] = (seg_id, int(fila))
+            inicio, fin = seg['indptr'][fila], seg['indptr'][fila + 1]
+            for j in seg['indices'][inicio:fin]:
+                self._vecinos[destinos[j]].add(nombre)
+
+    def _escribir_segmento(self, registros: Dict[str, dict]) -> int:
+        """Escribe un segmento nuevo; el meta.json se renombra al final como marca de completo."""
+        seg_id = self._siguiente_id
+        self._siguiente_id += 1
+
+        nombres = list(registros.keys())
+        destinos: List[str] = []
+        pos_destino: Dict[str, int] = {}
+        vec = np.zeros((len(nombres), 2, self.dim_vector), dtype=np.float64)
+        indptr = np.zeros(len(nombres) + 1, dtype=np.int64)
+        indices, pesos, datos = [], [], []
+
+        for fila, nombre in enumerate(nombres):
+            reg = registros[nombre]
+            vec[fila, 0] = reg['base']
+            vec[fila, 1] = reg['actual']
+            for destino, peso in reg.get('conexiones', []):
+                if destino not in pos_destino:
+                    pos_destino[destino] = len(destinos)
+                    destinos.append(destino)
+                indices.append(pos_destino[destino])
+                pesos.append(peso)
+            indptr[fila + 1] = len(indices)
+            datos.append({k: reg[k] for k in _CAMPOS_ESCALARES if k in reg})
+
+        np.save(self._ruta(seg_id, "vec.npy"), vec)
+        np.save(self._ruta(seg_id, "indptr.npy"), indptr)
+        np.save(self._ruta(seg_id, "indices.npy"), np.array(indices, dtype=np.int32))
+        np.save(self._ruta(seg_id, "pesos.npy"), np.array(pesos, dtype=np.float64))
+        np.save(self._ruta(seg_id, "vivos.npy"), np.ones(len(nombres), dtype=bool))
+
+        ruta_meta = self._ruta(seg_id, "meta.json")
+        with open(ruta_meta + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({'nombres': nombres, 'destinos': destinos, 'datos': datos}, f)
+        os.replace(ruta_meta + ".tmp", ruta_meta)
+        return seg_id
+
+    def _eliminar_segmento(self, seg_id: int):
+        self._segmentos.pop(seg_id, None)
+        for sufijo in ("meta.json", "vec.npy", "indptr.npy", "indices.npy", "pesos.npy", "vivos.npy"):
+            ruta = self._ruta(seg_id, sufijo)
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    def _marcar_muerto(self, seg_id: int, fila: int):
+        vivos = self._segmentos[seg_id]['vivos']
+        vivos[fila] = False
+        vivos.flush()
+
+    # === API publica ===
+
+    def __len__(self) -> int:
+        return len(self._ubicacion)
+
+    def __contains__(self, nombre: str) -> bool:
+        return nombre in self._ubicacion
+
+    def nombres(self) -> List[str]:
+        return list(self._ubicacion.keys())
+
+    def guardar_lote(self, registros: Dict[str, dict]) -> int:
+        """
+        Aparta un lote de conceptos en un segmento nuevo.
+
+        Returns:
+            Numero de conceptos guardados
+        """
+        if not registros:
+            return 0
+        for nombre in registros:
+            if nombre in self._ubicacion:
+                self._extraer_ubicacion(nombre)
+
+        seg_id = self._escribir_segmento(registros)
+        self._cargar_segmento(seg_id)
+        self._mantenimiento()
+        return len(registros)
+
+    def leer(self, nombre: str) -> Optional[dict]:
+        """Lee un registro sin sacarlo del almacen."""
+        ubicacion = self._ubicacion.get(nombre)
+        if ubicacion is None:
+            return None
+        seg_id, fila = ubicacion
+        seg = self._segmentos[seg_id]
+        meta = seg['meta']
+        inicio, fin = seg['indptr'][fila], seg['indptr'][fila + 1]
+        registro = dict(meta['datos'][fila])
+        registro['base'] = np.array(seg['vec'][fila, 0])
+        registro['actual'] = np.array(seg['vec'][fila, 1])
+        registro['conexiones'] = [
+            (meta['destinos'][j], float(p))
+            for j, p in zip(seg['indices'][inicio:fin], seg['pesos'][inicio:fin])
+        ]
+        return registro
+
+    def extraer(self, nombre: str) -> Optional[dict]:
+        """Lee un registro y lo marca como muerto (el concepto vuelve a RAM)."""
+        registro = self.leer(nombre)
+        if registro is not None:
+            self._extraer_ubicacion(nombre)
+        return registro
+
+    def _extraer_ubicacion(self, nombre: str):
+        seg_id, fila = self._ubicacion.pop(nombre)
+        seg = self._segmentos[seg_id]
+        destinos = seg['meta']['destinos']
+        inicio, fin = seg['indptr'][fila], seg['indptr'][fila + 1]
+        for j in seg['indices'][inicio:fin]:
+            frios = self._vecinos.get(destinos[j])
+            if frios is not None:
+                frios.discard(nombre)
+                if not frios:
+                    del self._vecinos[destinos[j]]
+        self._marcar_muerto(seg_id, fila)
+
+    def vecinos_frios(self, nombre: str) -> Set[str]:
+        """Conceptos frios con alguna arista hacia `nombre`."""
+        return self._vecinos.get(nombre, set())
+
+    def aristas_hacia(self, nombre: str) -> List[tuple]:
+        """Aristas (origen, peso) de los conceptos frios hacia `nombre`."""
+        aristas = []
+        for origen in self._vecinos.get(nombre, ()):
+            seg_id, fila = self._ubicacion[origen]
+            seg = self._segmentos[seg_id]
+            destinos = seg['meta']['destinos']
+            inicio, fin = seg['indptr'][fila], seg['indptr'][fila + 1]
+            for j, peso in zip(seg['indices'][inicio:fin], seg['pesos'][inicio:fin]):
+                if destinos[j] == nombre:
+                    aristas.append((origen, float(peso)))
+        return aristas
+
+    def num_conexiones(self, nombre: str) -> int:
+        ubicacion = self._ubicacion.get(nombre)
+        if ubicacion is None:
+            return 0
+        seg_id, fila = ubicacion
+        indptr = self._segmentos[seg_id]['indptr']
+        return int(indptr[fila + 1] - indptr[fila])
+
+    def fraccion_muerta(self) -> float:
+        total = sum(len(seg['vivos']) for seg in self._segmentos.values())
+        return 1.0 - len(self._ubicacion) / total if total else 0.0
+
+    def _nivel(self, seg_id: int) -> int:
+        """Nivel de fusion de un segmento: log_factor_fusion de sus filas."""
+        filas, nivel = len(self._segmentos[seg_id]['vivos']), 0
+        while filas >= self.factor_fusion:
+            filas //= self.factor_fusion
+            nivel += 1
+        return nivel
+
+    def _mantenimiento(self):
+        """
+        Compactacion amortizada tras cada escritura.
+
+        Reescribe los segmentos cuya fraccion muerta supera el umbral (coste
+        proporcional a las filas liberadas) y fusiona los niveles que juntan
+        factor_fusion segmentos o mas.
+        """
+        while True:
+            seleccion = set()
+            por_nivel = defaultdict(list)
+            for seg_id, seg in self._segmentos.items():
+                vivos = seg['vivos']
+                if len(vivos) and 1.0 - np.count_nonzero(vivos) / len(vivos) > self.umbral_compactacion:
+                    seleccion.add(seg_id)
+                else:
+                    por_nivel[self._nivel(seg_id)].append(seg_id)
+            for segmentos in por_nivel.values():
+                if len(segmentos) >= self.factor_fusion:
+                    seleccion.update(segmentos)
+            if not seleccion:
+                return
+            self.compactar(sorted(seleccion))
+
+    def compactar(self, seg_ids: Optional[List[int]] = None) -> int:
+        """
+        Reescribe las filas vivas de varios segmentos en uno nuevo.
+
+        El segmento nuevo se escribe y se carga antes de borrar los antiguos:
+        si el proceso cae a medias, al reabrir gana el segmento posterior.
+
+        Args:
+            seg_ids: Segmentos a reescribir (None = todos)
+
+        Returns:
+            Numero de filas muertas liberadas
+        """
+        seleccion = sorted(self._segmentos) if seg_ids is None else list(seg_ids)
+        nombres = []
+        total = 0
+        for seg_id in seleccion:
+            seg = self._segmentos[seg_id]
+            total += len(seg['vivos'])
+            nombres.extend(seg['meta']['nombres'][fila] for fila in np.flatnonzero(seg['vivos']))
+        liberadas = total - len(nombres)
+        if liberadas == 0 and len(seleccion) < 2:
+            return 0
+
+        registros = {nombre: self.leer(nombre) for nombre in nombres}
+        nuevo = self._escribir_segmento(registros) if registros else None
+
+        # El segmento nuevo ya esta completo en disco: soltar los antiguos
+        for seg_id in seleccion:
+            self._segmentos.pop(seg_id)
+        for nombre in nombres:
+            del self._ubicacion[nombre]  # sus aristas en _vecinos se recargan iguales
+        if nuevo is not None:
+            self._cargar_segmento(nuevo)
+        for seg_id in seleccion:
+            self._eliminar_segmento(seg_id)
+        return liberadas
+
+    def importar_json(self, ruta: str) -> int:
+        """
+        Migra un conceptos_apartados.json del optimizador antiguo al almacen.
+
+        Returns:
+            Numero de conceptos importados
+        """
+        if not os.path.exists(ruta):
+            return 0
+        with open(ruta, 'r', encoding='utf-8') as f:
+            antiguos = json.load(f)
+        registros = {}
+        for nombre, datos in antiguos.items():
+            registro = {k: datos[k] for k in _CAMPOS_ESCALARES if k in datos}
+            registro['base'] = np.array(datos['vector'], dtype=np.float64)
+            registro['actual'] = np.array(datos.get('actual', datos['vector']), dtype=np.float64)
+            registro['conexiones'] = [(d, float(p)) for d, p in datos.get('conexiones', [])]
+            registros[nombre] = registro
+        return self.guardar_lote(registros)
@@ -0,0 +1,279 @@
+"""
+Busqueda de nombres de conceptos en texto con Aho-Corasick.
+
+AutomataAhoCorasick es un automata inmutable sobre un conjunto de formas
+(nombres y alias en minusculas) que encuentra todas sus apariciones en un
+texto en una sola pasada, O(len(texto) + coincidencias), independientemente
+del numero de conceptos.
+
+BuscadorConceptos lo mantiene al dia de forma incremental: las formas nuevas
+van a un automata delta pequeño y las retiradas se filtran, y solo cuando el
+delta crece demasiado se reconstruye el automata base completo. Cada
+sincronizacion publica el estado nuevo de una vez, asi que las busquedas
+concurrentes nunca ven un automata a medio construir.
+"""
+import re
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Las transiciones se guardan en un unico dict con clave (nodo << 21) | ord(c):
+# un dict por nodo costaria cientos de MB con 100k conceptos
+_BITS_CARACTER = 21
+
+_PATRON_COMPONENTES = re.compile(r'[^\w]+|_')
+
+
+class AutomataAhoCorasick:
+    """Automata de Aho-Corasick inmutable sobre formas de texto."""
+
+    def __init__(self, formas: Iterable[str]):
+        """
+        Args:
+            formas: Cadenas a buscar (ya normalizadas; las vacias se ignoran)
+        """
+        self.formas: List[str] = []
+        self.indice: Dict[str, int] = {}
+        for forma in formas:
+            if forma and forma not in self.indice:
+                self.indice[forma] = len(self.formas)
+                self.formas.append(forma)
+
+        trans: Dict[int, int] = {}
+        salida = array('i', [-1])
+        profundidad = array('i', [0])
+        aristas = []  # (padre, codigo, hijo) en orden de creacion
+        for fid, forma in enumerate(self.formas):
+            nodo = 0
+            for ch in forma:
+                clave = (nodo << _BITS_CARACTER) | ord(ch)
+                hijo = trans.get(clave)
+                if hijo is None:
+                    hijo = len(salida)
+                    trans[clave] = hijo
+                    salida.append(-1)
+                    profundidad.append(profundidad[nodo] + 1)
+                    aristas.append((nodo, ord(ch), hijo))
+                nodo = hijo
+            salida[nodo] = fid
+
+        # Enlaces de fallo en orden de anchura (por profundidad del hijo)
+        n_nodos = len(salida)
+        fallo = array('i', bytes(4 * n_nodos))
+        enlace_salida = array('i', bytes(4 * n_nodos))
+        aristas.sort(key=lambda a: profundidad[a[2]])
+        for padre, codigo, hijo in aristas:
+            if padre:
+                f = fallo[padre]
+                while True:
+                    destino = trans.get((f << _BITS_CARACTER) | codigo)
+                    if destino is not None:
+                        fallo[hijo] = destino
+                        break
+                    if not f:
+                        break
+                    f = fallo[f]
+            f = fallo[hijo]
+            enlace_salida[hijo] = f if salida[f] >= 0 else enlace_salida[f]
+
+        self._trans = trans
+        self._salida = salida
+        self._fallo = fallo
+        self._enlace_salida = enlace_salida
+
+    def __len__(self):
+        return len(self.formas)
+
+    @property
+    def num_nodos(self) -> int:
+        return len(self._salida)
+
+    def buscar(self, texto: str) -> Iterator[Tuple[int, int]]:
+        """
+        Recorre el texto una vez.
+
+        Yields:
+            (fin, id_forma) por cada aparicion; la forma ocupa texto[fin - len(forma):fin]
+        """
+        trans, salida, fallo, enlace = self._trans, self._salida, self._fallo, self._enlace_salida
+        nodo = 0
+        for pos, ch in enumerate(texto):
+            codigo = ord(ch)
+            while True:
+                hijo = trans.get((nodo << _BITS_CARACTER) | codigo)
+                if hijo is not None:
+                    nodo = hijo
+                    break
+                if not nodo:
+                    break
+                nodo = fallo[nodo]
+            o = nodo if salida[nodo] >= 0 else enlace[nodo]
+            while o:
+                yield pos + 1, salida[o]
+                o = enlace[o]
+
+
+def _componentes(forma: str) -> List[str]:
+    """Palabras de una forma ('docker_compose' -> ['docker', 'compose'])."""
+    return [c for c in _PATRON_COMPONENTES.split(forma) if len(c) > 2]
+
+
+def _es_palabra(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+class BuscadorConceptos:
+    """
+    Indice texto -> conceptos mantenido de forma incremental.
+
+    Uso:
+        buscador = BuscadorConceptos()
+        buscador.sincronizar(sistema.formas_textuales())
+        buscador.conceptos_en("Python y OpenCV para tacografos")
+    """
+
+    def __init__(self, max_delta: int = 1024, fraccion_delta: float = 0.1):
+        """
+        Args:
+            max_delta: cambios pendientes tolerados antes de reconstruir el automata base
+            fraccion_delta: idem, como fraccion del tamaño del automata base
+        """
+        self.max_delta = max_delta
+        self.fraccion_delta = fraccion_delta
+        self.reconstrucciones = 0
+        self._formas: Dict[str, str] = {}
+        self._delta_formas: Dict[str, str] = {}
+        self._componentes: Dict[str, Dict[str, int]] = {}  # componente -> {concepto: formas}
+        vacio = AutomataAhoCorasick(())
+        # (base, conceptos_base, delta, conceptos_delta, retiradas): se publica de una vez
+        self._estado = (vacio, [], vacio, [], frozenset())
+
+    def __len__(self):
+        return len(self._formas)
+
+    def sincronizar(self, formas: Dict[str, str]) -> bool:
+        """
+        Ajusta el indice al conjunto actual de formas.
+
+        Args:
+            formas: forma en minusculas -> nombre del concepto
+
+        Returns:
+            True si hubo cambios
+        """
+        anteriores = self._formas
+        añadidas = dict(formas.items() - anteriores.items())
+        quitadas = anteriores.keys() - formas.keys()
+        if not añadidas and not quitadas:
+            return False
+
+        for forma in quitadas:
+            self._quitar_componentes(forma, anteriores[forma])
+        for forma, concepto in añadidas.items():
+            if forma in anteriores:
+                self._quitar_componentes(forma, anteriores[forma])
+            for componente in _componentes(forma):
+                conceptos = self._componentes.setdefault(componente, {})
+                conceptos[concepto] = conceptos.get(concepto, 0) + 1
+        self._formas = dict(formas)
+
+        base, conceptos_base, _, _, retiradas = self._estado
+        pendientes = len(self._delta_formas) + len(añadidas) + len(retiradas) + len(quitadas)
+        if pendientes > max(self.max_delta, self.fraccion_delta * len(base)):
+            self._reconstruir()
+            return True
+
+        for forma in quitadas:
+            self._delta_formas.pop(forma, None)
+        self._delta_formas.update(añadidas)
+        retiradas = retiradas | {f for f in (*quitadas, *añadidas) if f in base.indice}
+        delta = AutomataAhoCorasick(self._delta_formas)
+        conceptos_delta = [self._delta_formas[f] for f in delta.formas]
+        self._estado = (base, conceptos_base, delta, conceptos_delta, retiradas)
+        return True
+
+    def coincidencias(self, texto: str, palabras_completas: bool = False) -> List[Tuple[int, int, str]]:
+        """
+        Todas las apariciones de conceptos en el texto.
+
+        Args:
+            texto: Texto libre (se compara en minusculas)
+            palabras_completas: descartar apariciones dentro de otra palabra
+
+        Returns:
+            Lista de (inicio, fin, concepto) sobre texto.lower(), ordenada por
+            inicio y, a igual inicio, de mas larga a mas corta
+        """
+        base, conceptos_base, delta, conceptos_delta, retiradas = self._estado
+        t = texto.lower()
+        resultado = []
+        for fin, fid in base.buscar(t):
+            forma = base.formas[fid]
+            if forma not in retiradas:
+                resultado.append((fin - len(forma), fin, conceptos_base[fid]))
+        for fin, fid in delta.buscar(t):
+            resultado.append((fin - len(delta.formas[fid]), fin, conceptos_delta[fid]))
+        if palabras_completas:
+            resultado = [(i, f, c) for i, f, c in resultado
+                         if (i == 0 or not _es_palabra(t[i - 1]))
+                         and (f == len(t) or not _es_palabra(t[f]))]
+        resultado.sort(key=lambda c: (c[0], -c[1]))
+        return resultado
+
+    def conceptos_en(self, texto: str, palabras_completas: bool = False) -> List[str]:
+        """Conceptos que aparecen en el texto, en orden de primera aparicion."""
+        return list(dict.fromkeys(c for _, _, c in self.coincidencias(texto, palabras_completas)))
+
+    def conceptos_por_palabra(self, texto: str) -> List[str]:
+        """
+        Conceptos con alguna palabra del texto como componente de su nombre
+        ('docker' -> 'Docker_Compose'); respaldo cuando conceptos_en no encuentra nada.
+        """
+        encontrados = {}
+        for palabra in re.findall(r'[^\W_]+', texto.lower()):
+            for concepto in tuple(self._componentes.get(palabra, ())):
+                encontrados[concepto] = None
+        return list(encontrados)
+
+    def conceptos_por_subcadena(self, texto: str) -> List[str]:
+        """
+        Respaldo lineal del buscador original: formas contenidas en el texto o
+        que lo contienen ('tacografo' -> 'Tacografos') y, si no hay ninguna,
+        formas que contienen alguna palabra de mas de dos letras del texto.
+        Recorre todas las formas: solo para cuando los indices no encuentran nada.
+        """
+        t = texto.lower().strip()
+        if not t:
+            return []
+        formas = self._formas
+        encontrados = {c: None for f, c in formas.items() if f in t or t in f}
+        if not encontrados:
+            palabras = [p for p in t.split() if len(p) > 2]
+            encontrados = {c: None for f, c in formas.items() if any(p in f for p in palabras)}
+        return list(encontrados)
+
+    def buscar(self, texto: str) -> List[str]:
+        """
+        Conceptos mencionados en el texto: conceptos_en y, si no encuentra
+        nada, conceptos_por_palabra y despues conceptos_por_subcadena.
+        """
+        return (self.conceptos_en(texto) or self.conceptos_por_palabra(texto)
+                or self.conceptos_por_subcadena(texto))
+
+    def _reconstruir(self):
+        formas = list(self._formas)
+        base = AutomataAhoCorasick(formas)
+        conceptos_base = [self._formas[f] for f in base.formas]
+        self._delta_formas = {}
+        vacio = AutomataAhoCorasick(())
+        self._estado = (base, conceptos_base, vacio, [], frozenset())
+        self.reconstrucciones += 1
+
+    def _quitar_componentes(self, forma: str, concepto: str):
+        for componente in _componentes(forma):
+            conceptos = self._componentes.get(componente)
+            if conceptos is not None and concepto in conceptos:
+                conceptos[concepto] -= 1
+                if not conceptos[concepto]:
+                    del conceptos[concepto]
+                if not conceptos:
+                    del self._componentes[componente]
@@ -10,6 +10,8 @@ import numpy as np
 from collections import defaultdict
 import os
 
+from src.framework.llm.context_builder import ContextBuilder, ContextCandidate, ContextSection
+
 class ConceptosLucas(ConceptosDifusos):
     """
     Extensión de ConceptosDifusos que añade contexto textual y categorización
@@ -23,6 +25,20 @@ class ConceptosLucas(ConceptosDifusos):
         self.contextos = {}  # Almacena contexto textual de cada concepto
         self.categorias = defaultdict(list)  # Agrupa conceptos por categoría
         self.fuentes = {}  # Rastrea de qué conversación viene cada concepto
+
+        # Índice invertido palabra -> conceptos para buscar_conceptos_por_contexto
+        self._version_contextos = 0
+        self._indice_palabras = None
+        self._firma_indice = None
+
+        # Contexto para el LLM: fragmento cacheado por concepto y versión
+        # (la versión sube cada vez que cambia el contexto del concepto)
+        self._versiones_contexto = defaultdict(int)
+        self._constructor_contexto = ContextBuilder(
+            max_tokens=1000,
+            header="CONTEXTO RELEVANTE DE LAS CONVERSACIONES DE LUCAS:\n",
+            empty_message="No se encontró contexto relevante."
+        )
         
         # Metadatos de Lucas
         self.metadata_lucas = {
@@ -62,6 +78,9 @@ class ConceptosLucas(ConceptosDifusos):
             'codigo_relacionado': []
         }
         
+        self._version_contextos += 1
+        self._versiones_contexto[nombre] += 1
+
         # Registrar fuente
         self.fuentes[nombre] = fuente
         
@@ -85,21 +104,21 @@ class ConceptosLucas(ConceptosDifusos):
         Returns:
             Lista de conceptos relevantes con su contexto
         """
+        palabras_query = query.lower().split()
+
+        # Solo los conceptos que comparten alguna palabra con la query; el
+        # resto puntúa 0 y únicamente cuenta si el umbral lo admite
+        coincidencias = defaultdict(int)
+        indice = self._indice_contextos()
+        for palabra in palabras_query:
+            for concepto in indice.get(palabra, ()):
+                coincidencias[concepto] += 1
+        candidatos = self.contextos if umbral_similitud <= 0 else coincidencias
+
         resultados = []
-        query_lower = query.lower()
-        
-        for concepto, contexto_data in self.contextos.items():
-            puntuacion = 0
-            contexto_completo = f"{contexto_data['descripcion']} {' '.join(contexto_data['palabras_clave'])}"
-            
-            # Búsqueda simple por palabras
-            palabras_query = query_lower.split()
-            palabras_contexto = contexto_completo.lower().split()
-            
-            coincidencias = sum(1 for palabra in palabras_query if palabra in palabras_contexto)
-            if len(palabras_query) > 0:
-                puntuacion = coincidencias / len(palabras_query)
-            
+        for concepto in candidatos:
+            contexto_data = self.contextos[concepto]
+            puntuacion = coincidencias.get(concepto, 0) / len(palabras_query) if palabras_query else 0
             if puntuacion >= umbral_similitud:
                 resultados.append({
                     'concepto': concepto,
@@ -108,50 +127,84 @@ class ConceptosLucas(ConceptosDifusos):
                     'fuente': self.fuentes.get(concepto, ''),
                     'categoria': contexto_data['categoria']
                 })
-        
+
+        # Ante empates, el orden de alta de los contextos
+        resultados.sort(key=lambda x: self._posiciones_contexto[x['concepto']])
         # Ordenar por puntuación
         resultados.sort(key=lambda x: x['puntuacion'], reverse=True)
         return resultados
     
-    def generar_contexto_para_llm(self, conceptos_relevantes):
+    def _indice_contextos(self):
+        """
+        Índice invertido palabra -> conceptos sobre descripción y palabras clave.
+
+        Se reconstruye solo cuando cambian los contextos (alta de conceptos o
+        sustitución del diccionario al cargar).
+        """
+        firma = (id(self.contextos), len(self.contextos), self._version_contextos)
+        if self._indice_palabras is None or self._firma_indice != firma:
+            indice = defaultdict(list)
+            self._posiciones_contexto = {}
+            for concepto, contexto_data in self.contextos.items():
+                self._posiciones_contexto[concepto] = len(self._posiciones_contexto)
+                contexto_completo = f"{contexto_data['descripcion']} {' '.join(contexto_data['palabras_clave'])}"
+                for palabra in set(contexto_completo.lower().split()):
+                    indice[palabra].append(concepto)
+            self._indice_palabras = indice
+            self._firma_indice = firma
+        return self._indice_palabras
+
+    def generar_contexto_para_llm(self, conceptos_relevantes, max_tokens=None):
         """
         Genera contexto estructurado para enviar al LLM
         
         Args:
             conceptos_relevantes: Lista de conceptos encontrados
+            max_tokens: Presupuesto de tokens del contexto (default: 1000)
             
         Returns:
-            String con contexto formateado para LLM
+            String con contexto formateado para LLM: los conceptos de mayor
+            puntuación que quepan en el presupuesto
         """
-        if not conceptos_relevantes:
-            return "No se encontró contexto relevante."
+        candidatos = []
+        for item in conceptos_relevantes:
+            concepto = item['concepto']
+            # Solo se cachea el contexto propio; un dict ajeno se renderiza siempre
+            propio = item['contexto'] is self.contextos.get(concepto)
+            candidatos.append(ContextCandidate(
+                key=concepto,
+                score=item.get('puntuacion', 0.0),
+                render=lambda item=item: self._fragmento_contexto(item),
+                version=(id(self.contextos), self._versiones_contexto[concepto],
+                         item['fuente']) if propio else None
+            ))
         
-        contexto_llm = "CONTEXTO RELEVANTE DE LAS CONVERSACIONES DE LUCAS:\n\n"
+        return self._constructor_contexto.build(
+            ContextSection(candidatos, item_format="## {n}. {text}\n---\n", max_items=5),
+            max_tokens=max_tokens
+        )
+    
+    def _fragmento_contexto(self, item):
+        """Fragmento de contexto de un concepto (sin numerar)"""
+        datos = item['contexto']
         
-        for i, item in enumerate(conceptos_relevantes[:5]):  # Top 5
-            concepto = item['concepto']
-            datos = item['contexto']
-            fuente = item['fuente']
-            
-            contexto_llm += f"## {i+1}. {concepto.upper()}\n"
-            contexto_llm += f"**Categoría:** {datos['categoria']}\n"
-            contexto_llm += f"**Fuente:** {fuente}\n"
-            
-            if datos['descripcion']:
-                contexto_llm += f"**Descripción:** {datos['descripcion']}\n"
-            
-            if datos['palabras_clave']:
-                contexto_llm += f"**Palabras clave:** {', '.join(datos['palabras_clave'])}\n"
-            
-            if datos['problemas_relacionados']:
-                contexto_llm += f"**Problemas:** {'; '.join(datos['problemas_relacionados'])}\n"
-            
-            if datos['soluciones']:
-                contexto_llm += f"**Soluciones:** {'; '.join(datos['soluciones'])}\n"
-            
-            contexto_llm += "\n---\n\n"
+        fragmento = f"{item['concepto'].upper()}\n"
+        fragmento += f"**Categoría:** {datos['categoria']}\n"
+        fragmento += f"**Fuente:** {item['fuente']}\n"
+        
+        if datos['descripcion']:
+            fragmento += f"**Descripción:** {datos['descripcion']}\n"
+        
+        if datos['palabras_clave']:
+            fragmento += f"**Palabras clave:** {', '.join(datos['palabras_clave'])}\n"
+        
+        if datos['problemas_relacionados']:
+            fragmento += f"**Problemas:** {'; '.join(datos['problemas_relacionados'])}\n"
+        
+        if datos['soluciones']:
+            fragmento += f"**Soluciones:** {'; '.join(datos['soluciones'])}\n"
         
-        return contexto_llm
+        return fragmento
     
     def importar_desde_resumenes_v6(self, directorio_resumenes):
         """
@@ -314,10 +367,12 @@ class ConceptosLucas(ConceptosDifusos):
                 if linea.startswith('### Problema'):
                     if problema_actual:
                         self.contextos[concepto_principal]['problemas_relacionados'].append(problema_actual)
+                        self._versiones_contexto[concepto_principal] += 1
                     problema_actual = linea.replace('### Problema', '').strip()
                 elif linea.startswith('- ') and problema_actual:
                     solucion = linea[2:].strip()
                     self.contextos[concepto_principal]['soluciones'].append(solucion)
+                    self._versiones_contexto[concepto_principal] += 1
     
     def _extraer_codigo_relacionado(self, contenido, concepto_principal):
         """Extrae ejemplos de código del contenido"""
@@ -0,0 +1,264 @@
+"""
+Acceso concurrente a un ConceptosLucas compartido.
+
+Un unico escritor aplica las mutaciones (activar, auto_modificar, NLP...)
+bajo un cerrojo lectura/escritura. Cada escritura avanza la epoca; los
+lectores trabajan sobre una instantanea inmutable de la epoca actual
+(copia de los arrays numpy y de los metadatos de conceptos) que se
+construye bajo demanda la primera vez que se lee tras una escritura.
+Asi las lecturas (similares, datos de red, activacion sin ruido) corren
+en paralelo en hilos sin ver nunca un estado a medio modificar.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.automata import BuscadorConceptos
+
+# Campos de cada concepto que se copian a la instantanea
+_CAMPOS_INSTANTANEA = ('categoria', 'activaciones', 'ultima_activacion',
+                       'fuerza', 'conexiones_proyecto')
+
+
+class CerrojoLecturaEscritura:
+    """
+    Cerrojo lectura/escritura por fases: varios lectores o un escritor.
+
+    Un escritor en espera bloquea a los lectores nuevos, pero al liberar una
+    escritura entran todos los lectores que ya esperaban antes del siguiente
+    escritor, de modo que ni lectores ni escritores quedan sin turno.
+    No es reentrante: pedir lectura dentro de una escritura bloquea.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._lectores = 0
+        self._lectores_esperando = 0
+        self._escritor = False
+        self._escritores_esperando = 0
+        self._turno_lectores = False
+
+    @contextmanager
+    def lectura(self):
+        with self._cond:
+            self._lectores_esperando += 1
+            while self._escritor or (self._escritores_esperando and not self._turno_lectores):
+                self._cond.wait()
+            self._lectores_esperando -= 1
+            self._lectores += 1
+            if not self._lectores_esperando:
+                self._turno_lectores = False
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._lectores -= 1
+                if not self._lectores:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def escritura(self):
+        with self._cond:
+            self._escritores_esperando += 1
+            while self._escritor or self._lectores or self._turno_lectores:
+                self._cond.wait()
+            self._escritores_esperando -= 1
+            self._escritor = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._escritor = False
+                self._turno_lectores = self._lectores_esperando > 0
+                self._cond.notify_all()
+
+
+class InstantaneaLucas:
+    """
+    Vista inmutable de un ConceptosLucas en una epoca concreta.
+
+    Expone la misma forma de datos que usan los lectores del sistema vivo
+    (conceptos, metricas, categorias) mas consultas vectorizadas propias.
+    """
+
+    def __init__(self, epoca: int, nombres: List[str], adj: np.ndarray,
+                 vectores: np.ndarray, conceptos: Dict[str, dict],
+                 metricas: dict, categorias: Dict[str, List[str]],
+                 formas: Optional[Dict[str, str]] = None):
+        self.epoca = epoca
+        self.nombres = nombres
+        self.idx = {nombre: i for i, nombre in enumerate(nombres)}
+        self.adj = adj
+        self.vectores = vectores
+        self.conceptos = conceptos
+        self.metricas = metricas
+        self.categorias = categorias
+        self.formas = formas if formas is not None else {n.lower(): n for n in nombres}
+
+        normas = np.maximum(np.linalg.norm(vectores, axis=1), 1e-10)
+        self._vectores_norm = vectores / normas[:, np.newaxis]
+        for arr in (self.adj, self.vectores, self._vectores_norm):
+            arr.flags.writeable = False
+
+    @classmethod
+    def desde_sistema(cls, sistema, epoca: int = 0) -> 'InstantaneaLucas':
+        """Copia el estado actual de un ConceptosLucas (el llamador excluye escritores)."""
+        n = sistema._n
+        return cls(
+            epoca=epoca,
+            nombres=list(sistema._names[:n]),
+            adj=np.array(sistema._adj[:n, :n]),
+            vectores=np.array(sistema._vec_actual[:n]),
+            conceptos={nombre: {k: datos[k] for k in _CAMPOS_INSTANTANEA}
+                       for nombre, datos in sistema.conceptos.items()},
+            metricas=dict(sistema.metricas),
+            categorias={k: list(v) for k, v in sistema.categorias.items()},
+            formas=sistema.formas_textuales(),
+        )
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def buscar_similares(self, concepto: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """Misma semantica que ConceptosLucas.buscar_similares."""
+        if concepto not in self.idx:
+            return []
+        i = self.idx[concepto]
+        similitudes = self._vectores_norm @ self._vectores_norm[i]
+        similitudes[i] = -1  # Excluir a si mismo
+        top = np.argsort(similitudes)[::-1][:top_k]
+        return [(self.nombres[j], float(similitudes[j])) for j in top]
+
+    def propagar(self, concepto: str, pasos: int = 3) -> List[Dict[str, float]]:
+        """
+        Propagacion sin ruido (temperatura 0) y sin efectos secundarios.
+
+        Produce las mismas activaciones que ConceptosLucas.activar con
+        temperatura=0, pero no toca contadores, historial ni memoria.
+        """
+        if concepto not in self.idx:
+            return []
+        act = np.zeros(len(self.nombres), dtype=np.float64)
+        act[self.idx[concepto]] = 1.0
+        resultados = [self._a_dict(act)]
+        for _ in range(pasos):
+            activos = np.flatnonzero(act > 0.1)
+            if len(activos):
+                prop = act[activos, np.newaxis] * self.adj[activos]
+                nueva = np.maximum(act, prop.max(axis=0))
+            else:
+                nueva = act.copy()
+            nueva /= nueva.sum() + 1e-10
+            np.clip(nueva, 0, 1, out=nueva)
+            act = nueva
+            resultados.append(self._a_dict(act))
+        return resultados
+
+    def aristas(self) -> Iterator[Tuple[str, str, float]]:
+        """Aristas no dirigidas (u, v, peso), como las del grafo networkx."""
+        conectado = (self.adj != 0) | (self.adj.T != 0)
+        filas, cols = np.nonzero(np.triu(conectado, k=1))
+        pesos = np.where(self.adj[filas, cols] != 0, self.adj[filas, cols], self.adj[cols, filas])
+        for i, j, p in zip(filas.tolist(), cols.tolist(), pesos.tolist()):
+            yield self.nombres[i], self.nombres[j], p
+
+    def num_aristas(self) -> int:
+        conectado = (self.adj != 0) | (self.adj.T != 0)
+        return int(np.count_nonzero(np.triu(conectado, k=1)))
+
+    def _a_dict(self, arr):
+        return {self.nombres[i]: float(arr[i]) for i in range(len(self.nombres))}
+
+
+class SistemaConcurrente:
+    """
+    Envoltorio de un ConceptosLucas para lectores en paralelo y un escritor.
+
+    Uso:
+        with concurrente.escritura() as sistema:
+            sistema.activar('IANAE')
+        red = concurrente.instantanea()      # sin cerrojo para el lector
+    """
+
+    def __init__(self, sistema):
+        self._sistema = sistema
+        self._cerrojo = CerrojoLecturaEscritura()
+        self._construccion = threading.Lock()
+        self._epoca = 0
+        self._instantanea: Optional[InstantaneaLucas] = None
+        self._buscador = BuscadorConceptos()
+        self._buscador_epoca = -1
+        self._sincronizacion = threading.Lock()
+
+    @property
+    def epoca(self) -> int:
+        return self._epoca
+
+    @property
+    def sistema(self):
+        """Sistema vivo: solo debe usarse dentro de lectura() o escritura()."""
+        return self._sistema
+
+    @contextmanager
+    def lectura(self):
+        """Acceso compartido al sistema vivo (para lecturas que no cubre la instantanea)."""
+        with self._cerrojo.lectura():
+            yield self._sistema
+
+    @contextmanager
+    def escritura(self):
+        """Acceso exclusivo al sistema vivo; al salir se invalida la instantanea."""
+        with self._cerrojo.escritura():
+            try:
+                yield self._sistema
+            finally:
+                self._epoca += 1
+
+    def reemplazar(self, sistema, al_reemplazar=None):
+        """
+        Sustituye el sistema (p. ej. al cargar un snapshot).
+
+        Args:
+            sistema: Nuevo ConceptosLucas
+            al_reemplazar: Callable opcional ejecutado bajo el mismo cerrojo
+                exclusivo (para actualizar referencias externas al sistema)
+        """
+        with self._cerrojo.escritura():
+            self._sistema = sistema
+            if al_reemplazar is not None:
+                al_reemplazar()
+            self._epoca += 1
+
+    def instantanea(self) -> InstantaneaLucas:
+        """Instantanea de la epoca actual, copiada solo si hubo escrituras desde la ultima."""
+        actual = self._instantanea
+        if actual is not None and actual.epoca == self._epoca:
+            return actual
+        with self._cerrojo.lectura():
+            # Un solo lector copia; los demas reutilizan su resultado
+            with self._construccion:
+                if self._instantanea is None or self._instantanea.epoca != self._epoca:
+                    self._instantanea = InstantaneaLucas.desde_sistema(self._sistema, self._epoca)
+                return self._instantanea
+
+    def buscador_texto(self) -> BuscadorConceptos:
+        """
+        Automata texto -> conceptos de la epoca actual.
+
+        Se sincroniza de forma perezosa (solo con las formas que cambiaron)
+        la primera vez que se pide tras una escritura.
+        """
+        if self._buscador_epoca == self._epoca:
+            return self._buscador
+        instantanea = self.instantanea()
+        with self._sincronizacion:
+            if self._buscador_epoca != instantanea.epoca:
+                self._buscador.sincronizar(instantanea.formas)
+                self._buscador_epoca = instantanea.epoca
+        return self._buscador
+
+    def conceptos_en_texto(self, texto: str) -> List[str]:
+        """Conceptos que aparecen en el texto (nombres o alias), en orden de aparicion."""
+        return self.buscador_texto().conceptos_en(texto)
@@ -1,6 +1,5 @@
 # emergente_lucas.py - Pensamiento Emergente adaptado para Lucas
 import numpy as np
-import matplotlib.pyplot as plt
 try:
     from nucleo_lucas import ConceptosLucas
 except ImportError:
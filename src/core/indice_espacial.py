@@ -47,6 +47,26 @@ class IndiceEspacial:
         self._id_to_idx[id_concepto] = idx
         self._n += 1
 
+    def agregar_lote(self, ids: List[str], vectores: np.ndarray):
+        """Agregar muchos vectores de una vez (p.ej. al cargar un snapshot)."""
+        nuevos = [i for i, id_concepto in enumerate(ids) if id_concepto not in self._id_to_idx]
+        for i, id_concepto in enumerate(ids):
+            if id_concepto in self._id_to_idx:
+                self.actualizar(id_concepto, vectores[i])
+        if not nuevos:
+            return
+        requerido = self._n + len(nuevos)
+        if requerido > self._vectores.shape[0]:
+            nueva_cap = max(requerido, self._vectores.shape[0] * 2)
+            nueva = np.zeros((nueva_cap, self.dimension), dtype=np.float64)
+            nueva[:self._n] = self._vectores[:self._n]
+            self._vectores = nueva
+        self._vectores[self._n:requerido] = vectores[nuevos]
+        for offset, i in enumerate(nuevos):
+            self._ids.append(ids[i])
+            self._id_to_idx[ids[i]] = self._n + offset
+        self._n = requerido
+
     def actualizar(self, id_concepto: str, nuevo_vector: np.ndarray):
         """Actualizar el vector de un concepto existente."""
         if id_concepto not in self._id_to_idx:
@@ -1,7 +1,5 @@
 # nucleo_lucas.py - IANAE adaptado para proyectos de Lucas
 import numpy as np
-import networkx as nx
-import matplotlib.pyplot as plt
 from collections import defaultdict
 import random
 import json
@@ -14,6 +12,9 @@ from src.core.versionado import VersionadoEstado
 from src.core.memoria_v2 import MemoriaAsociativaV2
 from src.core.aprendizaje_refuerzo import AprendizajeRefuerzo
 
+# Versión del formato de snapshot binario (guardar_binario / cargar_binario)
+SNAPSHOT_BINARIO_VERSION = 1
+
 class ConceptosLucas:
     """
     Sistema IANAE adaptado específicamente para los proyectos y conceptos de Lucas
@@ -25,7 +26,7 @@ class ConceptosLucas:
         """
         self.conceptos = {}
         self.relaciones = defaultdict(list)
-        self.grafo = nx.Graph()
+        self._grafo = None                # networkx se construye bajo demanda (ver grafo)
         self.dim_vector = dim_vector
         self.incertidumbre_base = incertidumbre_base
         self.historial_activaciones = []
@@ -57,6 +58,9 @@ class ConceptosLucas:
             'emergentes': []
         }
 
+        # Alias textuales: forma alternativa -> nombre del concepto
+        self.alias = {}
+
         # === Estructuras numpy para propagación matricial ===
         self._cap = 64                    # Capacidad pre-asignada
         self._n = 0                       # Número actual de conceptos
@@ -65,13 +69,39 @@ class ConceptosLucas:
         self._adj = np.zeros((self._cap, self._cap), dtype=np.float64)   # Matriz de adyacencia
         self._vec_actual = np.zeros((self._cap, dim_vector), dtype=np.float64)  # Vectores actuales
         self._vec_base = np.zeros((self._cap, dim_vector), dtype=np.float64)    # Vectores base
-        
+
+        # === Almacenamiento por niveles (caliente en RAM / frío en disco) ===
+        self.almacen_frio = None          # AlmacenFrio opcional para paginación transparente
+        self.max_conceptos_calientes = None  # Presupuesto de conceptos en RAM (None = sin límite)
+
+    @property
+    def grafo(self):
+        """
+        Grafo networkx de conceptos, construido bajo demanda desde las relaciones.
+
+        networkx solo se importa en el primer acceso, de modo que los procesos
+        headless que solo propagan activaciones no pagan su coste de importación.
+        """
+        if self._grafo is None:
+            import networkx as nx
+            grafo = nx.Graph()
+            grafo.add_nodes_from(self.conceptos)
+            for origen, destinos in self.relaciones.items():
+                for destino, peso in destinos:
+                    grafo.add_edge(origen, destino, weight=peso)
+            self._grafo = grafo
+        return self._grafo
+
+    @grafo.setter
+    def grafo(self, valor):
+        self._grafo = valor
+
     # === Métodos internos numpy ===
 
-    def _ensure_capacity(self):
-        """Expande arrays numpy si se alcanza la capacidad"""
-        if self._n >= self._cap:
-            new_cap = self._cap * 2
+    def _ensure_capacity(self, extra=1):
+        """Expande arrays numpy si no caben `extra` conceptos más"""
+        if self._n + extra > self._cap:
+            new_cap = max(64, self._cap * 2, self._n + extra)
             new_adj = np.zeros((new_cap, new_cap), dtype=np.float64)
             new_adj[:self._cap, :self._cap] = self._adj
             self._adj = new_adj
@@ -108,6 +138,415 @@ class ConceptosLucas:
                         j = self._idx[destino]
                         self._adj[i, j] = peso
 
+    def eliminar_concepto(self, nombre):
+        """
+        Elimina un concepto de todas las representaciones (dicts, numpy, índice, grafo).
+
+        La fila/columna del concepto se rellena con el último índice (swap O(n)),
+        igual que IndiceEspacial.eliminar.
+
+        Returns:
+            Registro con vectores, métricas y conexiones del concepto, o None si no existe
+        """
+        if nombre not in self._idx:
+            return None
+
+        n = self._n
+        i = self._idx[nombre]
+        datos = self.conceptos.pop(nombre)
+        conexiones = list(self.relaciones.pop(nombre, []))
+
+        # Quitar relaciones entrantes: solo hace falta mirar los vecinos
+        vecinos_idx = np.flatnonzero((self._adj[i, :n] != 0) | (self._adj[:n, i] != 0))
+        vecinos = {self._names[j] for j in vecinos_idx} | {d for d, _ in conexiones}
+        for vecino in vecinos:
+            if vecino in self.relaciones:
+                self.relaciones[vecino] = [(d, p) for d, p in self.relaciones[vecino] if d != nombre]
+
+        # Compactar estructuras numpy moviendo el último concepto al hueco
+        last = n - 1
+        if i != last:
+            self._adj[i, :n] = self._adj[last, :n]
+            self._adj[:n, i] = self._adj[:n, last]
+            self._adj[i, i] = self._adj[last, last]
+            self._vec_actual[i] = self._vec_actual[last]
+            self._vec_base[i] = self._vec_base[last]
+            nombre_last = self._names[last]
+            self._names[i] = nombre_last
+            self._idx[nombre_last] = i
+        self._adj[last, :n] = 0
+        self._adj[:n, last] = 0
+        self._vec_actual[last] = 0
+        self._vec_base[last] = 0
+        self._names.pop()
+        del self._idx[nombre]
+        self._n -= 1
+
+        self.indice.eliminar(nombre)
+        for miembros in self.categorias.values():
+            if nombre in miembros:
+                miembros.remove(nombre)
+        if self._grafo is not None and nombre in self._grafo:
+            self._grafo.remove_node(nombre)
+
+        registro = {k: datos[k] for k in ('creado', 'activaciones', 'ultima_activacion',
+                                          'fuerza', 'categoria', 'conexiones_proyecto')}
+        registro['base'] = np.array(datos['base'])
+        registro['actual'] = np.array(datos['actual'])
+        registro['conexiones'] = conexiones
+        return registro
+
+    def restaurar_concepto(self, nombre, registro):
+        """
+        Reincorpora un concepto desde un registro de eliminar_concepto.
+
+        Conserva vectores y métricas; solo recrea las conexiones cuyo destino
+        está en RAM. Las conexiones con conceptos fríos vuelven cuando esos
+        conceptos se paginan: expulsar_conceptos guarda cada arista frío-frío
+        en los registros de ambos extremos.
+        """
+        if nombre in self.conceptos:
+            return nombre
+
+        # Restaurar no es crear: no inflar contadores globales
+        contadores = {k: self.metricas[k] for k in
+                      ('conceptos_creados', 'conexiones_formadas', 'proyectos_referenciados')}
+
+        self.añadir_concepto(nombre, atributos=np.array(registro['base']),
+                             categoria=registro.get('categoria', 'emergentes'))
+        i = self._idx[nombre]
+        datos = self.conceptos[nombre]
+        datos['base'] = np.array(registro['base'])
+        datos['actual'] = np.array(registro['actual'])
+        self._vec_base[i] = datos['base']
+        self._vec_actual[i] = datos['actual']
+        self.indice.actualizar(nombre, datos['actual'])
+
+        # Las aristas ya contaban en conexiones_proyecto de ambos extremos
+        conexiones_destino = {}
+        for destino, peso in registro.get('conexiones', []):
+            if destino in self.conceptos and destino != nombre:
+                conexiones_destino.setdefault(destino, self.conceptos[destino]['conexiones_proyecto'])
+                self.relacionar(nombre, destino, fuerza=peso)
+        for destino, valor in conexiones_destino.items():
+            self.conceptos[destino]['conexiones_proyecto'] = valor
+
+        for campo in ('creado', 'activaciones', 'ultima_activacion', 'fuerza', 'conexiones_proyecto'):
+            if campo in registro:
+                datos[campo] = registro[campo]
+        self.metricas.update(contadores)
+        return nombre
+
+    def paginar_conceptos(self, nombres):
+        """
+        Trae conceptos del almacén frío a RAM.
+
+        Returns:
+            Lista de conceptos paginados
+        """
+        if self.almacen_frio is None:
+            return []
+        paginados = []
+        ciclo = self.metricas['ciclos_pensamiento']
+        for nombre in nombres:
+            if nombre in self.conceptos:
+                continue
+            registro = self.almacen_frio.extraer(nombre)
+            if registro is None:
+                continue
+            self.restaurar_concepto(nombre, registro)
+            self.conceptos[nombre]['ultima_activacion'] = ciclo  # Tocar para LRU
+            paginados.append(nombre)
+        return paginados
+
+    def expulsar_conceptos(self, nombres):
+        """
+        Mueve conceptos de RAM al almacén frío.
+
+        Returns:
+            Número de conceptos expulsados
+        """
+        if self.almacen_frio is None:
+            return 0
+        # Capturar conexiones antes de eliminar: eliminar un concepto del lote
+        # poda las relaciones de los demás y se perderían las aristas frío-frío
+        conexiones = {nombre: list(self.relaciones.get(nombre, [])) for nombre in nombres}
+        # Las aristas con conceptos ya fríos se quitaron de relaciones al
+        # expulsarlos; se recuperan del índice inverso del almacén para que
+        # ambos registros las conserven y sobrevivan a cualquier orden de paginación
+        for nombre in nombres:
+            destinos = {d for d, _ in conexiones[nombre]}
+            for origen, peso in self.almacen_frio.aristas_hacia(nombre):
+                if origen not in destinos:
+                    conexiones[nombre].append((origen, peso))
+                    destinos.add(origen)
+        registros = {}
+        for nombre in nombres:
+            registro = self.eliminar_concepto(nombre)
+            if registro is not None:
+                registro['conexiones'] = conexiones[nombre]
+                registro['edad_cuando_apartado'] = self.metricas['edad']
+                registros[nombre] = registro
+        return self.almacen_frio.guardar_lote(registros)
+
+    def aplicar_presupuesto(self, protegidos=()):
+        """
+        Expulsa los conceptos usados hace más tiempo (LRU por ultima_activacion)
+        hasta cumplir max_conceptos_calientes.
+
+        Returns:
+            Lista de conceptos expulsados
+        """
+        if self.almacen_frio is None or self.max_conceptos_calientes is None:
+            return []
+        exceso = self._n - self.max_conceptos_calientes
+        if exceso <= 0:
+            return []
+
+        n = self._n
+        recencia = np.fromiter(
+            (self.conceptos[nombre]['ultima_activacion'] for nombre in self._names[:n]),
+            dtype=np.float64, count=n
+        )
+        for nombre in protegidos:
+            if nombre in self._idx:
+                recencia[self._idx[nombre]] = np.inf
+
+        candidatos = np.argpartition(recencia, exceso - 1)[:exceso] if exceso < n else np.arange(n)
+        victimas = [self._names[i] for i in candidatos if np.isfinite(recencia[i])]
+        self.expulsar_conceptos(victimas)
+        return victimas
+
+    def podar_conexiones(self, umbral=None, max_por_concepto=None):
+        """
+        Poda vectorizada de la matriz de adyacencia.
+
+        Aplica una máscara de umbral y después un top-k por fila (las
+        max_por_concepto conexiones más fuertes de cada concepto). Quitar
+        (i, j) quita también (j, i), como remove_edge en el grafo. Todo se
+        calcula antes de modificar nada y luego se aplica a _adj, relaciones
+        y grafo a la vez.
+
+        Args:
+            umbral: Se eliminan conexiones con peso < umbral (None = sin umbral)
+            max_por_concepto: Máximo de conexiones por concepto (None = sin límite)
+
+        Returns:
+            Dict con estadísticas de poda (conexiones dirigidas)
+        """
+        inicio = time.perf_counter()
+        n = self._n
+        adj = self._adj[:n, :n]
+        filas, cols = np.nonzero(adj)
+        pesos = adj[filas, cols]
+        antes = len(pesos)
+
+        quitar = np.zeros(antes, dtype=bool)
+        if umbral is not None:
+            quitar |= pesos < umbral
+        por_umbral = np.zeros((n, n), dtype=bool)
+        por_umbral[filas[quitar], cols[quitar]] = True
+        por_umbral |= por_umbral.T
+
+        if max_por_concepto is not None:
+            # Rango de cada arista dentro de su fila, ordenando por peso descendente
+            vivas = np.flatnonzero(~quitar)
+            orden = vivas[np.lexsort((-pesos[vivas], filas[vivas]))]
+            filas_ord = filas[orden]
+            rango = np.arange(len(orden)) - np.searchsorted(filas_ord, filas_ord, side='left')
+            quitar[orden[rango >= max_por_concepto]] = True
+
+        eliminar = np.zeros((n, n), dtype=bool)
+        eliminar[filas[quitar], cols[quitar]] = True
+        eliminar |= eliminar.T
+        eliminar &= adj != 0
+
+        el_filas, el_cols = np.nonzero(eliminar)
+        podadas_umbral = int(np.count_nonzero(por_umbral & eliminar))
+
+        # --- Aplicar a todas las representaciones ---
+        adj[eliminar] = 0.0
+
+        destinos_eliminados = defaultdict(set)
+        for i, j in zip(el_filas.tolist(), el_cols.tolist()):
+            destinos_eliminados[self._names[i]].add(self._names[j])
+        for origen, destinos in destinos_eliminados.items():
+            if origen in self.relaciones:
+                self.relaciones[origen] = [(d, p) for d, p in self.relaciones[origen]
+                                           if d not in destinos]
+
+        if self._grafo is not None:
+            self._grafo.remove_edges_from(
+                (self._names[i], self._names[j])
+                for i, j in zip(el_filas.tolist(), el_cols.tolist()) if i < j
+            )
+
+        return {
+            'conexiones_antes': antes,
+            'conexiones_despues': antes - len(el_filas),
+            'podadas_umbral': podadas_umbral,
+            'podadas_limite': len(el_filas) - podadas_umbral,
+            'conceptos_afectados': len(destinos_eliminados),
+            'tiempo_ms': (time.perf_counter() - inicio) * 1000,
+        }
+
+    def fusionar_similares(self, umbral=0.8, agregacion='max', tam_bloque=None):
+        """
+        Fusión masiva de conceptos casi duplicados.
+
+        1. Join de similitud por bloques sobre los vectores base normalizados
+           (solo triángulo superior, memoria acotada por bloque).
+        2. Union-find sobre los pares > umbral para formar grupos.
+        3. Cada grupo se reduce a su representante (el de más activaciones)
+           con el promedio de vectores ponderado por activaciones + 1.
+        4. La adyacencia se reescribe en una sola pasada sobre sus entradas no
+           nulas (máximo o suma por grupo) y los índices se compactan.
+
+        Args:
+            umbral: Similitud coseno mínima para fusionar
+            agregacion: 'max' o 'suma' para combinar pesos de conexiones
+            tam_bloque: Filas por bloque del join (None = automático)
+
+        Returns:
+            Dict con estadísticas y el mapa {fusionado: representante}
+        """
+        inicio = time.perf_counter()
+        n = self._n
+        resultado = {'pares': 0, 'grupos': 0, 'fusionados': 0, 'mapa': {}, 'tiempo_ms': 0.0}
+        if n < 2:
+            return resultado
+
+        # --- 1. Join por bloques ---
+        V = self._vec_base[:n]
+        Vn = V / np.maximum(np.linalg.norm(V, axis=1), 1e-10)[:, np.newaxis]
+        if tam_bloque is None:
+            tam_bloque = max(1, min(n, 4_000_000 // n))
+        pares_i, pares_j = [], []
+        for b in range(0, n, tam_bloque):
+            e = min(n, b + tam_bloque)
+            S = Vn[b:e] @ Vn[b:].T
+            fi, fj = np.nonzero(np.triu(S > umbral, k=1))
+            pares_i.append(fi + b)
+            pares_j.append(fj + b)
+        pares_i = np.concatenate(pares_i)
+        pares_j = np.concatenate(pares_j)
+        resultado['pares'] = len(pares_i)
+        if not len(pares_i):
+            resultado['tiempo_ms'] = (time.perf_counter() - inicio) * 1000
+            return resultado
+
+        # --- 2. Union-find con compresión de caminos ---
+        padre = list(range(n))
+
+        def raiz(x):
+            while padre[x] != x:
+                padre[x] = padre[padre[x]]
+                x = padre[x]
+            return x
+
+        for i, j in zip(pares_i.tolist(), pares_j.tolist()):
+            ri, rj = raiz(i), raiz(j)
+            if ri != rj:
+                padre[max(ri, rj)] = min(ri, rj)
+        grupo = np.fromiter((raiz(x) for x in range(n)), dtype=np.int64, count=n)
+
+        # --- 3. Representantes y vectores fusionados ---
+        activaciones = np.fromiter((self.conceptos[nm]['activaciones'] for nm in self._names[:n]),
+                                   dtype=np.float64, count=n)
+        # Representante: más activaciones, a igualdad el de menor índice
+        orden = np.lexsort((np.arange(n), -activaciones, grupo))
+        primeros = np.ones(n, dtype=bool)
+        primeros[1:] = grupo[orden][1:] != grupo[orden][:-1]
+        rep_de_grupo = np.empty(n, dtype=np.int64)
+        rep_de_grupo[grupo[orden][primeros]] = orden[primeros]
+        rep = rep_de_grupo[grupo]
+
+        pesos = activaciones + 1.0
+        suma_vec = np.zeros_like(V)
+        np.add.at(suma_vec, rep, V * pesos[:, np.newaxis])
+        suma_act = np.bincount(rep, weights=activaciones, minlength=n)
+        tamano = np.bincount(rep, minlength=n)
+
+        conservados = np.flatnonzero(rep == np.arange(n))
+        k = len(conservados)
+        nuevo_idx = np.full(n, -1, dtype=np.int64)
+        nuevo_idx[conservados] = np.arange(k)
+        destino = nuevo_idx[rep]
+
+        # --- 4. Reescritura de la adyacencia ---
+        adj = self._adj[:n, :n]
+        filas, cols = np.nonzero(adj)
+        nf, nc = destino[filas], destino[cols]
+        fuera_diagonal = nf != nc
+        nueva_adj = np.zeros((self._cap, self._cap), dtype=np.float64)
+        if agregacion == 'suma':
+            np.add.at(nueva_adj, (nf[fuera_diagonal], nc[fuera_diagonal]),
+                      adj[filas, cols][fuera_diagonal])
+        else:
+            bloque = np.full((k, k), -np.inf)
+            np.maximum.at(bloque, (nf[fuera_diagonal], nc[fuera_diagonal]),
+                          adj[filas, cols][fuera_diagonal])
+            bloque[np.isinf(bloque)] = 0.0
+            nueva_adj[:k, :k] = bloque
+
+        # Conceptos cuyas listas de relaciones cambian: grupos fusionados y sus vecinos
+        fusionados = np.flatnonzero(rep != np.arange(n))
+        en_grupo = tamano[rep] > 1
+        afectados = set(destino[en_grupo].tolist())
+        toca_grupo = en_grupo[cols]
+        afectados.update(nf[toca_grupo].tolist())
+
+        # --- Aplicar a todas las representaciones ---
+        nombres_antes = self._names[:n]
+        mapa = {nombres_antes[i]: nombres_antes[rep[i]] for i in fusionados.tolist()}
+        for nombre_rep_idx in conservados[tamano[conservados] > 1].tolist():
+            datos = self.conceptos[nombres_antes[nombre_rep_idx]]
+            nuevo_vector = suma_vec[nombre_rep_idx] / max(np.linalg.norm(suma_vec[nombre_rep_idx]), 1e-10)
+            datos['base'] = nuevo_vector
+            datos['actual'] = nuevo_vector + np.random.normal(0, self.incertidumbre_base, nuevo_vector.shape)
+            datos['activaciones'] = int(suma_act[nombre_rep_idx])
+
+        for eliminado in mapa:
+            del self.conceptos[eliminado]
+            self.relaciones.pop(eliminado, None)
+        for miembros in self.categorias.values():
+            miembros[:] = [m for m in miembros if m not in mapa]
+
+        self._names = [nombres_antes[i] for i in conservados.tolist()]
+        self._idx = {nombre: i for i, nombre in enumerate(self._names)}
+        self._n = k
+        self._adj = nueva_adj
+        vec_base = np.zeros((self._cap, self.dim_vector), dtype=np.float64)
+        vec_actual = np.zeros((self._cap, self.dim_vector), dtype=np.float64)
+        for i, nombre in enumerate(self._names):
+            vec_base[i] = self.conceptos[nombre]['base']
+            vec_actual[i] = self.conceptos[nombre]['actual']
+        self._vec_base, self._vec_actual = vec_base, vec_actual
+
+        for i in afectados:
+            fila = nueva_adj[i, :k]
+            self.relaciones[self._names[i]] = [(self._names[j], float(fila[j]))
+                                               for j in np.flatnonzero(fila).tolist()]
+
+        self.indice = IndiceEspacial(self.dim_vector)
+        self.indice.agregar_lote(self._names, self._vec_actual[:k])
+        self._grafo = None  # se reconstruye bajo demanda
+
+        resultado.update({
+            'grupos': int(np.count_nonzero(tamano > 1)),
+            'fusionados': len(mapa),
+            'mapa': mapa,
+            'tiempo_ms': (time.perf_counter() - inicio) * 1000,
+        })
+        return resultado
+
+    def _vecinos_frios_de(self, indices):
+        """Conceptos fríos conectados a los conceptos calientes dados."""
+        frios = set()
+        for i in indices:
+            frios |= self.almacen_frio.vecinos_frios(self._names[i])
+        return frios
+
     def buscar_similares(self, concepto, top_k=5):
         """Índice espacial: búsqueda vectorizada de conceptos similares por coseno"""
         if concepto not in self._idx:
@@ -307,7 +746,8 @@ class ConceptosLucas:
             'conexiones_proyecto': 0  # Nueva métrica
         }
         
-        self.grafo.add_node(nombre)
+        if self._grafo is not None:
+            self._grafo.add_node(nombre)
         self.metricas['conceptos_creados'] += 1
         self.indice.agregar(nombre, self.conceptos[nombre]['actual'])
 
@@ -329,6 +769,35 @@ class ConceptosLucas:
 
         return nombre
     
+    def añadir_alias(self, nombre, alias):
+        """
+        Registra una forma alternativa con la que el concepto aparece en texto.
+
+        Returns:
+            True si se registró (el concepto existe y el alias no es de otro)
+        """
+        if nombre not in self.conceptos or not alias:
+            return False
+        if self.alias.get(alias, nombre) != nombre:
+            return False
+        self.alias[alias] = nombre
+        return True
+
+    def formas_textuales(self):
+        """
+        Formas en minúsculas (nombres y alias) -> concepto, para buscar conceptos en texto.
+
+        Si dos conceptos comparten forma gana el nombre sobre el alias y, entre
+        nombres, el añadido primero.
+        """
+        formas = {}
+        for nombre in self.conceptos:
+            formas.setdefault(nombre.lower(), nombre)
+        for alias, nombre in self.alias.items():
+            if nombre in self.conceptos:
+                formas.setdefault(alias.lower(), nombre)
+        return formas
+
     def relacionar(self, concepto1, concepto2, fuerza=None, bidireccional=True):
         """
         Versión extendida con métricas de proyecto y sincronización de matriz de adyacencia
@@ -348,7 +817,8 @@ class ConceptosLucas:
         if bidireccional:
             self.relaciones[concepto2].append((concepto1, fuerza))
 
-        self.grafo.add_edge(concepto1, concepto2, weight=fuerza)
+        if self._grafo is not None:
+            self._grafo.add_edge(concepto1, concepto2, weight=fuerza)
         self.metricas['conexiones_formadas'] += 1
 
         # Sincronizar matriz de adyacencia numpy
@@ -368,7 +838,145 @@ class ConceptosLucas:
             self.metricas['proyectos_referenciados'] += 1
 
         return fuerza
-    
+
+    def añadir_conceptos_lote(self, nombres, atributos, incertidumbres=None, categoria='emergentes'):
+        """
+        Versión en lote de añadir_concepto: una sola ampliación de arrays,
+        normalización y ruido vectorizados e inserción en bloque en el índice.
+
+        Los nombres ya presentes (o repetidos en el lote) se omiten.
+
+        Args:
+            nombres: Lista de nombres
+            atributos: Matriz (len(nombres), dim_vector)
+            incertidumbres: Escalar o lista por concepto (None = incertidumbre_base)
+            categoria: Categoría común del lote
+
+        Returns:
+            Lista de nombres añadidos
+        """
+        atributos = np.asarray(atributos, dtype=np.float64)
+        if incertidumbres is None:
+            incertidumbres = self.incertidumbre_base
+        incertidumbres = np.broadcast_to(np.asarray(incertidumbres, dtype=np.float64), (len(nombres),))
+
+        vistos = set(self.conceptos)
+        filas = []
+        for i, nombre in enumerate(nombres):
+            if nombre not in vistos:
+                vistos.add(nombre)
+                filas.append(i)
+        if not filas:
+            return []
+        nuevos = [nombres[i] for i in filas]
+        base = atributos[filas]
+        base = base / np.maximum(np.linalg.norm(base, axis=1, keepdims=True), 1e-10)
+        actual = base + np.random.normal(0, 1, base.shape) * incertidumbres[filas, np.newaxis]
+
+        self._ensure_capacity(len(nuevos))
+        inicio, fin = self._n, self._n + len(nuevos)
+        self._vec_base[inicio:fin] = base
+        self._vec_actual[inicio:fin] = actual
+
+        en_categoria = categoria != 'emergentes' and categoria in self.categorias
+        lista_categoria = self.categorias[categoria if en_categoria else 'emergentes']
+        for k, nombre in enumerate(nuevos):
+            self.conceptos[nombre] = {
+                'base': base[k].copy(),
+                'actual': actual[k].copy(),
+                'historial': [base[k].copy()],
+                'creado': self.metricas['edad'],
+                'activaciones': 0,
+                'ultima_activacion': 0,
+                'fuerza': 1.0,
+                'categoria': categoria,
+                'conexiones_proyecto': 0
+            }
+            self._idx[nombre] = inicio + k
+            lista_categoria.append(nombre)
+        self._names.extend(nuevos)
+        self._n = fin
+
+        self.indice.agregar_lote(nuevos, actual)
+        if self._grafo is not None:
+            self._grafo.add_nodes_from(nuevos)
+        self.metricas['conceptos_creados'] += len(nuevos)
+        return nuevos
+
+    def reproyectar_conceptos(self, nombres, atributos):
+        """
+        Sustituye el vector base de conceptos existentes por otro del mismo
+        concepto en un espacio nuevo (p. ej. al congelar la proyección NLP).
+
+        Conserva el desplazamiento actual - base aprendido; el historial
+        vuelve a empezar porque sus vectores eran del espacio anterior.
+
+        Args:
+            nombres: Lista de nombres (los inexistentes se omiten)
+            atributos: Matriz (len(nombres), dim_vector)
+
+        Returns:
+            Lista de nombres reproyectados
+        """
+        atributos = np.asarray(atributos, dtype=np.float64)
+        filas = [k for k, nombre in enumerate(nombres) if nombre in self._idx]
+        if not filas:
+            return []
+        base = atributos[filas]
+        base = base / np.maximum(np.linalg.norm(base, axis=1, keepdims=True), 1e-10)
+        reproyectados = []
+        for k, fila in enumerate(filas):
+            nombre = nombres[fila]
+            i = self._idx[nombre]
+            datos = self.conceptos[nombre]
+            datos['actual'] = base[k] + (datos['actual'] - datos['base'])
+            datos['base'] = base[k].copy()
+            datos['historial'] = [base[k].copy()]
+            self._vec_base[i] = datos['base']
+            self._vec_actual[i] = datos['actual']
+            self.indice.actualizar(nombre, datos['actual'])
+            reproyectados.append(nombre)
+        return reproyectados
+
+    def relacionar_lote(self, relaciones, bidireccional=True):
+        """
+        Versión en lote de relacionar con fuerzas explícitas.
+
+        Args:
+            relaciones: Iterable de (concepto1, concepto2, fuerza)
+            bidireccional: Igual que en relacionar
+
+        Returns:
+            Número de relaciones creadas (se omiten las de conceptos inexistentes)
+        """
+        validas = [(c1, c2, float(f)) for c1, c2, f in relaciones
+                   if c1 in self.conceptos and c2 in self.conceptos]
+        if not validas:
+            return 0
+
+        idx_i = np.fromiter((self._idx[c1] for c1, _, _ in validas), dtype=np.intp, count=len(validas))
+        idx_j = np.fromiter((self._idx[c2] for _, c2, _ in validas), dtype=np.intp, count=len(validas))
+        fuerzas = np.fromiter((f for _, _, f in validas), dtype=np.float64, count=len(validas))
+        self._adj[idx_i, idx_j] = fuerzas
+        if bidireccional:
+            self._adj[idx_j, idx_i] = fuerzas
+
+        for c1, c2, fuerza in validas:
+            self.relaciones[c1].append((c2, fuerza))
+            if bidireccional:
+                self.relaciones[c2].append((c1, fuerza))
+            self.conceptos[c1]['conexiones_proyecto'] += 1
+            self.conceptos[c2]['conexiones_proyecto'] += 1
+            cat1 = self.conceptos[c1]['categoria']
+            cat2 = self.conceptos[c2]['categoria']
+            if cat1 != cat2 and cat1 != 'emergentes' and cat2 != 'emergentes':
+                self.metricas['proyectos_referenciados'] += 1
+
+        if self._grafo is not None:
+            self._grafo.add_weighted_edges_from(validas)
+        self.metricas['conexiones_formadas'] += len(validas)
+        return len(validas)
+
     def explorar_proyecto(self, proyecto, profundidad=3):
         """
         Explora específicamente un proyecto y sus tecnologías relacionadas
@@ -423,7 +1031,8 @@ class ConceptosLucas:
         co_activaciones = defaultdict(int)
         
         for activacion in ultimas_activaciones:
-            conceptos_activos = [c for c, a in activacion['resultado'].items() if a > umbral_emergencia]
+            conceptos_activos = [c for c, a in activacion['resultado'].items()
+                                 if a > umbral_emergencia and c in self.conceptos]
             
             # Contar pares co-activados
             for i, c1 in enumerate(conceptos_activos):
@@ -439,9 +1048,7 @@ class ConceptosLucas:
                 cat2 = self.conceptos[c2]['categoria']
                 
                 if cat1 != cat2:  # Cross-categoria = emergencia potencial
-                    fuerza_conexion = 0
-                    if self.grafo.has_edge(c1, c2):
-                        fuerza_conexion = self.grafo[c1][c2]['weight']
+                    fuerza_conexion = float(self._adj[self._idx[c1], self._idx[c2]])
                     
                     emergencias.append({
                         'conceptos': (c1, c2),
@@ -477,6 +1084,9 @@ class ConceptosLucas:
         """
         Visualización específica para los conceptos de Lucas con colores por categoría
         """
+        import matplotlib.pyplot as plt
+        import networkx as nx
+
         plt.figure(figsize=(16, 12))
         
         # Colores por categoría
@@ -596,7 +1206,10 @@ class ConceptosLucas:
     def activar(self, concepto_inicial, pasos=3, temperatura=0.1):
         """Propagación matricial numpy — reemplaza bucles anidados Python"""
         if concepto_inicial not in self._idx:
-            return []
+            # Paginación transparente: un concepto frío vuelve a RAM al activarse
+            if self.almacen_frio is None or concepto_inicial not in self.almacen_frio:
+                return []
+            self.paginar_conceptos([concepto_inicial])
 
         # Incrementar métricas específicas
         categoria = self.conceptos[concepto_inicial]['categoria']
@@ -651,6 +1264,14 @@ class ConceptosLucas:
                 self.conceptos[name]['activaciones'] += 1
                 self.conceptos[name]['ultima_activacion'] = ciclo
 
+            # La activación alcanza conceptos fríos vecinos: paginarlos para el
+            # siguiente paso (entran con activación 0 y reciben propagación)
+            if self.almacen_frio is not None and len(self.almacen_frio) and paso < pasos - 1:
+                if self.paginar_conceptos(self._vecinos_frios_de(high_idx)):
+                    n = self._n
+                    adj = self._adj[:n, :n]
+                    new_act = np.concatenate([new_act, np.zeros(n - len(new_act))])
+
             act = new_act
             resultados.append(self._act_to_dict(act))
 
@@ -678,6 +1299,9 @@ class ConceptosLucas:
                     "ciclo": self.metricas['ciclos_pensamiento'],
                 }, fuerza=valor_act)
 
+        # Mantener el presupuesto de RAM sin expulsar lo que acaba de activarse
+        self.aplicar_presupuesto(protegidos=[c for c, _ in top_activados] + [concepto_inicial])
+
         return resultados
     
     def auto_modificar(self, fuerza=0.1):
@@ -722,7 +1346,8 @@ class ConceptosLucas:
                 self._adj[jg, ig] = new_w
 
                 c1, c2 = self._names[ig], self._names[jg]
-                self.grafo[c1][c2]['weight'] = new_w
+                if self._grafo is not None:
+                    self._grafo[c1][c2]['weight'] = new_w
 
                 # Actualizar listas de relaciones
                 for idx, (vecino, _) in enumerate(self.relaciones[c1]):
@@ -761,6 +1386,7 @@ class ConceptosLucas:
                 'conceptos': {},
                 'relaciones': [],
                 'categorias': self.categorias,
+                'alias': self.alias,
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -816,6 +1442,7 @@ class ConceptosLucas:
             # Cargar métricas y categorías
             sistema.metricas = estado.get('metricas', {})
             sistema.categorias = estado.get('categorias', {})
+            sistema.alias = estado.get('alias', {})
             
             # Cargar conceptos
             for nombre, datos in estado.get('conceptos', {}).items():
@@ -834,8 +1461,6 @@ class ConceptosLucas:
                     'conexiones_proyecto': datos.get('conexiones_proyecto', 0)
                 }
                 
-                sistema.grafo.add_node(nombre)
-                
             # Cargar relaciones
             for rel in estado.get('relaciones', []):
                 origen = rel['origen']
@@ -843,7 +1468,6 @@ class ConceptosLucas:
                 peso = rel['peso']
                 
                 sistema.relaciones[origen].append((destino, peso))
-                sistema.grafo.add_edge(origen, destino, weight=peso)
 
             # Reconstruir estructuras numpy desde los dicts cargados
             sistema._rebuild_numpy()
@@ -853,7 +1477,136 @@ class ConceptosLucas:
         except Exception as e:
             print(f"Error al cargar: {e}")
             return None
-    
+
+    def guardar_binario(self, ruta_dir, definicion=None):
+        """
+        Guarda un snapshot binario del sistema, pensado para arranques en frío.
+
+        Los arrays numpy (vectores y adyacencia) se escriben como .npy sin
+        compresión para poder mapearlos en memoria al cargar; el resto del
+        estado (nombres, métricas, relaciones) va en un meta.json pequeño.
+
+        Args:
+            ruta_dir: Directorio destino (se crea si no existe)
+            definicion: Huella opcional de lo que generó el estado; cargar_binario
+                rechaza el snapshot si se le pide otra
+
+        Returns:
+            True si se guardó correctamente
+        """
+        try:
+            os.makedirs(ruta_dir, exist_ok=True)
+            n = self._n
+            np.save(os.path.join(ruta_dir, 'vec_base.npy'), self._vec_base[:n])
+            np.save(os.path.join(ruta_dir, 'vec_actual.npy'), self._vec_actual[:n])
+            np.save(os.path.join(ruta_dir, 'adj.npy'), self._adj[:n, :n])
+
+            meta = {
+                'version': SNAPSHOT_BINARIO_VERSION,
+                'dim_vector': self.dim_vector,
+                'incertidumbre_base': self.incertidumbre_base,
+                'nombres': self._names[:n],
+                'conceptos': {
+                    nombre: {
+                        'creado': datos['creado'],
+                        'activaciones': datos['activaciones'],
+                        'ultima_activacion': datos['ultima_activacion'],
+                        'fuerza': datos['fuerza'],
+                        'categoria': datos['categoria'],
+                        'conexiones_proyecto': datos['conexiones_proyecto'],
+                    }
+                    for nombre, datos in self.conceptos.items()
+                },
+                'relaciones': {origen: destinos for origen, destinos in self.relaciones.items()},
+                'metricas': self.metricas,
+                'categorias': self.categorias,
+                'alias': self.alias,
+                'definicion': definicion,
+                'timestamp': datetime.now().isoformat()
+            }
+            with open(os.path.join(ruta_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            return True
+
+        except Exception as e:
+            print(f"Error al guardar snapshot binario: {e}")
+            return False
+
+    @classmethod
+    def cargar_binario(cls, ruta_dir, mmap=True, definicion=None):
+        """
+        Carga un snapshot creado con guardar_binario.
+
+        Con mmap=True los arrays se mapean en modo copy-on-write: el arranque
+        no copia datos y las escrituras posteriores (auto_modificar, nuevos
+        conceptos) quedan en memoria privada sin tocar el fichero.
+
+        Args:
+            ruta_dir: Directorio del snapshot
+            mmap: Mapear los arrays en memoria en vez de leerlos completos
+            definicion: Si se indica, la huella guardada debe coincidir
+
+        Returns:
+            Instancia cargada, o None si el snapshot no existe, es inválido o
+            es de otra definición
+        """
+        try:
+            ruta_meta = os.path.join(ruta_dir, 'meta.json')
+            if not os.path.exists(ruta_meta):
+                return None
+
+            with open(ruta_meta, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != SNAPSHOT_BINARIO_VERSION:
+                print(f"Snapshot binario con versión incompatible: {meta.get('version')}")
+                return None
+            if definicion is not None and meta.get('definicion') != definicion:
+                print("Snapshot binario de una definición anterior: se descarta")
+                return None
+
+            modo = 'c' if mmap else None
+            vec_base = np.load(os.path.join(ruta_dir, 'vec_base.npy'), mmap_mode=modo)
+            vec_actual = np.load(os.path.join(ruta_dir, 'vec_actual.npy'), mmap_mode=modo)
+            adj = np.load(os.path.join(ruta_dir, 'adj.npy'), mmap_mode=modo)
+
+            sistema = cls(
+                dim_vector=meta['dim_vector'],
+                incertidumbre_base=meta['incertidumbre_base']
+            )
+            sistema.metricas = meta['metricas']
+            sistema.categorias = meta['categorias']
+            sistema.alias = meta.get('alias', {})
+
+            names = meta['nombres']
+            sistema._n = len(names)
+            sistema._cap = len(names)
+            sistema._names = list(names)
+            sistema._idx = {name: i for i, name in enumerate(names)}
+            sistema._vec_base = vec_base
+            sistema._vec_actual = vec_actual
+            sistema._adj = adj
+
+            for i, nombre in enumerate(names):
+                datos = meta['conceptos'][nombre]
+                # Copias: las filas del mmap se mueven al eliminar conceptos
+                sistema.conceptos[nombre] = {
+                    'base': np.array(vec_base[i]),
+                    'actual': np.array(vec_actual[i]),
+                    'historial': [np.array(vec_base[i])],
+                    **datos
+                }
+
+            for origen, destinos in meta['relaciones'].items():
+                sistema.relaciones[origen] = [(destino, peso) for destino, peso in destinos]
+
+            sistema.indice.agregar_lote(names, vec_actual)
+
+            return sistema
+
+        except Exception as e:
+            print(f"Error al cargar snapshot binario: {e}")
+            return None
+
     def ciclo_vital(self, num_ciclos=1, auto_mod=True, visualizar_cada=5):
         """Ejecuta un ciclo completo de vida del sistema"""
         resultados = []
@@ -1048,9 +1801,9 @@ class ConceptosLucas:
                 if nuevo_peso != self._adj[i, j]:
                     self._adj[i, j] = nuevo_peso
                     self._adj[j, i] = nuevo_peso
-                    # Actualizar grafo networkx
-                    if self.grafo.has_edge(origen, destino):
-                        self.grafo[origen][destino]['weight'] = nuevo_peso
+                    # Actualizar grafo networkx (si ya se construyó)
+                    if self._grafo is not None and self._grafo.has_edge(origen, destino):
+                        self._grafo[origen][destino]['weight'] = nuevo_peso
                     # Actualizar listas de relaciones
                     for idx, (vecino, _) in enumerate(self.relaciones[origen]):
                         if vecino == destino:
@@ -1171,6 +1924,43 @@ def crear_universo_lucas():
     
     return sistema
 
+
+def definicion_universo_lucas():
+    """
+    Huella de la definición del universo de Lucas: el código que lo construye.
+
+    Cambia al editar los conceptos o relaciones base, lo que invalida los
+    snapshots creados con la definición anterior.
+    """
+    import hashlib
+    import inspect
+    huella = hashlib.blake2b(digest_size=16)
+    huella.update(str(SNAPSHOT_BINARIO_VERSION).encode())
+    for funcion in (crear_universo_lucas, ConceptosLucas.crear_conceptos_lucas,
+                    ConceptosLucas.crear_relaciones_lucas):
+        try:
+            huella.update(inspect.getsource(funcion).encode('utf-8'))
+        except (OSError, TypeError):
+            huella.update(funcion.__code__.co_code)  # sin fuentes (p. ej. solo .pyc)
+    return huella.hexdigest()
+
+def cargar_universo_lucas(ruta_snapshot):
+    """
+    Carga el universo de Lucas desde un snapshot binario, creándolo la primera vez.
+
+    Pensado para reinicios de workers y llamadas CLI: si el snapshot existe y
+    es de la definición actual se mapea en memoria sin reconstruir nada; si
+    no, se crea el universo y se guarda el snapshot para el siguiente arranque.
+    """
+    definicion = definicion_universo_lucas()
+    sistema = ConceptosLucas.cargar_binario(ruta_snapshot, definicion=definicion)
+    if sistema is not None:
+        return sistema
+
+    sistema = crear_universo_lucas()
+    sistema.guardar_binario(ruta_snapshot, definicion=definicion)
+    return sistema
+
 if __name__ == "__main__":
     # Test básico
     sistema = crear_universo_lucas()
@@ -4,30 +4,31 @@ Módulo para optimizar el rendimiento del sistema IANAE con grandes cantidades d
 """
 
 import os
-import numpy as np
-import matplotlib.pyplot as plt
-from nucleo import ConceptosDifusos
+from src.core.nucleo import ConceptosLucas
+from src.core.almacen_frio import AlmacenFrio
 import time
 import json
-import psutil  # Para monitoreo de recursos (instalar con pip install psutil)
 
 class IANAEOptimizado:
     """
-    Wrapper para ConceptosDifusos que implementa optimizaciones para manejar
+    Wrapper para ConceptosLucas que implementa optimizaciones para manejar
     sistemas de gran escala con limitaciones de recursos.
     """
     
-    def __init__(self, sistema=None, dim_vector=10, ruta_temp="./datos/temp/"):
+    def __init__(self, sistema=None, dim_vector=10, ruta_temp="./datos/temp/",
+                 max_conceptos_ram=None):
         """
         Inicializa el optimizador
         
         Args:
-            sistema: Sistema ConceptosDifusos existente (opcional)
+            sistema: Sistema ConceptosLucas existente (opcional)
             dim_vector: Dimensionalidad para un nuevo sistema
             ruta_temp: Ruta para almacenamiento temporal en disco
+            max_conceptos_ram: Presupuesto de conceptos calientes en RAM; el
+                resto se pagina a disco (None = sin presupuesto, sin paginación)
         """
         # Crear o usar sistema existente
-        self.sistema = sistema if sistema else ConceptosDifusos(dim_vector=dim_vector)
+        self.sistema = sistema if sistema else ConceptosLucas(dim_vector=dim_vector)
         
         # Configurar límites
         self.MAX_CONCEPTOS = 500
@@ -51,8 +52,20 @@ class IANAEOptimizado:
             'num_conexiones': []
         }
         
-        # Conceptos apartados (interesantes pero poco activados)
-        self.conceptos_apartados = {}
+        # Conceptos apartados (interesantes pero poco activados): almacén frío
+        # en disco, paginado de vuelta automáticamente al activarse
+        self.almacen_frio = AlmacenFrio(
+            os.path.join(self.ruta_temp, "almacen_frio"),
+            dim_vector=self.sistema.dim_vector
+        )
+        self.sistema.almacen_frio = self.almacen_frio
+        self.sistema.max_conceptos_calientes = max_conceptos_ram
+        self.cargar_conceptos_apartados()
+
+    @property
+    def conceptos_apartados(self):
+        """Almacén frío (soporta len() e `in` como el antiguo dict)"""
+        return self.almacen_frio
         
     def monitorear_recursos(self):
         """
@@ -61,6 +74,8 @@ class IANAEOptimizado:
         Returns:
             Dict con métricas de uso de recursos
         """
+        import psutil  # Para monitoreo de recursos (instalar con pip install psutil)
+
         proceso = psutil.Process(os.getpid())
         memoria_usada = proceso.memory_info().rss / 1024 / 1024  # MB
         
@@ -80,31 +95,13 @@ class IANAEOptimizado:
     def podar_conexiones_debiles(self):
         """
         Elimina conexiones con peso por debajo del umbral para optimizar rendimiento
+        (máscara vectorizada sobre la matriz de adyacencia)
         
         Returns:
             Número de conexiones eliminadas
         """
-        conexiones_eliminadas = 0
-        
-        # Iterar sobre todos los conceptos y sus conexiones
-        for concepto in list(self.sistema.relaciones.keys()):
-            # Filtrar conexiones por debajo del umbral
-            conexiones_originales = self.sistema.relaciones[concepto]
-            conexiones_filtradas = [(dest, peso) for dest, peso in conexiones_originales 
-                                   if peso >= self.UMBRAL_CONEXION_MIN]
-            
-            # Calcular cuántas se eliminaron
-            eliminadas = len(conexiones_originales) - len(conexiones_filtradas)
-            conexiones_eliminadas += eliminadas
-            
-            # Actualizar lista de conexiones
-            self.sistema.relaciones[concepto] = conexiones_filtradas
-            
-            # Actualizar grafo
-            if eliminadas > 0:
-                for dest, peso in conexiones_originales:
-                    if peso < self.UMBRAL_CONEXION_MIN and self.sistema.grafo.has_edge(concepto, dest):
-                        self.sistema.grafo.remove_edge(concepto, dest)
+        stats = self.sistema.podar_conexiones(umbral=self.UMBRAL_CONEXION_MIN)
+        conexiones_eliminadas = stats['podadas_umbral']
         
         print(f"Conexiones podadas: {conexiones_eliminadas}")
         return conexiones_eliminadas
@@ -112,35 +109,13 @@ class IANAEOptimizado:
     def limitar_conexiones_por_concepto(self):
         """
         Limita el número de conexiones por concepto manteniendo solo las más fuertes
+        (top-k por fila sobre la matriz de adyacencia)
         
         Returns:
             Número de conexiones eliminadas
         """
-        conexiones_eliminadas = 0
-        
-        # Iterar sobre todos los conceptos
-        for concepto in self.sistema.relaciones:
-            conexiones = self.sistema.relaciones[concepto]
-            
-            # Si hay más conexiones que el límite, ordenar por peso y quedarnos con las más fuertes
-            if len(conexiones) > self.MAX_CONEXIONES_POR_CONCEPTO:
-                # Ordenar por peso (descendente)
-                conexiones_ordenadas = sorted(conexiones, key=lambda x: x[1], reverse=True)
-                
-                # Quedarnos solo con las MAX_CONEXIONES_POR_CONCEPTO más fuertes
-                conexiones_a_mantener = conexiones_ordenadas[:self.MAX_CONEXIONES_POR_CONCEPTO]
-                conexiones_a_eliminar = conexiones_ordenadas[self.MAX_CONEXIONES_POR_CONCEPTO:]
-                
-                # Actualizar grafo eliminando las conexiones descartadas
-                for dest, peso in conexiones_a_eliminar:
-                    if self.sistema.grafo.has_edge(concepto, dest):
-                        self.sistema.grafo.remove_edge(concepto, dest)
-                
-                # Actualizar lista de conexiones
-                self.sistema.relaciones[concepto] = conexiones_a_mantener
-                
-                # Contar eliminadas
-                conexiones_eliminadas += len(conexiones_a_eliminar)
+        stats = self.sistema.podar_conexiones(max_por_concepto=self.MAX_CONEXIONES_POR_CONCEPTO)
+        conexiones_eliminadas = stats['podadas_limite']
         
         print(f"Conexiones limitadas: {conexiones_eliminadas}")
         return conexiones_eliminadas
@@ -148,17 +123,18 @@ class IANAEOptimizado:
     def apartar_conceptos_poco_activos(self):
         """
         Identifica y aparta conceptos interesantes pero con baja activación
+        al almacén frío (segmentos mmap en disco)
         
         Returns:
             Lista de conceptos apartados
         """
-        conceptos_apartados_ahora = []
+        candidatos = []
         
         # Calcular umbral relativo basado en edad del sistema
         edad_min = max(10, self.sistema.metricas['edad'] / 10)
         
         # Buscar conceptos con baja tasa de activación pero que existen hace tiempo
-        for nombre, datos in list(self.sistema.conceptos.items()):
+        for nombre, datos in self.sistema.conceptos.items():
             # Calcular ratio de activación (activaciones / edad desde creación)
             edad_concepto = self.sistema.metricas['edad'] - datos['creado']
             if edad_concepto < edad_min:
@@ -169,66 +145,39 @@ class IANAEOptimizado:
             # Si el concepto tiene baja activación pero tiene al menos algunas conexiones
             num_conexiones = len(self.sistema.relaciones.get(nombre, []))
             if ratio_activacion < 0.1 and num_conexiones >= 2:
-                # Guardar información del concepto
-                self.conceptos_apartados[nombre] = {
-                    'vector': datos['base'].tolist(),
-                    'actual': datos['actual'].tolist(),
-                    'activaciones': datos['activaciones'],
-                    'creado': datos['creado'],
-                    'edad_cuando_apartado': self.sistema.metricas['edad'],
-                    'conexiones': [(dest, peso) for dest, peso in self.sistema.relaciones.get(nombre, [])]
-                }
-                
-                # Eliminar del sistema principal
-                del self.sistema.conceptos[nombre]
-                if nombre in self.sistema.relaciones:
-                    del self.sistema.relaciones[nombre]
-                
-                # Eliminar nodo del grafo
-                if nombre in self.sistema.grafo:
-                    self.sistema.grafo.remove_node(nombre)
-                
-                # Eliminar de las relaciones de otros conceptos
-                for c in self.sistema.relaciones:
-                    self.sistema.relaciones[c] = [(dest, peso) for dest, peso in self.sistema.relaciones[c] 
-                                                 if dest != nombre]
-                
-                conceptos_apartados_ahora.append(nombre)
+                candidatos.append(nombre)
         
-        # Guardar conceptos apartados a disco
-        if conceptos_apartados_ahora:
-            self.guardar_conceptos_apartados()
-            print(f"Conceptos apartados: {len(conceptos_apartados_ahora)}")
+        # Un único segmento nuevo por llamada; el resto del almacén no se reescribe
+        if candidatos:
+            self.sistema.expulsar_conceptos(candidatos)
+            print(f"Conceptos apartados: {len(candidatos)}")
         
-        return conceptos_apartados_ahora
+        return candidatos
     
     def guardar_conceptos_apartados(self):
         """
-        Guarda los conceptos apartados a un archivo JSON
+        Sin efecto: el almacén frío persiste cada segmento al escribirlo.
+        Se mantiene por compatibilidad con el flujo anterior basado en JSON.
         """
-        ruta = os.path.join(self.ruta_temp, "conceptos_apartados.json")
-        with open(ruta, 'w', encoding='utf-8') as f:
-            json.dump(self.conceptos_apartados, f, indent=2)
+        return len(self.almacen_frio)
     
     def cargar_conceptos_apartados(self):
         """
-        Carga los conceptos apartados desde un archivo JSON
+        Migra el conceptos_apartados.json del formato anterior al almacén frío
         
         Returns:
-            Número de conceptos cargados
+            Número de conceptos en el almacén frío
         """
         ruta = os.path.join(self.ruta_temp, "conceptos_apartados.json")
-        if not os.path.exists(ruta):
-            return 0
-            
-        with open(ruta, 'r', encoding='utf-8') as f:
-            self.conceptos_apartados = json.load(f)
-            
-        return len(self.conceptos_apartados)
+        if self.almacen_frio.importar_json(ruta):
+            os.replace(ruta, ruta + ".migrado")
+        return len(self.almacen_frio)
     
     def reincorporar_conceptos_apartados(self, num_conceptos=5):
         """
-        Reincorpora algunos conceptos apartados al sistema principal
+        Reincorpora algunos conceptos apartados al sistema principal.
+        La activación ya pagina conceptos fríos automáticamente; esto permite
+        además precargar los más conectados cuando sobra presupuesto.
         
         Args:
             num_conceptos: Número de conceptos a reincorporar
@@ -236,47 +185,17 @@ class IANAEOptimizado:
         Returns:
             Lista de conceptos reincorporados
         """
-        if not self.conceptos_apartados:
+        if not len(self.almacen_frio):
             return []
             
         # Ordenar conceptos apartados por número de conexiones
         conceptos_ordenados = sorted(
-            self.conceptos_apartados.items(),
-            key=lambda x: len(x[1]['conexiones']),
+            self.almacen_frio.nombres(),
+            key=self.almacen_frio.num_conexiones,
             reverse=True
         )
         
-        # Tomar los primeros N conceptos
-        a_reincorporar = conceptos_ordenados[:min(num_conceptos, len(conceptos_ordenados))]
-        reincorporados = []
-        
-        for nombre, datos in a_reincorporar:
-            # Comprobar que no exista ya un concepto con el mismo nombre
-            if nombre in self.sistema.conceptos:
-                continue
-                
-            # Recrear el concepto
-            vector_base = np.array(datos['vector'])
-            self.sistema.añadir_concepto(
-                nombre=nombre,
-                atributos=vector_base
-            )
-            
-            # Restaurar métricas
-            self.sistema.conceptos[nombre]['activaciones'] = datos['activaciones']
-            self.sistema.conceptos[nombre]['creado'] = datos['creado']
-            
-            # Recrear conexiones que aún existan en el sistema
-            for dest, peso in datos['conexiones']:
-                if dest in self.sistema.conceptos:
-                    self.sistema.relacionar(nombre, dest, fuerza=peso)
-            
-            # Eliminar del diccionario de apartados
-            del self.conceptos_apartados[nombre]
-            reincorporados.append(nombre)
-        
-        # Actualizar archivo de conceptos apartados
-        self.guardar_conceptos_apartados()
+        reincorporados = self.sistema.paginar_conceptos(conceptos_ordenados[:num_conceptos])
         
         print(f"Conceptos reincorporados: {len(reincorporados)}")
         return reincorporados
@@ -294,9 +213,14 @@ class IANAEOptimizado:
         # Monitorear estado inicial
         estado_inicial = self.monitorear_recursos()
         
-        # Aplicar todas las optimizaciones
-        conexiones_podadas = self.podar_conexiones_debiles()
-        conexiones_limitadas = self.limitar_conexiones_por_concepto()
+        # Aplicar todas las optimizaciones (umbral + límite en una sola pasada)
+        stats_poda = self.sistema.podar_conexiones(
+            umbral=self.UMBRAL_CONEXION_MIN,
+            max_por_concepto=self.MAX_CONEXIONES_POR_CONCEPTO
+        )
+        conexiones_podadas = stats_poda['podadas_umbral']
+        conexiones_limitadas = stats_poda['podadas_limite']
+        print(f"Conexiones podadas: {conexiones_podadas}, limitadas: {conexiones_limitadas}")
         conceptos_apartados = self.apartar_conceptos_poco_activos()
         
         # Monitorear estado final
@@ -310,6 +234,7 @@ class IANAEOptimizado:
             'memoria_final_mb': estado_final['memoria_usada'],
             'conexiones_podadas': conexiones_podadas,
             'conexiones_limitadas': conexiones_limitadas,
+            'poda': stats_poda,
             'conceptos_apartados': len(conceptos_apartados)
         }
         
@@ -468,7 +393,9 @@ class IANAEOptimizado:
         if not self.metricas_rendimiento['tiempo_ciclo']:
             print("No hay suficientes datos de rendimiento para visualizar")
             return
-            
+
+        import matplotlib.pyplot as plt
+
         fig, axs = plt.subplots(2, 2, figsize=(14, 10))
         
         # Tiempo por ciclo
@@ -508,6 +435,9 @@ def fusionar_conceptos_similares(self, umbral_similitud=0.8):
     """
     Fusiona conceptos muy similares para reducir redundancia
     
+    Los pares por encima del umbral se agrupan con union-find y cada grupo
+    se fusiona de una vez (ver ConceptosLucas.fusionar_similares).
+    
     Args:
         umbral_similitud: Umbral de similitud para considerar fusión
         
@@ -519,123 +449,11 @@ def fusionar_conceptos_similares(self, umbral_similitud=0.8):
     
     print("Buscando conceptos similares para fusionar...")
     
-    # Preparar vectores y nombres
-    vectores = {}
-    for nombre, datos in self.sistema.conceptos.items():
-        vectores[nombre] = datos['base']
+    stats = self.sistema.fusionar_similares(umbral=umbral_similitud)
     
-    # Buscar pares de conceptos similares
-    nombres = list(vectores.keys())
-    candidatos_fusion = []
-    
-    # Comparar cada par (proceso O(n²), puede ser lento con muchos conceptos)
-    for i in range(len(nombres)):
-        for j in range(i+1, len(nombres)):
-            v1 = vectores[nombres[i]]
-            v2 = vectores[nombres[j]]
-            
-            # Calcular similitud coseno
-            similitud = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
-            
-            if similitud > umbral_similitud:
-                # Guardar esta pareja y su similitud
-                candidatos_fusion.append((nombres[i], nombres[j], similitud))
-    
-    # Ordenar candidatos por similitud (descendente)
-    candidatos_fusion.sort(key=lambda x: x[2], reverse=True)
-    
-    # Realizar fusiones
-    fusionados = 0
-    conceptos_procesados = set()
-    
-    for c1, c2, sim in candidatos_fusion:
-        # Si alguno ya ha sido procesado, saltamos
-        if c1 in conceptos_procesados or c2 in conceptos_procesados:
-            continue
-        
-        # Determinar cuál mantener y cuál eliminar
-        # Preferimos mantener el que tiene más activaciones
-        if self.sistema.conceptos[c1]['activaciones'] >= self.sistema.conceptos[c2]['activaciones']:
-            mantener, eliminar = c1, c2
-        else:
-            mantener, eliminar = c2, c1
-        
-        print(f"Fusionando conceptos similares: '{eliminar}' -> '{mantener}' (similitud: {sim:.2f})")
-        
-        # Actualizar vector del concepto que mantenemos (promedio ponderado)
-        act1 = self.sistema.conceptos[mantener]['activaciones'] + 1
-        act2 = self.sistema.conceptos[eliminar]['activaciones'] + 1
-        peso_total = act1 + act2
-        
-        # Nuevo vector base (promedio ponderado por activaciones)
-        nuevo_vector = (self.sistema.conceptos[mantener]['base'] * act1 + 
-                       self.sistema.conceptos[eliminar]['base'] * act2) / peso_total
-        
-        # Normalizar el nuevo vector
-        nuevo_vector = nuevo_vector / np.linalg.norm(nuevo_vector)
-        
-        # Actualizar el concepto que mantenemos
-        self.sistema.conceptos[mantener]['base'] = nuevo_vector
-        self.sistema.conceptos[mantener]['actual'] = nuevo_vector + np.random.normal(0, 0.1, nuevo_vector.shape)
-        self.sistema.conceptos[mantener]['activaciones'] += self.sistema.conceptos[eliminar]['activaciones']
-        
-        # Transferir conexiones del concepto eliminado al mantenido
-        if eliminar in self.sistema.relaciones:
-            for dest, peso in self.sistema.relaciones[eliminar]:
-                # Si la conexión ya existe, quedarnos con el peso mayor
-                existe = False
-                for idx, (d, p) in enumerate(self.sistema.relaciones.get(mantener, [])):
-                    if d == dest:
-                        existe = True
-                        # Actualizar peso si el nuevo es mayor
-                        if peso > p:
-                            self.sistema.relaciones[mantener][idx] = (d, peso)
-                            # Actualizar grafo si existe
-                            if self.sistema.grafo.has_edge(mantener, dest):
-                                self.sistema.grafo[mantener][dest]['weight'] = peso
-                        break
-                
-                # Si no existe, añadir la conexión
-                if not existe and dest != mantener:
-                    if mantener not in self.sistema.relaciones:
-                        self.sistema.relaciones[mantener] = []
-                    self.sistema.relaciones[mantener].append((dest, peso))
-                    # Añadir al grafo
-                    self.sistema.grafo.add_edge(mantener, dest, weight=peso)
-            
-            # También debemos actualizar las conexiones entrantes
-            for origen in self.sistema.relaciones:
-                for idx, (dest, peso) in enumerate(self.sistema.relaciones[origen]):
-                    if dest == eliminar:
-                        # Reemplazar por el concepto mantenido
-                        self.sistema.relaciones[origen][idx] = (mantener, peso)
-                        # Actualizar grafo
-                        if self.sistema.grafo.has_edge(origen, eliminar):
-                            # Eliminar arista antigua
-                            self.sistema.grafo.remove_edge(origen, eliminar)
-                            # Añadir nueva si no existe
-                            if not self.sistema.grafo.has_edge(origen, mantener):
-                                self.sistema.grafo.add_edge(origen, mantener, weight=peso)
-                            # Si ya existe, mantener el peso mayor
-                            elif self.sistema.grafo[origen][mantener]['weight'] < peso:
-                                self.sistema.grafo[origen][mantener]['weight'] = peso
-        
-        # Eliminar el concepto redundante
-        if eliminar in self.sistema.conceptos:
-            del self.sistema.conceptos[eliminar]
-        if eliminar in self.sistema.relaciones:
-            del self.sistema.relaciones[eliminar]
-        if eliminar in self.sistema.grafo:
-            self.sistema.grafo.remove_node(eliminar)
-        
-        # Marcar como procesados
-        conceptos_procesados.add(mantener)
-        conceptos_procesados.add(eliminar)
-        
-        fusionados += 1
-    
-    print(f"Se fusionaron {fusionados} pares de conceptos")
-    return fusionados
+    print(f"Se fusionaron {stats['fusionados']} conceptos en {stats['grupos']} grupos "
+          f"({stats['pares']} pares similares, {stats['tiempo_ms']:.1f} ms)")
+    return stats['fusionados']
 
 def buscar_patrones_emergentes(self):
     """
@@ -652,6 +470,7 @@ def buscar_patrones_emergentes(self):
     print("Buscando patrones emergentes en la red conceptual...")
     
     import networkx as nx
+    import matplotlib.pyplot as plt
     from networkx.algorithms import community
     
     # Usar solo conexiones con peso significativo para análisis de patrones
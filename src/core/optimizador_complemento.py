@@ -2,8 +2,6 @@
 Funciones complementarias para el optimizador IANAE
 """
 import os
-import networkx as nx
-import matplotlib.pyplot as plt
 import numpy as np
 
 def buscar_patrones_emergentes(self):
@@ -19,7 +17,10 @@ def buscar_patrones_emergentes(self):
         return {}
     
     print("Buscando patrones emergentes en la red conceptual...")
-    
+
+    import networkx as nx
+    import matplotlib.pyplot as plt
+
     # Usar solo conexiones con peso significativo para análisis de patrones
     G = nx.Graph()
     
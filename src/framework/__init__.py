@@ -1 +1 @@
-"""IANAE  src/framework"""
+"""IANAE — src/framework"""
@@ -9,16 +9,40 @@ import sqlite3
 import json
 import os
 import hashlib
+import re
+import threading
 import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple, Union
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 import logging
+import zlib
 from pathlib import Path
 
+try:
+    import xxhash
+except ImportError:  # opcional: sin él se usa crc32 de zlib
+    xxhash = None
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Tokenizador FTS5: sin distinguir acentos ("programacion" encuentra "programación")
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+
+# Peso de una coincidencia en el título frente a una en un mensaje (bm25 es negativo)
+FTS_TITLE_WEIGHT = 2.0
+
+# Lectura de archivos para el hash de contenido (bloques grandes)
+FILE_HASH_BUFFER = 1 << 20
+
+# Hashes de archivo recordados en memoria, por (ruta, tamaño, mtime_ns, inodo)
+FILE_HASH_CACHE_SIZE = 4096
+
+# Marcas de resaltado y longitud (en tokens) de los fragmentos de búsqueda
+FTS_HIGHLIGHT = ('<mark>', '</mark>')
+FTS_SNIPPET_TOKENS = 16
+
 class IANAEDatabase:
     """
     Sistema de base de datos completo para IANAE.
@@ -42,10 +66,15 @@ class IANAEDatabase:
         # Inicializar base de datos
         self._init_database()
         
-        # Estadísticas en memoria
+        # Hashes de archivo ya calculados en este proceso
+        self._file_hash_cache: Dict[Tuple[str, int, int, int], str] = {}
+        
+        # Conexión por hilo para comprobaciones frecuentes (abrir una conexión
+        # cuesta más que la consulta: SQLite relee el esquema completo)
+        self._local = threading.local()
+        
+        # Últimas estadísticas calculadas (las consultas ya son O(1))
         self._stats_cache = {}
-        self._cache_timestamp = 0
-        self._cache_timeout = 60  # 60 segundos
         
         logger.info(f"IANAEDatabase inicializada: {self.db_path}")
     
@@ -64,6 +93,7 @@ class IANAEDatabase:
             self._create_concepts_table(cursor)
             self._create_relationships_table(cursor)
             self._create_files_table(cursor)
+            self._migrate_files_table(cursor)
             self._create_processing_table(cursor)
             
             # Crear índices para optimización
@@ -72,6 +102,12 @@ class IANAEDatabase:
             # Crear vistas útiles
             self._create_views(cursor)
             
+            # Índice de texto completo (migra bases existentes)
+            self._fts_available = self._create_fts_tables(cursor)
+            
+            # Estadísticas materializadas (migra bases existentes)
+            self._create_stats_tables(cursor)
+            
             conn.commit()
             conn.close()
             
@@ -153,10 +189,12 @@ class IANAEDatabase:
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS processed_files (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                filename TEXT UNIQUE NOT NULL,
-                file_path TEXT,
+                filename TEXT NOT NULL,
+                file_path TEXT UNIQUE NOT NULL,
                 file_hash TEXT,
                 file_size INTEGER,
+                mtime_ns INTEGER,
+                inode INTEGER,
                 processor_used TEXT,
                 conversations_extracted INTEGER DEFAULT 0,
                 messages_extracted INTEGER DEFAULT 0,
@@ -166,6 +204,56 @@ class IANAEDatabase:
             )
         ''')
     
+    def _migrate_files_table(self, cursor):
+        """
+        Migra processed_files de bases antiguas.
+        
+        Las columnas de stat se añaden sin más. La clave única pasa de
+        filename a file_path: SQLite no permite quitar una restricción
+        UNIQUE, así que la tabla se reconstruye (los registros sin ruta
+        usan el nombre como ruta).
+        """
+        cursor.execute("PRAGMA table_info(processed_files)")
+        columns = {row[1] for row in cursor.fetchall()}
+        for column in ('mtime_ns', 'inode'):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE processed_files ADD COLUMN {column} INTEGER")
+        
+        cursor.execute("PRAGMA index_list(processed_files)")
+        unique_columns = []
+        for _, index_name, unique, *_ in cursor.fetchall():
+            if unique:
+                cursor.execute(f"PRAGMA index_info('{index_name}')")
+                unique_columns.append([row[2] for row in cursor.fetchall()])
+        if ['file_path'] in unique_columns:
+            return
+        
+        cursor.execute("ALTER TABLE processed_files RENAME TO processed_files_old")
+        self._create_files_table(cursor)
+        cursor.execute('''
+            INSERT OR REPLACE INTO processed_files
+            (id, filename, file_path, file_hash, file_size, mtime_ns, inode, processor_used,
+             conversations_extracted, messages_extracted, processing_time, processed_at, status)
+            SELECT id, filename, COALESCE(NULLIF(file_path, ''), filename), file_hash, file_size,
+                   mtime_ns, inode, processor_used, conversations_extracted, messages_extracted,
+                   processing_time, processed_at, status
+            FROM processed_files_old ORDER BY id
+        ''')
+        cursor.execute("DROP TABLE processed_files_old")
+        
+        # Los triggers e índices de la tabla antigua se recrean después; los
+        # contadores se ajustan a las filas copiadas
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'stats_counters'"
+        )
+        if cursor.fetchone():
+            cursor.execute('''
+                UPDATE stats_counters SET value = (SELECT COUNT(*) FROM processed_files)
+                WHERE key = 'processed_files'
+            ''')
+            cursor.execute("UPDATE stats_counters SET value = value + 1 WHERE key = 'derived_dirty'")
+        logger.info("processed_files migrada: clave única por file_path")
+    
     def _create_processing_table(self, cursor):
         """Crea tabla de historial de procesamiento"""
         cursor.execute('''
@@ -212,6 +300,7 @@ class IANAEDatabase:
             
             # Archivos
             "CREATE INDEX IF NOT EXISTS idx_files_filename ON processed_files(filename)",
+            "CREATE INDEX IF NOT EXISTS idx_files_path ON processed_files(file_path)",
             "CREATE INDEX IF NOT EXISTS idx_files_hash ON processed_files(file_hash)",
             "CREATE INDEX IF NOT EXISTS idx_files_processed_at ON processed_files(processed_at)"
         ]
@@ -249,6 +338,298 @@ class IANAEDatabase:
             ORDER BY relevance_score DESC
         ''')
     
+    def _create_fts_tables(self, cursor) -> bool:
+        """
+        Crea el índice FTS5 de títulos y mensajes y sus triggers.
+        
+        Los índices son de contenido externo: solo guardan los términos y leen
+        el texto de conversations/messages por rowid (para snippet/highlight).
+        En una base existente sin índice se indexa todo lo ya guardado.
+        
+        Returns:
+            True si SQLite tiene FTS5 disponible
+        """
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('messages_fts', 'conversations_fts')"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        
+        try:
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    content, content='messages', tokenize="{FTS_TOKENIZER}"
+                )
+            ''')
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+                    title, content='conversations', tokenize="{FTS_TOKENIZER}"
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 no disponible, la búsqueda usará LIKE: {e}")
+            return False
+        
+        for table, column, fts in (('messages', 'content', 'messages_fts'),
+                                   ('conversations', 'title', 'conversations_fts')):
+            # INSERT OR REPLACE borra la fila anterior sin disparar triggers de
+            # DELETE (recursive_triggers está desactivado): se retira del índice
+            # antes de insertar, cuando la fila vieja aún existe
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts}_bi BEFORE INSERT ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {column})
+                    SELECT 'delete', rowid, {column} FROM {table} WHERE id = new.id;
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {fts}(rowid, {column}) VALUES (new.rowid, new.{column});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.rowid, old.{column});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.rowid, old.{column});
+                    INSERT INTO {fts}(rowid, {column}) VALUES (new.rowid, new.{column});
+                END
+            ''')
+            
+            # Migración: indexar lo que ya había antes de crear el índice
+            if fts not in existing:
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+                logger.info(f"Índice de búsqueda {fts} creado sobre los datos existentes")
+        
+        return True
+    
+    def _create_stats_tables(self, cursor):
+        """
+        Crea las tablas de estadísticas materializadas y sus triggers.
+        
+        - stats_counters: totales de mensajes, conceptos, relaciones y archivos,
+          y 'derived_dirty', que cuenta las escrituras que afectan a las
+          métricas derivadas desde su último cálculo (0 = al día)
+        - platform_counters: conversaciones y mensajes por plataforma
+        - conversation_hashes: copias por content_hash (detector de duplicados)
+        - stats_derived: métricas derivadas calculadas (JSON) hasta que se
+          marquen como sucias
+        
+        Los triggers las mantienen en cada escritura, así que leerlas es O(1).
+        En una base existente se inicializan una vez desde los datos.
+        """
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'stats_counters'"
+        )
+        is_new = cursor.fetchone() is None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_counters (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS platform_counters (
+                platform TEXT PRIMARY KEY,
+                conversations INTEGER NOT NULL DEFAULT 0,
+                messages INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS conversation_hashes (
+                content_hash TEXT PRIMARY KEY,
+                copies INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_conversation_hashes_dup "
+            "ON conversation_hashes(content_hash) WHERE copies > 1"
+        )
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_derived (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        
+        # Contadores simples: (tabla, clave, condición de fila ya existente).
+        # Las tablas se escriben con INSERT o INSERT OR REPLACE; como el borrado
+        # de REPLACE no dispara triggers de DELETE, el BEFORE INSERT descuenta
+        # la fila que va a ser reemplazada. Dentro de los triggers no se usa
+        # INSERT OR IGNORE: SQLite aplicaría el OR REPLACE de la sentencia
+        # externa y reiniciaría el contador
+        counters = [
+            ('messages', 'messages', 'id = new.id'),
+            ('concepts', 'concepts', 'id = new.id OR name = new.name'),
+            ('relationships', 'relationships',
+             'id = new.id OR (concept_a = new.concept_a AND concept_b = new.concept_b)'),
+            ('processed_files', 'processed_files', 'id = new.id OR file_path = new.file_path'),
+        ]
+        for table, key, existing in counters:
+            cursor.execute('''
+                INSERT OR IGNORE INTO stats_counters (key, value) VALUES (?, 0)
+            ''', (key,))
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS stats_{table}_bi BEFORE INSERT ON {table} BEGIN
+                    UPDATE stats_counters
+                    SET value = value - (SELECT COUNT(*) FROM {table} WHERE {existing})
+                    WHERE key = '{key}';
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS stats_{table}_ai AFTER INSERT ON {table} BEGIN
+                    UPDATE stats_counters SET value = value + 1 WHERE key = '{key}';
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS stats_{table}_ad AFTER DELETE ON {table} BEGIN
+                    UPDATE stats_counters SET value = value - 1 WHERE key = '{key}';
+                END
+            ''')
+        
+        # Métricas derivadas (archivos recientes, conceptos top): solo se marcan
+        cursor.execute("INSERT OR IGNORE INTO stats_counters (key, value) VALUES ('derived_dirty', 1)")
+        for table, events in (('concepts', ('INSERT', 'UPDATE', 'DELETE')),
+                              ('processed_files', ('INSERT', 'UPDATE', 'DELETE'))):
+            for event in events:
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS stats_{table}_dirty_{event.lower()}
+                    AFTER {event} ON {table} BEGIN
+                        UPDATE stats_counters SET value = value + 1 WHERE key = 'derived_dirty';
+                    END
+                ''')
+        
+        # Conversaciones: por plataforma y por content_hash
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS stats_conversations_bi BEFORE INSERT ON conversations BEGIN
+                UPDATE platform_counters
+                SET conversations = conversations - 1,
+                    messages = messages - COALESCE((SELECT total_messages FROM conversations WHERE id = new.id), 0)
+                WHERE platform = (SELECT platform FROM conversations WHERE id = new.id);
+                UPDATE conversation_hashes SET copies = copies - 1
+                WHERE content_hash = (SELECT content_hash FROM conversations WHERE id = new.id);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS stats_conversations_ai AFTER INSERT ON conversations BEGIN
+                INSERT INTO platform_counters (platform)
+                SELECT new.platform WHERE NOT EXISTS
+                    (SELECT 1 FROM platform_counters WHERE platform = new.platform);
+                UPDATE platform_counters
+                SET conversations = conversations + 1,
+                    messages = messages + COALESCE(new.total_messages, 0)
+                WHERE platform = new.platform;
+                INSERT INTO conversation_hashes (content_hash)
+                SELECT new.content_hash WHERE new.content_hash IS NOT NULL AND NOT EXISTS
+                    (SELECT 1 FROM conversation_hashes WHERE content_hash = new.content_hash);
+                UPDATE conversation_hashes SET copies = copies + 1 WHERE content_hash = new.content_hash;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS stats_conversations_ad AFTER DELETE ON conversations BEGIN
+                UPDATE platform_counters
+                SET conversations = conversations - 1,
+                    messages = messages - COALESCE(old.total_messages, 0)
+                WHERE platform = old.platform;
+                UPDATE conversation_hashes SET copies = copies - 1 WHERE content_hash = old.content_hash;
+                DELETE FROM conversation_hashes WHERE content_hash = old.content_hash AND copies <= 0;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS stats_conversations_au
+            AFTER UPDATE OF platform, total_messages, content_hash ON conversations BEGIN
+                UPDATE platform_counters
+                SET conversations = conversations - 1,
+                    messages = messages - COALESCE(old.total_messages, 0)
+                WHERE platform = old.platform;
+                INSERT INTO platform_counters (platform)
+                SELECT new.platform WHERE NOT EXISTS
+                    (SELECT 1 FROM platform_counters WHERE platform = new.platform);
+                UPDATE platform_counters
+                SET conversations = conversations + 1,
+                    messages = messages + COALESCE(new.total_messages, 0)
+                WHERE platform = new.platform;
+                UPDATE conversation_hashes SET copies = copies - 1 WHERE content_hash = old.content_hash;
+                DELETE FROM conversation_hashes WHERE content_hash = old.content_hash AND copies <= 0;
+                INSERT INTO conversation_hashes (content_hash)
+                SELECT new.content_hash WHERE new.content_hash IS NOT NULL AND NOT EXISTS
+                    (SELECT 1 FROM conversation_hashes WHERE content_hash = new.content_hash);
+                UPDATE conversation_hashes SET copies = copies + 1 WHERE content_hash = new.content_hash;
+            END
+        ''')
+        
+        # Migración: contar una vez lo que ya había
+        if is_new:
+            self._recount_statistics(cursor)
+    
+    def _recount_statistics(self, cursor):
+        """Recalcula las tablas materializadas desde cero (consultas completas)"""
+        for table in ('messages', 'concepts', 'relationships', 'processed_files'):
+            cursor.execute(
+                f"UPDATE stats_counters SET value = (SELECT COUNT(*) FROM {table}) WHERE key = ?",
+                (table,)
+            )
+        cursor.execute("UPDATE stats_counters SET value = value + 1 WHERE key = 'derived_dirty'")
+        
+        cursor.execute("DELETE FROM platform_counters")
+        cursor.execute('''
+            INSERT INTO platform_counters (platform, conversations, messages)
+            SELECT platform, COUNT(*), COALESCE(SUM(total_messages), 0)
+            FROM conversations GROUP BY platform
+        ''')
+        
+        cursor.execute("DELETE FROM conversation_hashes")
+        cursor.execute('''
+            INSERT INTO conversation_hashes (content_hash, copies)
+            SELECT content_hash, COUNT(*) FROM conversations
+            WHERE content_hash IS NOT NULL GROUP BY content_hash
+        ''')
+    
+    def rebuild_statistics(self) -> bool:
+        """
+        Recalcula las estadísticas materializadas (reparación).
+        
+        Returns:
+            True si se recalcularon correctamente
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            self._recount_statistics(cursor)
+            conn.commit()
+            conn.close()
+            self._stats_cache = {}
+            return True
+        except Exception as e:
+            logger.error(f"Error recalculando estadísticas: {e}")
+            return False
+    
+    def rebuild_search_index(self) -> bool:
+        """
+        Reconstruye el índice de texto completo desde conversations/messages.
+        
+        Necesario tras un VACUUM (puede renumerar los rowid de tablas sin
+        INTEGER PRIMARY KEY) o para reparar un índice dañado.
+        
+        Returns:
+            True si se reconstruyó correctamente
+        """
+        if not self._fts_available:
+            return False
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+            cursor.execute("INSERT INTO conversations_fts(conversations_fts) VALUES ('rebuild')")
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error reconstruyendo índice de búsqueda: {e}")
+            return False
+    
     def add_conversation(self, conversation: Dict[str, Any]) -> bool:
         """
         Añade una conversación a la base de datos.
@@ -301,14 +682,17 @@ class IANAEDatabase:
     
     def _add_message(self, cursor, message: Dict[str, Any], conversation_id: str):
         """Añade un mensaje a la base de datos"""
-        content_hash = hashlib.md5(message['content'].encode()).hexdigest()
-        metadata = json.dumps(message.get('metadata', {}))
-        
         cursor.execute('''
             INSERT OR REPLACE INTO messages 
             (id, conversation_id, role, content, timestamp, content_hash, content_length, metadata)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        ''', self._message_row(message, conversation_id))
+    
+    @staticmethod
+    def _message_row(message: Dict[str, Any], conversation_id: str) -> Tuple:
+        """Fila de la tabla messages para un mensaje"""
+        content_hash = hashlib.md5(message['content'].encode()).hexdigest()
+        return (
             message.get('id', f"{conversation_id}_{content_hash[:8]}"),
             conversation_id,
             message['role'],
@@ -316,17 +700,26 @@ class IANAEDatabase:
             message.get('timestamp'),
             content_hash,
             len(message['content']),
-            metadata
-        ))
+            json.dumps(message.get('metadata', {}))
+        )
     
     def add_conversations_batch(self, conversations: List[Dict[str, Any]], 
-                               batch_size: int = 100) -> Dict[str, Any]:
+                               batch_size: int = 500,
+                               rebuild_indexes: bool = False) -> Dict[str, Any]:
         """
         Añade múltiples conversaciones de forma eficiente.
         
+        Cada lote consulta de una vez los hashes ya guardados (un solo IN) y
+        escribe conversaciones y mensajes con executemany, en WAL con
+        synchronous=NORMAL. Si un lote falla se reintenta conversación a
+        conversación para aislar la que da error.
+        
         Args:
             conversations: Lista de conversaciones
             batch_size: Tamaño del lote para procesamiento
+            rebuild_indexes: Para importaciones iniciales grandes: eliminar los
+                índices secundarios y los triggers de búsqueda, cargar, y
+                reconstruirlos al final
             
         Returns:
             Estadísticas del procesamiento
@@ -344,49 +737,35 @@ class IANAEDatabase:
         }
         
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect_bulk()
+            cursor = conn.cursor()
             
-            for i in range(0, len(conversations), batch_size):
-                batch = conversations[i:i + batch_size]
-                
-                try:
-                    cursor = conn.cursor()
-                    cursor.execute("BEGIN TRANSACTION")
+            if rebuild_indexes:
+                self._drop_secondary_indexes(cursor)
+            
+            try:
+                for i in range(0, len(conversations), batch_size):
+                    batch = conversations[i:i + batch_size]
                     
-                    for conversation in batch:
-                        try:
-                            # Verificar si ya existe
-                            existing = self._get_conversation_by_id(cursor, conversation['id'])
-                            
-                            if existing:
-                                # Comparar hashes para determinar si actualizar
-                                new_hash = self._calculate_conversation_hash(conversation)
-                                if existing.get('content_hash') != new_hash:
-                                    self._update_conversation(cursor, conversation, new_hash)
-                                    stats['conversations_updated'] += 1
-                                else:
-                                    stats['conversations_skipped'] += 1
-                            else:
-                                # Nueva conversación
-                                self._insert_conversation(cursor, conversation)
-                                stats['conversations_added'] += 1
-                            
-                            stats['messages_added'] += len(conversation.get('mensajes', []))
-                            
-                        except Exception as e:
-                            logger.error(f"Error procesando conversación {conversation.get('id')}: {e}")
-                            stats['errors'] += 1
+                    try:
+                        cursor.execute("BEGIN")
+                        batch_stats = self._write_batch(cursor, batch)
+                        cursor.execute("COMMIT")
+                    except Exception as e:
+                        cursor.execute("ROLLBACK")
+                        logger.warning(f"Lote {i//batch_size + 1} falló ({e}), reintentando por conversación")
+                        batch_stats = self._write_batch_one_by_one(cursor, batch)
                     
-                    cursor.execute("COMMIT")
+                    for key, value in batch_stats.items():
+                        stats[key] += value
                     
                     # Log progreso
-                    if (i + batch_size) % 500 == 0:
-                        logger.info(f"Procesadas {i + batch_size}/{len(conversations)} conversaciones...")
-                        
-                except Exception as e:
-                    cursor.execute("ROLLBACK")
-                    logger.error(f"Error en lote {i//batch_size + 1}: {e}")
-                    stats['errors'] += batch_size
+                    if (i // batch_size + 1) % 10 == 0:
+                        logger.info(f"Procesadas {i + len(batch)}/{len(conversations)} conversaciones...")
+            finally:
+                if rebuild_indexes:
+                    self._restore_secondary_indexes(cursor)
+                    conn.commit()
             
             conn.close()
             
@@ -397,6 +776,150 @@ class IANAEDatabase:
         stats['processing_time'] = time.time() - start_time
         return stats
     
+    def _connect_bulk(self) -> sqlite3.Connection:
+        """Conexión para escrituras masivas: WAL, synchronous=NORMAL, transacciones manuales"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+    
+    def _write_batch(self, cursor, batch: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Escribe un lote dentro de la transacción abierta.
+        
+        Returns:
+            Contadores del lote (added, updated, skipped, messages, errors)
+        """
+        stats = {'conversations_added': 0, 'conversations_updated': 0,
+                 'conversations_skipped': 0, 'messages_added': 0, 'errors': 0}
+        
+        # Hashes ya guardados para todo el lote en una consulta
+        ids = list({conv.get('id') for conv in batch if conv.get('id') is not None})
+        cursor.execute(
+            f"SELECT id, content_hash FROM conversations WHERE id IN ({','.join('?' * len(ids))})",
+            ids
+        )
+        stored = dict(cursor.fetchall())
+        
+        # id -> (conversación, hash, es_nueva); una conversación repetida en el
+        # lote se queda con su última versión, como al escribirlas en orden
+        pending: Dict[str, Tuple[Dict[str, Any], str, bool]] = {}
+        for conversation in batch:
+            try:
+                conv_id = conversation['id']
+                new_hash = self._calculate_conversation_hash(conversation)
+                
+                if conv_id in pending:
+                    is_new = pending[conv_id][2]
+                    if pending[conv_id][1] != new_hash:
+                        pending[conv_id] = (conversation, new_hash, is_new)
+                        stats['conversations_updated'] += 1
+                    else:
+                        stats['conversations_skipped'] += 1
+                elif conv_id not in stored:
+                    pending[conv_id] = (conversation, new_hash, True)
+                    stats['conversations_added'] += 1
+                elif stored[conv_id] != new_hash:
+                    pending[conv_id] = (conversation, new_hash, False)
+                    stats['conversations_updated'] += 1
+                else:
+                    stats['conversations_skipped'] += 1
+                
+                stats['messages_added'] += len(conversation.get('mensajes', []))
+                
+            except Exception as e:
+                logger.error(f"Error procesando conversación {conversation.get('id')}: {e}")
+                stats['errors'] += 1
+        
+        inserts, updates, messages = [], [], []
+        for conv_id, (conversation, content_hash, is_new) in pending.items():
+            metadata = conversation.get('metadata', {})
+            if is_new:
+                inserts.append((
+                    conv_id,
+                    conversation['titulo'],
+                    conversation['plataforma'],
+                    conversation.get('timestamp'),
+                    len(conversation.get('mensajes', [])),
+                    content_hash,
+                    json.dumps(metadata),
+                    metadata.get('source_file')
+                ))
+            else:
+                updates.append((
+                    conversation['titulo'],
+                    len(conversation.get('mensajes', [])),
+                    content_hash,
+                    json.dumps(metadata),
+                    conv_id
+                ))
+            prepared = conversation.get('_message_rows')
+            if prepared is not None:
+                messages.extend(prepared)
+            else:
+                for mensaje in conversation.get('mensajes', []):
+                    messages.append(self._message_row(mensaje, conv_id))
+        
+        cursor.executemany('''
+            INSERT INTO conversations 
+            (id, title, platform, created_at, total_messages, content_hash, metadata, source_file)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', inserts)
+        cursor.executemany('''
+            UPDATE conversations 
+            SET title=?, total_messages=?, content_hash=?, metadata=?, updated_at=CURRENT_TIMESTAMP
+            WHERE id=?
+        ''', updates)
+        # Eliminar mensajes antiguos de las actualizadas y añadir todos los nuevos
+        cursor.executemany('DELETE FROM messages WHERE conversation_id = ?',
+                           [(row[-1],) for row in updates])
+        cursor.executemany('''
+            INSERT OR REPLACE INTO messages 
+            (id, conversation_id, role, content, timestamp, content_hash, content_length, metadata)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', messages)
+        
+        return stats
+    
+    def _write_batch_one_by_one(self, cursor, batch: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Escribe un lote conversación a conversación (aísla las que fallan)"""
+        stats = {'conversations_added': 0, 'conversations_updated': 0,
+                 'conversations_skipped': 0, 'messages_added': 0, 'errors': 0}
+        
+        for conversation in batch:
+            try:
+                cursor.execute("BEGIN")
+                conv_stats = self._write_batch(cursor, [conversation])
+                cursor.execute("COMMIT")
+            except Exception as e:
+                cursor.execute("ROLLBACK")
+                logger.error(f"Error procesando conversación {conversation.get('id')}: {e}")
+                conv_stats = {'errors': 1}
+            for key, value in conv_stats.items():
+                stats[key] += value
+        
+        return stats
+    
+    def _drop_secondary_indexes(self, cursor):
+        """Elimina índices secundarios y triggers de búsqueda y estadísticas antes de una carga masiva"""
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master "
+            "WHERE (type = 'index' AND tbl_name IN ('conversations', 'messages') AND sql IS NOT NULL) "
+            "   OR (type = 'trigger' AND (name LIKE '%\\_fts\\_%' ESCAPE '\\' OR name LIKE 'stats\\_%' ESCAPE '\\'))"
+        )
+        for object_type, name in cursor.fetchall():
+            cursor.execute(f"DROP {object_type.upper()} IF EXISTS {name}")
+    
+    def _restore_secondary_indexes(self, cursor):
+        """Recrea índices y triggers, reindexa la búsqueda y recuenta las estadísticas tras una carga masiva"""
+        self._create_indexes(cursor)
+        self._create_stats_tables(cursor)
+        self._recount_statistics(cursor)
+        if self._fts_available:
+            self._create_fts_tables(cursor)
+            cursor.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+            cursor.execute("INSERT INTO conversations_fts(conversations_fts) VALUES ('rebuild')")
+    
     def _get_conversation_by_id(self, cursor, conv_id: str) -> Optional[Dict]:
         """Obtiene conversación por ID"""
         cursor.execute('''
@@ -462,8 +985,12 @@ class IANAEDatabase:
         for mensaje in conversation.get('mensajes', []):
             self._add_message(cursor, mensaje, conversation['id'])
     
-    def _calculate_conversation_hash(self, conversation: Dict[str, Any]) -> str:
-        """Calcula hash único de una conversación"""
+    @staticmethod
+    def _calculate_conversation_hash(conversation: Dict[str, Any]) -> str:
+        """Calcula hash único de una conversación (o usa el de prepare_conversation)"""
+        if '_content_hash' in conversation:
+            return conversation['_content_hash']
+        
         content_parts = [
             conversation.get('titulo', ''),
             conversation.get('plataforma', ''),
@@ -482,16 +1009,22 @@ class IANAEDatabase:
     
     def search_conversations(self, query: str = None, platform: str = None,
                            date_from: str = None, date_to: str = None,
-                           limit: int = 50) -> List[Dict[str, Any]]:
+                           limit: int = 50, after: str = None) -> List[Dict[str, Any]]:
         """
         Busca conversaciones con filtros opcionales.
         
+        Con texto, usa el índice FTS5: las conversaciones se ordenan por
+        relevancia bm25 (su mejor mensaje o el título) e incluyen 'snippet'
+        con los términos resaltados. Sin texto, se ordenan por fecha.
+        
         Args:
             query: Texto a buscar en título o contenido
             platform: Filtrar por plataforma
             date_from: Fecha inicio (YYYY-MM-DD)
             date_to: Fecha fin (YYYY-MM-DD)
             limit: Máximo número de resultados
+            after: 'cursor' del último resultado de la página anterior
+                (paginación por clave, sin OFFSET)
             
         Returns:
             Lista de conversaciones que coinciden
@@ -500,63 +1033,13 @@ class IANAEDatabase:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # Construir query base
-            sql_parts = [
-                "SELECT c.id, c.title, c.platform, c.created_at, c.total_messages, c.metadata",
-                "FROM conversations c"
-            ]
-            
-            conditions = []
-            params = []
-            
-            # Filtrar por query de texto
-            if query:
-                sql_parts.append("LEFT JOIN messages m ON c.id = m.conversation_id")
-                conditions.append("(c.title LIKE ? OR m.content LIKE ?)")
-                query_pattern = f"%{query}%"
-                params.extend([query_pattern, query_pattern])
-            
-            # Filtrar por plataforma
-            if platform:
-                conditions.append("c.platform = ?")
-                params.append(platform)
-            
-            # Filtrar por fecha
-            if date_from:
-                conditions.append("c.created_at >= ?")
-                params.append(date_from)
-            
-            if date_to:
-                conditions.append("c.created_at <= ?")
-                params.append(date_to)
-            
-            # Agregar condiciones WHERE
-            if conditions:
-                sql_parts.append("WHERE " + " AND ".join(conditions))
-            
-            # Agrupar si hay JOIN con mensajes
-            if query:
-                sql_parts.append("GROUP BY c.id")
-            
-            # Ordenar y limitar
-            sql_parts.extend([
-                "ORDER BY c.created_at DESC",
-                f"LIMIT {limit}"
-            ])
-            
-            sql = " ".join(sql_parts)
-            cursor.execute(sql, params)
-            
-            results = []
-            for row in cursor.fetchall():
-                results.append({
-                    'id': row[0],
-                    'title': row[1],
-                    'platform': row[2],
-                    'created_at': row[3],
-                    'total_messages': row[4],
-                    'metadata': json.loads(row[5] or '{}')
-                })
+            fts_query = self._fts_query(query) if query else None
+            if fts_query and self._fts_available:
+                results = self._search_fts(cursor, fts_query, platform, date_from, date_to, limit, after)
+            elif query:
+                results = self._search_like(cursor, query, platform, date_from, date_to, limit)
+            else:
+                results = self._search_recent(cursor, platform, date_from, date_to, limit, after)
             
             conn.close()
             return results
@@ -565,6 +1048,161 @@ class IANAEDatabase:
             logger.error(f"Error buscando conversaciones: {e}")
             return []
     
+    @staticmethod
+    def _fts_query(query: str) -> Optional[str]:
+        """Convierte texto libre en una consulta FTS5 (todos los términos, entre comillas)"""
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return None
+        return ' '.join(f'"{term}"' for term in terms)
+    
+    @staticmethod
+    def _filter_conditions(platform: str, date_from: str, date_to: str) -> Tuple[List[str], List[Any]]:
+        """Condiciones WHERE comunes sobre la tabla de conversaciones (alias c)"""
+        conditions = []
+        params = []
+        
+        # Filtrar por plataforma
+        if platform:
+            conditions.append("c.platform = ?")
+            params.append(platform)
+        
+        # Filtrar por fecha
+        if date_from:
+            conditions.append("c.created_at >= ?")
+            params.append(date_from)
+        
+        if date_to:
+            conditions.append("c.created_at <= ?")
+            params.append(date_to)
+        
+        return conditions, params
+    
+    @staticmethod
+    def _conversation_row(row) -> Dict[str, Any]:
+        return {
+            'id': row[0],
+            'title': row[1],
+            'platform': row[2],
+            'created_at': row[3],
+            'total_messages': row[4],
+            'metadata': json.loads(row[5] or '{}')
+        }
+    
+    def _search_fts(self, cursor, fts_query: str, platform: str, date_from: str,
+                    date_to: str, limit: int, after: Optional[str]) -> List[Dict[str, Any]]:
+        """Búsqueda por relevancia con el índice FTS5"""
+        conditions, params = self._filter_conditions(platform, date_from, date_to)
+        
+        # Paginación por clave: (score, id) estrictamente después del cursor
+        if after:
+            last_score, last_id = json.loads(after)
+            conditions.append("(r.score > ? OR (r.score = ? AND r.id > ?))")
+            params.extend([last_score, last_score, last_id])
+        
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        
+        # MIN(score) con msg_rowid sin agregar: SQLite toma msg_rowid de la fila
+        # con el mejor score, es decir, el mensaje que mejor coincide
+        cursor.execute(f'''
+            WITH hits AS (
+                SELECT m.conversation_id AS id, bm25(messages_fts) AS score,
+                       messages_fts.rowid AS msg_rowid
+                FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid
+                WHERE messages_fts MATCH ?
+                UNION ALL
+                SELECT c.id, bm25(conversations_fts) * ?, NULL
+                FROM conversations_fts JOIN conversations c ON c.rowid = conversations_fts.rowid
+                WHERE conversations_fts MATCH ?
+            ), ranked AS (
+                SELECT id, MIN(score) AS score, msg_rowid FROM hits GROUP BY id
+            )
+            SELECT c.id, c.title, c.platform, c.created_at, c.total_messages, c.metadata,
+                   r.score, r.msg_rowid
+            FROM ranked r JOIN conversations c ON c.id = r.id
+            {where}
+            ORDER BY r.score, r.id
+            LIMIT ?
+        ''', [fts_query, FTS_TITLE_WEIGHT, fts_query] + params + [limit])
+        rows = cursor.fetchall()
+        if not rows:
+            return []
+        
+        # Fragmentos resaltados solo para la página devuelta
+        open_mark, close_mark = FTS_HIGHLIGHT
+        msg_rowids = [row[7] for row in rows if row[7] is not None]
+        snippets = {}
+        if msg_rowids:
+            cursor.execute(f'''
+                SELECT rowid, snippet(messages_fts, 0, ?, ?, '…', ?)
+                FROM messages_fts
+                WHERE messages_fts MATCH ? AND rowid IN ({','.join('?' * len(msg_rowids))})
+            ''', [open_mark, close_mark, FTS_SNIPPET_TOKENS, fts_query] + msg_rowids)
+            snippets = dict(cursor.fetchall())
+        
+        ids = [row[0] for row in rows]
+        cursor.execute(f'''
+            SELECT c.id, highlight(conversations_fts, 0, ?, ?)
+            FROM conversations_fts JOIN conversations c ON c.rowid = conversations_fts.rowid
+            WHERE conversations_fts MATCH ? AND c.id IN ({','.join('?' * len(ids))})
+        ''', [open_mark, close_mark, fts_query] + ids)
+        titles = dict(cursor.fetchall())
+        
+        results = []
+        for row in rows:
+            result = self._conversation_row(row)
+            result['score'] = -row[6]
+            result['title_highlight'] = titles.get(row[0], row[1])
+            result['snippet'] = snippets.get(row[7], result['title_highlight'])
+            result['cursor'] = json.dumps([row[6], row[0]])
+            results.append(result)
+        return results
+    
+    def _search_like(self, cursor, query: str, platform: str, date_from: str,
+                     date_to: str, limit: int) -> List[Dict[str, Any]]:
+        """Búsqueda por subcadena (sin FTS5 disponible): recorre todos los mensajes"""
+        conditions, params = self._filter_conditions(platform, date_from, date_to)
+        conditions.insert(0, "(c.title LIKE ? OR m.content LIKE ?)")
+        query_pattern = f"%{query}%"
+        params[:0] = [query_pattern, query_pattern]
+        
+        cursor.execute(f'''
+            SELECT c.id, c.title, c.platform, c.created_at, c.total_messages, c.metadata
+            FROM conversations c
+            LEFT JOIN messages m ON c.id = m.conversation_id
+            WHERE {" AND ".join(conditions)}
+            GROUP BY c.id
+            ORDER BY c.created_at DESC
+            LIMIT ?
+        ''', params + [limit])
+        return [self._conversation_row(row) for row in cursor.fetchall()]
+    
+    def _search_recent(self, cursor, platform: str, date_from: str, date_to: str,
+                       limit: int, after: Optional[str]) -> List[Dict[str, Any]]:
+        """Conversaciones filtradas, de la más reciente a la más antigua"""
+        conditions, params = self._filter_conditions(platform, date_from, date_to)
+        
+        if after:
+            last_created, last_id = json.loads(after)
+            conditions.append("(COALESCE(c.created_at, '') < ? OR (COALESCE(c.created_at, '') = ? AND c.id < ?))")
+            params.extend([last_created, last_created, last_id])
+        
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        cursor.execute(f'''
+            SELECT c.id, c.title, c.platform, c.created_at, c.total_messages, c.metadata
+            FROM conversations c
+            {where}
+            ORDER BY COALESCE(c.created_at, '') DESC, c.id DESC
+            LIMIT ?
+        ''', params + [limit])
+        
+        results = []
+        for row in cursor.fetchall():
+            result = self._conversation_row(row)
+            result['cursor'] = json.dumps([row[3] or '', row[0]])
+            results.append(result)
+        return results
+    
     def get_conversation_details(self, conversation_id: str) -> Optional[Dict[str, Any]]:
         """
         Obtiene detalles completos de una conversación incluyendo mensajes.
@@ -625,11 +1263,114 @@ class IANAEDatabase:
             logger.error(f"Error obteniendo detalles de conversación {conversation_id}: {e}")
             return None
     
+    def iter_conversations(self, platform: str = None, query: str = None,
+                           include_messages: bool = True,
+                           chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre conversaciones (con sus mensajes) sin cargarlas todas.
+        
+        Una sola consulta con JOIN a messages, leída en bloques de chunk_size
+        filas: en memoria solo está la conversación en curso. Las
+        conversaciones salen en orden de id y los mensajes como en
+        get_conversation_details.
+        
+        Args:
+            platform: Filtrar por plataforma
+            query: Filtrar por texto (título o contenido)
+            include_messages: Incluir 'messages' en cada conversación
+            chunk_size: Filas leídas por fetchmany
+            
+        Yields:
+            Conversaciones con el formato de get_conversation_details
+        """
+        conditions = []
+        params: List[Any] = []
+        
+        if platform:
+            # "+" impide usar idx_conversations_platform: se recorre por id y
+            # el resultado sale ya ordenado sin ordenar la exportación entera
+            conditions.append("+c.platform = ?")
+            params.append(platform)
+        
+        if query:
+            fts_query = self._fts_query(query)
+            if fts_query and self._fts_available:
+                conditions.append('''(
+                    c.id IN (SELECT conversation_id FROM messages WHERE rowid IN
+                             (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?))
+                    OR c.rowid IN (SELECT rowid FROM conversations_fts WHERE conversations_fts MATCH ?)
+                )''')
+                params.extend([fts_query, fts_query])
+            else:
+                conditions.append(
+                    "(c.title LIKE ? OR c.id IN (SELECT conversation_id FROM messages WHERE content LIKE ?))"
+                )
+                params.extend([f"%{query}%", f"%{query}%"])
+        
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        columns = "c.id, c.title, c.platform, c.created_at, c.updated_at, c.total_messages, c.metadata, c.source_file"
+        if include_messages:
+            # El orden por c.id lo da el índice de la clave primaria: SQLite solo
+            # ordena los mensajes de cada conversación
+            sql = f'''
+                SELECT {columns},
+                       m.id, m.role, m.content, m.timestamp, m.content_length, m.metadata
+                FROM conversations c
+                LEFT JOIN messages m ON m.conversation_id = c.id
+                {where}
+                ORDER BY c.id, m.timestamp, m.rowid
+            '''
+        else:
+            sql = f"SELECT {columns} FROM conversations c {where} ORDER BY c.id"
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            
+            current = None
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    if current is None or current['id'] != row[0]:
+                        if current is not None:
+                            yield current
+                        current = {
+                            'id': row[0],
+                            'title': row[1],
+                            'platform': row[2],
+                            'created_at': row[3],
+                            'updated_at': row[4],
+                            'total_messages': row[5],
+                            'metadata': json.loads(row[6] or '{}'),
+                            'source_file': row[7]
+                        }
+                        if include_messages:
+                            current['messages'] = []
+                    if include_messages and row[8] is not None:
+                        current['messages'].append({
+                            'id': row[8],
+                            'role': row[9],
+                            'content': row[10],
+                            'timestamp': row[11],
+                            'content_length': row[12],
+                            'metadata': json.loads(row[13] or '{}')
+                        })
+            if current is not None:
+                yield current
+        finally:
+            conn.close()
+    
     def register_file_processing(self, file_path: str, processor: str, 
                                 stats: Dict[str, Any]) -> bool:
         """
         Registra el procesamiento de un archivo.
         
+        Guarda, además del hash, el stat del archivo (tamaño, mtime_ns e
+        inodo) para que is_file_processed no tenga que volver a leerlo.
+        
         Args:
             file_path: Ruta del archivo procesado
             processor: Nombre del procesador usado
@@ -642,21 +1383,27 @@ class IANAEDatabase:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # Calcular hash del archivo
-            file_hash = self._calculate_file_hash(file_path)
-            file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+            path = os.path.abspath(file_path)
             filename = os.path.basename(file_path)
+            if os.path.exists(path):
+                signature = self._file_signature(path)
+                file_hash = self._cached_file_hash(signature)
+                _, file_size, mtime_ns, inode = signature
+            else:
+                file_hash, file_size, mtime_ns, inode = "", 0, None, None
             
             cursor.execute('''
                 INSERT OR REPLACE INTO processed_files 
-                (filename, file_path, file_hash, file_size, processor_used, 
+                (filename, file_path, file_hash, file_size, mtime_ns, inode, processor_used, 
                  conversations_extracted, messages_extracted, processing_time, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 filename,
-                file_path,
+                path,
                 file_hash,
                 file_size,
+                mtime_ns,
+                inode,
                 processor,
                 stats.get('conversations_processed', 0),
                 stats.get('messages_processed', 0),
@@ -673,21 +1420,85 @@ class IANAEDatabase:
             logger.error(f"Error registrando procesamiento de archivo {file_path}: {e}")
             return False
     
-    def _calculate_file_hash(self, file_path: str) -> str:
-        """Calcula hash MD5 de un archivo"""
+    def _thread_connection(self) -> sqlite3.Connection:
+        """Conexión reutilizada por el hilo actual (se cierra con close_thread_connection)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            self._local.conn = conn
+        return conn
+    
+    def close_thread_connection(self):
+        """Cierra la conexión del hilo actual, si la abrió (p. ej. al terminar un worker)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
+    @staticmethod
+    def _file_signature(path: str) -> Tuple[str, int, int, int]:
+        """(ruta, tamaño, mtime_ns, inodo): si no cambia, el contenido tampoco"""
+        st = os.stat(path)
+        return (path, st.st_size, st.st_mtime_ns, st.st_ino)
+    
+    def _cached_file_hash(self, signature: Tuple[str, int, int, int]) -> str:
+        """Hash rápido del archivo, calculado una sola vez por stat"""
+        file_hash = self._file_hash_cache.get(signature)
+        if file_hash is None:
+            file_hash = self._calculate_file_hash(signature[0])
+            if len(self._file_hash_cache) >= FILE_HASH_CACHE_SIZE:
+                self._file_hash_cache.pop(next(iter(self._file_hash_cache)))
+            self._file_hash_cache[signature] = file_hash
+        return file_hash
+    
+    def _calculate_file_hash(self, file_path: str, legacy_md5: bool = False) -> Union[str, Tuple[str, str]]:
+        """
+        Calcula el hash de contenido de un archivo (no criptográfico).
+        
+        xxh3_64 si xxhash está instalado (requirements.txt), si no crc32 de
+        zlib; el prefijo indica el algoritmo. Se lee en bloques de
+        FILE_HASH_BUFFER.
+        
+        Args:
+            file_path: Ruta del archivo
+            legacy_md5: Calcular también el MD5 que guardaban las versiones
+                anteriores (en la misma lectura)
+            
+        Returns:
+            Hash, o (hash, md5) con legacy_md5; "" si no se puede leer
+        """
         try:
-            hash_md5 = hashlib.md5()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            fast = xxhash.xxh3_64() if xxhash is not None else None
+            crc = 0
+            md5 = hashlib.md5() if legacy_md5 else None
+            buffer = bytearray(FILE_HASH_BUFFER)
+            view = memoryview(buffer)
+            with open(file_path, "rb", buffering=0) as f:
+                while True:
+                    n = f.readinto(buffer)
+                    if not n:
+                        break
+                    chunk = view[:n]
+                    if fast is not None:
+                        fast.update(chunk)
+                    else:
+                        crc = zlib.crc32(chunk, crc)
+                    if md5 is not None:
+                        md5.update(chunk)
+            file_hash = f"xxh3:{fast.hexdigest()}" if fast is not None else f"crc32:{crc:08x}"
+            return (file_hash, md5.hexdigest()) if legacy_md5 else file_hash
         except Exception:
-            return ""
+            return ("", "") if legacy_md5 else ""
     
     def is_file_processed(self, file_path: str) -> Tuple[bool, Dict[str, Any]]:
         """
         Verifica si un archivo ya fue procesado.
         
+        Si el stat guardado (tamaño, mtime_ns, inodo) coincide con el actual
+        no se lee el archivo; solo cuando cambia se compara el hash de
+        contenido (un archivo tocado pero idéntico sigue contando como
+        procesado, y se actualiza su stat).
+        
         Args:
             file_path: Ruta del archivo
             
@@ -695,26 +1506,57 @@ class IANAEDatabase:
             Tupla (ya_procesado, info_procesamiento)
         """
         try:
+            path = os.path.abspath(file_path)
             filename = os.path.basename(file_path)
-            file_hash = self._calculate_file_hash(file_path) if os.path.exists(file_path) else ""
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._thread_connection()
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT file_hash, processor_used, conversations_extracted, 
-                       messages_extracted, processed_at, status
-                FROM processed_files 
-                WHERE filename = ?
-            ''', (filename,))
-            
-            row = cursor.fetchone()
-            conn.close()
+            # Por ruta. Los registros de versiones antiguas (sin stat guardado)
+            # pueden tener una ruta relativa: se buscan por nombre y el hash de
+            # contenido decide; si coincide, el registro pasa a la ruta absoluta
+            row = None
+            for condition, value in (('file_path = ?', path),
+                                     ('filename = ? AND mtime_ns IS NULL', filename)):
+                cursor.execute(f'''
+                    SELECT file_hash, processor_used, conversations_extracted, 
+                           messages_extracted, processed_at, status,
+                           id, file_size, mtime_ns, inode
+                    FROM processed_files 
+                    WHERE {condition}
+                    ORDER BY id DESC LIMIT 1
+                ''', (value,))
+                row = cursor.fetchone()
+                if row:
+                    break
             
             if not row:
                 return False, {}
             
-            stored_hash, processor, convs, msgs, processed_at, status = row
+            (stored_hash, processor, convs, msgs, processed_at, status,
+             row_id, stored_size, stored_mtime, stored_inode) = row
+            
+            signature = self._file_signature(path) if os.path.exists(path) else None
+            if signature is not None and signature[1:] == (stored_size, stored_mtime, stored_inode):
+                file_changed = False
+            elif signature is None:
+                file_changed = bool(stored_hash)
+            else:
+                if stored_hash.startswith(('xxh3:', 'crc32:')):
+                    file_hash = self._cached_file_hash(signature)
+                    file_changed = stored_hash != file_hash
+                else:
+                    # Registro antiguo con MD5: comparar y migrar en la misma lectura
+                    file_hash, md5 = self._calculate_file_hash(path, legacy_md5=True)
+                    file_changed = stored_hash != md5
+                
+                if not file_changed:
+                    cursor.execute('''
+                        UPDATE processed_files 
+                        SET file_path = ?, file_hash = ?, file_size = ?, mtime_ns = ?, inode = ?
+                        WHERE id = ?
+                    ''', (path, file_hash, signature[1], signature[2], signature[3], row_id))
+                    conn.commit()
             
             info = {
                 'processor_used': processor,
@@ -722,11 +1564,11 @@ class IANAEDatabase:
                 'messages_extracted': msgs,
                 'processed_at': processed_at,
                 'status': status,
-                'file_changed': stored_hash != file_hash
+                'file_changed': file_changed
             }
             
-            # Si el hash cambió, considerar no procesado
-            if stored_hash != file_hash:
+            # Si el contenido cambió, considerar no procesado
+            if file_changed:
                 return False, info
             
             return True, info
@@ -739,52 +1581,95 @@ class IANAEDatabase:
         """
         Obtiene estadísticas completas de la base de datos.
         
+        Los totales salen de las tablas materializadas (O(1) sea cual sea el
+        tamaño de la base). Archivos recientes y conceptos top se recalculan
+        solo si alguna escritura los marcó como sucios.
+        
         Returns:
             Diccionario con estadísticas detalladas
         """
-        # Usar cache si está disponible y es reciente
-        current_time = time.time()
-        if (self._stats_cache and 
-            current_time - self._cache_timestamp < self._cache_timeout):
-            return self._stats_cache
-        
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
             cursor = conn.cursor()
             
             stats = {}
             
             # Estadísticas básicas
-            cursor.execute("SELECT COUNT(*) FROM conversations")
-            stats['total_conversations'] = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM messages")
-            stats['total_messages'] = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM concepts")
-            stats['total_concepts'] = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM relationships")
-            stats['total_relationships'] = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM processed_files")
-            stats['total_files_processed'] = cursor.fetchone()[0]
-            
-            # Estadísticas por plataforma
-            cursor.execute('''
-                SELECT platform, COUNT(*), SUM(total_messages)
-                FROM conversations 
-                GROUP BY platform
-            ''')
+            cursor.execute("SELECT key, value FROM stats_counters")
+            counters = dict(cursor.fetchall())
             
+            cursor.execute("SELECT platform, conversations, messages FROM platform_counters WHERE conversations > 0")
             platforms = {}
             for row in cursor.fetchall():
                 platforms[row[0]] = {
                     'conversations': row[1],
                     'messages': row[2]
                 }
+            
+            stats['total_conversations'] = sum(p['conversations'] for p in platforms.values())
+            stats['total_messages'] = counters.get('messages', 0)
+            stats['total_concepts'] = counters.get('concepts', 0)
+            stats['total_relationships'] = counters.get('relationships', 0)
+            stats['total_files_processed'] = counters.get('processed_files', 0)
+            
+            # Estadísticas por plataforma
             stats['by_platform'] = platforms
             
+            # Duplicados detectados por content_hash
+            cursor.execute(
+                "SELECT COALESCE(SUM(copies - 1), 0) FROM conversation_hashes WHERE copies > 1"
+            )
+            stats['duplicate_conversations'] = cursor.fetchone()[0]
+            
+            # Archivos recientes y conceptos más usados
+            stats.update(self._derived_statistics(cursor, bool(counters.get('derived_dirty', 1))))
+            
+            # Cálculos adicionales
+            if stats['total_conversations'] > 0:
+                stats['avg_messages_per_conversation'] = round(
+                    stats['total_messages'] / stats['total_conversations'], 2
+                )
+            else:
+                stats['avg_messages_per_conversation'] = 0
+            
+            # Información de base de datos
+            stats['database_file'] = os.path.abspath(self.db_path)
+            if os.path.exists(self.db_path):
+                stats['database_size_mb'] = round(
+                    os.path.getsize(self.db_path) / (1024 * 1024), 2
+                )
+            
+            conn.close()
+            
+            self._stats_cache = stats
+            return stats
+            
+        except Exception as e:
+            logger.error(f"Error obteniendo estadísticas: {e}")
+            return {}
+    
+    def _derived_statistics(self, cursor, dirty: bool) -> Dict[str, Any]:
+        """
+        Métricas derivadas guardadas en stats_derived, recalculadas si están sucias.
+        
+        El recálculo se hace en una transacción de lectura, sin bloquear a los
+        escritores. Después, una escritura breve guarda el resultado y pone a
+        cero 'derived_dirty' solo si sigue valiendo lo mismo que al leer: si
+        otra escritura lo cambió entre medias, se queda sucio y el próximo
+        get_statistics recalcula. Si la base está ocupada no se guarda nada.
+        """
+        if not dirty:
+            cursor.execute("SELECT key, value FROM stats_derived")
+            derived = {key: json.loads(value) for key, value in cursor.fetchall()}
+            if 'recent_files' in derived and 'top_concepts' in derived:
+                return derived
+        
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute("SELECT value FROM stats_counters WHERE key = 'derived_dirty'")
+            row = cursor.fetchone()
+            generation = row[0] if row else None
+            
             # Archivos procesados recientemente
             cursor.execute('''
                 SELECT filename, processor_used, conversations_extracted, 
@@ -803,7 +1688,6 @@ class IANAEDatabase:
                     'messages': row[3],
                     'processed_at': row[4]
                 })
-            stats['recent_files'] = recent_files
             
             # Conceptos más usados
             cursor.execute('''
@@ -821,37 +1705,59 @@ class IANAEDatabase:
                     'usage_count': row[2],
                     'strength': row[3]
                 })
-            stats['top_concepts'] = top_concepts
-            
-            # Cálculos adicionales
-            if stats['total_conversations'] > 0:
-                stats['avg_messages_per_conversation'] = round(
-                    stats['total_messages'] / stats['total_conversations'], 2
+        finally:
+            cursor.execute("COMMIT")
+        
+        derived = {'recent_files': recent_files, 'top_concepts': top_concepts}
+        if generation is None:
+            return derived
+        
+        try:
+            cursor.execute("PRAGMA busy_timeout = 100")
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute(
+                    "UPDATE stats_counters SET value = 0 WHERE key = 'derived_dirty' AND value = ?",
+                    (generation,)
                 )
-            else:
-                stats['avg_messages_per_conversation'] = 0
-            
-            # Información de base de datos
-            cursor.execute("PRAGMA database_list")
-            db_info = cursor.fetchone()
-            if db_info:
-                stats['database_file'] = db_info[2]
-                if os.path.exists(db_info[2]):
-                    stats['database_size_mb'] = round(
-                        os.path.getsize(db_info[2]) / (1024 * 1024), 2
+                if cursor.rowcount:
+                    cursor.executemany(
+                        "INSERT OR REPLACE INTO stats_derived (key, value) VALUES (?, ?)",
+                        [(key, json.dumps(value)) for key, value in derived.items()]
                     )
-            
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        except sqlite3.OperationalError as e:
+            logger.debug(f"Métricas derivadas no guardadas (base ocupada): {e}")
+        
+        return derived
+    
+    def find_duplicate_conversations(self) -> Iterator[Tuple[str, List[str]]]:
+        """
+        Grupos de conversaciones con el mismo content_hash.
+        
+        Usa el contador por hash que mantienen los triggers: solo se visitan
+        los hashes con más de una copia, no toda la tabla.
+        
+        Yields:
+            (content_hash, ids en orden de inserción)
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT content_hash FROM conversation_hashes WHERE copies > 1")
+            for (content_hash,) in cursor.fetchall():
+                cursor.execute(
+                    "SELECT id FROM conversations WHERE content_hash = ? ORDER BY rowid",
+                    (content_hash,)
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                if len(ids) > 1:
+                    yield content_hash, ids
+        finally:
             conn.close()
-            
-            # Actualizar cache
-            self._stats_cache = stats
-            self._cache_timestamp = current_time
-            
-            return stats
-            
-        except Exception as e:
-            logger.error(f"Error obteniendo estadísticas: {e}")
-            return {}
     
     def cleanup_database(self, dry_run: bool = True) -> Dict[str, Any]:
         """
@@ -876,17 +1782,7 @@ class IANAEDatabase:
             cursor = conn.cursor()
             
             # Encontrar conversaciones duplicadas por hash
-            cursor.execute('''
-                SELECT content_hash, COUNT(*), GROUP_CONCAT(id)
-                FROM conversations 
-                WHERE content_hash IS NOT NULL
-                GROUP BY content_hash
-                HAVING COUNT(*) > 1
-            ''')
-            
-            for row in cursor.fetchall():
-                content_hash, count, ids = row
-                id_list = ids.split(',')
+            for content_hash, id_list in list(self.find_duplicate_conversations()):
                 duplicates_to_remove = id_list[1:]  # Mantener el primero
                 
                 stats['duplicate_conversations'] += len(duplicates_to_remove)
@@ -957,6 +1853,11 @@ class IANAEDatabase:
                 # Optimizar base de datos después de la limpieza
                 cursor.execute("VACUUM")
                 stats['actions_taken'].append("Database optimized with VACUUM")
+                if self._fts_available:
+                    cursor.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+                    cursor.execute("INSERT INTO conversations_fts(conversations_fts) VALUES ('rebuild')")
+                    conn.commit()
+                    stats['actions_taken'].append("Search index rebuilt")
             
             conn.close()
             
@@ -970,11 +1871,35 @@ class IANAEDatabase:
         """Cierra la conexión a la base de datos"""
         # SQLite se cierra automáticamente, pero podemos limpiar cache
         self._stats_cache = {}
+        self.close_thread_connection()
         logger.info("IANAEDatabase cerrada")
 
 
 # Funciones de utilidad
 
+def prepare_conversation(conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Precalcula el hash de la conversación y las filas de sus mensajes.
+    
+    Es la parte de CPU de add_conversations_batch; el pipeline de ingesta
+    la ejecuta en los workers de procesamiento para que el hilo escritor
+    solo haga E/S. La conversación no debe modificarse después.
+    
+    Args:
+        conversation: Conversación en formato IANAE estándar
+        
+    Returns:
+        La misma conversación con '_content_hash' y '_message_rows'
+    """
+    conversation.pop('_content_hash', None)
+    conversation['_content_hash'] = IANAEDatabase._calculate_conversation_hash(conversation)
+    conversation['_message_rows'] = [
+        IANAEDatabase._message_row(mensaje, conversation['id'])
+        for mensaje in conversation.get('mensajes', [])
+    ]
+    return conversation
+
+
 def create_database(db_path: str = "ianae_memoria.db") -> IANAEDatabase:
     """
     Crea una nueva instancia de base de datos IANAE.
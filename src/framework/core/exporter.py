@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+core/exporter.py - Exportación de conversaciones en streaming
+Escribe JSON, JSONL, CSV o TXT conversación a conversación (opcionalmente
+comprimido con gzip), sin reunir la exportación en memoria
+"""
+
+import csv
+import gzip
+import io
+import json
+from typing import Any, Dict, Iterable, Optional, TextIO
+
+# Formatos soportados
+EXPORT_FORMATS = ('json', 'jsonl', 'csv', 'txt')
+
+# Buffer de escritura: el volcado lo marca el disco, no las llamadas a write
+EXPORT_BUFFER = 1 << 20
+
+
+def open_export_file(output_path: str, compress: Optional[bool] = None) -> TextIO:
+    """
+    Abre el archivo de salida en modo texto.
+
+    Args:
+        output_path: Ruta del archivo de salida
+        compress: Comprimir con gzip (None = según la extensión .gz)
+
+    Returns:
+        Archivo de texto abierto para escritura
+    """
+    if compress is None:
+        compress = output_path.endswith('.gz')
+    if compress:
+        # Buffer grande delante del compresor: gzip recibe bloques de 1 MB
+        compressed = gzip.GzipFile(output_path, mode='wb', compresslevel=6)
+        return io.TextIOWrapper(io.BufferedWriter(compressed, EXPORT_BUFFER),
+                                encoding='utf-8', newline='')
+    return open(output_path, 'w', encoding='utf-8', newline='', buffering=EXPORT_BUFFER)
+
+
+def write_export(conversations: Iterable[Dict[str, Any]], output_path: str,
+                 format: str = 'jsonl', compress: Optional[bool] = None) -> Dict[str, int]:
+    """
+    Escribe conversaciones a medida que llegan del iterador.
+
+    Args:
+        conversations: Conversaciones con el formato de get_conversation_details
+            (CSV solo usa los campos de la conversación, no 'messages')
+        output_path: Ruta del archivo de salida
+        format: 'json' (array), 'jsonl' (una conversación por línea), 'csv' o 'txt'
+        compress: Comprimir con gzip (None = según la extensión .gz)
+
+    Returns:
+        Diccionario con 'conversations_exported' y 'messages_exported'
+
+    Raises:
+        ValueError: Si el formato no está soportado
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportación no soportado: {format}")
+
+    stats = {'conversations_exported': 0, 'messages_exported': 0}
+
+    with open_export_file(output_path, compress) as f:
+        if format == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(['ID', 'Título', 'Plataforma', 'Fecha', 'Mensajes'])
+        elif format == 'json':
+            f.write('[')
+
+        for conv in conversations:
+            if format == 'json':
+                f.write(',\n' if stats['conversations_exported'] else '\n')
+                f.write(json.dumps(conv, indent=2, ensure_ascii=False))
+
+            elif format == 'jsonl':
+                f.write(json.dumps(conv, ensure_ascii=False))
+                f.write('\n')
+
+            elif format == 'csv':
+                writer.writerow([
+                    conv['id'],
+                    conv['title'],
+                    conv['platform'],
+                    conv.get('created_at', ''),
+                    conv.get('total_messages', 0)
+                ])
+
+            elif format == 'txt':
+                f.write(f"=== {conv['title']} ===\n")
+                f.write(f"ID: {conv['id']}\n")
+                f.write(f"Plataforma: {conv['platform']}\n")
+                f.write(f"Fecha: {conv.get('created_at', 'N/A')}\n\n")
+
+                for msg in conv.get('messages', []):
+                    f.write(f"{msg['role'].upper()}: {msg['content']}\n\n")
+
+                f.write("\n" + "="*50 + "\n\n")
+
+            stats['conversations_exported'] += 1
+            stats['messages_exported'] += len(conv.get('messages', ()))
+
+        if format == 'json':
+            f.write('\n]\n' if stats['conversations_exported'] else ']\n')
+
+    return stats
@@ -8,11 +8,12 @@ import os
 import time
 import logging
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Union, Tuple
+from typing import Dict, List, Any, Iterator, Optional, Union, Tuple
 from pathlib import Path
 
 # Imports ajustados para la estructura REAL de tu carpeta
-from .database import IANAEDatabase, create_database
+from .database import IANAEDatabase, create_database, prepare_conversation
+from .exporter import EXPORT_FORMATS, write_export
 
 # Import del auto-detector (está en el nivel superior)
 import sys
@@ -24,6 +25,11 @@ from chatgpt import ChatGPTProcessor
 from claude import ClaudeProcessor  
 from cline import ClineProcessor
 
+# Pipeline por etapas (también en el nivel superior)
+from pipeline.orchestrator import Pipeline
+from pipeline.stages import (StorageWriter, check_file, ingestion_stage, parse_file,
+                             processing_stage, storage_stage)
+
 # Clase base está en base.py
 try:
     from base import BaseProcessor, ProcessingError
@@ -54,6 +60,33 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def _create_processors() -> Dict[str, BaseProcessor]:
+    """Procesadores especializados por plataforma"""
+    return {
+        'chatgpt': ChatGPTProcessor(),
+        'claude': ClaudeProcessor(),
+        'cline': ClineProcessor()
+    }
+
+
+def _detect_and_parse(file_path: str, database: IANAEDatabase, detector: AutoDetector,
+                      processors: Dict[str, BaseProcessor]) -> Dict[str, Any]:
+    """
+    Pasos de solo lectura de la ingesta de un archivo: comprobar si ya se
+    procesó, auto-detectar el tipo y extraer las conversaciones (las mismas
+    etapas del pipeline de ingesta, ejecutadas en el hilo actual).
+
+    Returns:
+        Diccionario con 'status' ('skipped', 'rejected', 'failed' o 'parsed'),
+        'detected_type', 'confidence', 'conversations', 'file_info' y 'error'
+    """
+    parsed = check_file(database, file_path)
+    if parsed['status'] == 'pending':
+        parse_file(parsed, detector, processors)
+    return parsed
+
+
 class IANAECore:
     """
     Sistema Principal IANAE - Versión Completamente Integrada
@@ -86,11 +119,7 @@ class IANAECore:
         logger.info("✅ Auto-detector inicializado")
         
         # 3. Procesadores especializados
-        self.processors = {
-            'chatgpt': ChatGPTProcessor(),
-            'claude': ClaudeProcessor(),
-            'cline': ClineProcessor()
-        }
+        self.processors = _create_processors()
         logger.info(f"✅ Procesadores inicializados: {list(self.processors.keys())}")
         
         # 4. Estadísticas del sistema
@@ -135,49 +164,39 @@ class IANAECore:
         try:
             logger.info(f"📄 Procesando archivo: {os.path.basename(file_path)}")
             
-            # 1. Verificar si ya fue procesado
-            is_processed, file_info = self.database.is_file_processed(file_path)
-            if is_processed and not file_info.get('file_changed', False):
+            # 1-4. Verificar, auto-detectar y parsear
+            parsed = _detect_and_parse(file_path, self.database, self.detector, self.processors)
+            result['detected_type'] = parsed['detected_type']
+            
+            if parsed['status'] == 'skipped':
                 result.update({
                     'success': True,
                     'file_already_processed': True,
-                    'detected_type': file_info.get('processor_used', 'unknown'),
                     'processing_time': time.time() - start_time,
                     'message': 'Archivo ya procesado previamente'
                 })
                 self.system_stats['files_skipped'] += 1
                 return result
             
-            # 2. Auto-detección del tipo
-            detection_result = self.detector.detect_file_type(file_path)
-            
-            if not detection_result['success']:
+            if parsed['status'] == 'rejected':
                 result.update({
-                    'error': f"Auto-detección falló: {detection_result.get('error', 'Tipo no soportado')}",
+                    'error': parsed['error'],
                     'processing_time': time.time() - start_time
                 })
                 self.system_stats['errors_encountered'] += 1
                 return result
             
-            detected_type = detection_result['processor']
-            result['detected_type'] = detected_type
-            
-            # 3. Obtener procesador especializado
-            if detected_type not in self.processors:
+            if parsed['status'] == 'failed':
                 result.update({
-                    'error': f"Procesador no disponible para tipo: {detected_type}",
+                    'error': parsed['error'],
                     'processing_time': time.time() - start_time
                 })
-                self.system_stats['errors_encountered'] += 1
+                self._update_system_stats({'processing_time': time.time() - start_time}, False)
                 return result
             
-            processor = self.processors[detected_type]
+            detected_type = parsed['detected_type']
             result['processor_used'] = detected_type
-            
-            # 4. Procesar con el procesador especializado
-            logger.info(f"🔧 Usando procesador {detected_type} con confianza {detection_result['confidence']:.1f}%")
-            
-            conversaciones = processor.process_file(file_path)
+            conversaciones = parsed['conversations']
             
             if not conversaciones:
                 result.update({
@@ -215,7 +234,7 @@ class IANAECore:
                     'conversations_new': db_stats['conversations_added'],
                     'conversations_updated': db_stats['conversations_updated'],
                     'conversations_skipped': db_stats['conversations_skipped'],
-                    'detection_confidence': detection_result['confidence']
+                    'detection_confidence': parsed['confidence']
                 }
             })
             
@@ -244,7 +263,8 @@ class IANAECore:
         return result
     
     def process_directory(self, directory_path: str, extensions: List[str] = None, 
-                         max_files: int = 100, recursive: bool = True) -> Dict[str, Any]:
+                         max_files: int = 100, recursive: bool = True,
+                         workers: Optional[int] = 1) -> Dict[str, Any]:
         """
         Procesa un directorio completo de archivos.
         
@@ -253,15 +273,13 @@ class IANAECore:
             extensions: Extensiones a procesar (default: ['.json', '.md', '.txt'])
             max_files: Máximo número de archivos a procesar
             recursive: Si buscar recursivamente en subdirectorios
+            workers: Workers que parsean en paralelo (1 = un hilo, sin pool de
+                procesos; None = todos los núcleos). Ver iter_process_directory.
             
         Returns:
             Estadísticas completas del procesamiento por lotes
         """
         start_time = time.time()
-        
-        if extensions is None:
-            extensions = ['.json', '.md', '.txt']
-        
         result = {
             'success': False,
             'directory': directory_path,
@@ -273,98 +291,46 @@ class IANAECore:
             'total_messages': 0,
             'processing_time': 0.0,
             'detailed_results': [],
+            'pipeline': None,
             'error': None
         }
         
         try:
-            if not os.path.exists(directory_path):
-                result['error'] = f"Directorio no encontrado: {directory_path}"
-                return result
-            
-            logger.info(f"📂 Procesando directorio: {directory_path}")
-            logger.info(f"🔍 Extensiones: {extensions}, Máx archivos: {max_files}")
-            
-            # Encontrar archivos
-            files_to_process = []
-            
-            if recursive:
-                for root, dirs, files in os.walk(directory_path):
-                    for file in files:
-                        if any(file.lower().endswith(ext) for ext in extensions):
-                            files_to_process.append(os.path.join(root, file))
-                            if len(files_to_process) >= max_files:
-                                break
-                    if len(files_to_process) >= max_files:
-                        break
-            else:
-                for file in os.listdir(directory_path):
-                    if os.path.isfile(os.path.join(directory_path, file)):
-                        if any(file.lower().endswith(ext) for ext in extensions):
-                            files_to_process.append(os.path.join(directory_path, file))
-                            if len(files_to_process) >= max_files:
-                                break
-            
-            result['files_found'] = len(files_to_process)
-            
-            if not files_to_process:
-                result.update({
-                    'success': True,
-                    'processing_time': time.time() - start_time,
-                    'message': 'No se encontraron archivos compatibles'
-                })
-                return result
-            
-            logger.info(f"📊 Encontrados {len(files_to_process)} archivos para procesar")
-            
-            # Procesar archivos uno por uno
-            for i, file_path in enumerate(files_to_process):
-                try:
-                    logger.info(f"📄 Procesando {i+1}/{len(files_to_process)}: {os.path.basename(file_path)}")
-                    
-                    file_result = self.process_file(file_path)
-                    
-                    # Agregar a resultados detallados
+            for event in self.iter_process_directory(directory_path, extensions, max_files,
+                                                     recursive, workers=workers):
+                if event['type'] == 'error':
+                    result['error'] = event['error']
+                    return result
+                if event['type'] == 'start':
+                    result['files_found'] = event['files_found']
+                elif event['type'] == 'commit':
+                    result['total_conversations'] += event['conversations_added']
+                    result['total_messages'] += event['messages_added']
+                elif event['type'] == 'pipeline':
+                    result['pipeline'] = event['stats']
+                elif event['type'] == 'file':
                     result['detailed_results'].append({
-                        'filename': os.path.basename(file_path),
-                        'success': file_result['success'],
-                        'detected_type': file_result.get('detected_type'),
-                        'conversations': file_result.get('conversations_added', 0),
-                        'messages': file_result.get('messages_added', 0),
-                        'processing_time': file_result.get('processing_time', 0),
-                        'error': file_result.get('error'),
-                        'already_processed': file_result.get('file_already_processed', False)
+                        k: event[k] for k in ('filename', 'success', 'detected_type', 'conversations',
+                                              'messages', 'processing_time', 'error',
+                                              'already_processed')
                     })
-                    
-                    # Actualizar contadores
-                    if file_result['success']:
+                    if event['success']:
                         result['files_processed'] += 1
-                        result['total_conversations'] += file_result.get('conversations_added', 0)
-                        result['total_messages'] += file_result.get('messages_added', 0)
-                        
-                        if file_result.get('file_already_processed'):
+                        if event['already_processed']:
                             result['files_skipped'] += 1
                     else:
                         result['files_errors'] += 1
                     
-                    # Log progreso cada 10 archivos
-                    if (i + 1) % 10 == 0:
-                        logger.info(f"📈 Progreso: {i+1}/{len(files_to_process)} archivos, "
+                    if event['completed'] % 10 == 0:
+                        logger.info(f"📈 Progreso: {event['completed']}/{event['total']} archivos, "
                                    f"{result['total_conversations']} conversaciones")
-                
-                except Exception as e:
-                    logger.error(f"❌ Error procesando {file_path}: {e}")
-                    result['files_errors'] += 1
-                    result['detailed_results'].append({
-                        'filename': os.path.basename(file_path),
-                        'success': False,
-                        'error': str(e)
-                    })
             
-            # Finalizar resultado
             result.update({
                 'success': True,
                 'processing_time': time.time() - start_time
             })
+            if not result['files_found']:
+                result['message'] = 'No se encontraron archivos compatibles'
             
             logger.info(f"🎉 Directorio procesado: {result['files_processed']} archivos, "
                        f"{result['total_conversations']} conversaciones, "
@@ -379,9 +345,114 @@ class IANAECore:
         
         return result
     
+    def iter_process_directory(self, directory_path: str, extensions: List[str] = None,
+                               max_files: int = 100, recursive: bool = True,
+                               workers: Optional[int] = None, max_pending: Optional[int] = None,
+                               commit_batch: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Ingesta de un directorio sobre el pipeline por etapas, emitiendo el
+        progreso como iterador.
+        
+        Etapas (ver pipeline/stages):
+        - ingestion: hilos que descartan los archivos ya procesados (stat/hash)
+        - processing: pool de procesos que auto-detecta, parsea y precalcula
+          hashes y filas de mensajes (CPU, en paralelo con la escritura)
+        - storage: único hilo escritor que agrupa las conversaciones de varios
+          archivos en cada add_conversations_batch y registra los archivos
+          después del commit
+        Las colas están acotadas: si el escritor se retrasa, se dejan de
+        enviar archivos a parsear. Si se deja de iterar, el pipeline se cancela.
+        
+        Args:
+            directory_path: Ruta del directorio
+            extensions: Extensiones a procesar (default: ['.json', '.md', '.txt'])
+            max_files: Máximo número de archivos a procesar
+            recursive: Si buscar recursivamente en subdirectorios
+            workers: Workers de parseo (default: núcleos disponibles; 1 = un hilo)
+            max_pending: Archivos parseados esperando al escritor como máximo
+                (default: 2 * workers)
+            commit_batch: Conversaciones acumuladas antes de escribir un lote
+            
+        Yields:
+            Eventos de progreso con 'type':
+            - 'start': files_found
+            - 'file': un archivo terminado (success, status, detected_type,
+              conversations, messages, error, already_processed, completed, total)
+            - 'commit': un lote escrito (files, conversations_added/updated/skipped,
+              messages_added)
+            - 'pipeline': al terminar, 'stats' con throughput y latencias por etapa
+            - 'error': error que impide procesar el directorio
+        """
+        if extensions is None:
+            extensions = ['.json', '.md', '.txt']
+        
+        if not os.path.exists(directory_path):
+            yield {'type': 'error', 'error': f"Directorio no encontrado: {directory_path}"}
+            return
+        
+        files_to_process = self._find_files(directory_path, extensions, max_files, recursive)
+        total = len(files_to_process)
+        yield {'type': 'start', 'directory': directory_path, 'files_found': total}
+        if not files_to_process:
+            return
+        
+        workers = workers or os.cpu_count() or 1
+        logger.info(f"📂 Ingesta en pipeline: {total} archivos, {workers} workers")
+        
+        pipeline = self._ingest_pipeline(total, workers, max_pending or 2 * workers, commit_batch)
+        yield from pipeline.run(enumerate(files_to_process))
+        yield {'type': 'pipeline', 'stats': pipeline.stats()}
+    
+    def _ingest_pipeline(self, total: int, workers: int, max_pending: int,
+                         commit_batch: int) -> Pipeline:
+        """Pipeline de ingesta ingestion → processing → storage de iter_process_directory"""
+        writer = StorageWriter(self.database, commit_batch, total, on_file=self._record_file)
+        return Pipeline([
+            ingestion_stage(self.database, workers=min(4, workers)),
+            processing_stage(AutoDetector, _create_processors, prepare_conversation,
+                             workers=workers, mode='process' if workers > 1 else 'thread'),
+            storage_stage(writer)
+        ], name="ianae-ingest", queue_size=max_pending)
+    
+    def _record_file(self, parsed: Dict[str, Any], success: bool, processing_stats: Dict[str, Any]):
+        """Estadísticas del sistema para un archivo terminado en el pipeline (hilo escritor)"""
+        status = parsed['status']
+        if status == 'skipped':
+            self.system_stats['files_skipped'] += 1
+        elif status == 'rejected':
+            self.system_stats['errors_encountered'] += 1
+        elif status == 'failed' or not success:
+            self._update_system_stats({'processing_time': processing_stats['processing_time']}, False)
+        elif processing_stats['conversations_processed']:
+            self._update_system_stats(processing_stats, True)
+    
+    def _find_files(self, directory_path: str, extensions: List[str],
+                    max_files: int, recursive: bool) -> List[str]:
+        """Archivos del directorio con las extensiones dadas, hasta max_files"""
+        files_to_process = []
+        
+        if recursive:
+            for root, dirs, files in os.walk(directory_path):
+                for file in files:
+                    if any(file.lower().endswith(ext) for ext in extensions):
+                        files_to_process.append(os.path.join(root, file))
+                        if len(files_to_process) >= max_files:
+                            break
+                if len(files_to_process) >= max_files:
+                    break
+        else:
+            for file in os.listdir(directory_path):
+                if os.path.isfile(os.path.join(directory_path, file)):
+                    if any(file.lower().endswith(ext) for ext in extensions):
+                        files_to_process.append(os.path.join(directory_path, file))
+                        if len(files_to_process) >= max_files:
+                            break
+        
+        return files_to_process
+    
     def search_conversations(self, query: str, platform: str = None, 
                            limit: int = 50, date_from: str = None, 
-                           date_to: str = None) -> List[Dict[str, Any]]:
+                           date_to: str = None, after: str = None) -> List[Dict[str, Any]]:
         """
         Busca conversaciones en la base de datos.
         
@@ -391,6 +462,7 @@ class IANAECore:
             limit: Máximo número de resultados
             date_from: Fecha inicio (YYYY-MM-DD)
             date_to: Fecha fin (YYYY-MM-DD)
+            after: 'cursor' del último resultado, para pedir la página siguiente
             
         Returns:
             Lista de conversaciones que coinciden
@@ -403,7 +475,8 @@ class IANAECore:
                 platform=platform,
                 date_from=date_from,
                 date_to=date_to,
-                limit=limit
+                limit=limit,
+                after=after
             )
             
             logger.info(f"📊 Encontrados {len(results)} resultados")
@@ -497,15 +570,21 @@ class IANAECore:
             return {'error': str(e)}
     
     def export_conversations(self, output_path: str, format: str = 'json',
-                           platform: str = None, query: str = None) -> Dict[str, Any]:
+                           platform: str = None, query: str = None,
+                           compress: bool = None) -> Dict[str, Any]:
         """
         Exporta conversaciones en el formato especificado.
         
+        Las conversaciones se leen de un único cursor y se escriben a medida
+        que llegan: no hay límite de cantidad y la memoria no crece con el
+        tamaño de la exportación.
+        
         Args:
             output_path: Ruta del archivo de salida
-            format: Formato de exportación ('json', 'csv', 'txt')
+            format: Formato de exportación ('json', 'jsonl', 'csv', 'txt')
             platform: Filtrar por plataforma
             query: Filtrar por búsqueda
+            compress: Comprimir con gzip (None = si output_path acaba en .gz)
             
         Returns:
             Resultado de la exportación
@@ -513,66 +592,33 @@ class IANAECore:
         try:
             logger.info(f"📤 Exportando conversaciones a {output_path} (formato: {format})")
             
-            # Buscar conversaciones según filtros
-            conversations = self.search_conversations(
-                query=query or "",
+            if format not in EXPORT_FORMATS:
+                return {
+                    'success': False,
+                    'error': f'Formato no soportado: {format}'
+                }
+            
+            # CSV solo lleva datos de la conversación: sin JOIN a mensajes
+            conversations = self.database.iter_conversations(
                 platform=platform,
-                limit=10000  # Exportar todas las que coincidan
+                query=query or None,
+                include_messages=format != 'csv'
             )
+            export_stats = write_export(conversations, output_path, format, compress)
             
-            if not conversations:
+            if not export_stats['conversations_exported']:
+                os.remove(output_path)
                 return {
                     'success': False,
                     'error': 'No se encontraron conversaciones para exportar'
                 }
             
-            # Obtener detalles completos si es necesario
-            if format in ['json', 'txt']:
-                detailed_conversations = []
-                for conv in conversations:
-                    details = self.get_conversation_details(conv['id'])
-                    if details:
-                        detailed_conversations.append(details)
-                conversations = detailed_conversations
-            
-            # Exportar según formato
-            if format == 'json':
-                import json
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(conversations, f, indent=2, ensure_ascii=False)
-            
-            elif format == 'csv':
-                import csv
-                with open(output_path, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(['ID', 'Título', 'Plataforma', 'Fecha', 'Mensajes'])
-                    for conv in conversations:
-                        writer.writerow([
-                            conv['id'],
-                            conv['title'],
-                            conv['platform'],
-                            conv.get('created_at', ''),
-                            conv.get('total_messages', 0)
-                        ])
-            
-            elif format == 'txt':
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    for conv in conversations:
-                        f.write(f"=== {conv['title']} ===\n")
-                        f.write(f"ID: {conv['id']}\n")
-                        f.write(f"Plataforma: {conv['platform']}\n")
-                        f.write(f"Fecha: {conv.get('created_at', 'N/A')}\n\n")
-                        
-                        for msg in conv.get('messages', []):
-                            f.write(f"{msg['role'].upper()}: {msg['content']}\n\n")
-                        
-                        f.write("\n" + "="*50 + "\n\n")
-            
             result = {
                 'success': True,
                 'output_path': output_path,
                 'format': format,
-                'conversations_exported': len(conversations),
+                'conversations_exported': export_stats['conversations_exported'],
+                'messages_exported': export_stats['messages_exported'],
                 'file_size': os.path.getsize(output_path) if os.path.exists(output_path) else 0
             }
             
@@ -1 +1,37 @@
-# LLM module 
+"""
+llm - Capa LLM asíncrona de IANAE
+Proveedores sobre httpx con sesiones persistentes, cliente con fallback
+y constructor de contexto con presupuesto de tokens
+"""
+
+from .client import LLMClient, create_provider
+from .context_builder import ContextBuilder, ContextCandidate, ContextSection, estimate_tokens
+from .providers import (
+    PROVIDERS,
+    AnthropicProvider,
+    BaseProvider,
+    LLMError,
+    LLMResponse,
+    LMStudioProvider,
+    LocalModelProvider,
+    OllamaProvider,
+    OpenAIProvider,
+)
+
+__all__ = [
+    'LLMClient',
+    'create_provider',
+    'ContextBuilder',
+    'ContextCandidate',
+    'ContextSection',
+    'estimate_tokens',
+    'PROVIDERS',
+    'BaseProvider',
+    'LLMError',
+    'LLMResponse',
+    'OpenAIProvider',
+    'LMStudioProvider',
+    'LocalModelProvider',
+    'OllamaProvider',
+    'AnthropicProvider'
+]
@@ -1 +1,123 @@
-# LLM client 
+#!/usr/bin/env python3
+"""
+llm/client.py - Cliente LLM con cadena de proveedores
+Prueba los proveedores en orden (fallback) sobre sesiones HTTP persistentes;
+las peticiones concurrentes no se serializan entre sí
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from .providers import PROVIDERS, BaseProvider, LLMError, LLMResponse
+
+logger = logging.getLogger(__name__)
+
+
+def create_provider(name: str, **kwargs) -> BaseProvider:
+    """
+    Crea un proveedor por nombre.
+
+    Args:
+        name: Clave de PROVIDERS ('openai', 'lmstudio', 'local', 'ollama', 'anthropic')
+        **kwargs: Argumentos del proveedor (endpoint, model, timeout...)
+
+    Raises:
+        ValueError: Si el proveedor no existe
+    """
+    try:
+        provider_class = PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Proveedor LLM desconocido: {name}") from None
+    return provider_class(**kwargs)
+
+
+class LLMClient:
+    """
+    Cadena de proveedores con fallback.
+
+    chat() devuelve la respuesta del primer proveedor que responda; los
+    errores de los anteriores quedan en last_errors. stream() solo cambia
+    de proveedor si falla antes del primer token.
+    """
+
+    def __init__(self, providers: Sequence[BaseProvider]):
+        """
+        Args:
+            providers: Proveedores en orden de preferencia
+        """
+        if not providers:
+            raise ValueError("LLMClient necesita al menos un proveedor")
+        self.providers = list(providers)
+        self.last_errors: Dict[str, str] = {}
+
+    def _candidates(self, provider: Optional[str]) -> List[BaseProvider]:
+        if provider is None:
+            return [p for p in self.providers if p.available]
+        return [p for p in self.providers if p.name == provider]
+
+    async def chat(self, messages: List[Dict[str, str]], system: Optional[str] = None,
+                   provider: Optional[str] = None, **kwargs) -> LLMResponse:
+        """
+        Chat con el primer proveedor disponible.
+
+        Args:
+            messages: Mensajes [{'role', 'content'}]
+            system: Prompt de sistema
+            provider: Usar solo este proveedor (por nombre)
+            **kwargs: max_tokens, temperature, timeout...
+
+        Raises:
+            LLMError: Si ningún proveedor respondió
+        """
+        errors = self.last_errors = {}
+        for candidate in self._candidates(provider):
+            try:
+                return await candidate.chat(messages, system=system, **kwargs)
+            except LLMError as e:
+                logger.info(f"LLM {candidate.name} falló: {e}")
+                errors[candidate.name] = str(e)
+        raise LLMError(f"Ningún proveedor LLM disponible: {errors or 'sin proveedores'}")
+
+    async def stream(self, messages: List[Dict[str, str]], system: Optional[str] = None,
+                     provider: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Streaming de tokens del primer proveedor disponible.
+
+        Raises:
+            LLMError: Si ningún proveedor respondió o el stream se corta a medias
+        """
+        errors = self.last_errors = {}
+        for candidate in self._candidates(provider):
+            started = False
+            try:
+                async for token in candidate.stream(messages, system=system, **kwargs):
+                    started = True
+                    yield token
+                return
+            except LLMError as e:
+                if started:
+                    raise
+                logger.info(f"LLM {candidate.name} falló: {e}")
+                errors[candidate.name] = str(e)
+        raise LLMError(f"Ningún proveedor LLM disponible: {errors or 'sin proveedores'}")
+
+    async def health(self, timeout: float = 5.0) -> Dict[str, Dict[str, Any]]:
+        """Estado de todos los proveedores, comprobados en paralelo"""
+        results = await asyncio.gather(*(p.health_check(timeout) for p in self.providers))
+        return {p.name: r for p, r in zip(self.providers, results)}
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Estadísticas por proveedor"""
+        return {p.name: p.get_stats() for p in self.providers}
+
+    async def aclose(self):
+        """Cierra las sesiones de todos los proveedores en el loop actual"""
+        for p in self.providers:
+            await p.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
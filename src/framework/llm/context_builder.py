@@ -1 +1,207 @@
-# Context builder 
+#!/usr/bin/env python3
+"""
+llm/context_builder.py - Contexto para el LLM con presupuesto de tokens
+Ordena los fragmentos candidatos, los empaqueta de forma voraz hasta el
+presupuesto con un estimador local de tokens y cachea el fragmento
+renderizado de cada concepto mientras no cambie su versión
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+# Trozos de hasta 4 caracteres de palabra y signos sueltos: se parece al
+# recuento de un tokenizador BPE sin cargar ninguno
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Por debajo de este hueco no merece la pena truncar un fragmento
+MIN_TRUNCATE_TOKENS = 16
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimación rápida del número de tokens de un texto.
+
+    Args:
+        text: Texto a estimar
+
+    Returns:
+        Tokens aproximados (0 para texto vacío)
+    """
+    return len(_TOKEN_RE.findall(text)) if text else 0
+
+
+@dataclass
+class ContextCandidate:
+    """Fragmento candidato: se renderiza solo si no está en caché"""
+    key: Hashable
+    score: float
+    render: Callable[[], str]
+    version: Any = None  # None = no cachear (p. ej. datos ajenos al sistema)
+
+
+@dataclass
+class ContextSection:
+    """Grupo de fragmentos con título y formato de elemento propios"""
+    candidates: Sequence[ContextCandidate]
+    title: str = ""
+    item_format: str = "{n}. {text}"
+    max_items: Optional[int] = None
+
+
+class ContextBuilder:
+    """
+    Constructor de contexto con presupuesto de tokens.
+
+    Las secciones se llenan en orden de prioridad; dentro de cada una los
+    candidatos se prueban de mayor a menor puntuación y se añade todo el
+    que quepa en lo que queda de presupuesto. Un concepto ya incluido en
+    una sección anterior no se repite.
+    """
+
+    def __init__(self, max_tokens: int = 1200, header: str = "", empty_message: str = "",
+                 separator: str = "\n", cache_size: int = 2048,
+                 estimator: Callable[[str], int] = estimate_tokens):
+        """
+        Args:
+            max_tokens: Presupuesto de tokens por defecto (cabecera incluida)
+            header: Texto inicial del contexto
+            empty_message: Contexto devuelto si no hay ningún fragmento
+            separator: Separador entre cabecera, títulos y fragmentos
+            cache_size: Fragmentos renderizados como máximo en caché (LRU)
+            estimator: Función texto → tokens
+        """
+        self.max_tokens = max_tokens
+        self.header = header
+        self.empty_message = empty_message
+        self.separator = separator
+        self.cache_size = cache_size
+        self.estimator = estimator
+        self._header_tokens = estimator(header)
+        self._cache: "OrderedDict[Hashable, Tuple[Any, str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'builds': 0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'last_candidates': 0,
+            'last_packed': 0,
+            'last_dropped': 0,
+            'last_tokens': 0
+        }
+
+    def snippet(self, candidate: ContextCandidate) -> Tuple[str, int]:
+        """
+        Fragmento renderizado y sus tokens, desde la caché si la versión coincide.
+
+        Returns:
+            (texto, tokens)
+        """
+        if candidate.version is not None:
+            with self._lock:
+                cached = self._cache.get(candidate.key)
+                if cached is not None and cached[0] == candidate.version:
+                    self._cache.move_to_end(candidate.key)
+                    self.stats['cache_hits'] += 1
+                    return cached[1], cached[2]
+
+        text = candidate.render()
+        tokens = self.estimator(text)
+        self.stats['cache_misses'] += 1
+        if candidate.version is not None:
+            with self._lock:
+                self._cache[candidate.key] = (candidate.version, text, tokens)
+                self._cache.move_to_end(candidate.key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return text, tokens
+
+    def build(self, *sections: ContextSection, max_tokens: Optional[int] = None) -> str:
+        """
+        Construye el contexto.
+
+        Args:
+            *sections: Secciones en orden de prioridad
+            max_tokens: Presupuesto para esta llamada (default: self.max_tokens)
+
+        Returns:
+            Contexto con cabecera, títulos y fragmentos numerados por sección;
+            empty_message si no cupo ningún fragmento
+        """
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        remaining = budget - self._header_tokens
+        seen = set()
+        packed: List[Tuple[ContextSection, List[str]]] = []
+        candidates = dropped = 0
+
+        for section in sections:
+            items: List[str] = []
+            title_tokens = self.estimator(section.title)
+            # sorted es estable: a igual puntuación se respeta el orden de llegada
+            for candidate in sorted(section.candidates, key=lambda c: c.score, reverse=True):
+                candidates += 1
+                if candidate.key in seen or (section.max_items is not None
+                                             and len(items) >= section.max_items):
+                    dropped += 1
+                    continue
+                text, tokens = self.snippet(candidate)
+                prefix = self.estimator(section.item_format.format(n=len(items) + 1, text=""))
+                cost = tokens + prefix + (0 if items else title_tokens)
+                if cost > remaining:
+                    # El primer fragmento del contexto se recorta antes que quedarse sin nada
+                    space = remaining - (cost - tokens)
+                    if packed or items or space < MIN_TRUNCATE_TOKENS:
+                        dropped += 1
+                        continue
+                    text = self._truncate(text, tokens, space)
+                    cost = self.estimator(text) + cost - tokens
+                seen.add(candidate.key)
+                items.append(section.item_format.format(n=len(items) + 1, text=text))
+                remaining -= cost
+            if items:
+                packed.append((section, items))
+
+        self.stats['builds'] += 1
+        self.stats['last_candidates'] = candidates
+        self.stats['last_packed'] = sum(len(items) for _, items in packed)
+        self.stats['last_dropped'] = dropped
+        self.stats['last_tokens'] = budget - remaining if packed else 0
+
+        if not packed:
+            return self.empty_message
+
+        parts = [self.header] if self.header else []
+        for section, items in packed:
+            if section.title:
+                parts.append(section.title)
+            parts.extend(items)
+        return self.separator.join(parts)
+
+    def _truncate(self, text: str, tokens: int, max_tokens: int) -> str:
+        """Recorta un texto a max_tokens aproximados (con '...' al final)"""
+        max_tokens -= self.estimator("...")
+        cut = len(text) * max_tokens // max(tokens, 1)
+        while cut > 0 and self.estimator(text[:cut]) > max_tokens:
+            cut = cut * 9 // 10
+        return text[:cut].rstrip() + "..."
+
+    def invalidate(self, key: Hashable):
+        """Descarta el fragmento cacheado de un concepto"""
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def clear_cache(self):
+        """Vacía la caché de fragmentos"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores del constructor con la tasa de aciertos de caché"""
+        stats = dict(self.stats)
+        lookups = stats['cache_hits'] + stats['cache_misses']
+        stats['cache_entries'] = len(self._cache)
+        stats['hit_rate'] = stats['cache_hits'] / lookups if lookups else 0.0
+        return stats
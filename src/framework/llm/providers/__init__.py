@@ -1 +1,32 @@
-# LLM providers 
+#!/usr/bin/env python3
+"""
+providers/__init__.py - Proveedores LLM asíncronos
+"""
+
+from .base_provider import BaseProvider, LLMError, LLMResponse
+from .openai import OpenAIProvider
+from .lmstudio import LMStudioProvider
+from .local_models import LocalModelProvider
+from .ollama import OllamaProvider
+from .anthropic import AnthropicProvider
+
+# Nombre → clase (para crear proveedores desde configuración)
+PROVIDERS = {
+    'openai': OpenAIProvider,
+    'lmstudio': LMStudioProvider,
+    'local': LocalModelProvider,
+    'ollama': OllamaProvider,
+    'anthropic': AnthropicProvider
+}
+
+__all__ = [
+    'BaseProvider',
+    'LLMError',
+    'LLMResponse',
+    'OpenAIProvider',
+    'LMStudioProvider',
+    'LocalModelProvider',
+    'OllamaProvider',
+    'AnthropicProvider',
+    'PROVIDERS'
+]
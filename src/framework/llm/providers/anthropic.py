@@ -1 +1,81 @@
-# Anthropic 
+#!/usr/bin/env python3
+"""
+providers/anthropic.py - API de mensajes de Anthropic
+Streaming SSE con eventos content_block_delta hasta message_stop
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from .base_provider import BaseProvider, LLMResponse
+
+ANTHROPIC_VERSION = "2023-06-01"
+
+
+class AnthropicProvider(BaseProvider):
+    """Claude vía /v1/messages (clave en ANTHROPIC_API_KEY)"""
+
+    name = "anthropic"
+    default_endpoint = "https://api.anthropic.com/v1"
+    default_model = "claude-sonnet-4-20250514"
+    api_key_env = "ANTHROPIC_API_KEY"
+    chat_path = "/messages"
+
+    def __init__(self, endpoint: Optional[str] = None, model: Optional[str] = None,
+                 max_concurrency: int = 8, **kwargs):
+        super().__init__(endpoint, model, max_concurrency=max_concurrency, **kwargs)
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json", "anthropic-version": ANTHROPIC_VERSION}
+        if self.api_key:
+            headers["x-api-key"] = self.api_key
+        headers.update(self.extra_headers)
+        return headers
+
+    def build_payload(self, messages: List[Dict[str, str]], system: Optional[str],
+                      max_tokens: int, temperature: float, stream: bool,
+                      **options) -> Dict[str, Any]:
+        # La API solo admite user/assistant; el sistema va aparte
+        system_parts = [system] if system else []
+        chat_messages = []
+        for m in messages:
+            if m.get("role") == "system":
+                system_parts.append(m.get("content", ""))
+            else:
+                chat_messages.append({"role": m.get("role", "user"), "content": m.get("content", "")})
+        payload = {
+            "model": options.pop("model", None) or self.model,
+            "messages": chat_messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": stream
+        }
+        if system_parts:
+            payload["system"] = "\n\n".join(system_parts)
+        payload.update(options)
+        return payload
+
+    def parse_response(self, data: Dict[str, Any]) -> LLMResponse:
+        usage = data.get("usage") or {}
+        return LLMResponse(
+            text="".join(block.get("text", "") for block in data["content"]
+                         if block.get("type") == "text"),
+            provider=self.name,
+            model=data.get("model", self.model),
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            raw=data
+        )
+
+    def parse_stream_line(self, line: str) -> Optional[str]:
+        data = self._sse_data(line)
+        if data is None:
+            return None  # líneas 'event: ...'
+        event = json.loads(data)
+        if event.get("type") == "message_stop":
+            raise StopAsyncIteration
+        if event.get("type") == "error":
+            raise ValueError(event.get("error", {}).get("message", "error en el stream"))
+        if event.get("type") == "content_block_delta":
+            return event.get("delta", {}).get("text")
+        return None
@@ -1 +1,338 @@
-# Base provider 
+#!/usr/bin/env python3
+"""
+providers/base_provider.py - Base asíncrona de los proveedores LLM
+Sesión HTTP persistente (pool de conexiones de httpx) por event loop,
+límite de peticiones concurrentes, timeouts por petición y streaming de tokens
+"""
+
+import os
+import time
+import asyncio
+import logging
+import weakref
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LLMResponse:
+    """Respuesta unificada de cualquier proveedor"""
+    text: str
+    provider: str
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    latency: float = 0.0
+    raw: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+class LLMError(Exception):
+    """Error de un proveedor (conexión, HTTP, timeout o respuesta inválida)"""
+
+    def __init__(self, message: str, provider: str = "", status: Optional[int] = None,
+                 timeout: bool = False, connection: bool = False):
+        super().__init__(message)
+        self.provider = provider
+        self.status = status
+        self.timeout = timeout
+        self.connection = connection
+
+
+class _LoopState:
+    """Cliente HTTP y semáforo de un event loop (no se pueden compartir entre loops)"""
+
+    def __init__(self, client, semaphore: asyncio.Semaphore):
+        self.client = client
+        self.semaphore = semaphore
+
+
+class BaseProvider(ABC):
+    """
+    Proveedor LLM asíncrono sobre httpx.AsyncClient.
+
+    Cada event loop tiene su propio cliente (pool de conexiones keep-alive)
+    y su propio semáforo de concurrencia, creados al primer uso. Las
+    subclases definen las rutas, el payload y cómo leer la respuesta.
+
+    Uso:
+        async with OllamaProvider(model="llama3") as llm:
+            respuesta = await llm.chat([{"role": "user", "content": "Hola"}])
+            async for token in llm.stream([{"role": "user", "content": "Hola"}]):
+                print(token, end="")
+    """
+
+    name = "base"
+    default_endpoint = ""
+    default_model = ""
+    api_key_env = ""
+    chat_path = "/chat/completions"
+    models_path = "/models"
+
+    def __init__(self, endpoint: Optional[str] = None, model: Optional[str] = None,
+                 api_key: Optional[str] = None, timeout: float = 60.0,
+                 connect_timeout: float = 5.0, max_concurrency: int = 4,
+                 max_connections: int = 10, headers: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            endpoint: URL base de la API (default: la del proveedor)
+            model: Modelo por defecto
+            api_key: Clave (default: variable de entorno api_key_env)
+            timeout: Segundos máximos por petición (chat) o entre tokens (stream)
+            connect_timeout: Segundos para establecer la conexión
+            max_concurrency: Peticiones simultáneas como máximo
+            max_connections: Conexiones del pool
+            headers: Cabeceras adicionales
+        """
+        self.endpoint = (endpoint or self.default_endpoint).rstrip('/')
+        self.model = model or self.default_model
+        if api_key is None and self.api_key_env:
+            api_key = os.environ.get(self.api_key_env, "")
+        self.api_key = api_key or ""
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.extra_headers = dict(headers or {})
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+
+        self.stats = {
+            'requests': 0,
+            'streams': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'in_flight': 0,
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'latency_total': 0.0
+        }
+
+    # --- Sesión ---
+
+    @property
+    def available(self) -> bool:
+        """True si el proveedor tiene lo necesario para llamarse (clave si la requiere)"""
+        return bool(self.api_key) or not self.api_key_env
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        headers.update(self.extra_headers)
+        return headers
+
+    def _state(self) -> _LoopState:
+        """Cliente y semáforo del event loop actual"""
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            import httpx
+            client = httpx.AsyncClient(
+                base_url=self.endpoint,
+                headers=self._headers(),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+            state = self._states[loop] = _LoopState(client, asyncio.Semaphore(self.max_concurrency))
+        return state
+
+    async def aclose(self):
+        """Cierra el cliente del loop actual (los de otros loops se liberan con ellos)"""
+        loop = asyncio.get_running_loop()
+        state = self._states.pop(loop, None)
+        if state is not None:
+            await state.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    # --- Formato de la API (subclases) ---
+
+    @abstractmethod
+    def build_payload(self, messages: List[Dict[str, str]], system: Optional[str],
+                      max_tokens: int, temperature: float, stream: bool,
+                      **options) -> Dict[str, Any]:
+        """Cuerpo de la petición de chat"""
+        pass
+
+    @abstractmethod
+    def parse_response(self, data: Dict[str, Any]) -> LLMResponse:
+        """Respuesta completa → LLMResponse"""
+        pass
+
+    @abstractmethod
+    def parse_stream_line(self, line: str) -> Optional[str]:
+        """
+        Una línea del stream → texto del token ('' si no trae texto).
+
+        Raises:
+            StopAsyncIteration: Fin del stream indicado por el proveedor
+        """
+        pass
+
+    def parse_models(self, data: Dict[str, Any]) -> List[str]:
+        """Respuesta de models_path → nombres de modelos"""
+        return [m.get('id', '') for m in data.get('data', [])]
+
+    # --- Peticiones ---
+
+    async def chat(self, messages: List[Dict[str, str]], system: Optional[str] = None,
+                   max_tokens: int = 1000, temperature: float = 0.7,
+                   timeout: Optional[float] = None, **options) -> LLMResponse:
+        """
+        Petición de chat completa.
+
+        Args:
+            messages: Mensajes [{'role', 'content'}]
+            system: Prompt de sistema
+            max_tokens: Tokens de salida como máximo
+            temperature: Temperatura
+            timeout: Segundos máximos para esta petición (default: self.timeout)
+            **options: Parámetros propios del proveedor (p. ej. model)
+
+        Raises:
+            LLMError: Conexión rechazada, timeout, HTTP != 2xx o respuesta inválida
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        payload = self.build_payload(messages, system, max_tokens, temperature, False, **options)
+        state = self._state()
+        async with state.semaphore:
+            self.stats['requests'] += 1
+            self.stats['in_flight'] += 1
+            start = time.perf_counter()
+            try:
+                async with asyncio.timeout(timeout):
+                    response = await state.client.post(self.chat_path, json=payload,
+                                                       timeout=self._timeout(timeout))
+                self._check_status(response.status_code, response.text)
+                result = self.parse_response(response.json())
+            except Exception as e:
+                raise self._error(e, timeout) from e
+            finally:
+                self.stats['in_flight'] -= 1
+
+        result.latency = time.perf_counter() - start
+        self.stats['latency_total'] += result.latency
+        self.stats['input_tokens'] += result.input_tokens
+        self.stats['output_tokens'] += result.output_tokens
+        return result
+
+    async def stream(self, messages: List[Dict[str, str]], system: Optional[str] = None,
+                     max_tokens: int = 1000, temperature: float = 0.7,
+                     timeout: Optional[float] = None, **options) -> AsyncIterator[str]:
+        """
+        Petición de chat en streaming: itera los fragmentos de texto según llegan.
+
+        El timeout se aplica a la conexión y a la espera entre fragmentos,
+        no a la respuesta completa.
+
+        Raises:
+            LLMError: Como chat()
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        payload = self.build_payload(messages, system, max_tokens, temperature, True, **options)
+        state = self._state()
+        async with state.semaphore:
+            self.stats['streams'] += 1
+            self.stats['in_flight'] += 1
+            start = time.perf_counter()
+            try:
+                async with state.client.stream('POST', self.chat_path, json=payload,
+                                               timeout=self._timeout(timeout)) as response:
+                    if response.status_code >= 400:
+                        body = (await response.aread()).decode('utf-8', 'replace')
+                        self._check_status(response.status_code, body)
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        try:
+                            token = self.parse_stream_line(line)
+                        except StopAsyncIteration:
+                            break
+                        if token:
+                            yield token
+            except Exception as e:
+                raise self._error(e, timeout) from e
+            finally:
+                self.stats['in_flight'] -= 1
+                self.stats['latency_total'] += time.perf_counter() - start
+
+    async def list_models(self, timeout: float = 5.0) -> List[str]:
+        """
+        Modelos disponibles en el servidor.
+
+        Raises:
+            LLMError: Si el servidor no responde
+        """
+        state = self._state()
+        try:
+            response = await state.client.get(self.models_path, timeout=self._timeout(timeout))
+            self._check_status(response.status_code, response.text)
+            return self.parse_models(response.json())
+        except Exception as e:
+            raise self._error(e, timeout) from e
+
+    async def health_check(self, timeout: float = 5.0) -> Dict[str, Any]:
+        """Estado del proveedor: disponible, modelos y error (nunca lanza)"""
+        status = {'provider': self.name, 'endpoint': self.endpoint, 'available': False,
+                  'model': self.model, 'models': [], 'error': None}
+        if not self.available:
+            status['error'] = f"Falta la clave ({self.api_key_env})"
+            return status
+        try:
+            status['models'] = await self.list_models(timeout)
+            status['available'] = True
+        except LLMError as e:
+            status['error'] = str(e)
+        return status
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores del proveedor con la latencia media"""
+        stats = dict(self.stats)
+        calls = stats['requests'] + stats['streams']
+        stats['avg_latency'] = stats['latency_total'] / calls if calls else 0.0
+        return stats
+
+    # --- Utilidades ---
+
+    def _timeout(self, timeout: float):
+        import httpx
+        return httpx.Timeout(timeout, connect=min(self.connect_timeout, timeout))
+
+    def _check_status(self, status: int, body: str):
+        if status >= 400:
+            raise LLMError(f"{self.name}: HTTP {status}: {body[:200]}", self.name, status=status)
+
+    def _error(self, error: Exception, timeout: float) -> LLMError:
+        """Traduce excepciones de httpx/asyncio a LLMError y actualiza contadores"""
+        import httpx
+        self.stats['errors'] += 1
+        if isinstance(error, LLMError):
+            return error
+        if isinstance(error, (TimeoutError, httpx.TimeoutException)):
+            self.stats['timeouts'] += 1
+            return LLMError(f"{self.name}: timeout después de {timeout}s", self.name, timeout=True)
+        if isinstance(error, httpx.ConnectError):
+            return LLMError(f"{self.name}: no disponible en {self.endpoint}", self.name, connection=True)
+        if isinstance(error, httpx.HTTPError):
+            return LLMError(f"{self.name}: error HTTP: {error}", self.name, connection=True)
+        if isinstance(error, (ValueError, KeyError, IndexError, TypeError)):
+            return LLMError(f"{self.name}: respuesta inválida: {error}", self.name)
+        return LLMError(f"{self.name}: {error}", self.name)
+
+    @staticmethod
+    def _sse_data(line: str) -> Optional[str]:
+        """Contenido de una línea 'data: ...' de Server-Sent Events (None si es otra cosa)"""
+        if not line.startswith('data:'):
+            return None
+        return line[5:].strip()
@@ -1 +1,21 @@
-# LM Studio 
+#!/usr/bin/env python3
+"""
+providers/lmstudio.py - LM Studio (servidor local compatible con OpenAI)
+"""
+
+from typing import Optional
+
+from .openai import OpenAIProvider
+
+
+class LMStudioProvider(OpenAIProvider):
+    """LM Studio en localhost:1234, sin clave; un modelo local atiende pocas peticiones a la vez"""
+
+    name = "lmstudio"
+    default_endpoint = "http://localhost:1234/v1"
+    default_model = "local-model"
+    api_key_env = ""
+
+    def __init__(self, endpoint: Optional[str] = None, model: Optional[str] = None,
+                 max_concurrency: int = 2, **kwargs):
+        super().__init__(endpoint, model, max_concurrency=max_concurrency, **kwargs)
@@ -1 +1,22 @@
-# Local models 
+#!/usr/bin/env python3
+"""
+providers/local_models.py - Otros servidores locales compatibles con OpenAI
+(llama.cpp server, vLLM, text-generation-webui...)
+"""
+
+from typing import Optional
+
+from .openai import OpenAIProvider
+
+
+class LocalModelProvider(OpenAIProvider):
+    """Servidor local con API /v1 compatible con OpenAI (por defecto llama.cpp en :8080)"""
+
+    name = "local"
+    default_endpoint = "http://localhost:8080/v1"
+    default_model = "local-model"
+    api_key_env = ""
+
+    def __init__(self, endpoint: Optional[str] = None, model: Optional[str] = None,
+                 max_concurrency: int = 2, **kwargs):
+        super().__init__(endpoint, model, max_concurrency=max_concurrency, **kwargs)
@@ -1 +1,60 @@
-# Ollama 
+#!/usr/bin/env python3
+"""
+providers/ollama.py - Ollama (API nativa /api/chat)
+El streaming es NDJSON: un objeto por línea hasta 'done': true
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from .base_provider import BaseProvider, LLMResponse
+
+
+class OllamaProvider(BaseProvider):
+    """Ollama en localhost:11434"""
+
+    name = "ollama"
+    default_endpoint = "http://localhost:11434"
+    default_model = "llama3"
+    chat_path = "/api/chat"
+    models_path = "/api/tags"
+
+    def __init__(self, endpoint: Optional[str] = None, model: Optional[str] = None,
+                 max_concurrency: int = 2, **kwargs):
+        super().__init__(endpoint, model, max_concurrency=max_concurrency, **kwargs)
+
+    def build_payload(self, messages: List[Dict[str, str]], system: Optional[str],
+                      max_tokens: int, temperature: float, stream: bool,
+                      **options) -> Dict[str, Any]:
+        chat_messages = [{"role": "system", "content": system}] if system else []
+        chat_messages.extend({"role": m.get("role", "user"), "content": m.get("content", "")}
+                             for m in messages)
+        model = options.pop("model", None) or self.model
+        return {
+            "model": model,
+            "messages": chat_messages,
+            "stream": stream,
+            "options": {"temperature": temperature, "num_predict": max_tokens, **options}
+        }
+
+    def parse_response(self, data: Dict[str, Any]) -> LLMResponse:
+        return LLMResponse(
+            text=data["message"]["content"],
+            provider=self.name,
+            model=data.get("model", self.model),
+            input_tokens=data.get("prompt_eval_count", 0),
+            output_tokens=data.get("eval_count", 0),
+            raw=data
+        )
+
+    def parse_stream_line(self, line: str) -> Optional[str]:
+        data = json.loads(line)
+        if data.get("error"):
+            raise ValueError(data["error"])
+        token = (data.get("message") or {}).get("content", "")
+        if data.get("done") and not token:
+            raise StopAsyncIteration
+        return token
+
+    def parse_models(self, data: Dict[str, Any]) -> List[str]:
+        return [m.get("name", "") for m in data.get("models", [])]
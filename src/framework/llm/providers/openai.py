@@ -1 +1,59 @@
-# OpenAI 
+#!/usr/bin/env python3
+"""
+providers/openai.py - API de OpenAI y servidores compatibles
+Chat completions con streaming SSE ('data: {...}' hasta 'data: [DONE]')
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from .base_provider import BaseProvider, LLMResponse
+
+
+class OpenAIProvider(BaseProvider):
+    """Chat completions de OpenAI (clave en OPENAI_API_KEY)"""
+
+    name = "openai"
+    default_endpoint = "https://api.openai.com/v1"
+    default_model = "gpt-4o-mini"
+    api_key_env = "OPENAI_API_KEY"
+
+    def __init__(self, endpoint: Optional[str] = None, model: Optional[str] = None,
+                 max_concurrency: int = 8, **kwargs):
+        super().__init__(endpoint, model, max_concurrency=max_concurrency, **kwargs)
+
+    def build_payload(self, messages: List[Dict[str, str]], system: Optional[str],
+                      max_tokens: int, temperature: float, stream: bool,
+                      **options) -> Dict[str, Any]:
+        chat_messages = [{"role": "system", "content": system}] if system else []
+        chat_messages.extend({"role": m.get("role", "user"), "content": m.get("content", "")}
+                             for m in messages)
+        payload = {
+            "model": options.pop("model", None) or self.model,
+            "messages": chat_messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream
+        }
+        payload.update(options)
+        return payload
+
+    def parse_response(self, data: Dict[str, Any]) -> LLMResponse:
+        usage = data.get("usage") or {}
+        return LLMResponse(
+            text=data["choices"][0]["message"]["content"] or "",
+            provider=self.name,
+            model=data.get("model", self.model),
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            raw=data
+        )
+
+    def parse_stream_line(self, line: str) -> Optional[str]:
+        data = self._sse_data(line)
+        if data is None:
+            return None
+        if data == "[DONE]":
+            raise StopAsyncIteration
+        choices = json.loads(data).get("choices") or [{}]
+        return (choices[0].get("delta") or {}).get("content")
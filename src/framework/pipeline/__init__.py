@@ -1 +1,26 @@
-# Pipeline module 
+#!/usr/bin/env python3
+"""
+pipeline/__init__.py - Pipeline de procesamiento por etapas
+Pools de workers conectados por colas acotadas
+"""
+
+from .task_queue import QueueClosed, TaskQueue
+from .orchestrator import Pipeline, PipelineError, Stage, StageStats, STAGE_MODES
+from .middleware import (CachingMiddleware, Middleware, RateLimitMiddleware, TokenBucket,
+                         compose, get_bucket)
+
+__all__ = [
+    'Pipeline',
+    'PipelineError',
+    'Stage',
+    'StageStats',
+    'STAGE_MODES',
+    'TaskQueue',
+    'QueueClosed',
+    'Middleware',
+    'compose',
+    'CachingMiddleware',
+    'RateLimitMiddleware',
+    'TokenBucket',
+    'get_bucket'
+]
@@ -1 +1,18 @@
-# Pipeline middleware 
+#!/usr/bin/env python3
+"""
+middleware/__init__.py - Middleware componible para las etapas del pipeline
+"""
+
+from .base import Middleware, compose
+from .caching_middleware import CachingMiddleware, content_hash
+from .rate_limit_middleware import RateLimitMiddleware, TokenBucket, get_bucket
+
+__all__ = [
+    'Middleware',
+    'compose',
+    'CachingMiddleware',
+    'content_hash',
+    'RateLimitMiddleware',
+    'TokenBucket',
+    'get_bucket'
+]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+middleware/base.py - Base de los middleware del pipeline
+Un middleware envuelve la función de una etapa (lote → resultados) y se
+compone con otros alrededor de cualquier callable con esa forma
+"""
+
+import time
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Sequence
+
+# Función de etapa: lote → lista de resultados
+StageFunc = Callable[[List[Any]], List[Any]]
+
+
+class Middleware(ABC):
+    """
+    Middleware de etapa.
+
+    Las subclases implementan wrap(); el pipeline lo aplica en el proceso
+    principal alrededor del envío del lote (también en etapas de procesos),
+    así que el middleware puede tener cerrojos, conexiones o caches.
+    """
+
+    name = "middleware"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._first_call = None
+        self._last_call = None
+        self._items = 0
+
+    @abstractmethod
+    def wrap(self, func: StageFunc, stage_name: str = "") -> StageFunc:
+        """
+        Args:
+            func: Función (o cadena de middleware) a envolver
+            stage_name: Etapa en la que se usa
+
+        Returns:
+            Función con la misma forma que func
+        """
+        pass
+
+    def _count(self, items: int):
+        """Registra items que pasan por el middleware (para el throughput)"""
+        now = time.perf_counter()
+        with self._lock:
+            if self._first_call is None:
+                self._first_call = now
+            self._last_call = now
+            self._items += items
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores comunes: items y throughput en items/s"""
+        with self._lock:
+            elapsed = (self._last_call - self._first_call) if self._first_call is not None else 0.0
+            return {
+                'middleware': self.name,
+                'items': self._items,
+                'throughput': self._items / elapsed if elapsed > 0 else 0.0
+            }
+
+
+def compose(func: StageFunc, middlewares: Sequence[Middleware], stage_name: str = "") -> StageFunc:
+    """
+    Envuelve func con varios middleware; el primero queda por fuera.
+
+    compose(f, [cache, limite]) equivale a cache(limite(f)): los aciertos
+    de la cache no consumen tokens del limitador.
+    """
+    for middleware in reversed(middlewares):
+        func = middleware.wrap(func, stage_name)
+    return func
@@ -1 +1,291 @@
-# Caching middleware 
+#!/usr/bin/env python3
+"""
+middleware/caching_middleware.py - Cache de resultados por hash de contenido
+LRU en memoria delante de una tabla SQLite en disco: los elementos ya vistos
+(mismo contenido) no vuelven a pasar por la etapa
+"""
+
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .base import Middleware, StageFunc
+
+logger = logging.getLogger(__name__)
+
+# Claves por consulta IN al disco (por debajo del límite de variables de SQLite)
+DISK_LOOKUP_CHUNK = 500
+
+
+def content_hash(item: Any) -> str:
+    """Clave por defecto: BLAKE2b del JSON canónico del elemento"""
+    content = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CachingMiddleware(Middleware):
+    """
+    Cache de dos niveles para etapas que producen un resultado por elemento.
+
+    La función envuelta debe devolver exactamente un resultado por elemento
+    y en el mismo orden (etapas de tipo map, como enriquecimiento o análisis).
+    En cada lote solo se le pasan los elementos que no están en cache (y
+    una vez cada contenido repetido). Los resultados de la capa en memoria
+    se devuelven sin copiar: no deben modificarse.
+
+    Uso:
+        cache = CachingMiddleware(db_path="data/cache_etapas.db")
+        Stage('analysis', analizar, middleware=[cache])
+    """
+
+    name = "cache"
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = 4096,
+                 max_disk_entries: int = 100_000, ttl: Optional[float] = None,
+                 key: Callable[[Any], Optional[str]] = content_hash,
+                 namespace: Optional[str] = None):
+        """
+        Args:
+            db_path: Base de datos SQLite del nivel en disco (None = solo memoria)
+            max_entries: Entradas del LRU en memoria
+            max_disk_entries: Entradas en disco por namespace (se podan las más antiguas)
+            ttl: Segundos de validez de una entrada en disco (None = sin caducidad)
+            key: Clave de cada elemento; None = no cacheable
+            namespace: Separa etapas en la misma base de datos (default: nombre de la etapa)
+        """
+        super().__init__()
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.key = key
+        self.namespace = namespace
+        self._memory: OrderedDict = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_entries: Dict[str, int] = {}  # por namespace (aproximado)
+
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+        self._uncacheable = 0
+        self._lookup_time = 0.0
+        self._compute_time = 0.0
+
+        if db_path:
+            self._init_disk()
+
+    # --- Nivel en disco ---
+
+    def _init_disk(self):
+        """Abre la base de datos de la cache (una conexión compartida bajo el cerrojo)"""
+        try:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS stage_cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_stage_cache_created "
+                         "ON stage_cache(namespace, created_at)")
+            self._conn = conn
+        except sqlite3.Error as e:
+            logger.error(f"Cache en disco no disponible ({self.db_path}): {e}")
+            self._conn = None
+
+    def _disk_get(self, namespace: str, keys: List[str]) -> Dict[str, Any]:
+        """Valores en disco para varias claves (con el cerrojo tomado)"""
+        found = {}
+        min_created = time.time() - self.ttl if self.ttl else None
+        for i in range(0, len(keys), DISK_LOOKUP_CHUNK):
+            chunk = keys[i:i + DISK_LOOKUP_CHUNK]
+            sql = (f"SELECT key, value FROM stage_cache WHERE namespace = ? "
+                   f"AND key IN ({','.join('?' * len(chunk))})")
+            params = [namespace, *chunk]
+            if min_created is not None:
+                sql += " AND created_at > ?"
+                params.append(min_created)
+            for key, value in self._conn.execute(sql, params):
+                try:
+                    found[key] = pickle.loads(value)
+                except Exception as e:
+                    logger.warning(f"Entrada de cache ilegible ({namespace}/{key}): {e}")
+        return found
+
+    def _disk_put(self, namespace: str, entries: List[Tuple[str, Any]]):
+        """Guarda resultados en disco y poda el exceso (con el cerrojo tomado)"""
+        now = time.time()
+        rows = []
+        for key, value in entries:
+            try:
+                rows.append((namespace, key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now))
+            except Exception as e:
+                logger.warning(f"Resultado no serializable, no se guarda en disco ({key}): {e}")
+        if not rows:
+            return
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO stage_cache (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.execute("COMMIT")
+        except sqlite3.Error:
+            # Sin ROLLBACK la conexión compartida quedaría dentro de la transacción
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            raise
+
+        if namespace not in self._disk_entries:
+            self._disk_entries[namespace] = self._count_disk(namespace)
+        else:
+            # Aproximado: cuenta también los reemplazos; se recalcula al podar
+            self._disk_entries[namespace] += len(rows)
+        if self._disk_entries[namespace] > self.max_disk_entries:
+            count = self._count_disk(namespace)
+            if count > self.max_disk_entries:
+                self._conn.execute('''
+                    DELETE FROM stage_cache WHERE namespace = ? AND key IN (
+                        SELECT key FROM stage_cache WHERE namespace = ?
+                        ORDER BY created_at LIMIT ?
+                    )
+                ''', (namespace, namespace, count - self.max_disk_entries))
+                count = self.max_disk_entries
+            self._disk_entries[namespace] = count
+
+    def _count_disk(self, namespace: str) -> int:
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM stage_cache WHERE namespace = ?", (namespace,)
+        ).fetchone()[0]
+
+    # --- Nivel en memoria ---
+
+    def _memory_put(self, namespace: str, key: str, value: Any):
+        """Inserta en el LRU (con el cerrojo tomado)"""
+        self._memory[(namespace, key)] = value
+        self._memory.move_to_end((namespace, key))
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # --- Middleware ---
+
+    def wrap(self, func: StageFunc, stage_name: str = "") -> StageFunc:
+        namespace = self.namespace or stage_name or "default"
+
+        def cached(batch: List[Any]) -> List[Any]:
+            start = time.perf_counter()
+            keys = [self.key(item) for item in batch]
+            results: Dict[str, Any] = {}
+            with self._lock:
+                for key in keys:
+                    if key is None or key in results:
+                        continue
+                    if (namespace, key) in self._memory:
+                        self._memory.move_to_end((namespace, key))
+                        results[key] = self._memory[(namespace, key)]
+                        self._hits_memory += 1
+                pending = [k for k in dict.fromkeys(keys) if k is not None and k not in results]
+                if pending and self._conn is not None:
+                    try:
+                        found = self._disk_get(namespace, pending)
+                    except sqlite3.Error as e:
+                        logger.error(f"Error leyendo la cache en disco: {e}")
+                        found = {}
+                    for key, value in found.items():
+                        self._memory_put(namespace, key, value)
+                    results.update(found)
+                    self._hits_disk += len(found)
+                self._lookup_time += time.perf_counter() - start
+
+            # Un solo cálculo por contenido; los no cacheables siempre se calculan
+            misses, miss_positions, seen = [], [], set()
+            for position, (item, key) in enumerate(zip(batch, keys)):
+                if key is None or (key not in results and key not in seen):
+                    misses.append(item)
+                    miss_positions.append(position)
+                    if key is not None:
+                        seen.add(key)
+
+            computed: List[Any] = []
+            if misses:
+                compute_start = time.perf_counter()
+                computed = list(func(misses))
+                compute_time = time.perf_counter() - compute_start
+                if len(computed) != len(misses):
+                    raise ValueError(f"CachingMiddleware ({namespace}): la etapa devolvió "
+                                     f"{len(computed)} resultados para {len(misses)} elementos")
+                new_entries = []
+                with self._lock:
+                    self._compute_time += compute_time
+                    for position, value in zip(miss_positions, computed):
+                        key = keys[position]
+                        if key is None:
+                            self._uncacheable += 1
+                            continue
+                        self._misses += 1
+                        results[key] = value
+                        self._memory_put(namespace, key, value)
+                        new_entries.append((key, value))
+                    if new_entries and self._conn is not None:
+                        try:
+                            self._disk_put(namespace, new_entries)
+                        except sqlite3.Error as e:
+                            logger.error(f"Error escribiendo la cache en disco: {e}")
+
+            by_position = dict(zip(miss_positions, computed))
+            output = [by_position[i] if i in by_position else results[key]
+                      for i, key in enumerate(keys)]
+            self._count(len(batch))
+            return output
+
+        return cached
+
+    def clear(self, namespace: Optional[str] = None):
+        """Vacía la cache (toda, o solo un namespace)"""
+        with self._lock:
+            if namespace is None:
+                self._memory.clear()
+            else:
+                for entry in [e for e in self._memory if e[0] == namespace]:
+                    del self._memory[entry]
+            if self._conn is not None:
+                if namespace is None:
+                    self._conn.execute("DELETE FROM stage_cache")
+                else:
+                    self._conn.execute("DELETE FROM stage_cache WHERE namespace = ?", (namespace,))
+                self._disk_entries.clear()
+
+    def close(self):
+        """Cierra la conexión del nivel en disco"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            hits = self._hits_memory + self._hits_disk
+            lookups = hits + self._misses
+            stats.update({
+                'hits_memory': self._hits_memory,
+                'hits_disk': self._hits_disk,
+                'misses': self._misses,
+                'uncacheable': self._uncacheable,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_enabled': self._conn is not None,
+                'lookup_time': self._lookup_time,
+                'compute_time': self._compute_time
+            })
+        return stats
@@ -1 +1,191 @@
-# Rate limit middleware 
+#!/usr/bin/env python3
+"""
+middleware/rate_limit_middleware.py - Limitación de ritmo con token bucket
+Un cubo por etapa o por clave (p. ej. proveedor LLM); los cubos con nombre
+se comparten entre etapas a través de get_bucket()
+"""
+
+import time
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from .base import Middleware, StageFunc
+
+
+class TokenBucket:
+    """
+    Token bucket: rate tokens por segundo con ráfagas de hasta capacity.
+
+    Una petición mayor que capacity no se rechaza: espera a tener el cubo
+    lleno y lo deja en negativo, de modo que el ritmo medio se respeta.
+    Es seguro entre hilos.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens por segundo
+            capacity: Tokens acumulables como máximo (default: rate, un segundo de ráfaga)
+        """
+        if rate <= 0:
+            raise ValueError("rate debe ser > 0")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens: float) -> float:
+        """Descuenta tokens si hay suficientes; si no, devuelve los segundos a esperar"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            needed = min(tokens, self.capacity)
+            if self._tokens >= needed:
+                self._tokens -= tokens
+                return 0.0
+            return (needed - self._tokens) / self.rate
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Toma tokens sin esperar"""
+        return self._reserve(tokens) == 0.0
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> float:
+        """
+        Espera hasta poder tomar tokens.
+
+        Returns:
+            Segundos esperados
+
+        Raises:
+            TimeoutError: Si habría que esperar más de timeout segundos
+        """
+        start = time.monotonic()
+        waited = False
+        while True:
+            delay = self._reserve(tokens)
+            if not delay:
+                return time.monotonic() - start if waited else 0.0
+            if timeout is not None and time.monotonic() - start + delay > timeout:
+                raise TimeoutError(f"Límite de ritmo: {tokens} tokens no disponibles en {timeout}s")
+            time.sleep(delay)
+            waited = True
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+# Cubos compartidos por nombre (p. ej. un proveedor usado desde varias etapas)
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(name: str, rate: float, capacity: Optional[float] = None) -> TokenBucket:
+    """Cubo compartido con ese nombre (se crea con rate/capacity la primera vez)"""
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            bucket = _buckets[name] = TokenBucket(rate, capacity)
+        return bucket
+
+
+class RateLimitMiddleware(Middleware):
+    """
+    Limita el ritmo de una etapa con token buckets.
+
+    Sin key, un solo cubo para toda la etapa. Con key, un cubo por clave
+    de cada elemento (p. ej. el proveedor), con ritmo propio en rates. El
+    lote espera a los tokens de todas sus claves antes de ejecutarse.
+
+    Uso:
+        Stage('llm', resumir, middleware=[RateLimitMiddleware(
+            rate=5, key=lambda item: item['provider'],
+            rates={'openai': 1, 'ollama': 20}, cost=lambda item: item['tokens'] / 1000)])
+    """
+
+    name = "rate_limit"
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 key: Optional[Callable[[Any], str]] = None,
+                 rates: Optional[Dict[str, float]] = None,
+                 cost: Optional[Callable[[Any], float]] = None,
+                 bucket: Optional[TokenBucket] = None,
+                 timeout: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens por segundo (por clave si hay key)
+            capacity: Ráfaga máxima (default: rate)
+            key: Clave de cada elemento (None = un cubo para la etapa; los
+                elementos cuya clave sea None usan ese mismo cubo)
+            rates: Ritmo por clave, si difiere de rate
+            cost: Tokens de cada elemento (default: 1)
+            bucket: Cubo ya creado (p. ej. get_bucket) para la etapa
+            timeout: Espera máxima por lote (TimeoutError → on_error de la etapa)
+        """
+        super().__init__()
+        self.rate = rate
+        self.capacity = capacity
+        self.key = key
+        self.rates = rates or {}
+        self.cost = cost
+        self.timeout = timeout
+        self._bucket = bucket if bucket is not None else TokenBucket(rate, capacity)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._wait_time: Dict[Optional[str], float] = defaultdict(float)
+        self._max_wait = 0.0
+        self._throttled = 0
+        self._batches = 0
+
+    def bucket_for(self, key: Optional[str]) -> TokenBucket:
+        """Cubo de una clave (o el de la etapa sin key o con clave None)"""
+        if key is None or self.key is None:
+            return self._bucket
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate = self.rates.get(key, self.rate)
+                capacity = self.capacity if key not in self.rates else None
+                bucket = self._buckets[key] = TokenBucket(rate, capacity)
+            return bucket
+
+    def wrap(self, func: StageFunc, stage_name: str = "") -> StageFunc:
+        def limited(batch: List[Any]) -> List[Any]:
+            costs: Dict[Optional[str], float] = defaultdict(float)
+            for item in batch:
+                costs[self.key(item) if self.key else None] += self.cost(item) if self.cost else 1.0
+            waited_total = 0.0
+            for key, tokens in costs.items():
+                waited = self.bucket_for(key).acquire(tokens, self.timeout)
+                waited_total += waited
+                with self._lock:
+                    self._wait_time[key] += waited
+            with self._lock:
+                self._batches += 1
+                self._throttled += int(waited_total > 0)
+                self._max_wait = max(self._max_wait, waited_total)
+            results = func(batch)
+            self._count(len(batch))
+            return results
+        return limited
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            total_wait = sum(self._wait_time.values())
+            stats.update({
+                'batches': self._batches,
+                'throttled_batches': self._throttled,
+                'wait_time': total_wait,
+                'avg_wait': total_wait / self._batches if self._batches else 0.0,
+                'max_wait': self._max_wait,
+                'wait_by_key': {k: v for k, v in self._wait_time.items() if k is not None}
+            })
+        return stats
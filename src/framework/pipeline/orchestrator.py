@@ -1 +1,567 @@
-# Main orchestrator 
+#!/usr/bin/env python3
+"""
+pipeline/orchestrator.py - Motor del pipeline por etapas
+Cada etapa es un pool de workers (hilos o procesos) que lee lotes de una
+cola acotada y escribe sus resultados en la cola de la siguiente etapa.
+Las colas llenas frenan a la etapa anterior (contrapresión); al cerrar la
+entrada, cada etapa vacía su cola y cierra la siguiente (drenado en orden).
+"""
+
+import time
+import queue
+import inspect
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .task_queue import QueueClosed, TaskQueue
+from .middleware.base import Middleware, compose
+
+logger = logging.getLogger(__name__)
+
+# Modos de ejecución de una etapa
+STAGE_MODES = ('thread', 'process')
+
+# Tamaño por defecto de las colas entre etapas
+DEFAULT_QUEUE_SIZE = 64
+
+# Resultados en vuelo por worker de una etapa generadora en modo 'process'
+STREAM_BUFFER = 4
+
+# Segundos entre comprobaciones del pool mientras se espera un resultado
+STREAM_POLL = 0.1
+
+# Canales de cada proceso de una etapa generadora: (cola, cancelación) por worker
+_stream_channels: Optional[List[Any]] = None
+
+
+def _init_stream_process(channels: List[Any], initializer: Optional[Callable],
+                         initargs: Sequence):
+    """Initializer de los procesos de una etapa generadora"""
+    global _stream_channels
+    _stream_channels = channels
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _run_stream(func: Callable, slot: int, task: int, batch: List[Any]) -> int:
+    """
+    Tarea del pool de una etapa generadora: envía cada resultado por la cola
+    del worker según se produce (se bloquea si el worker va por detrás).
+
+    Returns:
+        Resultados enviados
+    """
+    results, cancel = _stream_channels[slot]
+    sent = 0
+    outputs = func(batch)
+    try:
+        for item in outputs:
+            if cancel.is_set():
+                break
+            results.put((task, True, item))
+            sent += 1
+    finally:
+        outputs.close()
+        results.put((task, False, None))
+    return sent
+
+
+class PipelineError(Exception):
+    """Un worker del pipeline terminó por un error no controlado"""
+    pass
+
+
+class StageStats:
+    """Contadores de una etapa (compartidos por sus workers)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.max_batch_time = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def record(self, items_in: int, items_out: int, elapsed: float, error: bool = False):
+        """Registra un lote procesado"""
+        with self._lock:
+            self.batches += 1
+            self.items_in += items_in
+            self.items_out += items_out
+            self.errors += int(error)
+            self.busy_time += elapsed
+            if elapsed > self.max_batch_time:
+                self.max_batch_time = elapsed
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copia de los contadores con throughput y latencias derivadas"""
+        with self._lock:
+            end = self.finished_at or time.perf_counter()
+            wall = end - self.started_at if self.started_at else 0.0
+            return {
+                'batches': self.batches,
+                'items_in': self.items_in,
+                'items_out': self.items_out,
+                'errors': self.errors,
+                'busy_time': self.busy_time,
+                'wall_time': wall,
+                'throughput': self.items_in / wall if wall > 0 else 0.0,
+                'avg_latency': self.busy_time / self.items_in if self.items_in else 0.0,
+                'max_batch_time': self.max_batch_time
+            }
+
+
+class Stage:
+    """
+    Definición de una etapa del pipeline.
+
+    La función de la etapa recibe un lote (lista de elementos) y devuelve
+    una lista de resultados, que puede tener otra longitud (filtrar o
+    expandir). En modo 'process' la función, el initializer y sus argumentos
+    deben poder serializarse con pickle (funciones de módulo); on_error,
+    on_finish y los middleware se ejecutan siempre en el proceso principal.
+
+    Si la función es un generador, cada resultado pasa a la cola siguiente
+    en cuanto se produce y la contrapresión llega hasta el generador: un
+    lote no tiene que caber entero en memoria. En modo 'process' los
+    resultados viajan por una cola de STREAM_BUFFER elementos por worker.
+    Si el generador falla a medias, lo ya entregado sigue su curso y
+    on_error solo aporta los resultados que sustituyen al resto.
+    """
+
+    def __init__(self, name: str, func: Callable[[List[Any]], List[Any]],
+                 workers: int = 1, mode: str = 'thread', batch_size: int = 1,
+                 max_wait: float = 0.0, queue_size: Optional[int] = None,
+                 initializer: Optional[Callable] = None, initargs: Sequence = (),
+                 finalizer: Optional[Callable[[], Any]] = None,
+                 on_error: Optional[Callable[[List[Any], Exception], List[Any]]] = None,
+                 on_finish: Optional[Callable[[], List[Any]]] = None,
+                 middleware: Sequence[Middleware] = ()):
+        """
+        Args:
+            name: Nombre de la etapa
+            func: Procesa un lote y devuelve la lista de resultados (o los
+                va entregando, si es un generador)
+            workers: Hilos o procesos de la etapa
+            mode: 'thread' (E/S, estado compartido) o 'process' (CPU)
+            batch_size: Elementos por lote como máximo
+            max_wait: Segundos a esperar para completar un lote
+            queue_size: Capacidad de la cola de entrada (default: la del pipeline)
+            initializer: Se ejecuta una vez en cada worker (hilo o proceso)
+            initargs: Argumentos del initializer
+            finalizer: Se ejecuta una vez en cada hilo worker al terminar, también
+                si falla o se cancela (solo modo 'thread'; p. ej. cerrar recursos
+                por hilo que abrió la función)
+            on_error: Resultados que sustituyen a un lote fallido (default: se descarta)
+            on_finish: Resultados finales tras vaciar la entrada (se ejecuta en
+                el proceso principal, una sola vez)
+            middleware: Middleware alrededor del envío de cada lote (el
+                primero queda por fuera); se ejecuta en el proceso principal
+
+        Raises:
+            ValueError: Si el modo o el número de workers no es válido
+        """
+        if mode not in STAGE_MODES:
+            raise ValueError(f"Modo de etapa no soportado: {mode}")
+        if workers < 1 or batch_size < 1:
+            raise ValueError(f"Etapa {name}: workers y batch_size deben ser >= 1")
+        if finalizer is not None and mode != 'thread':
+            raise ValueError(f"Etapa {name}: finalizer solo se admite en modo 'thread'")
+
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.mode = mode
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.queue_size = queue_size
+        self.initializer = initializer
+        self.initargs = tuple(initargs)
+        self.finalizer = finalizer
+        self.on_error = on_error
+        self.on_finish = on_finish
+        self.middleware = list(middleware)
+        self.streaming = inspect.isgeneratorfunction(func)
+        self.stats = StageStats()
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name!r}, mode={self.mode!r}, workers={self.workers})"
+
+
+class Pipeline:
+    """
+    Pipeline de etapas conectadas por colas acotadas.
+
+    Uso:
+        pipeline = Pipeline([Stage('parse', parse, workers=4, mode='process'),
+                             Stage('store', store, batch_size=100)])
+        for resultado in pipeline.run(archivos):
+            ...
+
+    run() alimenta la entrada desde un hilo y entrega los resultados de la
+    última etapa; si el consumidor deja de iterar, el pipeline se cancela.
+    Para alimentarlo a mano: start(), put(), close() y results().
+    """
+
+    def __init__(self, stages: List[Stage], name: str = "pipeline",
+                 queue_size: int = DEFAULT_QUEUE_SIZE, collect: bool = True):
+        """
+        Args:
+            stages: Etapas en orden
+            name: Nombre del pipeline (prefijo de los hilos)
+            queue_size: Capacidad por defecto de las colas
+            collect: Guardar los resultados de la última etapa para results();
+                con False se descartan
+        """
+        if not stages:
+            raise ValueError("El pipeline necesita al menos una etapa")
+
+        self.stages = stages
+        self.name = name
+        self._queues = [TaskQueue(stage.queue_size or queue_size, f"{name}.{stage.name}")
+                        for stage in stages]
+        self._output = TaskQueue(queue_size, f"{name}.output") if collect else None
+        self._threads: List[threading.Thread] = []
+        self._executors: Dict[str, ProcessPoolExecutor] = {}
+        self._channels: Dict[str, List[Any]] = {}
+        self._local = threading.local()
+        self._tasks = 0
+        self._dispatch: Dict[str, Callable[[List[Any]], List[Any]]] = {}
+        self._remaining = [stage.workers for stage in stages]
+        self._lock = threading.Lock()
+        self._started = False
+        self._cancelled = False
+        self._started_at: Optional[float] = None
+        self.failure: Optional[BaseException] = None
+
+    # --- Ciclo de vida ---
+
+    def start(self) -> 'Pipeline':
+        """Arranca los pools de procesos y los hilos de todas las etapas"""
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        self._started_at = time.perf_counter()
+
+        for index, stage in enumerate(self.stages):
+            stage.stats.started_at = time.perf_counter()
+            if stage.mode == 'process':
+                initializer, initargs = stage.initializer, stage.initargs
+                context = multiprocessing.get_context()
+                if stage.streaming:
+                    channels = [(context.Queue(STREAM_BUFFER), context.Event())
+                                for _ in range(stage.workers)]
+                    self._channels[stage.name] = channels
+                    initializer, initargs = _init_stream_process, (channels, initializer, initargs)
+                self._executors[stage.name] = ProcessPoolExecutor(
+                    max_workers=stage.workers, mp_context=context,
+                    initializer=initializer, initargs=initargs
+                )
+            self._dispatch[stage.name] = compose(self._dispatcher(stage), stage.middleware, stage.name)
+            for slot in range(stage.workers):
+                thread = threading.Thread(target=self._worker, args=(index, slot),
+                                          name=f"{self.name}-{stage.name}-{slot}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+        logger.info(f"🚀 Pipeline {self.name}: "
+                    + " → ".join(f"{s.name}[{s.workers} {s.mode}]" for s in self.stages))
+        return self
+
+    def put(self, item: Any, timeout: Optional[float] = None):
+        """
+        Encola un elemento en la primera etapa (bloquea si está llena).
+
+        Raises:
+            QueueClosed: Si la entrada ya se cerró o el pipeline se canceló
+        """
+        self.start()
+        self._queues[0].put(item, timeout)
+
+    def close(self):
+        """Cierra la entrada: las etapas terminan al vaciar sus colas"""
+        self._queues[0].close()
+
+    def results(self) -> Iterator[Any]:
+        """Resultados de la última etapa hasta que el pipeline se vacía"""
+        if self._output is None:
+            self.join()
+            return
+        while True:
+            batch = self._output.get_batch(DEFAULT_QUEUE_SIZE)
+            if not batch:
+                return
+            yield from batch
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que terminen todos los workers.
+
+        Returns:
+            True si terminaron dentro del plazo
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for thread in self._threads:
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            thread.join(remaining)
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Cierra la entrada y espera a que se procese todo lo pendiente"""
+        self.close()
+        return self.join(timeout)
+
+    def shutdown(self, cancel: bool = False):
+        """
+        Detiene el pipeline y libera los pools.
+
+        Args:
+            cancel: Descartar lo pendiente en las colas en lugar de drenarlo
+                (los lotes que ya están en un worker terminan igualmente)
+        """
+        if cancel:
+            self._cancelled = True
+            discarded = sum(q.abort() for q in self._queues)
+            if self._output is not None:
+                discarded += self._output.abort()
+            if discarded:
+                logger.warning(f"⚠️ Pipeline {self.name} cancelado: {discarded} elementos descartados")
+        else:
+            self.close()
+        self.join()
+        for executor in self._executors.values():
+            executor.shutdown(wait=True, cancel_futures=cancel)
+        self._executors.clear()
+        for channels in self._channels.values():
+            for results, _ in channels:
+                results.close()
+        self._channels.clear()
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """
+        Procesa items de principio a fin y entrega los resultados.
+
+        Raises:
+            PipelineError: Si algún worker terminó por un error no controlado
+        """
+        self.start()
+        feeder = threading.Thread(target=self._feed, args=(items,),
+                                  name=f"{self.name}-feeder", daemon=True)
+        feeder.start()
+        completed = False
+        try:
+            yield from self.results()
+            completed = True
+        finally:
+            # También al cerrar el iterador antes de tiempo
+            self.shutdown(cancel=not completed or self.failure is not None)
+            feeder.join()
+        if self.failure is not None:
+            raise PipelineError(f"Pipeline {self.name} interrumpido: {self.failure}") from self.failure
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown(cancel=exc_type is not None)
+
+    # --- Estadísticas ---
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores por etapa (throughput, latencias) y ocupación de las colas"""
+        stages = []
+        for stage, stage_queue in zip(self.stages, self._queues):
+            stage_stats = stage.stats.snapshot()
+            stage_stats.update({'name': stage.name, 'mode': stage.mode,
+                                'workers': stage.workers, 'queue': stage_queue.stats(),
+                                'middleware': [m.stats() for m in stage.middleware]})
+            stages.append(stage_stats)
+        return {
+            'name': self.name,
+            'elapsed': time.perf_counter() - self._started_at if self._started_at else 0.0,
+            'cancelled': self._cancelled,
+            'failure': str(self.failure) if self.failure is not None else None,
+            'stages': stages,
+            'output': self._output.stats() if self._output is not None else None
+        }
+
+    # --- Workers ---
+
+    def _feed(self, items: Iterable[Any]):
+        """Hilo alimentador de run()"""
+        try:
+            for item in items:
+                self._queues[0].put(item)
+        except QueueClosed:
+            pass
+        except Exception as e:
+            self._fail(f"{self.name}-feeder", e)
+        finally:
+            self.close()
+
+    def _worker(self, index: int, slot: int):
+        """Bucle de un worker: lote de la cola de entrada → función → cola de salida"""
+        stage = self.stages[index]
+        input_queue = self._queues[index]
+        output_queue = self._queues[index + 1] if index + 1 < len(self.stages) else self._output
+        self._local.slot = slot
+        try:
+            if stage.mode == 'thread' and stage.initializer is not None:
+                stage.initializer(*stage.initargs)
+            while True:
+                batch = input_queue.get_batch(stage.batch_size, stage.max_wait)
+                if not batch:
+                    break
+                if stage.streaming:
+                    self._call_stream(stage, batch, output_queue)
+                else:
+                    self._emit(output_queue, self._call(stage, batch))
+        except QueueClosed:
+            pass  # pipeline cancelado aguas abajo
+        except BaseException as e:
+            self._fail(stage.name, e)
+        finally:
+            if stage.finalizer is not None:
+                try:
+                    stage.finalizer()
+                except Exception as e:
+                    logger.error(f"❌ Etapa {stage.name}: finalizer falló: {e}")
+            with self._lock:
+                self._remaining[index] -= 1
+                last = not self._remaining[index]
+            if last:
+                self._finish_stage(stage, output_queue)
+
+    def _call(self, stage: Stage, batch: List[Any]) -> List[Any]:
+        """Ejecuta la función de la etapa sobre un lote, en el hilo o en el pool"""
+        start = time.perf_counter()
+        error = False
+        try:
+            outputs = self._dispatch[stage.name](batch)
+        except Exception as e:
+            error = True
+            logger.error(f"❌ Etapa {stage.name}: lote de {len(batch)} elementos falló: {e}")
+            outputs = stage.on_error(batch, e) if stage.on_error is not None else []
+        outputs = outputs or []
+        stage.stats.record(len(batch), len(outputs), time.perf_counter() - start, error)
+        return outputs
+
+    def _call_stream(self, stage: Stage, batch: List[Any], output_queue: Optional[TaskQueue]):
+        """Ejecuta una etapa generadora y emite cada resultado según llega"""
+        start = time.perf_counter()
+        error = False
+        emitted = 0
+        outputs = None
+        try:
+            outputs = self._dispatch[stage.name](batch)
+            for item in outputs:
+                self._emit(output_queue, (item,))
+                emitted += 1
+        except QueueClosed:
+            raise
+        except Exception as e:
+            error = True
+            logger.error(f"❌ Etapa {stage.name}: lote de {len(batch)} elementos falló "
+                         f"tras {emitted} resultados: {e}")
+            replacement = (stage.on_error(batch, e) if stage.on_error is not None else None) or []
+            self._emit(output_queue, replacement)
+            emitted += len(replacement)
+        finally:
+            if outputs is not None and hasattr(outputs, 'close'):
+                outputs.close()
+        stage.stats.record(len(batch), emitted, time.perf_counter() - start, error)
+
+    def _dispatcher(self, stage: Stage) -> Callable[[List[Any]], List[Any]]:
+        """Envío de un lote: llamada directa o tarea en el pool de la etapa"""
+        if stage.mode != 'process':
+            return stage.func
+        executor = self._executors[stage.name]
+        if stage.streaming:
+            return lambda batch: self._stream_from_pool(stage, executor, batch)
+        return lambda batch: executor.submit(stage.func, batch).result()
+
+    def _stream_from_pool(self, stage: Stage, executor: ProcessPoolExecutor,
+                          batch: List[Any]) -> Iterator[Any]:
+        """
+        Resultados de una tarea generadora del pool, leídos de la cola del worker.
+
+        Los mensajes llevan el número de tarea: los restos de una tarea
+        anterior (cancelada o caída) se ignoran.
+        """
+        slot = self._local.slot
+        results, cancel = self._channels[stage.name][slot]
+        with self._lock:
+            self._tasks += 1
+            task = self._tasks
+        future = executor.submit(_run_stream, stage.func, slot, task, batch)
+        finished = False
+        try:
+            while True:
+                try:
+                    message_task, more, item = results.get(timeout=STREAM_POLL)
+                except queue.Empty:
+                    if future.done() and future.exception() is not None:
+                        finished = True
+                        future.result()  # proceso caído: no llegará el fin
+                    continue
+                if message_task != task:
+                    continue
+                if not more:
+                    finished = True
+                    break
+                yield item
+            future.result()
+        finally:
+            if not finished:
+                # Consumidor cancelado: parar el generador y vaciar lo que ya envió
+                cancel.set()
+                while not future.done():
+                    try:
+                        message_task, more, _ = results.get(timeout=STREAM_POLL)
+                    except queue.Empty:
+                        continue
+                    if message_task == task and not more:
+                        break
+                future.exception()
+                cancel.clear()
+
+    @staticmethod
+    def _emit(output_queue: Optional[TaskQueue], outputs: List[Any]):
+        if output_queue is None:
+            return
+        for item in outputs:
+            output_queue.put(item)  # bloquea si la etapa siguiente va por detrás
+
+    def _finish_stage(self, stage: Stage, output_queue: Optional[TaskQueue]):
+        """Último worker de una etapa: resultados finales y cierre de la cola siguiente"""
+        try:
+            if stage.on_finish is not None and not self._cancelled and self.failure is None:
+                self._emit(output_queue, stage.on_finish() or [])
+        except QueueClosed:
+            pass
+        except BaseException as e:
+            self._fail(stage.name, e)
+        finally:
+            stage.stats.finished_at = time.perf_counter()
+            if output_queue is not None:
+                output_queue.close()
+
+    def _fail(self, where: str, error: BaseException):
+        """Error no controlado: se registra y se cancela el resto del pipeline"""
+        logger.error(f"💥 Error crítico en {where} (pipeline {self.name}): {error}")
+        with self._lock:
+            if self.failure is None:
+                self.failure = error
+        self._cancelled = True
+        for stage_queue in self._queues:
+            stage_queue.abort()
+        if self._output is not None:
+            # Lo ya entregado se puede leer; results() termina después
+            self._output.close()
@@ -1 +1,22 @@
-# Pipeline stages 
+#!/usr/bin/env python3
+"""
+stages/__init__.py - Etapas del pipeline de ingesta de IANAE
+ingestion (hilos) → processing + enrichment (procesos) → storage (un escritor)
+"""
+
+from .ingestion import check_file, ingestion_stage, new_parsed
+from .processing import iter_parse_file, parse_file, processing_stage
+from .enrichment import enrich_parsed
+from .storage import StorageWriter, storage_stage
+
+__all__ = [
+    'new_parsed',
+    'check_file',
+    'ingestion_stage',
+    'iter_parse_file',
+    'parse_file',
+    'processing_stage',
+    'enrich_parsed',
+    'StorageWriter',
+    'storage_stage'
+]
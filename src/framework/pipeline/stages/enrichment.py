@@ -1 +1,30 @@
-# Enrichment stage 
+#!/usr/bin/env python3
+"""
+stages/enrichment.py - Enriquecimiento de conversaciones parseadas
+Precalcula en los workers de procesamiento lo que de otro modo haría el
+hilo escritor (hashes de contenido, filas de mensajes) y los totales del archivo
+"""
+
+import time
+from typing import Any, Callable, Dict
+
+
+def enrich_parsed(parsed: Dict[str, Any], prepare: Callable[[Dict[str, Any]], Any]) -> Dict[str, Any]:
+    """
+    Aplica prepare a cada conversación de un archivo parseado.
+
+    Args:
+        parsed: Elemento de ingesta con status 'parsed'
+        prepare: Enriquecimiento por conversación (p. ej. prepare_conversation)
+
+    Returns:
+        El mismo elemento con 'messages' y 'enrich_time'
+    """
+    start_time = time.time()
+    messages = 0
+    for conversation in parsed['conversations']:
+        prepare(conversation)
+        messages += len(conversation.get('mensajes', []))
+    parsed['messages'] = messages
+    parsed['enrich_time'] = time.time() - start_time
+    return parsed
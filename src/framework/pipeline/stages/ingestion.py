@@ -1 +1,75 @@
-# Ingestion stage 
+#!/usr/bin/env python3
+"""
+stages/ingestion.py - Etapa de ingesta
+Comprueba en la base de datos qué archivos ya se procesaron (stat y hash,
+sobre todo E/S) y descarta los que no cambiaron antes de parsearlos
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..orchestrator import Stage
+
+
+def new_parsed(file_path: str, index: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Elemento que recorre el pipeline de ingesta para un archivo.
+
+    'status' avanza de 'pending' a 'skipped', 'rejected', 'failed' o 'parsed'.
+    """
+    return {
+        'file_path': file_path,
+        'index': index,
+        'status': 'pending',
+        'detected_type': None,
+        'confidence': 0.0,
+        'conversations': [],
+        'file_info': {},
+        'error': None,
+        'parse_time': 0.0
+    }
+
+
+def check_file(database, file_path: str, index: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Primer paso de la ingesta de un archivo: ¿ya está procesado y sin cambios?
+
+    Args:
+        database: IANAEDatabase (is_file_processed usa una conexión por hilo)
+        file_path: Ruta del archivo
+        index: Posición del archivo en la ingesta
+
+    Returns:
+        Elemento con status 'skipped' o 'pending'
+    """
+    parsed = new_parsed(file_path, index)
+    is_processed, file_info = database.is_file_processed(file_path)
+    if is_processed and not file_info.get('file_changed', False):
+        parsed.update({
+            'status': 'skipped',
+            'detected_type': file_info.get('processor_used', 'unknown'),
+            'file_info': file_info
+        })
+    return parsed
+
+
+def ingestion_stage(database, workers: int = 2) -> Stage:
+    """
+    Etapa de hilos: (índice, ruta) → elemento de ingesta.
+
+    Args:
+        database: IANAEDatabase compartida por los hilos
+        workers: Hilos de la etapa
+    """
+    def check_batch(batch: List[Tuple[int, str]]) -> List[Dict[str, Any]]:
+        return [check_file(database, file_path, index) for index, file_path in batch]
+
+    def failed_batch(batch: List[Tuple[int, str]], error: Exception) -> List[Dict[str, Any]]:
+        items = [new_parsed(file_path, index) for index, file_path in batch]
+        for parsed in items:
+            parsed.update({'status': 'failed', 'error': f"Error inesperado: {str(error)}"})
+        return items
+
+    # Cada hilo reutiliza su conexión durante la ingesta y la cierra al terminar
+    return Stage('ingestion', check_batch, workers=workers, mode='thread',
+                 batch_size=8, finalizer=database.close_thread_connection,
+                 on_error=failed_batch)
@@ -1 +1,207 @@
-# Processing stage 
+#!/usr/bin/env python3
+"""
+stages/processing.py - Etapa de procesamiento
+Auto-detección del formato y parseo con el procesador de la plataforma
+(CPU); el enriquecimiento se aplica en el mismo worker para no enviar las
+conversaciones entre procesos dos veces. Cada archivo sale hacia
+almacenamiento en trozos de tamaño fijo
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from ..orchestrator import Stage
+from .enrichment import enrich_parsed
+
+try:
+    from base import ProcessingError
+except ImportError:
+    class ProcessingError(Exception):
+        pass
+
+logger = logging.getLogger(__name__)
+
+# Conversaciones por trozo enviado a la etapa de almacenamiento
+CHUNK_SIZE = 200
+
+# Detector y procesadores de cada worker (uno por proceso, o por hilo en modo 'thread')
+_worker_state = threading.local()
+
+
+def init_worker(detector_factory: Callable, processors_factory: Callable,
+                prepare: Optional[Callable] = None, chunk_size: int = CHUNK_SIZE):
+    """
+    Initializer de la etapa: crea el detector y los procesadores del worker.
+
+    Args:
+        detector_factory: Crea el AutoDetector
+        processors_factory: Crea el dict plataforma → procesador
+        prepare: Enriquecimiento por conversación (p. ej. prepare_conversation)
+        chunk_size: Conversaciones por trozo enviado a almacenamiento
+    """
+    _worker_state.detector = detector_factory()
+    _worker_state.processors = processors_factory()
+    _worker_state.prepare = prepare
+    _worker_state.chunk_size = chunk_size
+
+
+def _chunk(parsed: Dict[str, Any], conversations: List[Dict[str, Any]], index: int,
+           final: bool) -> Dict[str, Any]:
+    """Copia del elemento de un archivo con un trozo de sus conversaciones"""
+    chunk = dict(parsed, conversations=conversations, chunk=index, final=final)
+    if not final:
+        chunk['status'] = 'parsed'
+    return chunk
+
+
+def iter_parse_file(parsed: Dict[str, Any], detector, processors: Dict[str, Any],
+                    chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Auto-detecta el tipo de un archivo pendiente y entrega sus conversaciones
+    en trozos de chunk_size, leyendo con iter_file del procesador.
+
+    No escribe en la base de datos. Cada trozo es una copia del elemento con
+    'conversations', 'chunk' (índice) y 'final'. Solo el último (final=True)
+    lleva el status definitivo del archivo ('rejected', 'failed' o 'parsed'),
+    'conversation_count' y 'message_count' con los totales; si el archivo
+    falla a medias, ese trozo final no lleva conversaciones.
+
+    Args:
+        parsed: Elemento de ingesta con status 'pending' (se actualiza con el status final)
+        detector: AutoDetector
+        processors: Procesadores por plataforma
+        chunk_size: Conversaciones por trozo
+
+    Returns:
+        Iterador de trozos; el último siempre tiene final=True
+    """
+    file_path = parsed['file_path']
+    pending: List[Dict[str, Any]] = []
+    index = conversations = messages = 0
+    try:
+        detection_result = detector.detect_file_type(file_path)
+
+        if not detection_result['success']:
+            parsed.update({
+                'status': 'rejected',
+                'error': f"Auto-detección falló: {detection_result.get('error', 'Tipo no soportado')}"
+            })
+            yield _chunk(parsed, [], index, True)
+            return
+
+        detected_type = detection_result['processor']
+        parsed['detected_type'] = detected_type
+        parsed['confidence'] = detection_result['confidence']
+
+        if detected_type not in processors:
+            parsed.update({
+                'status': 'rejected',
+                'error': f"Procesador no disponible para tipo: {detected_type}"
+            })
+            yield _chunk(parsed, [], index, True)
+            return
+
+        logger.info(f"🔧 Usando procesador {detected_type} con confianza {detection_result['confidence']:.1f}%")
+
+        for conversation in processors[detected_type].iter_file(file_path):
+            # El trozo lleno sale solo cuando llega otra conversación: así el
+            # final nunca queda vacío en un archivo con conversaciones
+            if len(pending) >= chunk_size:
+                yield _chunk(parsed, pending, index, False)
+                index += 1
+                pending = []
+            pending.append(conversation)
+            conversations += 1
+            messages += len(conversation.get('mensajes', []))
+        parsed['status'] = 'parsed'
+
+    except ProcessingError as e:
+        parsed.update({'status': 'failed', 'error': f"Error de procesamiento: {str(e)}"})
+        logger.error(f"❌ Error procesando {file_path}: {e}")
+        pending = []
+
+    except Exception as e:
+        parsed.update({'status': 'failed', 'error': f"Error inesperado: {str(e)}"})
+        logger.error(f"💥 Error crítico procesando {file_path}: {e}")
+        pending = []
+
+    final = _chunk(parsed, pending, index, True)
+    final.update({'conversation_count': conversations, 'message_count': messages})
+    yield final
+
+
+def parse_file(parsed: Dict[str, Any], detector, processors: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Auto-detecta el tipo de un archivo pendiente y extrae todas sus conversaciones.
+
+    No escribe en la base de datos.
+
+    Returns:
+        El mismo elemento con status 'rejected', 'failed' o 'parsed'
+    """
+    conversations = []
+    for chunk in iter_parse_file(parsed, detector, processors):
+        conversations.extend(chunk['conversations'])
+    if parsed['status'] == 'parsed':
+        parsed['conversations'] = conversations
+    return parsed
+
+
+def parse_batch(batch: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Función de la etapa: parsea y enriquece los elementos pendientes del lote.
+
+    Es un generador: cada trozo pasa a almacenamiento en cuanto está listo,
+    de modo que en el worker solo está el trozo en curso y no el archivo.
+
+    Yields:
+        Los elementos ya resueltos tal cual y, por cada pendiente, sus trozos
+    """
+    state = _worker_state
+    for parsed in batch:
+        if parsed['status'] != 'pending':
+            yield parsed
+            continue
+        start_time = time.time()
+        for chunk in iter_parse_file(parsed, state.detector, state.processors, state.chunk_size):
+            if chunk['status'] == 'parsed' and state.prepare is not None:
+                enrich_parsed(chunk, state.prepare)
+            if chunk['final']:
+                chunk['parse_time'] = time.time() - start_time
+            yield chunk
+
+
+def failed_batch(batch: List[Dict[str, Any]], error: Exception) -> List[Dict[str, Any]]:
+    """
+    Lote perdido (p. ej. un proceso del pool caído): sus archivos fallan.
+
+    Los trozos ya entregados de un archivo a medias no lo registran: solo
+    el trozo final lo hace, y este elemento lo sustituye como fallido.
+    """
+    for parsed in batch:
+        if parsed['status'] in ('pending', 'parsed'):
+            parsed.update({'status': 'failed', 'conversations': [],
+                           'error': f"Error inesperado: {str(error)}"})
+    return batch
+
+
+def processing_stage(detector_factory: Callable, processors_factory: Callable,
+                     prepare: Optional[Callable] = None, workers: int = 1,
+                     mode: str = 'process', chunk_size: int = CHUNK_SIZE) -> Stage:
+    """
+    Etapa de parseo: un archivo por lote para repartir bien la carga.
+
+    Args:
+        detector_factory: Crea el AutoDetector (debe poder serializarse en modo 'process')
+        processors_factory: Crea los procesadores por plataforma
+        prepare: Enriquecimiento por conversación
+        workers: Procesos (o hilos) de la etapa
+        mode: 'process' o 'thread' (un solo worker no compensa lanzar procesos)
+        chunk_size: Conversaciones por trozo enviado a almacenamiento
+    """
+    return Stage('processing', parse_batch, workers=workers, mode=mode, batch_size=1,
+                 queue_size=2 * workers, initializer=init_worker,
+                 initargs=(detector_factory, processors_factory, prepare, chunk_size),
+                 on_error=failed_batch)
@@ -1 +1,168 @@
-# Storage stage 
+#!/usr/bin/env python3
+"""
+stages/storage.py - Etapa de almacenamiento
+Único escritor de la base de datos: agrupa las conversaciones de varios
+archivos (o trozos de archivo) en cada add_conversations_batch y registra
+cada archivo como procesado solo después de escribir su último trozo
+"""
+
+import os
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from ..orchestrator import Stage
+
+logger = logging.getLogger(__name__)
+
+
+class StorageWriter:
+    """
+    Función con estado de la etapa de almacenamiento (un solo hilo).
+
+    Recibe elementos de ingesta y devuelve eventos de progreso:
+    - 'file': un archivo terminado (success, status, detected_type,
+      conversations, messages, error, already_processed, completed, total)
+    - 'commit': un lote escrito (files, conversations_added/updated/skipped,
+      messages_added)
+    """
+
+    def __init__(self, database, commit_batch: int = 500, total: int = 0,
+                 on_file: Optional[Callable[[Dict[str, Any], bool, Dict[str, Any]], None]] = None):
+        """
+        Args:
+            database: IANAEDatabase
+            commit_batch: Conversaciones acumuladas antes de escribir un lote
+            total: Archivos de la ingesta (para los eventos de progreso)
+            on_file: Callback (elemento, éxito, processing_stats) al terminar cada archivo
+        """
+        self.database = database
+        self.commit_batch = commit_batch
+        self.total = total
+        self.on_file = on_file
+        self.completed = 0
+        self._batch: List[Dict[str, Any]] = []
+        self._batch_conversations = 0
+        # Archivos con algún trozo intermedio que no se pudo escribir → error
+        self._failed_files: Dict[str, str] = {}
+
+    def __call__(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        events = []
+        for parsed in items:
+            status = parsed['status']
+            final = parsed.get('final', True)
+            if final and parsed['file_path'] in self._failed_files:
+                error = self._failed_files.pop(parsed['file_path'])
+                events.append(self._finish(parsed, False, parsed.get('error') or error))
+            elif status in ('skipped', 'rejected', 'failed'):
+                events.append(self._finish(parsed, status == 'skipped', parsed.get('error')))
+            elif not parsed['conversations']:
+                if final:
+                    events.append(self._finish(parsed, True))
+            else:
+                self._batch.append(parsed)
+                self._batch_conversations += len(parsed['conversations'])
+                if self._batch_conversations >= self.commit_batch:
+                    events.extend(self.flush())
+        return events
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """
+        Escribe el lote acumulado (también al vaciar la entrada).
+
+        add_conversations_batch no lanza: informa de cuántas conversaciones
+        no pudo escribir, pero no de cuáles. Si hay alguna, ningún archivo
+        del lote se registra como procesado y todos se reintentan en la
+        próxima ingesta (lo que sí se escribió se salta por hash).
+        """
+        if not self._batch:
+            return []
+        files, self._batch, self._batch_conversations = self._batch, [], 0
+        conversations = [conv for parsed in files for conv in parsed['conversations']]
+        events = []
+        try:
+            db_stats = self.database.add_conversations_batch(conversations)
+        except Exception as e:
+            error = f"Error inesperado: {str(e)}"
+        else:
+            events.append({
+                'type': 'commit',
+                'files': len(files),
+                'conversations_added': db_stats['conversations_added'],
+                'conversations_updated': db_stats['conversations_updated'],
+                'conversations_skipped': db_stats['conversations_skipped'],
+                'messages_added': db_stats['messages_added'],
+                'errors': db_stats['errors'],
+                'processing_time': db_stats['processing_time']
+            })
+            error = None
+            if db_stats['errors']:
+                error = (f"{db_stats['errors']} de {len(conversations)} conversaciones "
+                         f"del lote no se escribieron")
+
+        if error is not None:
+            logger.error(f"❌ Error escribiendo lote de {len(files)} archivos: {error}")
+            for parsed in files:
+                if parsed.get('final', True):
+                    self._failed_files.pop(parsed['file_path'], None)
+                    events.append(self._finish(parsed, False, error))
+                else:
+                    self._failed_files[parsed['file_path']] = error
+            return events
+
+        for parsed in files:
+            if not parsed.get('final', True):
+                continue
+            error = self._failed_files.pop(parsed['file_path'], None)
+            if error is not None:
+                events.append(self._finish(parsed, False, error))
+                continue
+            self.database.register_file_processing(parsed['file_path'], parsed['detected_type'],
+                                                   self._processing_stats(parsed))
+            events.append(self._finish(parsed, True))
+        return events
+
+    @staticmethod
+    def _processing_stats(parsed: Dict[str, Any]) -> Dict[str, Any]:
+        # El trozo final de un archivo trae los totales de todos sus trozos
+        conversations = parsed.get('conversations') or []
+        messages = parsed.get('message_count', parsed.get('messages'))
+        if messages is None:
+            messages = sum(len(conv.get('mensajes', [])) for conv in conversations)
+        return {
+            'conversations_processed': parsed.get('conversation_count', len(conversations)),
+            'messages_processed': messages,
+            'processing_time': parsed.get('parse_time', 0.0)
+        }
+
+    def _finish(self, parsed: Dict[str, Any], success: bool,
+                error: Optional[str] = None) -> Dict[str, Any]:
+        """Evento 'file' de un archivo terminado"""
+        self.completed += 1
+        processing_stats = self._processing_stats(parsed)
+        if self.on_file is not None:
+            self.on_file(parsed, success, processing_stats)
+        return {
+            'type': 'file',
+            'index': parsed.get('index'),
+            'filename': os.path.basename(parsed['file_path']),
+            'file_path': parsed['file_path'],
+            'success': success,
+            'status': parsed['status'] if success or parsed['status'] != 'parsed' else 'failed',
+            'detected_type': parsed.get('detected_type'),
+            'conversations': processing_stats['conversations_processed'],
+            'messages': processing_stats['messages_processed'],
+            'processing_time': processing_stats['processing_time'],
+            'error': error,
+            'already_processed': parsed['status'] == 'skipped',
+            'completed': self.completed,
+            'total': self.total
+        }
+
+
+def storage_stage(writer: StorageWriter) -> Stage:
+    """
+    Etapa de un solo hilo: toma todo lo que haya en la cola en cada lote
+    y escribe el resto al vaciarse la entrada.
+    """
+    return Stage('storage', writer, workers=1, mode='thread', batch_size=64,
+                 on_finish=writer.flush)
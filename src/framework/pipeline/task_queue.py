@@ -1 +1,159 @@
-# Task queue 
+#!/usr/bin/env python3
+"""
+pipeline/task_queue.py - Cola acotada entre etapas del pipeline
+Contrapresión (put bloquea con la cola llena), lectura por lotes, cierre
+ordenado para el drenado y contadores de ocupación y espera
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+
+class QueueClosed(Exception):
+    """Se intentó encolar en una cola cerrada o abortada"""
+    pass
+
+
+class TaskQueue:
+    """
+    Cola FIFO acotada con cierre.
+
+    close() deja de aceptar elementos pero permite vaciar los pendientes:
+    get_batch() devuelve [] solo cuando la cola está cerrada y vacía.
+    abort() además descarta los pendientes y despierta a todos los que
+    esperan (cancelación).
+    """
+
+    def __init__(self, maxsize: int = 0, name: str = "queue"):
+        """
+        Args:
+            maxsize: Elementos como máximo (0 = sin límite)
+            name: Nombre para estadísticas y logs
+        """
+        self.maxsize = maxsize
+        self.name = name
+        self._items: deque = deque()  # (instante de entrada, elemento)
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+
+        self._put_count = 0
+        self._get_count = 0
+        self._high_water = 0
+        self._put_blocked_time = 0.0
+        self._wait_time = 0.0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, item: Any, timeout: Optional[float] = None):
+        """
+        Encola un elemento, esperando si la cola está llena.
+
+        Raises:
+            QueueClosed: Si la cola está cerrada (o se cierra mientras espera)
+            TimeoutError: Si no hubo hueco en timeout segundos
+        """
+        with self._not_full:
+            if self.maxsize > 0 and len(self._items) >= self.maxsize and not self._closed:
+                start = time.perf_counter()
+                deadline = None if timeout is None else start + timeout
+                while len(self._items) >= self.maxsize and not self._closed:
+                    remaining = None if deadline is None else deadline - time.perf_counter()
+                    if remaining is not None and remaining <= 0:
+                        self._put_blocked_time += time.perf_counter() - start
+                        raise TimeoutError(f"Cola {self.name} llena")
+                    self._not_full.wait(remaining)
+                self._put_blocked_time += time.perf_counter() - start
+            if self._closed:
+                raise QueueClosed(f"Cola {self.name} cerrada")
+
+            self._items.append((time.perf_counter(), item))
+            self._put_count += 1
+            if len(self._items) > self._high_water:
+                self._high_water = len(self._items)
+            self._not_empty.notify()
+
+    def get_batch(self, max_items: int = 1, max_wait: float = 0.0) -> List[Any]:
+        """
+        Saca un lote de hasta max_items elementos.
+
+        Espera sin límite al primer elemento; después espera como mucho
+        max_wait segundos a completar el lote.
+
+        Returns:
+            Lista de elementos; [] si la cola está cerrada y vacía
+        """
+        with self._not_empty:
+            while not self._items and not self._closed:
+                self._not_empty.wait()
+
+            batch = self._take(max_items)
+            if batch and len(batch) < max_items and max_wait > 0:
+                deadline = time.perf_counter() + max_wait
+                while len(batch) < max_items:
+                    if not self._items:
+                        remaining = deadline - time.perf_counter()
+                        if self._closed or remaining <= 0:
+                            break
+                        self._not_empty.wait(remaining)
+                    batch.extend(self._take(max_items - len(batch)))
+            return batch
+
+    def _take(self, max_items: int) -> List[Any]:
+        """Saca hasta max_items elementos (con el cerrojo tomado)"""
+        now = time.perf_counter()
+        batch = []
+        while self._items and len(batch) < max_items:
+            enqueued_at, item = self._items.popleft()
+            self._wait_time += now - enqueued_at
+            batch.append(item)
+        if batch:
+            self._get_count += len(batch)
+            self._not_full.notify(len(batch))
+        return batch
+
+    def close(self):
+        """No admite más elementos; los consumidores vacían los pendientes"""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def abort(self) -> int:
+        """
+        Cierra la cola y descarta los pendientes.
+
+        Returns:
+            Número de elementos descartados
+        """
+        with self._lock:
+            self._closed = True
+            discarded = len(self._items)
+            self._items.clear()
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+            return discarded
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de la cola"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'size': len(self._items),
+                'maxsize': self.maxsize,
+                'put': self._put_count,
+                'got': self._get_count,
+                'high_water': self._high_water,
+                'put_blocked_time': self._put_blocked_time,
+                'avg_wait': self._wait_time / self._get_count if self._get_count else 0.0,
+                'closed': self._closed
+            }
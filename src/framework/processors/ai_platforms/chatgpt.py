@@ -7,8 +7,8 @@ Actualizado para heredar de BaseProcessor y seguir estándares IANAE
 
 import json
 import time
-from typing import List, Dict, Any, Optional
-from .base import BaseProcessor, ProcessingError, load_json_safely, get_file_preview
+from typing import List, Dict, Any, Iterator, Optional
+from .base import BaseProcessor, ProcessingError, open_json_stream, get_file_preview
 import logging
 
 logger = logging.getLogger(__name__)
@@ -112,78 +112,113 @@ class ChatGPTProcessor(BaseProcessor):
         Returns:
             Lista de conversaciones en formato estándar IANAE
             
+        Raises:
+            ProcessingError: Si hay errores durante el procesamiento
+        """
+        return list(self.iter_file(file_path))
+    
+    def iter_file(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre un archivo JSON de ChatGPT en streaming.
+        
+        El array de conversaciones se decodifica elemento a elemento, de modo
+        que en memoria solo está la conversación en curso y no la exportación
+        completa. Las estadísticas se actualizan al terminar el archivo.
+        
+        Args:
+            file_path: Ruta del archivo a procesar
+            
+        Yields:
+            Conversaciones normalizadas en formato estándar IANAE
+            
         Raises:
             ProcessingError: Si hay errores durante el procesamiento
         """
         start_time = time.time()
+        total_conversations = 0
+        total_messages = 0
+        errors = 0
         
         try:
             logger.info(f"Procesando archivo ChatGPT: {file_path}")
             
-            # Cargar datos JSON
-            data = load_json_safely(file_path)
-            if data is None:
-                raise ProcessingError(f"No se pudo cargar JSON desde {file_path}", 
+            try:
+                stream = open_json_stream(file_path)
+            except (OSError, json.JSONDecodeError) as e:
+                raise ProcessingError(f"No se pudo cargar JSON desde {file_path}: {e}", 
                                     self.name, file_path)
             
-            # Procesar según estructura
-            conversaciones_raw = []
-            
-            if isinstance(data, list):
-                logger.info(f"Procesando {len(data)} conversaciones de ChatGPT...")
-                conversaciones_raw = self._process_conversation_list(data)
+            with stream:
+                if stream.root_type == 'object':
+                    logger.info("Procesando conversación individual de ChatGPT...")
                 
-            elif isinstance(data, dict) and 'mapping' in data:
-                logger.info("Procesando conversación individual de ChatGPT...")
-                conv = self._process_single_conversation(data, 0)
-                if conv:
-                    conversaciones_raw = [conv]
-            else:
-                raise ProcessingError(f"Estructura JSON no reconocida en {file_path}", 
-                                    self.name, file_path)
-            
-            # Normalizar conversaciones al formato IANAE
-            conversaciones_normalizadas = []
-            errors = 0
-            
-            for conv_raw in conversaciones_raw:
-                try:
-                    # Agregar metadatos de procesamiento
-                    conv_raw['original_format'] = 'chatgpt_json'
+                for i, conv_data in enumerate(stream):
+                    # Procesar según estructura
+                    if stream.root_type == 'object':
+                        if not isinstance(conv_data, dict) or 'mapping' not in conv_data:
+                            raise ProcessingError(f"Estructura JSON no reconocida en {file_path}", 
+                                                self.name, file_path)
+                        conv_raw = self._process_single_conversation(conv_data, 0)
+                    else:
+                        try:
+                            conv_raw = self._process_single_conversation(conv_data, i)
+                        except Exception as e:
+                            logger.warning(f"Error procesando conversación {i}: {e}")
+                            continue
+                        if not (conv_raw and conv_raw.get('mensajes')):
+                            conv_raw = None
+                        
+                        # Log progreso cada 100 conversaciones
+                        if i % 100 == 0 and i > 0:
+                            logger.info(f"Procesadas {i} conversaciones de ChatGPT...")
                     
-                    # Normalizar usando BaseProcessor
-                    conv_normalizada = self.normalize_conversation(conv_raw)
+                    if not conv_raw:
+                        continue
                     
-                    # Validar usando BaseProcessor
-                    if self.validate_conversation(conv_normalizada):
-                        conversaciones_normalizadas.append(conv_normalizada)
-                    else:
-                        logger.warning(f"Conversación inválida descartada: {conv_raw.get('id', 'unknown')}")
-                        errors += 1
+                    # Normalizar conversación al formato IANAE
+                    try:
+                        # Agregar metadatos de procesamiento
+                        conv_raw['original_format'] = 'chatgpt_json'
                         
-                except Exception as e:
-                    logger.error(f"Error normalizando conversación {conv_raw.get('id', 'unknown')}: {e}")
-                    errors += 1
-                    continue
+                        # Normalizar usando BaseProcessor
+                        conv_normalizada = self.normalize_conversation(conv_raw)
+                        
+                        # Validar usando BaseProcessor
+                        if not self.validate_conversation(conv_normalizada):
+                            logger.warning(f"Conversación inválida descartada: {conv_raw.get('id', 'unknown')}")
+                            errors += 1
+                            continue
+                            
+                    except Exception as e:
+                        logger.error(f"Error normalizando conversación {conv_raw.get('id', 'unknown')}: {e}")
+                        errors += 1
+                        continue
+                    
+                    total_conversations += 1
+                    total_messages += len(conv_normalizada['mensajes'])
+                    yield conv_normalizada
             
             # Actualizar estadísticas
             processing_time = time.time() - start_time
-            total_messages = sum(len(conv['mensajes']) for conv in conversaciones_normalizadas)
             
             self.update_stats(
-                conversations_processed=len(conversaciones_normalizadas),
+                conversations_processed=total_conversations,
                 messages_processed=total_messages,
                 processing_time=processing_time,
                 errors=errors
             )
             
-            logger.info(f"ChatGPT procesado: {len(conversaciones_normalizadas)} conversaciones, "
+            logger.info(f"ChatGPT procesado: {total_conversations} conversaciones, "
                        f"{total_messages} mensajes en {processing_time:.2f}s")
             
-            return conversaciones_normalizadas
-            
         except ProcessingError:
             raise
+        except json.JSONDecodeError as e:
+            # JSON truncado o corrupto a mitad del array
+            processing_time = time.time() - start_time
+            self.update_stats(total_conversations, total_messages, processing_time, errors + 1)
+            raise ProcessingError(f"JSON inválido en {file_path}: {e}", 
+                                self.name, file_path)
         except Exception as e:
             processing_time = time.time() - start_time
             self.update_stats(0, 0, processing_time, 1)
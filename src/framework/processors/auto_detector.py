@@ -5,10 +5,83 @@ Detecta y procesa ChatGPT, Claude, Cline/Continue automáticamente
 """
 
 import json
+import os
 import re
-from typing import Dict, List, Any, Tuple
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Any, Optional, TextIO, Tuple
 from pathlib import Path
 
+from .base import JSONArrayStream, open_json_stream
+
+# Caracteres leídos para detectar el formato; se amplía hasta SNIFF_MAX_CHARS
+# solo si el primer registro JSON no basta para decidir
+SNIFF_CHARS = 16 * 1024
+SNIFF_MAX_CHARS = 256 * 1024
+
+# Veredictos de detección recordados, por (ruta, tamaño, mtime)
+DETECTION_CACHE_SIZE = 1024
+
+# Cadenas JSON (también una cortada al final del prefijo) y signos de estructura
+_JSON_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*(?:"|\\?\Z)|[\[\]{}:,]')
+
+
+def scan_json_prefix(prefix: str) -> Dict[str, Any]:
+    """
+    Escáner tolerante de un prefijo JSON posiblemente cortado.
+    
+    No decodifica valores: sigue la profundidad de anidamiento y recoge las
+    claves de nivel superior del primer registro (el objeto raíz, o el
+    primer elemento si la raíz es un array), que es lo que necesitan las
+    puntuaciones de formato.
+    
+    Args:
+        prefix: Inicio del documento
+        
+    Returns:
+        Diccionario con 'root' ('array', 'object' o None si no parece JSON),
+        'keys' (claves del primer registro), 'first_complete' (si el primer
+        registro terminó dentro del prefijo), 'items' (registros completos)
+        y 'complete' (si el documento entero cabe en el prefijo)
+    """
+    result = {'root': None, 'keys': [], 'first_complete': False, 'items': 0, 'complete': False}
+    
+    start = len(prefix) - len(prefix.lstrip())
+    if start >= len(prefix) or prefix[start] not in '[{':
+        return result
+    result['root'] = 'array' if prefix[start] == '[' else 'object'
+    record_depth = 2 if result['root'] == 'array' else 1
+    
+    depth = 0
+    last_string = None
+    keys = {}
+    for match in _JSON_TOKEN.finditer(prefix, start):
+        token = match.group()
+        if token[0] == '"':
+            if len(token) < 2 or token[-1] != '"' or match.end() == len(prefix) and token.endswith('\\"'):
+                break  # cadena cortada por el prefijo
+            last_string = token
+            continue
+        if token in '[{':
+            depth += 1
+        elif token in ']}':
+            depth -= 1
+            if depth == record_depth - 1:
+                result['items'] += 1
+                result['first_complete'] = True
+            if depth == 0:
+                result['complete'] = True
+                break
+        elif token == ':' and depth == record_depth and not result['first_complete'] and last_string:
+            try:
+                keys[json.loads(last_string)] = None
+            except json.JSONDecodeError:
+                pass
+        last_string = None
+    
+    result['keys'] = list(keys)
+    return result
+
+
 class AutoDetector:
     """Detector inteligente de formatos de conversaciones"""
     
@@ -37,31 +110,120 @@ class AutoDetector:
                 'confidence_threshold': 0.6
             }
         }
+        
+        self._detection_cache: "OrderedDict[Tuple[str, int, int], Tuple[str, float, Dict]]" = OrderedDict()
     
     def detect_format(self, file_path: str) -> Tuple[str, float, Dict]:
         """
         Detecta el formato del archivo de conversación
         
+        Solo lee un prefijo acotado del archivo (SNIFF_CHARS) y recuerda el
+        veredicto mientras el tamaño y la fecha de modificación no cambien.
+        
         Returns:
             (formato, confianza, metadatos)
         """
         try:
-            # Leer contenido del archivo
+            cached = self._cached_verdict(file_path)
+            if cached is not None:
+                return cached
             with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Intentar detectar como JSON primero
-            json_result = self._detect_json_format(content)
-            if json_result[1] > 0.5:  # Si confianza > 0.5
-                return json_result
-            
-            # Si no es JSON válido, probar como texto/markdown
-            text_result = self._detect_text_format(content)
-            return text_result
+                verdict, _ = self._sniff(file_path, f)
+            return verdict
             
         except Exception as e:
             return 'unknown', 0.0, {'error': str(e)}
     
+    def _cached_verdict(self, file_path: str) -> Optional[Tuple[str, float, Dict]]:
+        """Veredicto recordado si el archivo no cambió desde la última detección"""
+        key = self._cache_key(file_path)
+        verdict = self._detection_cache.get(key)
+        if verdict is not None:
+            self._detection_cache.move_to_end(key)
+        return verdict
+    
+    def _cache_key(self, file_path: str) -> Tuple[str, int, int]:
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    
+    def _sniff(self, file_path: str, f: TextIO) -> Tuple[Tuple[str, float, Dict], str]:
+        """
+        Detecta el formato leyendo solo el inicio de un archivo abierto.
+        
+        Returns:
+            (veredicto, prefijo leído); el archivo queda posicionado tras el
+            prefijo para que el procesador continúe desde ahí
+        """
+        key = self._cache_key(file_path)
+        prefix = f.read(SNIFF_CHARS)
+        at_eof = len(prefix) < SNIFF_CHARS
+        
+        while True:
+            if not at_eof:
+                scan = scan_json_prefix(prefix)
+                at_eof = scan['complete']
+            if at_eof:
+                # El archivo cabe en el prefijo: detección exacta como antes
+                prefix += f.read()
+                verdict = self._detect_content(prefix)
+                break
+            
+            verdict = self._detect_json_prefix(scan, len(prefix.encode('utf-8')), key[1])
+            if (verdict[1] > 0.5 or scan['root'] is None or scan['first_complete']
+                    or len(prefix) >= SNIFF_MAX_CHARS):
+                if verdict[1] <= 0.5:
+                    verdict = self._detect_text_format(prefix)
+                    verdict[2]['estimated'] = True
+                break
+            
+            # El primer registro no cabe en el prefijo: leer el doble
+            wanted = len(prefix)
+            chunk = f.read(wanted)
+            prefix += chunk
+            at_eof = len(chunk) < wanted
+        
+        self._detection_cache[key] = verdict
+        while len(self._detection_cache) > DETECTION_CACHE_SIZE:
+            self._detection_cache.popitem(last=False)
+        return verdict, prefix
+    
+    def _detect_content(self, content: str) -> Tuple[str, float, Dict]:
+        """Detección sobre el archivo completo (ya cabía en el prefijo)"""
+        # Intentar detectar como JSON primero
+        json_result = self._detect_json_format(content)
+        if json_result[1] > 0.5:  # Si confianza > 0.5
+            return json_result
+        
+        # Si no es JSON válido, probar como texto/markdown
+        return self._detect_text_format(content)
+    
+    def _detect_json_prefix(self, scan: Dict[str, Any], bytes_read: int,
+                            file_size: int) -> Tuple[str, float, Dict]:
+        """Detecta ChatGPT/Claude a partir del escaneo de un prefijo JSON"""
+        if scan['root'] is None:
+            return 'not_json', 0.0, {}
+        
+        # Las puntuaciones solo miran las claves del primer registro
+        sample = dict.fromkeys(scan['keys'])
+        data = [sample] if scan['root'] == 'array' else sample
+        
+        # Estimación lineal del número de conversaciones
+        if scan['root'] == 'array':
+            conversations = max(1, round(scan['items'] * file_size / max(1, bytes_read)))
+        else:
+            conversations = 1
+        metadata = {'structure': 'json', 'conversations_detected': conversations, 'estimated': True}
+        
+        chatgpt_score = self._score_chatgpt(data)
+        if chatgpt_score > self.conversation_patterns['chatgpt']['confidence_threshold']:
+            return 'chatgpt', chatgpt_score, metadata
+        
+        claude_score = self._score_claude(data)
+        if claude_score > self.conversation_patterns['claude']['confidence_threshold']:
+            return 'claude', claude_score, metadata
+        
+        return 'json_generic', 0.3, {'structure': 'json'}
+    
     def _detect_json_format(self, content: str) -> Tuple[str, float, Dict]:
         """Detecta formatos JSON (ChatGPT, Claude)"""
         try:
@@ -193,18 +355,15 @@ class AutoDetector:
     def process_file(self, file_path: str) -> Dict[str, Any]:
         """
         Procesa archivo detectando formato y extrayendo conversaciones
-        """
-        format_type, confidence, metadata = self.detect_format(file_path)
         
-        # Procesar según formato detectado
-        if format_type == 'chatgpt':
-            conversations = self._process_chatgpt_file(file_path)
-        elif format_type == 'claude':
-            conversations = self._process_claude_file(file_path)
-        elif format_type == 'cline':
-            conversations = self._process_cline_file(file_path)
-        else:
-            conversations = []
+        El archivo se abre una sola vez: el prefijo leído para detectar el
+        formato se entrega al procesador, que sigue leyendo desde ahí. El
+        resultado lleva la lista completa; iter_file recorre el archivo sin
+        materializarla.
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            (format_type, confidence, metadata), prefix = self._open_verdict(file_path, f)
+            conversations = list(self._iter_conversations(format_type, file_path, f, prefix))
         
         return {
             'format': format_type,
@@ -215,44 +374,73 @@ class AutoDetector:
             'total_messages': sum(len(conv.get('messages', [])) for conv in conversations)
         }
     
-    def _process_chatgpt_file(self, file_path: str) -> List[Dict]:
-        """Procesa archivo ChatGPT"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        conversations = []
+    def iter_file(self, file_path: str) -> Iterator[Dict]:
+        """
+        Conversaciones del archivo una a una, en el formato detectado
         
-        if isinstance(data, list):
-            for i, conv_data in enumerate(data):
+        ChatGPT y Claude se leen en streaming: en memoria solo está la
+        conversación en curso. El archivo se cierra al agotar o cerrar
+        el iterador.
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            (format_type, _, _), prefix = self._open_verdict(file_path, f)
+            yield from self._iter_conversations(format_type, file_path, f, prefix)
+    
+    def _open_verdict(self, file_path: str, f: TextIO) -> Tuple[Tuple[str, float, Dict], str]:
+        """Veredicto de un archivo abierto y el prefijo ya leído ('' si venía de la cache)"""
+        verdict = self._cached_verdict(file_path)
+        if verdict is not None:
+            return verdict, ''
+        try:
+            return self._sniff(file_path, f)
+        except Exception as e:
+            return ('unknown', 0.0, {'error': str(e)}), ''
+    
+    def _iter_conversations(self, format_type: str, file_path: str, f: TextIO,
+                            prefix: str) -> Iterator[Dict]:
+        """Lector de conversaciones según el formato detectado"""
+        if format_type == 'chatgpt':
+            return self._iter_chatgpt_file(file_path, f, prefix)
+        if format_type == 'claude':
+            return self._iter_claude_file(file_path, f, prefix)
+        if format_type == 'cline':
+            return iter(self._process_cline_file(file_path, f, prefix))
+        return iter(())
+    
+    def _json_stream(self, file_path: str, f: Optional[TextIO], prefix: str) -> JSONArrayStream:
+        """Stream JSON sobre el archivo ya abierto, o abriéndolo si no se pasa"""
+        if f is None:
+            return open_json_stream(file_path)
+        return JSONArrayStream(f, prefix=prefix)
+    
+    def _iter_chatgpt_file(self, file_path: str, f: Optional[TextIO] = None,
+                           prefix: str = '') -> Iterator[Dict]:
+        """Conversaciones de un archivo ChatGPT (el array se lee una a una)"""
+        with self._json_stream(file_path, f, prefix) as stream:
+            for i, conv_data in enumerate(stream):
                 processed_conv = self._process_chatgpt_conversation(conv_data, i)
                 if processed_conv:
-                    conversations.append(processed_conv)
-        elif isinstance(data, dict):
-            processed_conv = self._process_chatgpt_conversation(data, 0)
-            if processed_conv:
-                conversations.append(processed_conv)
-        
-        return conversations
+                    yield processed_conv
     
-    def _process_claude_file(self, file_path: str) -> List[Dict]:
-        """Procesa archivo Claude"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        conversations = []
-        
-        if isinstance(data, list):
-            for conv_data in data:
+    def _iter_claude_file(self, file_path: str, f: Optional[TextIO] = None,
+                          prefix: str = '') -> Iterator[Dict]:
+        """Conversaciones de un archivo Claude (el array se lee una a una)"""
+        with self._json_stream(file_path, f, prefix) as stream:
+            if stream.root_type != 'array':
+                return
+            for conv_data in stream:
                 processed_conv = self._process_claude_conversation(conv_data)
                 if processed_conv:
-                    conversations.append(processed_conv)
-        
-        return conversations
+                    yield processed_conv
     
-    def _process_cline_file(self, file_path: str) -> List[Dict]:
+    def _process_cline_file(self, file_path: str, f: Optional[TextIO] = None,
+                            prefix: str = '') -> List[Dict]:
         """Procesa archivo Cline/Continue"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        if f is None:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        else:
+            content = prefix + f.read()
         
         conversations = []
         
@@ -6,7 +6,7 @@ Establece la interfaz común que deben implementar todos los procesadores
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Iterator, Optional, TextIO, Union
 import json
 import os
 from datetime import datetime
@@ -72,6 +72,16 @@ class BaseProcessor(ABC):
         """
         pass
     
+    def iter_file(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Conversaciones del archivo una a una.
+        
+        Los procesadores que leen el archivo en streaming lo redefinen para
+        no materializar todas las conversaciones; por defecto recorre
+        process_file.
+        """
+        return iter(self.process_file(file_path))
+    
     def validate_conversation(self, conversation: Dict[str, Any]) -> bool:
         """
         Valida que una conversación tenga la estructura mínima requerida.
@@ -390,6 +400,159 @@ def load_json_safely(file_path: str) -> Union[Dict, List, None]:
         logger.error(f"Error cargando JSON {file_path}: {e}")
         return None
 
+# Tamaño de lectura del parser JSON en streaming (caracteres)
+JSON_STREAM_CHUNK = 1 << 20
+
+_JSON_WHITESPACE = ' \t\n\r'
+_JSON_DELIMITERS = _JSON_WHITESPACE + ',]}'
+
+
+class JSONArrayStream:
+    """
+    Parser incremental de un array JSON de nivel superior.
+    
+    Lee el archivo por bloques y decodifica cada elemento con
+    json.JSONDecoder.raw_decode en cuanto está completo, así que en memoria
+    solo hay un bloque de texto y el elemento actual, no el archivo entero.
+    
+    Si la raíz es un objeto (exportación de una sola conversación) el
+    iterador produce ese objeto como único elemento. root_type indica
+    cuál de los dos casos es ('array' u 'object').
+    
+    Uso:
+        with open_json_stream(ruta) as stream:
+            for conversacion in stream:
+                ...
+    """
+    
+    def __init__(self, fileobj: TextIO, chunk_size: int = JSON_STREAM_CHUNK, prefix: str = ''):
+        """
+        Args:
+            fileobj: Archivo abierto en modo texto
+            chunk_size: Caracteres leídos por bloque
+            prefix: Texto ya leído de fileobj (p. ej. al detectar el formato);
+                la lectura continúa desde la posición actual del archivo
+        """
+        self._file = fileobj
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = prefix
+        self._pos = 0
+        self._eof = False
+        
+        self._skip_whitespace()
+        if self._pos >= len(self._buffer):
+            raise json.JSONDecodeError("Documento JSON vacío", self._buffer, 0)
+        first = self._buffer[self._pos]
+        if first == '[':
+            self.root_type = 'array'
+            self._pos += 1
+        elif first == '{':
+            self.root_type = 'object'
+        else:
+            raise json.JSONDecodeError("Se esperaba un array u objeto JSON", self._buffer, self._pos)
+    
+    def __iter__(self) -> Iterator[Any]:
+        if self.root_type == 'object':
+            yield self._decode_value()
+            self._expect_end()
+            return
+        
+        self._skip_whitespace()
+        if self._peek() == ']':
+            self._pos += 1
+            self._expect_end()
+            return
+        while True:
+            yield self._decode_value()
+            self._skip_whitespace()
+            separator = self._peek()
+            self._pos += 1
+            if separator == ']':
+                self._expect_end()
+                return
+            if separator != ',':
+                raise json.JSONDecodeError("Se esperaba ',' o ']'", self._buffer, self._pos - 1)
+            self._skip_whitespace()
+    
+    def close(self):
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _read(self, size: int) -> bool:
+        """Añade hasta size caracteres al buffer descartando lo ya consumido"""
+        if self._eof:
+            return False
+        chunk = self._file.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+    
+    def _skip_whitespace(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _JSON_WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._read(self._chunk_size):
+                return
+    
+    def _peek(self) -> str:
+        if self._pos >= len(self._buffer):
+            raise json.JSONDecodeError("Fin inesperado del documento", self._buffer, self._pos)
+        return self._buffer[self._pos]
+    
+    def _decode_value(self) -> Any:
+        """Decodifica el valor en la posición actual, leyendo más bloques si está incompleto"""
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # Un número cortado por el bloque ("-25" de "-2500.5") también se
+                # decodifica: solo se acepta si le sigue un delimitador
+                if self._eof or (end < len(self._buffer) and self._buffer[end] in _JSON_DELIMITERS):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # Elemento incompleto: leer más, duplicando para no reparsear de forma cuadrática
+            self._read(size)
+            size *= 2
+    
+    def _expect_end(self):
+        self._skip_whitespace()
+        if self._pos < len(self._buffer):
+            raise json.JSONDecodeError("Datos extra tras el documento JSON", self._buffer, self._pos)
+
+
+def open_json_stream(file_path: str, chunk_size: int = JSON_STREAM_CHUNK) -> JSONArrayStream:
+    """
+    Abre un archivo JSON para recorrer su array de nivel superior en streaming.
+    
+    Args:
+        file_path: Ruta del archivo JSON
+        chunk_size: Caracteres leídos por bloque
+        
+    Returns:
+        JSONArrayStream (cerrarlo, o usarlo como context manager)
+        
+    Raises:
+        json.JSONDecodeError: Si el archivo no empieza por un array u objeto JSON
+    """
+    f = open(file_path, 'r', encoding='utf-8')
+    try:
+        return JSONArrayStream(f, chunk_size)
+    except Exception:
+        f.close()
+        raise
+
 def get_file_preview(file_path: str, max_chars: int = 2000) -> str:
     """
     Obtiene preview del inicio de un archivo.
@@ -1 +1 @@
-"""IANAE  src/llm"""
+"""IANAE — src/llm"""
@@ -13,11 +13,13 @@ Este módulo maneja la integración con diferentes proveedores LLM:
 - Construcción de prompts específicos para Lucas
 - Manejo robusto de errores y timeouts
 
+Las llamadas van por la capa asíncrona de src.framework.llm: sesiones
+HTTP persistentes por proveedor y límite de concurrencia, de modo que
+varias peticiones simultáneas no se bloquean entre sí.
+
 Dependencias:
-- requests: Para llamadas HTTP a LM Studio
-- openai: Para API de OpenAI (opcional)
+- httpx: Cliente HTTP asíncrono (vía src.framework.llm)
 - typing: Para type hints
-- json: Para serialización de datos
 
 Uso típico:
     llm = IANAELLMConnector()
@@ -28,13 +30,12 @@ Uso típico:
     )
 """
 
-import requests
-import json
-import asyncio
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List
 from datetime import datetime
 import logging
 
+from src.framework.llm import LLMError, LMStudioProvider, OpenAIProvider
+
 logger = logging.getLogger(__name__)
 
 class IANAELLMConnector:
@@ -57,10 +58,19 @@ class IANAELLMConnector:
         """
         self.lm_studio_url = "http://localhost:1234/v1/chat/completions"
         self.lm_studio_model = "r1-gemma-3-4b-multimodal-test"
+        self.openai_model = "gpt-3.5-turbo"
         self.timeout = 15
         self.temperature = 0.7
         self.max_tokens = 1000
         
+        # Proveedores con sesión persistente (una por event loop)
+        self.lm_studio = LMStudioProvider(
+            endpoint=self.lm_studio_url.rsplit("/chat/completions", 1)[0],
+            model=self.lm_studio_model,
+            timeout=self.timeout
+        )
+        self.openai = OpenAIProvider(model=self.openai_model, timeout=self.timeout)
+        
         # Estado de conectividad
         self.lm_studio_available = False
         self.openai_available = False
@@ -130,68 +140,39 @@ class IANAELLMConnector:
             - Maneja errores de conexión gracefully
             - Detecta si el modelo está cargado
         """
+        logger.debug(f"🔄 Enviando request a LM Studio...")
         try:
-            # Preparar payload para LM Studio
-            payload = {
-                "model": self.lm_studio_model,
-                "messages": [
-                    {
-                        "role": "system", 
-                        "content": "Eres IANAE, el bibliotecario personal de Lucas. Responde de forma conversacional y útil."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                "temperature": self.temperature,
-                "max_tokens": self.max_tokens,
-                "stream": False
-            }
-            
-            logger.debug(f"🔄 Enviando request a LM Studio...")
-            
-            # Realizar llamada HTTP
-            response = requests.post(
-                self.lm_studio_url,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=self.timeout
+            result = await self.lm_studio.chat(
+                [{"role": "user", "content": prompt}],
+                system="Eres IANAE, el bibliotecario personal de Lucas. Responde de forma conversacional y útil.",
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
             )
             
-            if response.status_code == 200:
-                data = response.json()
-                content = data["choices"][0]["message"]["content"]
-                
-                # Actualizar estado de conectividad
-                self.lm_studio_available = True
-                self.last_check = datetime.now()
-                
-                return {
-                    "success": True,
-                    "response": content.strip(),
-                    "provider": "LM Studio",
-                    "model": self.lm_studio_model,
-                    "tokens_used": data.get("usage", {}).get("total_tokens", 0)
-                }
-            else:
-                logger.warning(f"⚠️ LM Studio error HTTP {response.status_code}")
-                return {
-                    "success": False,
-                    "error": f"HTTP {response.status_code}: {response.text[:200]}"
-                }
-                
-        except requests.exceptions.ConnectionError:
-            logger.info(f"🔌 LM Studio no disponible - conexión rechazada")
-            self.lm_studio_available = False
-            return {"success": False, "error": "LM Studio no está ejecutándose"}
+            # Actualizar estado de conectividad
+            self.lm_studio_available = True
+            self.last_check = datetime.now()
             
-        except requests.exceptions.Timeout:
-            logger.warning(f"⏰ LM Studio timeout después de {self.timeout}s")
-            return {"success": False, "error": f"Timeout después de {self.timeout}s"}
+            return {
+                "success": True,
+                "response": result.text.strip(),
+                "provider": "LM Studio",
+                "model": self.lm_studio_model,
+                "tokens_used": result.total_tokens
+            }
             
-        except Exception as e:
-            logger.error(f"❌ Error inesperado con LM Studio: {e}")
+        except LLMError as e:
+            if e.connection:
+                logger.info(f"🔌 LM Studio no disponible - conexión rechazada")
+                self.lm_studio_available = False
+                return {"success": False, "error": "LM Studio no está ejecutándose"}
+            if e.timeout:
+                logger.warning(f"⏰ LM Studio timeout después de {self.timeout}s")
+                return {"success": False, "error": f"Timeout después de {self.timeout}s"}
+            if e.status:
+                logger.warning(f"⚠️ LM Studio error HTTP {e.status}")
+            else:
+                logger.error(f"❌ Error inesperado con LM Studio: {e}")
             return {"success": False, "error": str(e)}
     
     async def _try_openai(self, prompt: str) -> Dict:
@@ -209,56 +190,78 @@ class IANAELLMConnector:
             - Usa gpt-3.5-turbo por defecto
             - Maneja límites de rate limiting
         """
+        # Verificar API key
+        if not self.openai.available:
+            return {"success": False, "error": "No hay API key de OpenAI configurada"}
+        
+        logger.debug(f"🔄 Enviando request a OpenAI...")
         try:
-            import openai
-            import os
-            
-            # Verificar API key
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                return {"success": False, "error": "No hay API key de OpenAI configurada"}
-            
-            openai.api_key = api_key
-            
-            logger.debug(f"🔄 Enviando request a OpenAI...")
-            
-            # Realizar llamada a OpenAI
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Eres IANAE, el bibliotecario personal de Lucas. Conoces sus proyectos y forma de trabajar."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+            result = await self.openai.chat(
+                [{"role": "user", "content": prompt}],
+                system="Eres IANAE, el bibliotecario personal de Lucas. Conoces sus proyectos y forma de trabajar.",
                 temperature=self.temperature,
                 max_tokens=self.max_tokens
             )
             
-            content = response.choices[0].message.content
-            
             # Actualizar estado
             self.openai_available = True
             
             return {
                 "success": True,
-                "response": content.strip(),
+                "response": result.text.strip(),
                 "provider": "OpenAI",
-                "model": "gpt-3.5-turbo",
-                "tokens_used": response.usage.total_tokens
+                "model": self.openai_model,
+                "tokens_used": result.total_tokens
             }
             
-        except ImportError:
-            return {"success": False, "error": "Librería openai no instalada"}
-            
-        except Exception as e:
+        except LLMError as e:
             logger.error(f"❌ Error con OpenAI: {e}")
             return {"success": False, "error": str(e)}
     
+    async def stream_intelligent_response(self, user_message: str, concepts: List[Dict],
+                                          relations: List[Dict]) -> AsyncIterator[str]:
+        """
+        Como get_intelligent_response pero entrega el texto según se genera
+        
+        Args:
+            user_message: Pregunta original del usuario
+            concepts: Lista de conceptos encontrados en memoria
+            relations: Lista de relaciones detectadas
+            
+        Yields:
+            Fragmentos de la respuesta (LM Studio, o OpenAI si LM Studio
+            falla antes del primer fragmento)
+            
+        Raises:
+            LLMError: Si ningún LLM está disponible
+        """
+        prompt = self._build_lucas_prompt(user_message, concepts, relations)
+        messages = [{"role": "user", "content": prompt}]
+        system = "Eres IANAE, el bibliotecario personal de Lucas. Responde de forma conversacional y útil."
+        
+        errors = []
+        for provider in (self.lm_studio, self.openai):
+            if not provider.available:
+                continue
+            started = False
+            try:
+                async for token in provider.stream(messages, system=system,
+                                                   temperature=self.temperature,
+                                                   max_tokens=self.max_tokens):
+                    started = True
+                    yield token
+                return
+            except LLMError as e:
+                if started:
+                    raise
+                errors.append(str(e))
+        raise LLMError(f"No hay LLMs disponibles: {'; '.join(errors)}")
+    
+    async def aclose(self):
+        """Cierra las sesiones HTTP de los proveedores en el event loop actual"""
+        await self.lm_studio.aclose()
+        await self.openai.aclose()
+    
     def _build_lucas_prompt(self, user_message: str, concepts: List[Dict], 
                            relations: List[Dict]) -> str:
         """
@@ -346,35 +349,27 @@ Estilo de respuesta:
         }
         
         # Check LM Studio
-        try:
-            response = requests.get(
-                "http://localhost:1234/v1/models", 
-                timeout=5
-            )
-            if response.status_code == 200:
-                models_data = response.json()
-                if models_data.get("data"):
-                    model_name = models_data["data"][0].get("id", "unknown")
-                    status["lm_studio"] = {
-                        "available": True,
-                        "model": model_name,
-                        "endpoint": self.lm_studio_url
-                    }
-                    status["recommended"] = "lm_studio"
-        except Exception as e:
-            status["lm_studio"]["error"] = str(e)
+        lm_status = await self.lm_studio.health_check(timeout=5)
+        # Servidor levantado pero sin modelo cargado: no sirve para responder
+        if lm_status["available"] and lm_status["models"]:
+            status["lm_studio"] = {
+                "available": True,
+                "model": lm_status["models"][0] or "unknown",
+                "endpoint": self.lm_studio_url
+            }
+            status["recommended"] = "lm_studio"
+        elif lm_status["available"]:
+            status["lm_studio"]["error"] = "No hay modelos cargados"
+        else:
+            status["lm_studio"]["error"] = lm_status["error"]
         
         # Check OpenAI
-        try:
-            import os
-            if os.getenv("OPENAI_API_KEY"):
-                status["openai"]["available"] = True
-                if not status["recommended"]:
-                    status["recommended"] = "openai"
-            else:
-                status["openai"]["error"] = "No API key configured"
-        except Exception as e:
-            status["openai"]["error"] = str(e)
+        if self.openai.available:
+            status["openai"]["available"] = True
+            if not status["recommended"]:
+                status["recommended"] = "openai"
+        else:
+            status["openai"]["error"] = "No API key configured"
         
         # Determinar recomendación final
         if not status["recommended"]:
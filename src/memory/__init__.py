@@ -1 +1 @@
-"""IANAE  src/memory"""
+"""IANAE — src/memory"""
@@ -11,6 +11,11 @@ import time
 from typing import List, Dict, Any, Tuple
 import numpy as np
 
+from src.framework.llm.context_builder import ContextBuilder, ContextCandidate, ContextSection
+
+# Presupuesto de tokens del contexto que se envía al LLM
+CONTEXTO_MAX_TOKENS = 800
+
 class IANAEDatabase:
     """
     Base de datos optimizada para IANAE con búsquedas ultrarrápidas
@@ -19,6 +24,13 @@ class IANAEDatabase:
     def __init__(self, db_path='ianae_memoria.db'):
         self.db_path = db_path
         self.conn = None
+        # Fragmentos de contexto cacheados por (updated_at, generación de importación)
+        self._generacion = 0
+        self._constructor_contexto = ContextBuilder(
+            max_tokens=CONTEXTO_MAX_TOKENS,
+            header="MEMORIA PERSONAL DE LUCAS:\n",
+            empty_message="No se encontró contexto relevante en la memoria de Lucas."
+        )
         self._init_database()
     
     def _init_database(self):
@@ -148,7 +160,8 @@ class IANAEDatabase:
             
             print(f"📊 Datos cargados: {len(data.get('conceptos', {}))} conceptos")
             
-            # Importar conceptos
+            # Importar conceptos (invalida los fragmentos de contexto cacheados)
+            self._generacion += 1
             conceptos_importados = self._importar_conceptos(data)
             print(f"✅ Conceptos importados: {conceptos_importados}")
             
@@ -317,9 +330,12 @@ class IANAEDatabase:
                 'contexto': row['contexto'],
                 'fuente': row['fuente'],
                 'palabras_clave': json.loads(row['palabras_clave'] or '[]'),
-                'puntuacion': float(row.get('rank', 1.0)),
+                # rank es el bm25 de FTS5 (menor = mejor): se invierte para que,
+                # como relevancia, una puntuación mayor sea un resultado mejor
+                'puntuacion': -float(row['rank']),
                 'relevancia': row['relevancia'],
-                'activaciones': row['activaciones']
+                'activaciones': row['activaciones'],
+                'updated_at': row['updated_at']
             })
         
         # Si pocos resultados, búsqueda aproximada
@@ -346,7 +362,8 @@ class IANAEDatabase:
             return []
         
         query_sql = f'''
-            SELECT nombre, categoria, contexto, fuente, palabras_clave, relevancia, activaciones
+            SELECT nombre, categoria, contexto, fuente, palabras_clave, relevancia, activaciones,
+                   updated_at
             FROM conceptos
             WHERE {' OR '.join(condiciones)}
             ORDER BY relevancia DESC, activaciones DESC
@@ -366,7 +383,8 @@ class IANAEDatabase:
                 'palabras_clave': json.loads(row['palabras_clave'] or '[]'),
                 'puntuacion': row['relevancia'],
                 'relevancia': row['relevancia'],
-                'activaciones': row['activaciones']
+                'activaciones': row['activaciones'],
+                'updated_at': row['updated_at']
             })
         
         return resultados
@@ -386,7 +404,7 @@ class IANAEDatabase:
         # Buscar conceptos relacionados ordenados por peso
         cursor.execute('''
             SELECT c.nombre, c.categoria, c.contexto, c.fuente, 
-                   c.palabras_clave, r.peso, c.relevancia, c.activaciones
+                   c.palabras_clave, r.peso, c.relevancia, c.activaciones, c.updated_at
             FROM relaciones r
             JOIN conceptos c ON (
                 CASE 
@@ -409,39 +427,59 @@ class IANAEDatabase:
                 'palabras_clave': json.loads(row['palabras_clave'] or '[]'),
                 'peso_relacion': row['peso'],
                 'relevancia': row['relevancia'],
-                'activaciones': row['activaciones']
+                'activaciones': row['activaciones'],
+                'updated_at': row['updated_at']
             })
         
         return relacionados
     
-    def generar_contexto_para_llm(self, conceptos_encontrados: List[Dict]) -> str:
-        """Genera contexto optimizado para el LLM"""
-        if not conceptos_encontrados:
-            return "No se encontró contexto relevante en la memoria de Lucas."
-        
-        contexto_partes = ["MEMORIA PERSONAL DE LUCAS:\n"]
-        
-        for i, concepto in enumerate(conceptos_encontrados[:5], 1):
-            nombre = concepto['concepto']
-            categoria = concepto['categoria']
-            contexto_texto = concepto['contexto']
-            fuente = concepto['fuente']
-            
-            contexto_partes.append(f"\n{i}. {nombre.upper().replace('_', ' ')}")
-            contexto_partes.append(f"   Categoría: {categoria}")
-            if fuente:
-                contexto_partes.append(f"   Fuente: {fuente}")
-            if contexto_texto and len(contexto_texto) > 10:
-                contexto_partes.append(f"   Contexto: {contexto_texto}")
-            
-            # Agregar conceptos relacionados si es relevante
-            if concepto.get('peso_relacion', 0) > 0.5:
-                relacionados = self.obtener_conceptos_relacionados(nombre, 3)
-                if relacionados:
-                    relacionados_nombres = [r['concepto'].replace('_', ' ') for r in relacionados[:2]]
-                    contexto_partes.append(f"   Relacionado: {', '.join(relacionados_nombres)}")
-        
-        return '\n'.join(contexto_partes)
+    def generar_contexto_para_llm(self, conceptos_encontrados: List[Dict],
+                                  max_tokens: int = None) -> str:
+        """
+        Genera contexto optimizado para el LLM
+        
+        Los conceptos se ordenan por puntuación y se incluyen mientras quepan
+        en max_tokens (default: CONTEXTO_MAX_TOKENS). El fragmento de cada
+        concepto, con sus relacionados, se reutiliza entre llamadas mientras
+        no cambie su updated_at.
+        """
+        candidatos = [
+            ContextCandidate(
+                key=concepto['concepto'],
+                score=concepto.get('puntuacion', concepto.get('relevancia', 0.0)),
+                render=lambda concepto=concepto: self._fragmento_contexto(concepto),
+                version=(concepto.get('updated_at'), self._generacion,
+                         concepto.get('peso_relacion', 0) > 0.5) if concepto.get('updated_at') else None
+            )
+            for concepto in conceptos_encontrados
+        ]
+        return self._constructor_contexto.build(
+            ContextSection(candidatos, item_format="\n{n}. {text}", max_items=5),
+            max_tokens=max_tokens
+        )
+    
+    def _fragmento_contexto(self, concepto: Dict) -> str:
+        """Fragmento de contexto de un concepto (sin numerar)"""
+        nombre = concepto['concepto']
+        categoria = concepto['categoria']
+        contexto_texto = concepto['contexto']
+        fuente = concepto['fuente']
+        
+        partes = [nombre.upper().replace('_', ' ')]
+        partes.append(f"   Categoría: {categoria}")
+        if fuente:
+            partes.append(f"   Fuente: {fuente}")
+        if contexto_texto and len(contexto_texto) > 10:
+            partes.append(f"   Contexto: {contexto_texto}")
+        
+        # Agregar conceptos relacionados si es relevante
+        if concepto.get('peso_relacion', 0) > 0.5:
+            relacionados = self.obtener_conceptos_relacionados(nombre, 3)
+            if relacionados:
+                relacionados_nombres = [r['concepto'].replace('_', ' ') for r in relacionados[:2]]
+                partes.append(f"   Relacionado: {', '.join(relacionados_nombres)}")
+        
+        return '\n'.join(partes)
     
     def _mostrar_estadisticas_db(self):
         """Muestra estadísticas de la base de datos"""
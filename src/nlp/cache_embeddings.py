@@ -0,0 +1,265 @@
+# cache_embeddings.py - Cache persistente de embeddings por (modelo, texto normalizado)
+# Scope: src/nlp/ (Worker-NLP)
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Registro del índice: (hash de 64 bits, fila en la matriz)
+_REGISTRO = np.dtype([("hash", "<u8"), ("fila", "<u8")])
+
+
+@contextmanager
+def _bloqueo_exclusivo(ruta: str):
+    """Cerrojo de archivo entre procesos (flock / msvcrt.locking)."""
+    with open(ruta, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class CacheEmbeddings:
+    """
+    Cache de embeddings en dos niveles: LRU acotado en RAM + disco append-only.
+
+    En disco, por modelo:
+      - vectores.f32: matriz float32 (filas, dim) que solo crece, leída vía mmap
+      - indice.bin: registros (hash64(texto normalizado), fila) que solo crecen
+      - meta.json: nombre del modelo y dimensión
+
+    Varios procesos (dashboard, ingesta batch) pueden compartir el directorio:
+    las escrituras se serializan con un cerrojo de archivo y cada proceso lee
+    los registros nuevos del índice cuando no encuentra una clave. Un registro
+    del índice solo se escribe después de su vector, así que nunca apunta a
+    datos incompletos.
+
+    Con ruta_dir=None funciona solo como LRU en memoria.
+    """
+
+    def __init__(self, ruta_dir: Optional[str] = None, nombre_modelo: str = "basico",
+                 max_ram: int = 10000):
+        """
+        Args:
+            ruta_dir: directorio raíz de la cache (None = solo RAM)
+            nombre_modelo: identifica el espacio de embeddings (forma parte de la clave)
+            max_ram: máximo de vectores en el LRU en memoria
+        """
+        self.nombre_modelo = nombre_modelo
+        self.max_ram = max_ram
+        self._lru: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.estadisticas = {"aciertos_ram": 0, "aciertos_disco": 0, "fallos": 0}
+        self._hermanas: Dict[str, "CacheEmbeddings"] = {}
+
+        self.ruta = None
+        self._indice: Dict[int, int] = {}
+        self._offset_indice = 0
+        self._dim: Optional[int] = None
+        self._mmap = None
+        if ruta_dir is not None:
+            slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", nombre_modelo)
+            self.ruta = os.path.join(ruta_dir, slug)
+            os.makedirs(self.ruta, exist_ok=True)
+            self._ruta_vectores = os.path.join(self.ruta, "vectores.f32")
+            self._ruta_indice = os.path.join(self.ruta, "indice.bin")
+            self._ruta_meta = os.path.join(self.ruta, "meta.json")
+            self._ruta_bloqueo = os.path.join(self.ruta, ".lock")
+            self._leer_meta()
+            self._refrescar_indice()
+
+    def para_modelo(self, nombre_modelo: str) -> "CacheEmbeddings":
+        """
+        Cache hermana para otro modelo, en el mismo directorio raíz.
+
+        Se usa cuando el modelo cambia en caliente (p. ej. tras la carga
+        perezosa): cada espacio de embeddings tiene su propia matriz.
+        """
+        if nombre_modelo == self.nombre_modelo:
+            return self
+        with self._lock:
+            if nombre_modelo not in self._hermanas:
+                raiz = os.path.dirname(self.ruta) if self.ruta is not None else None
+                self._hermanas[nombre_modelo] = CacheEmbeddings(raiz, nombre_modelo, self.max_ram)
+            return self._hermanas[nombre_modelo]
+
+    # --- Claves ---
+
+    @staticmethod
+    def normalizar(texto: str) -> str:
+        """Texto normalizado: sin espacios sobrantes y en minúsculas."""
+        return " ".join(texto.split()).lower()
+
+    def clave(self, texto: str) -> int:
+        """Hash de 64 bits de (modelo, texto normalizado)."""
+        datos = f"{self.nombre_modelo}\x00{self.normalizar(texto)}".encode("utf-8")
+        return int.from_bytes(hashlib.blake2b(datos, digest_size=8).digest(), "little")
+
+    # --- Consulta ---
+
+    def __len__(self):
+        with self._lock:
+            if self.ruta is None:
+                return len(self._lru)
+            self._refrescar_indice()
+            return len(self._indice)
+
+    def __contains__(self, texto: str):
+        return self.obtener(texto) is not None
+
+    def obtener(self, texto: str) -> Optional[np.ndarray]:
+        """Embedding cacheado de un texto, o None."""
+        with self._lock:
+            return self._obtener_clave(self.clave(texto))
+
+    def obtener_o_calcular(self, textos: List[str],
+                           calcular: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Devuelve la matriz de embeddings de textos, calculando solo los que faltan.
+
+        Args:
+            textos: textos a codificar
+            calcular: función que codifica una lista de textos en una sola llamada
+
+        Returns:
+            Matriz (len(textos), dim) en el mismo orden que textos
+        """
+        claves = [self.clave(t) for t in textos]
+        with self._lock:
+            encontrados = {k: self._obtener_clave(k) for k in dict.fromkeys(claves)}
+        faltan = {}
+        for texto, k in zip(textos, claves):
+            if encontrados[k] is None and k not in faltan:
+                faltan[k] = texto
+        if faltan:
+            nuevos = np.asarray(calcular(list(faltan.values())), dtype=np.float32)
+            self._guardar_claves(list(faltan), nuevos)
+            for k, vector in zip(faltan, nuevos):
+                encontrados[k] = vector
+        if not textos:
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+        return np.array([encontrados[k] for k in claves])
+
+    def guardar_lote(self, textos: List[str], vectores: np.ndarray):
+        """Añade embeddings a la cache (los ya presentes se ignoran)."""
+        self._guardar_claves([self.clave(t) for t in textos], np.asarray(vectores, dtype=np.float32))
+
+    # --- Internos ---
+
+    def _obtener_clave(self, k: int) -> Optional[np.ndarray]:
+        vector = self._lru.get(k)
+        if vector is not None:
+            self._lru.move_to_end(k)
+            self.estadisticas["aciertos_ram"] += 1
+            return vector
+        if self.ruta is not None:
+            fila = self._indice.get(k)
+            if fila is None:
+                self._refrescar_indice()  # otro proceso pudo añadirla
+                fila = self._indice.get(k)
+            if fila is not None:
+                vector = np.array(self._fila(fila))
+                self._recordar(k, vector)
+                self.estadisticas["aciertos_disco"] += 1
+                return vector
+        self.estadisticas["fallos"] += 1
+        return None
+
+    def _recordar(self, k: int, vector: np.ndarray):
+        self._lru[k] = vector
+        self._lru.move_to_end(k)
+        while len(self._lru) > self.max_ram:
+            self._lru.popitem(last=False)
+
+    def _guardar_claves(self, claves: List[int], vectores: np.ndarray):
+        """Guarda vectores float32 en el LRU y, si hay ruta, en disco."""
+        with self._lock:
+            for k, vector in zip(claves, vectores):
+                self._recordar(k, vector)
+            if self.ruta is None or not len(claves):
+                return
+            with _bloqueo_exclusivo(self._ruta_bloqueo):
+                self._refrescar_indice()
+                if self._dim is None:
+                    self._dim = int(vectores.shape[1])
+                    # Otros procesos leen meta.json sin el cerrojo: escritura atómica
+                    with open(self._ruta_meta + ".tmp", "w", encoding="utf-8") as f:
+                        json.dump({"modelo": self.nombre_modelo, "dim": self._dim}, f)
+                    os.replace(self._ruta_meta + ".tmp", self._ruta_meta)
+                nuevas = {}
+                for k, vector in zip(claves, vectores):
+                    if k not in self._indice and k not in nuevas:
+                        nuevas[k] = vector
+                if not nuevas:
+                    return
+                bytes_fila = self._dim * 4
+                with open(self._ruta_vectores, "ab") as f:
+                    # Descartar una fila a medio escribir por un proceso caído
+                    tam = f.seek(0, os.SEEK_END)
+                    if tam % bytes_fila:
+                        f.truncate(tam - tam % bytes_fila)
+                    primera = f.seek(0, os.SEEK_END) // bytes_fila
+                    f.write(np.asarray(list(nuevas.values()), dtype=np.float32).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                registros = np.zeros(len(nuevas), dtype=_REGISTRO)
+                registros["hash"] = list(nuevas)
+                registros["fila"] = np.arange(primera, primera + len(nuevas))
+                with open(self._ruta_indice, "ab") as f:
+                    # Igual que en vectores: fuera el registro incompleto de un proceso caído
+                    tam = f.seek(0, os.SEEK_END)
+                    if tam % _REGISTRO.itemsize:
+                        f.truncate(tam - tam % _REGISTRO.itemsize)
+                    f.write(registros.tobytes())
+                self._refrescar_indice()
+
+    def _leer_meta(self):
+        if os.path.exists(self._ruta_meta):
+            with open(self._ruta_meta, encoding="utf-8") as f:
+                self._dim = int(json.load(f)["dim"])
+
+    def _refrescar_indice(self):
+        """Incorpora los registros del índice escritos desde la última lectura."""
+        if not os.path.exists(self._ruta_indice):
+            return
+        tam = os.path.getsize(self._ruta_indice)
+        completos = tam - tam % _REGISTRO.itemsize
+        if completos <= self._offset_indice:
+            return
+        with open(self._ruta_indice, "rb") as f:
+            f.seek(self._offset_indice)
+            datos = f.read(completos - self._offset_indice)
+        registros = np.frombuffer(datos, dtype=_REGISTRO)
+        self._indice.update(zip(registros["hash"].tolist(), registros["fila"].tolist()))
+        self._offset_indice = completos
+        if self._dim is None:
+            self._leer_meta()
+
+    def _fila(self, fila: int) -> np.ndarray:
+        if self._mmap is None or fila >= self._mmap.shape[0]:
+            filas = os.path.getsize(self._ruta_vectores) // (self._dim * 4)
+            self._mmap = np.memmap(self._ruta_vectores, dtype=np.float32, mode="r",
+                                   shape=(filas, self._dim))
+        return self._mmap[fila]
@@ -2,9 +2,19 @@
 # Scope: src/nlp/ (Worker-NLP)
 # NO modifica nucleo.py - solo importa ConceptosLucas
 
+import threading
 import numpy as np
 from collections import Counter
-from typing import List, Dict, Tuple, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+MODELO_SENTENCE_TRANSFORMERS = "paraphrase-multilingual-MiniLM-L12-v2"
+
+# Componentes spaCy que usan la extracción (NER, POS, lemas, chunks, oraciones);
+# el resto se desactiva en modo corpus
+COMPONENTES_SPACY_USADOS = {
+    "tok2vec", "transformer", "tagger", "morphologizer", "attribute_ruler",
+    "lemmatizer", "parser", "senter", "ner",
+}
 
 
 class ExtractorConceptos:
@@ -16,17 +26,119 @@ class ExtractorConceptos:
     - sentence-transformers: embeddings semánticos (vectorización)
 
     Fallback: si no hay spaCy/transformers, usa extracción básica con regex+frecuencia.
+
+    Con carga_perezosa=True los modelos no se cargan al construir: se cargan
+    en el primer uso, o antes con calentar_en_segundo_plano(). Mientras un
+    calentamiento en segundo plano está en curso, las llamadas no esperan:
+    usan la extracción básica.
     """
 
-    def __init__(self, modo: str = "auto"):
+    def __init__(self, modo: str = "auto", cache_embeddings=None, carga_perezosa: bool = False):
         """
         Args:
             modo: "spacy", "transformers", "basico", o "auto" (detecta disponibilidad)
+            cache_embeddings: CacheEmbeddings opcional; generar_embedding(s) la consultan
+                antes de codificar y guardan en ella lo que calculan
+            carga_perezosa: diferir la carga de spaCy/sentence-transformers
         """
+        self.modo_solicitado = modo
         self.modo = modo
         self.nlp = None
         self.modelo_embeddings = None
-        self._inicializar(modo)
+        self.cache = cache_embeddings
+        self._lock_carga = threading.Lock()   # serializa la carga de modelos
+        self._lock_estado = threading.Lock()  # transiciones de estado_carga (nunca espera a la carga)
+        self._listo = threading.Event()
+        self._carga_terminada = threading.Event()  # listo o error: libera a quien espera
+        self.error_carga: Optional[Exception] = None
+        if carga_perezosa and modo != "basico":
+            self.modo = "basico"
+            self.estado_carga = "pendiente"
+        else:
+            self._inicializar(modo)
+            self.estado_carga = "listo"
+            self._listo.set()
+            self._carga_terminada.set()
+
+    # --- Carga de modelos ---
+
+    @property
+    def listo(self) -> bool:
+        """True cuando los modelos solicitados ya están cargados."""
+        return self._listo.is_set()
+
+    def calentar(self):
+        """
+        Carga los modelos de forma síncrona (no hace nada si ya están).
+
+        Si la carga falla, estado_carga pasa a "error" (con la excepción en
+        error_carga) y el extractor sigue en modo básico.
+        """
+        with self._lock_carga:
+            if self._listo.is_set():
+                return
+            with self._lock_estado:
+                self.estado_carga = "cargando"
+                self.error_carga = None
+                self._carga_terminada.clear()
+            try:
+                # Cargar en un extractor auxiliar y publicar los modelos de una vez,
+                # para que ninguna llamada concurrente vea una carga a medias
+                cargado = ExtractorConceptos(modo=self.modo_solicitado)
+            except Exception as e:
+                print(f"[NLP] Error cargando modelos, se sigue en modo básico: {e}")
+                with self._lock_estado:
+                    self.estado_carga = "error"
+                    self.error_carga = e
+                    self._carga_terminada.set()
+                return
+            with self._lock_estado:
+                self.modelo_embeddings = cargado.modelo_embeddings
+                self.nlp = cargado.nlp
+                self.modo = cargado.modo
+                self.estado_carga = "listo"
+                self._listo.set()
+                self._carga_terminada.set()
+
+    def calentar_en_segundo_plano(self) -> Optional[threading.Thread]:
+        """
+        Inicia la carga de modelos en un hilo daemon.
+
+        Returns:
+            El hilo de carga, o None si los modelos ya estaban cargados o cargándose
+        """
+        with self._lock_estado:
+            if self.estado_carga != "pendiente":
+                return None
+            self.estado_carga = "cargando"
+        hilo = threading.Thread(target=self.calentar, name="nlp-calentamiento", daemon=True)
+        hilo.start()
+        return hilo
+
+    def esperar_listo(self, timeout: Optional[float] = None) -> bool:
+        """
+        Bloquea hasta que termine la carga de modelos (o venza timeout).
+
+        Returns:
+            True si los modelos quedaron cargados; False si vence el
+            timeout o la carga terminó con error
+        """
+        self._carga_terminada.wait(timeout)
+        return self._listo.is_set()
+
+    def _asegurar_modelos(self):
+        """Carga perezosa en el primer uso, salvo que ya se esté calentando."""
+        if self.estado_carga == "pendiente":
+            self.calentar()
+
+    @property
+    def nombre_modelo(self) -> str:
+        """Identificador del espacio de embeddings en uso (clave de la cache)."""
+        if self.modelo_embeddings:
+            return "st:" + MODELO_SENTENCE_TRANSFORMERS
+        if self.nlp and self.nlp.vocab.vectors.shape[0] > 0:
+            return "spacy:" + self.nlp.meta.get("lang", "") + "_" + self.nlp.meta.get("name", "")
+        return "basico"
 
     def _inicializar(self, modo: str):
         """Detecta e inicializa las bibliotecas disponibles."""
@@ -69,9 +181,7 @@ class ExtractorConceptos:
         """Intenta cargar sentence-transformers."""
         try:
             from sentence_transformers import SentenceTransformer
-            self.modelo_embeddings = SentenceTransformer(
-                "paraphrase-multilingual-MiniLM-L12-v2"
-            )
+            self.modelo_embeddings = SentenceTransformer(MODELO_SENTENCE_TRANSFORMERS)
             print("[NLP] sentence-transformers cargado: paraphrase-multilingual-MiniLM-L12-v2")
         except ImportError:
             pass
@@ -85,13 +195,47 @@ class ExtractorConceptos:
         Returns:
             Lista de dicts: [{"nombre": str, "relevancia": float, "tipo": str}, ...]
         """
+        self._asegurar_modelos()
         if self.nlp:
             return self._extraer_con_spacy(texto, max_conceptos)
         return self._extraer_basico(texto, max_conceptos)
 
+    def analizar_corpus(self, textos: Iterable[str], max_conceptos: int = 10,
+                        batch_size: int = 64, n_process: int = 1
+                        ) -> Iterator[Tuple[str, List[Dict], Optional[Any]]]:
+        """
+        Modo corpus: un único nlp.pipe sobre todo el flujo de textos.
+
+        Cada texto se analiza una sola vez (con los componentes no usados
+        desactivados) y el Doc resultante se devuelve para reutilizarlo en
+        extraer_relaciones. Sin spaCy usa la extracción básica.
+
+        Args:
+            textos: iterable (puede ser perezoso) de textos
+            batch_size: textos por lote de nlp.pipe
+            n_process: procesos de spaCy (-1 = todos los núcleos)
+
+        Yields:
+            (texto, conceptos, doc) en el mismo orden que textos; doc es None sin spaCy
+        """
+        self._asegurar_modelos()
+        if not self.nlp:
+            for texto in textos:
+                yield texto, self._extraer_basico(texto, max_conceptos), None
+            return
+
+        no_usados = [n for n in self.nlp.pipe_names if n not in COMPONENTES_SPACY_USADOS]
+        docs = self.nlp.pipe(((t, t) for t in textos), as_tuples=True,
+                             batch_size=batch_size, n_process=n_process, disable=no_usados)
+        for doc, texto in docs:
+            yield texto, self._conceptos_de_doc(doc, max_conceptos), doc
+
     def _extraer_con_spacy(self, texto: str, max_conceptos: int) -> List[Dict]:
         """Extracción avanzada con spaCy: NER + sustantivos + chunks."""
-        doc = self.nlp(texto)
+        return self._conceptos_de_doc(self.nlp(texto), max_conceptos)
+
+    def _conceptos_de_doc(self, doc, max_conceptos: int) -> List[Dict]:
+        """Candidatos de un Doc ya analizado."""
         candidatos = Counter()
         tipos = {}
 
@@ -181,6 +325,14 @@ class ExtractorConceptos:
         Returns:
             Vector numpy. Dimensión depende del modelo (384 para MiniLM, 300 para spaCy).
         """
+        self._asegurar_modelos()
+        if self.cache is not None:
+            return self.cache.para_modelo(self.nombre_modelo).obtener_o_calcular(
+                [texto], self._codificar
+            )[0]
+        return self._codificar_uno(texto)
+
+    def _codificar_uno(self, texto: str) -> np.ndarray:
         if self.modelo_embeddings:
             embedding = self.modelo_embeddings.encode(texto)
             return np.array(embedding)
@@ -194,28 +346,69 @@ class ExtractorConceptos:
         rng = np.random.RandomState(seed)
         return rng.normal(0, 1, 15)
 
-    def extraer_relaciones(self, texto: str, conceptos: List[Dict]) -> List[Tuple[str, str, float]]:
+    def generar_embeddings(self, textos: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Genera embeddings para varios textos de una vez.
+
+        Con sentence-transformers hace una sola llamada a encode(lista) en
+        vez de una por texto; con spaCy recorre nlp.pipe.
+
+        Returns:
+            Matriz (len(textos), dim) con el mismo resultado que generar_embedding fila a fila.
+        """
+        if not textos:
+            return np.zeros((0, 15))
+
+        self._asegurar_modelos()
+        if self.cache is not None:
+            return self.cache.para_modelo(self.nombre_modelo).obtener_o_calcular(
+                list(textos), lambda faltan: self._codificar(faltan, batch_size)
+            )
+        return self._codificar(textos, batch_size)
+
+    def _codificar(self, textos: List[str], batch_size: int = 64) -> np.ndarray:
+        if self.modelo_embeddings:
+            return np.asarray(self.modelo_embeddings.encode(list(textos), batch_size=batch_size))
+
+        if self.nlp and self.nlp.vocab.vectors.shape[0] > 0:
+            return np.array([doc.vector for doc in self.nlp.pipe(textos, batch_size=batch_size)])
+
+        return np.array([self._codificar_uno(t) for t in textos])
+
+    def extraer_relaciones(self, texto: str, conceptos: List[Dict],
+                           embeddings: Optional[Dict[str, np.ndarray]] = None,
+                           doc=None) -> List[Tuple[str, str, float]]:
         """
         Detecta relaciones entre conceptos extraídos.
 
+        Args:
+            embeddings: embeddings ya calculados por nombre (evita recodificar)
+            doc: Doc de spaCy ya analizado para texto (evita reanalizar)
+
         Returns:
             Lista de (concepto1, concepto2, peso) donde peso ∈ [0, 1]
         """
+        self._asegurar_modelos()
         if self.modelo_embeddings:
-            return self._relaciones_por_similitud(conceptos)
+            return self._relaciones_por_similitud(conceptos, embeddings)
 
         if self.nlp:
-            return self._relaciones_por_dependencias(texto, conceptos)
+            return self._relaciones_por_dependencias(texto, conceptos, doc)
 
         return self._relaciones_por_coocurrencia(texto, conceptos)
 
-    def _relaciones_por_similitud(self, conceptos: List[Dict]) -> List[Tuple[str, str, float]]:
+    def _relaciones_por_similitud(self, conceptos: List[Dict],
+                                  embeddings_previos: Optional[Dict[str, np.ndarray]] = None
+                                  ) -> List[Tuple[str, str, float]]:
         """Calcula relaciones usando similitud coseno de embeddings."""
         nombres = [c["nombre"] for c in conceptos]
         if len(nombres) < 2:
             return []
 
-        embeddings = self.modelo_embeddings.encode(nombres)
+        if embeddings_previos is not None and all(n in embeddings_previos for n in nombres):
+            embeddings = np.array([embeddings_previos[n] for n in nombres])
+        else:
+            embeddings = self.modelo_embeddings.encode(nombres)
 
         # Normalizar para similitud coseno
         norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
@@ -236,9 +429,11 @@ class ExtractorConceptos:
         relaciones.sort(key=lambda x: x[2], reverse=True)
         return relaciones
 
-    def _relaciones_por_dependencias(self, texto: str, conceptos: List[Dict]) -> List[Tuple[str, str, float]]:
+    def _relaciones_por_dependencias(self, texto: str, conceptos: List[Dict],
+                                     doc=None) -> List[Tuple[str, str, float]]:
         """Detecta relaciones usando árbol de dependencias de spaCy."""
-        doc = self.nlp(texto)
+        if doc is None:
+            doc = self.nlp(texto)
         nombres_set = {c["nombre"].lower().replace("_", " ") for c in conceptos}
 
         relaciones = []
@@ -261,31 +456,73 @@ class ExtractorConceptos:
 
         return relaciones
 
-    def _relaciones_por_coocurrencia(self, texto: str, conceptos: List[Dict]) -> List[Tuple[str, str, float]]:
-        """Fallback: relaciones basadas en co-ocurrencia en ventana de texto."""
-        nombres = [c["nombre"].lower() for c in conceptos]
-        palabras = texto.lower().split()
-        ventana = 10
-
-        coocurrencias = Counter()
-        for i, palabra in enumerate(palabras):
-            for nombre in nombres:
-                if nombre in palabra:
-                    ventana_texto = palabras[max(0, i - ventana):i + ventana]
-                    for otro_nombre in nombres:
-                        if otro_nombre != nombre:
-                            if any(otro_nombre in p for p in ventana_texto):
-                                par = tuple(sorted([nombre, otro_nombre]))
-                                coocurrencias[par] += 1
-
-        if not coocurrencias:
+    def _relaciones_por_coocurrencia(self, texto: str, conceptos: List[Dict],
+                                     ventana: int = 10) -> List[Tuple[str, str, float]]:
+        """
+        Fallback: relaciones basadas en co-ocurrencia en ventana de texto.
+
+        Cada aparición de un concepto (nombre contenido en una palabra) cuenta
+        una co-ocurrencia con cada otro concepto presente en las palabras
+        [i - ventana, i + ventana). Una sola pasada lineal: cada palabra
+        distinta se resuelve a ids de concepto una vez, la ventana se desliza
+        sobre las posiciones con conceptos manteniendo sus conteos, y los
+        pares se acumulan como matriz dispersa (códigos a*k+b) que se reduce
+        con np.unique.
+        """
+        import re
+
+        nombres = sorted({c["nombre"].lower() for c in conceptos if c["nombre"]})
+        k = len(nombres)
+        if k < 2:
+            return []
+        patron = re.compile("|".join(re.escape(n) for n in nombres))
+
+        # Posiciones con algún concepto y sus ids (ids ordenados = orden alfabético)
+        ids_por_palabra: Dict[str, Tuple[int, ...]] = {}
+        posiciones, ids_posicion = [], []
+        for pos, palabra in enumerate(texto.lower().split()):
+            ids = ids_por_palabra.get(palabra)
+            if ids is None:
+                ids = ()
+                if patron.search(palabra):
+                    ids = tuple(c for c, nombre in enumerate(nombres) if nombre in palabra)
+                ids_por_palabra[palabra] = ids
+            if ids:
+                posiciones.append(pos)
+                ids_posicion.append(ids)
+
+        # Ventana deslizante: activos[c] = posiciones de la ventana que contienen c
+        activos: Dict[int, int] = {}
+        codigos = []
+        izq = der = 0
+        for pos, ids in zip(posiciones, ids_posicion):
+            while der < len(posiciones) and posiciones[der] < pos + ventana:
+                for c in ids_posicion[der]:
+                    activos[c] = activos.get(c, 0) + 1
+                der += 1
+            while posiciones[izq] < pos - ventana:
+                for c in ids_posicion[izq]:
+                    activos[c] -= 1
+                    if not activos[c]:
+                        del activos[c]
+                izq += 1
+            for a in ids:
+                for b in activos:
+                    if b != a:
+                        codigos.append(a * k + b if a < b else b * k + a)
+
+        if not codigos:
             return []
 
-        max_co = max(coocurrencias.values())
+        pares, primera, conteos = np.unique(np.asarray(codigos, dtype=np.int64),
+                                            return_index=True, return_counts=True)
+        # Mayor conteo primero; empates en orden de primera aparición
+        orden = np.lexsort((primera, -conteos))
+        max_co = int(conteos.max())
         relaciones = []
-        for (c1, c2), count in coocurrencias.most_common():
+        for par, count in zip(pares[orden].tolist(), conteos[orden].tolist()):
             peso = round(count / max_co, 3)
             if peso > 0.1:
-                relaciones.append((c1, c2, peso))
+                relaciones.append((nombres[par // k], nombres[par % k], peso))
 
         return relaciones
@@ -2,9 +2,13 @@
 # Scope: src/nlp/ (Worker-NLP)
 # Importa ConceptosLucas de nucleo.py (NO lo modifica)
 
+import os
+import threading
+
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+from src.nlp.cache_embeddings import CacheEmbeddings
 from src.nlp.extractor import ExtractorConceptos
 
 
@@ -12,35 +16,58 @@ class ReduccionDimensional:
     """
     Reduce embeddings de alta dimensión (384/768) a dim_target (15 por defecto).
 
-    Método: PCA incremental con fallback a proyección aleatoria estable.
+    Método: PCA incremental (media y matriz de dispersión acumuladas por lotes
+    con partial_fit) con fallback a proyección aleatoria estable. Una vez
+    congelada la proyección no cambia, de modo que todos los textos se
+    proyectan al mismo espacio; guardar/cargar la conservan entre reinicios.
     """
 
     def __init__(self, dim_target: int = 15):
         self.dim_target = dim_target
-        self._matriz_proyeccion = None
         self._media = None
         self._componentes = None
+        self._dispersion = None
+        self.n_muestras = 0
+        self.congelado = False
+        self._componentes_al_dia = True
 
-    def ajustar(self, embeddings: np.ndarray):
+    def partial_fit(self, embeddings: np.ndarray):
         """
-        Ajusta la reducción con un conjunto de embeddings.
+        Acumula un lote en las estadísticas de la PCA (no hace nada si está congelada).
 
         Args:
             embeddings: matriz (n_samples, dim_original)
         """
-        n_samples, dim_original = embeddings.shape
-
-        if dim_original <= self.dim_target:
-            # No necesita reducción, solo padding
-            self._matriz_proyeccion = None
+        embeddings = np.asarray(embeddings, dtype=np.float64)
+        if self.congelado or len(embeddings) == 0 or embeddings.shape[1] <= self.dim_target:
             return
-
-        self._media = np.mean(embeddings, axis=0)
-        centrado = embeddings - self._media
-
-        if n_samples >= self.dim_target:
+        n_lote = len(embeddings)
+        media_lote = embeddings.mean(axis=0)
+        centrado = embeddings - media_lote
+        dispersion_lote = centrado.T @ centrado
+
+        if self.n_muestras == 0:
+            self._media = media_lote
+            self._dispersion = dispersion_lote
+        else:
+            # Combinación de momentos de dos poblaciones (Chan et al.)
+            total = self.n_muestras + n_lote
+            delta = media_lote - self._media
+            self._dispersion = (self._dispersion + dispersion_lote +
+                                np.outer(delta, delta) * self.n_muestras * n_lote / total)
+            self._media = self._media + delta * n_lote / total
+        self.n_muestras += n_lote
+        self._componentes_al_dia = False
+
+    def _actualizar_componentes(self):
+        """Recalcula los componentes desde las estadísticas acumuladas."""
+        self._componentes_al_dia = True
+        if self.n_muestras == 0:
+            return
+        dim_original = self._dispersion.shape[0]
+        if self.n_muestras >= self.dim_target:
             # PCA real
-            cov = np.cov(centrado, rowvar=False)
+            cov = self._dispersion / max(self.n_muestras - 1, 1)
             eigenvalues, eigenvectors = np.linalg.eigh(cov)
             # Tomar los dim_target componentes con mayor varianza
             indices = np.argsort(eigenvalues)[::-1][:self.dim_target]
@@ -51,43 +78,134 @@ class ReduccionDimensional:
             self._componentes = rng.normal(0, 1 / np.sqrt(self.dim_target),
                                            (self.dim_target, dim_original))
 
-    def transformar(self, embedding: np.ndarray) -> np.ndarray:
+    def congelar(self):
+        """Fija la proyección actual: partial_fit deja de modificarla."""
+        if not self._componentes_al_dia:
+            self._actualizar_componentes()
+        self.congelado = True
+
+    def ajustar(self, embeddings: np.ndarray):
         """
-        Reduce un embedding a dim_target dimensiones.
+        Ajusta la reducción desde cero con un conjunto de embeddings.
 
         Args:
-            embedding: vector de dim_original
+            embeddings: matriz (n_samples, dim_original)
+        """
+        self._media = None
+        self._componentes = None
+        self._dispersion = None
+        self.n_muestras = 0
+        self.congelado = False
+        self.partial_fit(embeddings)
+        self._actualizar_componentes()
+
+    def transformar_lote(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Reduce una matriz de embeddings con una sola multiplicación.
+
+        Args:
+            embeddings: matriz (n, dim_original)
 
         Returns:
-            Vector de dim_target, normalizado
+            Matriz (n, dim_target) con filas normalizadas
         """
-        if len(embedding) == self.dim_target:
-            return embedding / (np.linalg.norm(embedding) + 1e-10)
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float64))
+        dim_original = embeddings.shape[1]
 
-        if len(embedding) < self.dim_target:
+        if dim_original == self.dim_target:
+            reducido = embeddings
+        elif dim_original < self.dim_target:
             # Padding con ceros
-            padded = np.zeros(self.dim_target)
-            padded[:len(embedding)] = embedding
-            return padded / (np.linalg.norm(padded) + 1e-10)
-
-        if self._componentes is not None:
-            centrado = embedding - self._media if self._media is not None else embedding
-            reducido = self._componentes @ centrado
+            reducido = np.zeros((len(embeddings), self.dim_target))
+            reducido[:, :dim_original] = embeddings
         else:
-            # Fallback: tomar primeros dim_target componentes
-            reducido = embedding[:self.dim_target]
+            if not self._componentes_al_dia:
+                self._actualizar_componentes()
+            if self._componentes is not None:
+                centrado = embeddings - self._media if self._media is not None else embeddings
+                reducido = centrado @ self._componentes.T
+            else:
+                # Fallback: tomar primeros dim_target componentes
+                reducido = embeddings[:, :self.dim_target]
 
         # Normalizar (ConceptosLucas normaliza internamente, pero es buena práctica)
-        norma = np.linalg.norm(reducido)
-        if norma > 0:
-            reducido = reducido / norma
+        normas = np.linalg.norm(reducido, axis=1, keepdims=True)
+        return reducido / np.where(normas > 0, normas, 1.0)
 
-        return reducido
+    def transformar(self, embedding: np.ndarray) -> np.ndarray:
+        """
+        Reduce un embedding a dim_target dimensiones.
+
+        Args:
+            embedding: vector de dim_original
+
+        Returns:
+            Vector de dim_target, normalizado
+        """
+        return self.transformar_lote(np.asarray(embedding)[np.newaxis, :])[0]
 
     def ajustar_y_transformar(self, embeddings: np.ndarray) -> np.ndarray:
         """Ajusta y transforma un batch de embeddings."""
         self.ajustar(embeddings)
-        return np.array([self.transformar(e) for e in embeddings])
+        return self.transformar_lote(embeddings)
+
+    def guardar(self, ruta: str, nombre_modelo: str = ""):
+        """
+        Persiste la proyección y las estadísticas en un .npz.
+
+        Args:
+            ruta: archivo destino
+            nombre_modelo: modelo de embeddings al que corresponde la proyección
+        """
+        if not self._componentes_al_dia:
+            self._actualizar_componentes()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        vacio = np.zeros(0)
+        with open(ruta, "wb") as f:
+            np.savez(
+                f,
+                dim_target=self.dim_target,
+                n_muestras=self.n_muestras,
+                congelado=self.congelado,
+                nombre_modelo=nombre_modelo,
+                media=self._media if self._media is not None else vacio,
+                componentes=self._componentes if self._componentes is not None else vacio,
+                dispersion=self._dispersion if self._dispersion is not None else vacio,
+            )
+
+    @classmethod
+    def cargar(cls, ruta: str, nombre_modelo: Optional[str] = None) -> Optional["ReduccionDimensional"]:
+        """
+        Recupera una proyección guardada.
+
+        Args:
+            ruta: archivo .npz de guardar()
+            nombre_modelo: si se indica y no coincide con el guardado, devuelve None
+
+        Returns:
+            ReduccionDimensional, o None si no existe o es de otro modelo
+        """
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with np.load(ruta) as datos:
+                if nombre_modelo is not None and str(datos["nombre_modelo"]) != nombre_modelo:
+                    return None
+                reductor = cls(dim_target=int(datos["dim_target"]))
+                reductor.n_muestras = int(datos["n_muestras"])
+                reductor.congelado = bool(datos["congelado"])
+                if datos["media"].size:
+                    reductor._media = datos["media"]
+                if datos["componentes"].size:
+                    reductor._componentes = datos["componentes"]
+                if datos["dispersion"].size:
+                    reductor._dispersion = datos["dispersion"]
+            return reductor
+        except Exception as e:
+            print(f"[NLP] Error cargando reducción dimensional: {e}")
+            return None
 
 
 class PipelineNLP:
@@ -101,22 +219,43 @@ class PipelineNLP:
         resultado = pipeline.procesar("Python es un lenguaje versátil para IA")
     """
 
-    def __init__(self, sistema_ianae=None, dim_vector: int = 15, modo_nlp: str = "auto"):
+    def __init__(self, sistema_ianae=None, dim_vector: int = 15, modo_nlp: str = "auto",
+                 ruta_cache_embeddings: Optional[str] = None, max_cache_ram: int = 10000,
+                 ruta_reduccion: Optional[str] = None, muestras_congelar: int = 256,
+                 carga_perezosa: bool = False):
         """
         Args:
             sistema_ianae: instancia de ConceptosLucas (o None para crear nueva)
             dim_vector: dimensión de vectores del sistema IANAE
             modo_nlp: modo del extractor ("auto", "spacy", "transformers", "basico")
+            ruta_cache_embeddings: directorio de la cache persistente de embeddings
+                (None = solo LRU en memoria)
+            max_cache_ram: máximo de embeddings en el LRU en memoria
+            ruta_reduccion: archivo .npz donde persiste la proyección congelada
+            muestras_congelar: conceptos distintos con los que se congela la proyección
+            carga_perezosa: no cargar los modelos del extractor hasta el primer uso
+                (o hasta extractor.calentar_en_segundo_plano())
         """
         self.dim_vector = dim_vector
-        self.extractor = ExtractorConceptos(modo=modo_nlp)
-        self.reductor = ReduccionDimensional(dim_target=dim_vector)
+        self.extractor = ExtractorConceptos(modo=modo_nlp, carga_perezosa=carga_perezosa)
+        self.ruta_reduccion = ruta_reduccion
+        self.muestras_congelar = muestras_congelar
+        self._modelo_reductor = None
+        # Vectores congelados de conceptos del calentamiento, aplicados en la
+        # siguiente inyección (que puede ocurrir en otra hebra, bajo el escritor)
+        self._reproyeccion_pendiente: Dict[str, np.ndarray] = {}
+        self._cerrojo_reproyeccion = threading.Lock()
+        self._reductor_para(self.extractor.nombre_modelo)
         self.sistema = sistema_ianae
-        self._embeddings_cache = {}
+        self._embeddings_cache = CacheEmbeddings(
+            ruta_cache_embeddings, nombre_modelo=self.extractor.nombre_modelo,
+            max_ram=max_cache_ram
+        )
+        self.extractor.cache = self._embeddings_cache
 
     def procesar(self, texto: str, max_conceptos: int = 10,
                  categoria: str = "nlp_extraidos",
-                 umbral_relacion: float = 0.2) -> Dict:
+                 umbral_relacion: float = 0.2, inyectar: bool = True) -> Dict:
         """
         Pipeline completo: texto → conceptos en red IANAE.
 
@@ -125,86 +264,206 @@ class PipelineNLP:
             max_conceptos: máximo de conceptos a extraer
             categoria: categoría para los conceptos en el sistema IANAE
             umbral_relacion: peso mínimo para crear relación
+            inyectar: False para solo extraer y codificar; el resultado se
+                inyecta después con inyectar() (p. ej. bajo el cerrojo de escritura)
 
         Returns:
             Dict con: conceptos, relaciones, embeddings_originales, vectores_reducidos
         """
-        # Paso 1: Extracción de conceptos
-        conceptos = self.extractor.extraer_conceptos(texto, max_conceptos)
-        if not conceptos:
-            return {"conceptos": [], "relaciones": [], "error": "No se extrajeron conceptos"}
-
-        # Paso 2: Generar embeddings (con cache)
-        embeddings_originales = {}
-        for concepto in conceptos:
-            nombre = concepto["nombre"]
-            if nombre in self._embeddings_cache:
-                embedding = self._embeddings_cache[nombre]
-            else:
-                embedding = self.extractor.generar_embedding(nombre)
-                self._embeddings_cache[nombre] = embedding
-            embeddings_originales[nombre] = embedding
+        analizado = list(self.extractor.analizar_corpus([texto], max_conceptos))
+        return self._procesar_lote(analizado, categoria, umbral_relacion, inyectar=inyectar)[0]
 
-        # Paso 3: Reducción dimensional (384/768 → 15)
-        nombres = list(embeddings_originales.keys())
-        matriz_embeddings = np.array([embeddings_originales[n] for n in nombres])
+    def inyectar(self, resultados: Iterable[Dict], categoria: str = "nlp_extraidos") -> int:
+        """
+        Inyecta en el sistema resultados de procesar(..., inyectar=False).
 
-        if matriz_embeddings.shape[1] != self.dim_vector:
-            vectores_reducidos_matriz = self.reductor.ajustar_y_transformar(matriz_embeddings)
-        else:
-            vectores_reducidos_matriz = matriz_embeddings
-
-        vectores_reducidos = {}
-        for i, nombre in enumerate(nombres):
-            vectores_reducidos[nombre] = vectores_reducidos_matriz[i]
-
-        # Paso 4: Extraer relaciones
-        relaciones = self.extractor.extraer_relaciones(texto, conceptos)
-        relaciones_filtradas = [(c1, c2, p) for c1, c2, p in relaciones if p >= umbral_relacion]
-
-        # Paso 5: Inyectar en sistema IANAE (si está disponible)
-        if self.sistema is not None:
-            self._inyectar_en_sistema(conceptos, vectores_reducidos, relaciones_filtradas, categoria)
-
-        return {
-            "conceptos": conceptos,
-            "relaciones": relaciones_filtradas,
-            "embeddings_originales": {k: v.tolist() for k, v in embeddings_originales.items()},
-            "vectores_reducidos": {k: v.tolist() for k, v in vectores_reducidos.items()},
-            "modo": self.extractor.modo,
-            "dim_original": matriz_embeddings.shape[1],
-            "dim_reducida": self.dim_vector
-        }
+        Returns:
+            Número de conceptos inyectados (incluidos los ya existentes)
+        """
+        conceptos, relaciones, vectores = [], [], {}
+        for resultado in resultados:
+            conceptos.extend(resultado.get("conceptos", []))
+            relaciones.extend(tuple(r) for r in resultado.get("relaciones", []))
+            vectores.update((n, np.asarray(v)) for n, v in
+                            resultado.get("vectores_reducidos", {}).items())
+        if self.sistema is None or not conceptos:
+            return 0
+        self._inyectar_en_sistema(conceptos, vectores, relaciones, categoria)
+        return len(conceptos)
+
+    def procesar_batch(self, textos: Iterable[str], max_conceptos: int = 10,
+                       categoria: str = "nlp_extraidos",
+                       umbral_relacion: float = 0.2,
+                       tam_lote: int = 32, batch_size: int = 64,
+                       n_process: int = 1) -> Iterator[Dict]:
+        """
+        Procesa un flujo de textos por lotes, entregando resultados a medida que salen.
+
+        Todo el flujo pasa por un único nlp.pipe (modo corpus del extractor),
+        que analiza cada texto una vez. Por cada lote de tam_lote textos,
+        todos los nombres sin embedding se codifican en una sola llamada,
+        esos embeddings y los Doc se reutilizan para las relaciones y el lote
+        se inyecta de una vez.
+
+        Args:
+            textos: iterable (puede ser perezoso) de textos
+            tam_lote: textos por lote
+            batch_size: batch_size de nlp.pipe y del modelo de embeddings
+            n_process: procesos de spaCy (-1 = todos los núcleos)
+
+        Yields:
+            Un dict por texto, en orden, igual que procesar()
+        """
+        analizados = self.extractor.analizar_corpus(
+            textos, max_conceptos, batch_size=batch_size, n_process=n_process
+        )
+        lote = []
+        for analizado in analizados:
+            lote.append(analizado)
+            if len(lote) >= tam_lote:
+                yield from self._procesar_lote(lote, categoria, umbral_relacion, batch_size)
+                lote = []
+        if lote:
+            yield from self._procesar_lote(lote, categoria, umbral_relacion, batch_size)
+
+    def _procesar_lote(self, analizados: List[Tuple], categoria: str,
+                       umbral_relacion: float, batch_size: int = 64,
+                       inyectar: bool = True) -> List[Dict]:
+        """
+        Procesa un lote ya analizado con una codificación y una inyección.
+
+        Args:
+            analizados: tuplas (texto, conceptos, doc) de ExtractorConceptos.analizar_corpus
+        """
+        nombres_lote = list(dict.fromkeys(
+            c["nombre"] for _, conceptos, _ in analizados for c in conceptos
+        ))
+
+        # Paso 2: Embeddings; los que no están en cache se codifican en una sola llamada
+        embeddings_lote = {}
+        vectores_lote = {}
+        dim_original = self.dim_vector
+        if nombres_lote:
+            matriz_embeddings = self.extractor.generar_embeddings(nombres_lote, batch_size=batch_size)
+            embeddings_lote = dict(zip(nombres_lote, matriz_embeddings))
+            # Con carga perezosa el modelo puede haber cambiado desde el lote anterior
+            self._reductor_para(self.extractor.nombre_modelo)
+
+            # Paso 3: Reducción dimensional (384/768 → 15)
+            dim_original = matriz_embeddings.shape[1]
+            if dim_original != self.dim_vector:
+                self._ajustar_reduccion(nombres_lote, matriz_embeddings)
+                vectores_reducidos_matriz = self.reductor.transformar_lote(matriz_embeddings)
+            else:
+                vectores_reducidos_matriz = matriz_embeddings
+            vectores_lote = dict(zip(nombres_lote, vectores_reducidos_matriz))
+
+        # Paso 4: Extraer relaciones reutilizando los embeddings ya calculados
+        resultados = []
+        conceptos_inyectar, relaciones_inyectar = [], []
+        for texto, conceptos, doc in analizados:
+            if not conceptos:
+                resultados.append({"conceptos": [], "relaciones": [],
+                                   "error": "No se extrajeron conceptos"})
+                continue
+
+            relaciones = self.extractor.extraer_relaciones(
+                texto, conceptos, embeddings=embeddings_lote, doc=doc
+            )
+            relaciones_filtradas = [(c1, c2, p) for c1, c2, p in relaciones if p >= umbral_relacion]
+            conceptos_inyectar.extend(conceptos)
+            relaciones_inyectar.extend(relaciones_filtradas)
+
+            nombres = [c["nombre"] for c in conceptos]
+            resultados.append({
+                "conceptos": conceptos,
+                "relaciones": relaciones_filtradas,
+                "embeddings_originales": {n: embeddings_lote[n].tolist() for n in nombres},
+                "vectores_reducidos": {n: vectores_lote[n].tolist() for n in nombres},
+                "modo": self.extractor.modo,
+                "dim_original": dim_original,
+                "dim_reducida": self.dim_vector
+            })
+
+        # Paso 5: Inyectar el lote en sistema IANAE (si está disponible)
+        if inyectar and self.sistema is not None and conceptos_inyectar:
+            self._inyectar_en_sistema(conceptos_inyectar, vectores_lote,
+                                      relaciones_inyectar, categoria)
+
+        return resultados
+
+    def _reductor_para(self, nombre_modelo: str):
+        """Selecciona la proyección del modelo de embeddings activo (cargándola si existe)."""
+        if nombre_modelo == self._modelo_reductor:
+            return
+        self.reductor = None
+        if self.ruta_reduccion:
+            self.reductor = ReduccionDimensional.cargar(self.ruta_reduccion, nombre_modelo=nombre_modelo)
+        if self.reductor is None or self.reductor.dim_target != self.dim_vector:
+            self.reductor = ReduccionDimensional(dim_target=self.dim_vector)
+        self._calentamiento: Dict[str, np.ndarray] = {}
+        self._modelo_reductor = nombre_modelo
+
+    def _ajustar_reduccion(self, nombres: List[str], embeddings: np.ndarray):
+        """
+        Alimenta la PCA incremental con conceptos nuevos hasta congelarla.
+
+        Mientras no está congelada cada lote se proyecta con la PCA del
+        momento (o la proyección aleatoria si hay pocas muestras); sus
+        embeddings se guardan para reproyectar esos conceptos en el sistema
+        con la proyección definitiva al congelarla (en la siguiente inyección).
+        """
+        if self.reductor.congelado:
+            return
+        nuevos = [i for i, n in enumerate(nombres) if n not in self._calentamiento]
+        if not nuevos:
+            return
+        self.reductor.partial_fit(embeddings[nuevos])
+        self._calentamiento.update((nombres[i], embeddings[i]) for i in nuevos)
+        if self.reductor.n_muestras >= self.muestras_congelar:
+            self.reductor.congelar()
+            calentamiento, self._calentamiento = self._calentamiento, {}
+            if self.ruta_reduccion:
+                self.reductor.guardar(self.ruta_reduccion, self._modelo_reductor)
+            nombres = list(calentamiento)
+            reducidos = self.reductor.transformar_lote(np.array([calentamiento[n] for n in nombres]))
+            with self._cerrojo_reproyeccion:
+                self._reproyeccion_pendiente.update(zip(nombres, reducidos))
+
+    def _reproyectar_en_sistema(self):
+        """
+        Pasa al espacio congelado los conceptos del calentamiento ya presentes
+        en el sistema; los que aún no se inyectaron quedan pendientes.
+        """
+        if not hasattr(self.sistema, "reproyectar_conceptos"):
+            return
+        with self._cerrojo_reproyeccion:
+            pendiente = self._reproyeccion_pendiente
+            nombres = [n for n in pendiente if n in self.sistema.conceptos]
+            vectores = [pendiente.pop(n) for n in nombres]
+        if nombres:
+            self.sistema.reproyectar_conceptos(nombres, np.array(vectores))
 
     def _inyectar_en_sistema(self, conceptos: List[Dict], vectores: Dict[str, np.ndarray],
                               relaciones: List[Tuple], categoria: str):
-        """Inyecta conceptos y relaciones en ConceptosLucas."""
+        """Inyecta conceptos y relaciones en ConceptosLucas con altas en lote."""
         # Registrar nueva categoría si no existe
         if hasattr(self.sistema, "categorias") and categoria not in self.sistema.categorias:
             self.sistema.categorias[categoria] = []
 
-        # Añadir conceptos
-        for concepto in conceptos:
-            nombre = concepto["nombre"]
-            if nombre in vectores:
-                vector = vectores[nombre]
-                # Escalar relevancia como incertidumbre inversa
-                incertidumbre = max(0.05, 0.3 * (1 - concepto["relevancia"]))
-                self.sistema.añadir_concepto(
-                    nombre,
-                    atributos=vector,
-                    incertidumbre=incertidumbre,
-                    categoria=categoria
-                )
+        # Añadir conceptos (escalar relevancia como incertidumbre inversa)
+        con_vector = [c for c in conceptos if c["nombre"] in vectores]
+        if con_vector:
+            self.sistema.añadir_conceptos_lote(
+                [c["nombre"] for c in con_vector],
+                np.array([vectores[c["nombre"]] for c in con_vector]),
+                incertidumbres=[max(0.05, 0.3 * (1 - c["relevancia"])) for c in con_vector],
+                categoria=categoria
+            )
 
         # Añadir relaciones
-        for c1, c2, peso in relaciones:
-            if c1 in self.sistema.conceptos and c2 in self.sistema.conceptos:
-                self.sistema.relacionar(c1, c2, fuerza=peso)
-
-    def procesar_batch(self, textos: List[str], **kwargs) -> List[Dict]:
-        """Procesa múltiples textos."""
-        return [self.procesar(texto, **kwargs) for texto in textos]
+        self.sistema.relacionar_lote(relaciones)
+        self._reproyectar_en_sistema()
 
 
 # --- Función de demostración ---
@@ -149,7 +149,7 @@ def test_pipeline_batch():
         "Docker facilita el despliegue de aplicaciones"
     ]
 
-    resultados = pipeline.procesar_batch(textos, max_conceptos=3)
+    resultados = list(pipeline.procesar_batch(textos, max_conceptos=3))
     assert len(resultados) == 3
     assert all(len(r["conceptos"]) > 0 for r in resultados)
 
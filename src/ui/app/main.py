@@ -16,6 +16,7 @@ import requests
 import asyncio
 import json
 import sys
+import threading
 from datetime import datetime
 from typing import List, Dict, Optional
 import os
@@ -29,8 +30,9 @@ sys.path.insert(0, str(SRC_PATH / "core"))
 import nucleo as _nucleo_module
 sys.modules['nucleo_lucas'] = _nucleo_module  # Alias para emergente.py
 
-from nucleo import ConceptosLucas, crear_universo_lucas
+from nucleo import ConceptosLucas, cargar_universo_lucas
 from emergente import PensamientoLucas
+from concurrencia import SistemaConcurrente, InstantaneaLucas
 
 # NLP Pipeline (optional - funciona con o sin spaCy/transformers)
 _nlp_pipeline = None
@@ -47,6 +49,12 @@ DOCS_SERVICE_URL = "http://localhost:25500"
 DAEMON_LOG_PATH = Path(__file__).parent.parent.parent.parent / "orchestra" / "daemon" / "logs" / "arquitecto.log"
 SNAPSHOTS_DIR = Path(__file__).parent.parent.parent.parent / "data" / "snapshots"
 SNAPSHOTS_DIR.mkdir(parents=True, exist_ok=True)
+# Snapshot binario del universo base: se mapea en memoria en cada arranque
+UNIVERSO_SNAPSHOT_DIR = SNAPSHOTS_DIR / "universo_lucas"
+# Cache de embeddings en disco compartida con los procesos de ingesta
+EMBEDDINGS_CACHE_DIR = SNAPSHOTS_DIR.parent / "cache_embeddings"
+# Cargar spaCy/sentence-transformers en segundo plano al arrancar ("0" = al primer uso)
+PRECALENTAR_NLP = os.environ.get("IANAE_PRECALENTAR_NLP", "1") != "0"
 
 # Static files y templates
 app.mount("/static", StaticFiles(directory=str(Path(__file__).parent / "static")), name="static")
@@ -56,22 +64,72 @@ templates = Jinja2Templates(directory=str(Path(__file__).parent / "templates"))
 
 _ianae_system: Optional[ConceptosLucas] = None
 _ianae_pensamiento: Optional[PensamientoLucas] = None
+# Lectores en paralelo sobre instantáneas por época, un único escritor
+_ianae_concurrente: Optional[SistemaConcurrente] = None
+_ianae_init_lock = threading.Lock()
+_nlp_lock = threading.Lock()
 
 def get_ianae():
     """Obtiene o inicializa el sistema IANAE"""
-    global _ianae_system, _ianae_pensamiento, _nlp_pipeline
+    global _ianae_system, _ianae_pensamiento, _ianae_concurrente, _nlp_pipeline
     if _ianae_system is None:
-        _ianae_system = crear_universo_lucas()
-        _ianae_system.crear_relaciones_lucas()
-        _ianae_pensamiento = PensamientoLucas(_ianae_system)
-        # Inicializar NLP pipeline conectado al sistema
-        if _nlp_available and _nlp_pipeline is None:
-            try:
-                _nlp_pipeline = PipelineNLP(sistema_ianae=_ianae_system, modo_nlp="auto")
-            except Exception as e:
-                print(f"[UI] NLP pipeline no disponible: {e}")
+        with _ianae_init_lock:
+            if _ianae_system is None:
+                sistema = cargar_universo_lucas(str(UNIVERSO_SNAPSHOT_DIR))
+                _ianae_pensamiento = PensamientoLucas(sistema)
+                _ianae_concurrente = SistemaConcurrente(sistema)
+                # Inicializar NLP pipeline conectado al sistema
+                if _nlp_available and _nlp_pipeline is None:
+                    try:
+                        _nlp_pipeline = PipelineNLP(
+                            sistema_ianae=sistema, modo_nlp="auto",
+                            ruta_cache_embeddings=str(EMBEDDINGS_CACHE_DIR),
+                            ruta_reduccion=str(EMBEDDINGS_CACHE_DIR / "reduccion.npz"),
+                            carga_perezosa=True
+                        )
+                    except Exception as e:
+                        print(f"[UI] NLP pipeline no disponible: {e}")
+                _ianae_system = sistema
     return _ianae_system, _ianae_pensamiento
 
+def estado_nlp() -> dict:
+    """Disponibilidad y estado de carga de los modelos NLP"""
+    if _nlp_pipeline is None:
+        return {"disponible": _nlp_available, "listo": False, "estado": "sin_inicializar", "modo": None}
+    extractor = _nlp_pipeline.extractor
+    return {
+        "disponible": True,
+        "listo": extractor.listo,
+        "estado": extractor.estado_carga,
+        "modo": extractor.modo,
+        "modo_solicitado": extractor.modo_solicitado,
+        "error": str(extractor.error_carga) if extractor.error_carga else None,
+    }
+
+def _precalentar():
+    """Inicializa IANAE y lanza la carga de modelos NLP sin bloquear el arranque"""
+    try:
+        get_ianae()
+        if _nlp_pipeline is not None:
+            _nlp_pipeline.extractor.calentar_en_segundo_plano()
+    except Exception as e:
+        print(f"[UI] Precalentamiento fallido: {e}")
+
+@app.on_event("startup")
+async def startup_event():
+    """Arranque: el servidor acepta peticiones mientras los modelos cargan"""
+    if PRECALENTAR_NLP:
+        threading.Thread(target=_precalentar, name="ianae-precalentar", daemon=True).start()
+
+def get_concurrente() -> SistemaConcurrente:
+    """Capa de concurrencia sobre el sistema IANAE (lo inicializa si hace falta)"""
+    get_ianae()
+    return _ianae_concurrente
+
+def red_actual(activaciones: dict = None) -> dict:
+    """Datos de red desde la instantánea de la época actual (seguro en cualquier hilo)"""
+    return build_network_data(get_concurrente().instantanea(), activaciones)
+
 # ==================== WebSocket Manager ====================
 
 class ConnectionManager:
@@ -151,6 +209,9 @@ async def get_status():
     api_metrics = get_api_metrics_from_log()
     status["api_metrics"] = api_metrics
 
+    # Modelos NLP: mientras cargan, process-text usa el extractor básico
+    status["nlp"] = estado_nlp()
+
     return status
 
 @app.get("/api/documents")
@@ -412,13 +473,13 @@ async def websocket_endpoint(websocket: WebSocket):
     try:
         # Enviar estado inicial de IANAE
         try:
-            sistema, _ = get_ianae()
+            instantanea = await asyncio.to_thread(lambda: get_concurrente().instantanea())
             await websocket.send_json({
                 "type": "ianae_status",
                 "data": {
-                    "conceptos": len(sistema.conceptos),
-                    "relaciones": sistema.grafo.number_of_edges(),
-                    "metricas": sistema.metricas
+                    "conceptos": len(instantanea.conceptos),
+                    "relaciones": instantanea.num_aristas(),
+                    "metricas": instantanea.metricas
                 }
             })
         except Exception:
@@ -433,8 +494,7 @@ async def websocket_endpoint(websocket: WebSocket):
 
             elif msg.get("type") == "request_network":
                 try:
-                    sistema, _ = get_ianae()
-                    network = build_network_data(sistema)
+                    network = await asyncio.to_thread(red_actual)
                     await websocket.send_json({
                         "type": "network_update",
                         "data": network
@@ -451,86 +511,111 @@ async def websocket_endpoint(websocket: WebSocket):
 async def get_ianae_network():
     """Obtiene la red de conceptos de IANAE para visualizacion D3.js"""
     try:
-        sistema, _ = get_ianae()
-        return build_network_data(sistema)
+        return await asyncio.to_thread(red_actual)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def conceptos_en_texto(text: str) -> List[str]:
+    """Conceptos existentes mencionados en el texto (Aho-Corasick sobre nombres y alias,
+    con respaldo por palabras y por subcadenas)"""
+    return get_concurrente().buscador_texto().buscar(text)
+
+def _analizar_texto(text: str) -> Optional[dict]:
+    """Extraccion, embeddings y proyeccion NLP de process-text (fuera de la escritura)"""
+    if _nlp_pipeline is None:
+        return None
+    try:
+        # El pipeline no es reentrante; la red sigue disponible mientras tanto
+        with _nlp_lock:
+            return _nlp_pipeline.procesar(text, max_conceptos=8, inyectar=False)
+    except Exception as e:
+        print(f"[UI] NLP pipeline error (fallback a matching): {e}")
+        return None
+
+def _procesar_texto(sistema: ConceptosLucas, profundidad: int, temperatura: float,
+                    conceptos_texto: List[str], nlp_resultado: Optional[dict]) -> dict:
+    """Parte mutante de process-text; se ejecuta dentro de la escritura exclusiva"""
+    conceptos_nlp = []
+
+    # Inyectar los conceptos NLP ya extraidos y codificados
+    if nlp_resultado is not None:
+        try:
+            _nlp_pipeline.inyectar([nlp_resultado], categoria="nlp_extraidos")
+            conceptos_nlp = [c["nombre"] for c in nlp_resultado.get("conceptos", [])]
+        except Exception as e:
+            print(f"[UI] NLP pipeline error (fallback a matching): {e}")
+
+    # Conceptos existentes mencionados en el texto (buscados fuera del cerrojo)
+    conceptos_encontrados = [c for c in conceptos_texto if c in sistema.conceptos]
+
+    # Incluir conceptos NLP recien inyectados
+    for cn in conceptos_nlp:
+        if cn in sistema.conceptos and cn not in conceptos_encontrados:
+            conceptos_encontrados.append(cn)
+
+    if not conceptos_encontrados:
+        conceptos_encontrados = [list(sistema.conceptos.keys())[0]]
+
+    # Activar el concepto principal
+    concepto_principal = conceptos_encontrados[0]
+    resultado = sistema.activar(
+        concepto_principal,
+        pasos=profundidad,
+        temperatura=temperatura
+    )
+
+    if not resultado:
+        return {"concepto_principal": concepto_principal, "resultado": None}
+
+    return {
+        "concepto_principal": concepto_principal,
+        "resultado": resultado,
+        "conceptos_encontrados": conceptos_encontrados,
+        "conceptos_nlp": conceptos_nlp,
+        "mods": sistema.auto_modificar(fuerza=0.1),
+    }
+
+def _escribir(funcion, *args):
+    """Ejecuta funcion(sistema, *args) como único escritor"""
+    with get_concurrente().escritura() as sistema:
+        return funcion(sistema, *args)
+
 @app.post("/api/ianae/process-text")
 async def process_text(input_data: TextInput):
     """Procesa texto activando la red IANAE. Usa pipeline NLP si disponible."""
     try:
-        sistema, pensamiento = get_ianae()
-
         text = input_data.text.strip()
         if not text:
             raise HTTPException(status_code=400, detail="Texto vacio")
 
-        nlp_resultado = None
-        conceptos_nlp = []
-
-        # Intentar procesamiento NLP (extrae conceptos nuevos e inyecta en red)
-        if _nlp_pipeline is not None:
-            try:
-                nlp_resultado = _nlp_pipeline.procesar(
-                    text, max_conceptos=8, categoria="nlp_extraidos"
-                )
-                conceptos_nlp = [c["nombre"] for c in nlp_resultado.get("conceptos", [])]
-            except Exception as e:
-                print(f"[UI] NLP pipeline error (fallback a matching): {e}")
-
-        # Buscar concepto existente mas cercano al texto (para activacion)
-        conceptos_encontrados = []
-        text_lower = text.lower()
-        for nombre in sistema.conceptos:
-            if nombre.lower() in text_lower or text_lower in nombre.lower():
-                conceptos_encontrados.append(nombre)
-
-        if not conceptos_encontrados:
-            for nombre in sistema.conceptos:
-                for palabra in text_lower.split():
-                    if len(palabra) > 2 and palabra in nombre.lower():
-                        conceptos_encontrados.append(nombre)
-                        break
-
-        # Incluir conceptos NLP recien inyectados
-        for cn in conceptos_nlp:
-            if cn in sistema.conceptos and cn not in conceptos_encontrados:
-                conceptos_encontrados.append(cn)
-
-        if not conceptos_encontrados:
-            conceptos_encontrados = [list(sistema.conceptos.keys())[0]]
-
-        # Activar el concepto principal
-        concepto_principal = conceptos_encontrados[0]
-        resultado = sistema.activar(
-            concepto_principal,
-            pasos=input_data.profundidad,
-            temperatura=input_data.temperatura
+        conceptos_texto = await asyncio.to_thread(conceptos_en_texto, text)
+        nlp_resultado = await asyncio.to_thread(_analizar_texto, text)
+        salida = await asyncio.to_thread(
+            _escribir, _procesar_texto, input_data.profundidad, input_data.temperatura,
+            conceptos_texto, nlp_resultado
         )
-
-        if not resultado:
+        concepto_principal = salida["concepto_principal"]
+        if not salida["resultado"]:
             return {"error": "No se pudo activar", "concepto": concepto_principal}
 
-        activaciones = resultado[-1]
+        activaciones = salida["resultado"][-1]
         activos = [
             {"concepto": c, "activacion": round(a, 4)}
             for c, a in sorted(activaciones.items(), key=lambda x: x[1], reverse=True)
             if a > 0.05
         ]
 
-        mods = sistema.auto_modificar(fuerza=0.1)
-        network = build_network_data(sistema, activaciones)
+        network = await asyncio.to_thread(red_actual, activaciones)
 
         response_data = {
             "concepto_activado": concepto_principal,
-            "conceptos_encontrados": conceptos_encontrados,
-            "conceptos_nlp_extraidos": conceptos_nlp,
+            "conceptos_encontrados": salida["conceptos_encontrados"],
+            "conceptos_nlp_extraidos": salida["conceptos_nlp"],
             "nlp_modo": _nlp_pipeline.extractor.modo if _nlp_pipeline else "no_disponible",
             "activaciones": activos[:15],
-            "modificaciones_hebbianas": mods,
+            "modificaciones_hebbianas": salida["mods"],
             "network": network,
-            "metricas": sistema.metricas,
+            "metricas": network["metricas"],
             "timestamp": datetime.now().isoformat()
         }
 
@@ -551,57 +636,91 @@ async def process_text(input_data: TextInput):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/ianae/similares/{concepto}")
+async def get_similares(concepto: str, top_k: int = 5):
+    """Conceptos más similares (lectura sobre la instantánea, sin bloquear escrituras)"""
+    instantanea = await asyncio.to_thread(lambda: get_concurrente().instantanea())
+    if concepto not in instantanea.idx:
+        raise HTTPException(status_code=404, detail=f"Concepto '{concepto}' no existe")
+    similares = await asyncio.to_thread(instantanea.buscar_similares, concepto, top_k)
+    return {
+        "concepto": concepto,
+        "similares": [{"concepto": c, "similitud": round(s, 4)} for c, s in similares],
+        "epoca": instantanea.epoca
+    }
+
+@app.get("/api/ianae/activacion/{concepto}")
+async def get_activacion(concepto: str, pasos: int = 3):
+    """Activación sin ruido y sin efectos secundarios sobre la instantánea actual"""
+    instantanea = await asyncio.to_thread(lambda: get_concurrente().instantanea())
+    if concepto not in instantanea.idx:
+        raise HTTPException(status_code=404, detail=f"Concepto '{concepto}' no existe")
+    resultado = await asyncio.to_thread(instantanea.propagar, concepto, pasos)
+    activos = [
+        {"concepto": c, "activacion": round(a, 4)}
+        for c, a in sorted(resultado[-1].items(), key=lambda x: x[1], reverse=True)
+        if a > 0.05
+    ]
+    return {"concepto": concepto, "activaciones": activos[:15], "epoca": instantanea.epoca}
+
+def _ejecutar_experimento(sistema: ConceptosLucas, name: str, params: dict):
+    """Experimentos IANAE (mutan el sistema); se ejecuta dentro de la escritura exclusiva"""
+    pensamiento = _ianae_pensamiento
+
+    if name == "explorar_proyecto":
+        proyecto = params.get("proyecto", "Tacografos")
+        profundidad = params.get("profundidad", 3)
+        if proyecto not in sistema.conceptos:
+            raise HTTPException(status_code=400, detail=f"Proyecto '{proyecto}' no existe")
+        resultado_texto = sistema.explorar_proyecto(proyecto, profundidad=profundidad)
+        activaciones = sistema.historial_activaciones[-1]["resultado"] if sistema.historial_activaciones else {}
+
+    elif name == "convergencia_proyectos":
+        proyectos = params.get("proyectos", ["Tacografos", "VBA2Python", "RAG_System"])
+        for p in proyectos:
+            if p not in sistema.conceptos:
+                raise HTTPException(status_code=400, detail=f"Proyecto '{p}' no existe")
+        resultado_texto = pensamiento.experimento_convergencia_proyectos(proyectos)
+        activaciones = pensamiento.historial_pensamientos[-1].get("activaciones_convergentes", {}) if pensamiento.historial_pensamientos else {}
+
+    elif name == "detectar_emergencias":
+        umbral = params.get("umbral", 0.3)
+        # Ejecutar algunos ciclos para generar historial
+        if len(sistema.historial_activaciones) < 3:
+            sistema.ciclo_vital(num_ciclos=5, auto_mod=True)
+        resultado_texto = sistema.detectar_emergencias(umbral_emergencia=umbral)
+        activaciones = sistema.historial_activaciones[-1]["resultado"] if sistema.historial_activaciones else {}
+
+    elif name == "ciclo_vital":
+        num_ciclos = params.get("num_ciclos", 10)
+        num_ciclos = min(num_ciclos, 50)
+        resultados_ciclo = sistema.ciclo_vital(num_ciclos=num_ciclos, auto_mod=True)
+        resultado_texto = f"Ejecutados {len(resultados_ciclo)} ciclos vitales.\n"
+        resultado_texto += f"Metricas actualizadas: edad={sistema.metricas['edad']}, "
+        resultado_texto += f"auto_mods={sistema.metricas['auto_modificaciones']}, "
+        resultado_texto += f"ciclos={sistema.metricas['ciclos_pensamiento']}"
+        activaciones = resultados_ciclo[-1]["activacion_final"] if resultados_ciclo else {}
+
+    else:
+        raise HTTPException(status_code=400, detail=f"Experimento '{name}' no existe. Disponibles: explorar_proyecto, convergencia_proyectos, detectar_emergencias, ciclo_vital")
+
+    return resultado_texto, activaciones
+
 @app.post("/api/ianae/experiment/{name}")
 async def run_experiment(name: str, input_data: ExperimentInput):
     """Ejecuta un experimento IANAE"""
     try:
-        sistema, pensamiento = get_ianae()
-        params = input_data.params
-
-        if name == "explorar_proyecto":
-            proyecto = params.get("proyecto", "Tacografos")
-            profundidad = params.get("profundidad", 3)
-            if proyecto not in sistema.conceptos:
-                raise HTTPException(status_code=400, detail=f"Proyecto '{proyecto}' no existe")
-            resultado_texto = sistema.explorar_proyecto(proyecto, profundidad=profundidad)
-            activaciones = sistema.historial_activaciones[-1]["resultado"] if sistema.historial_activaciones else {}
-
-        elif name == "convergencia_proyectos":
-            proyectos = params.get("proyectos", ["Tacografos", "VBA2Python", "RAG_System"])
-            for p in proyectos:
-                if p not in sistema.conceptos:
-                    raise HTTPException(status_code=400, detail=f"Proyecto '{p}' no existe")
-            resultado_texto = pensamiento.experimento_convergencia_proyectos(proyectos)
-            activaciones = pensamiento.historial_pensamientos[-1].get("activaciones_convergentes", {}) if pensamiento.historial_pensamientos else {}
-
-        elif name == "detectar_emergencias":
-            umbral = params.get("umbral", 0.3)
-            # Ejecutar algunos ciclos para generar historial
-            if len(sistema.historial_activaciones) < 3:
-                sistema.ciclo_vital(num_ciclos=5, auto_mod=True)
-            resultado_texto = sistema.detectar_emergencias(umbral_emergencia=umbral)
-            activaciones = sistema.historial_activaciones[-1]["resultado"] if sistema.historial_activaciones else {}
-
-        elif name == "ciclo_vital":
-            num_ciclos = params.get("num_ciclos", 10)
-            num_ciclos = min(num_ciclos, 50)
-            resultados_ciclo = sistema.ciclo_vital(num_ciclos=num_ciclos, auto_mod=True)
-            resultado_texto = f"Ejecutados {len(resultados_ciclo)} ciclos vitales.\n"
-            resultado_texto += f"Metricas actualizadas: edad={sistema.metricas['edad']}, "
-            resultado_texto += f"auto_mods={sistema.metricas['auto_modificaciones']}, "
-            resultado_texto += f"ciclos={sistema.metricas['ciclos_pensamiento']}"
-            activaciones = resultados_ciclo[-1]["activacion_final"] if resultados_ciclo else {}
-
-        else:
-            raise HTTPException(status_code=400, detail=f"Experimento '{name}' no existe. Disponibles: explorar_proyecto, convergencia_proyectos, detectar_emergencias, ciclo_vital")
+        resultado_texto, activaciones = await asyncio.to_thread(
+            _escribir, _ejecutar_experimento, name, input_data.params
+        )
 
-        network = build_network_data(sistema, activaciones)
+        network = await asyncio.to_thread(red_actual, activaciones)
 
         response_data = {
             "experiment": name,
             "resultado": resultado_texto,
             "network": network,
-            "metricas": sistema.metricas,
+            "metricas": network["metricas"],
             "timestamp": datetime.now().isoformat()
         }
 
@@ -611,7 +730,7 @@ async def run_experiment(name: str, input_data: ExperimentInput):
             "data": {
                 "experiment": name,
                 "network": network,
-                "metricas": sistema.metricas
+                "metricas": network["metricas"]
             }
         })
 
@@ -626,12 +745,12 @@ async def run_experiment(name: str, input_data: ExperimentInput):
 async def get_ianae_metricas():
     """Metricas del sistema IANAE"""
     try:
-        sistema, _ = get_ianae()
+        instantanea = await asyncio.to_thread(lambda: get_concurrente().instantanea())
         return {
-            "metricas": sistema.metricas,
-            "conceptos_total": len(sistema.conceptos),
-            "relaciones_total": sistema.grafo.number_of_edges(),
-            "categorias": {k: len(v) for k, v in sistema.categorias.items()},
+            "metricas": instantanea.metricas,
+            "conceptos_total": len(instantanea.conceptos),
+            "relaciones_total": instantanea.num_aristas(),
+            "categorias": {k: len(v) for k, v in instantanea.categorias.items()},
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -641,10 +760,14 @@ async def get_ianae_metricas():
 async def save_snapshot(name: str = "auto"):
     """Guarda un snapshot del estado actual de IANAE"""
     try:
-        sistema, _ = get_ianae()
         filename = f"snapshot_{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         filepath = SNAPSHOTS_DIR / filename
-        if sistema.guardar(str(filepath)):
+
+        def _guardar():
+            with get_concurrente().lectura() as sistema:
+                return sistema.guardar(str(filepath))
+
+        if await asyncio.to_thread(_guardar):
             return {"saved": True, "filename": filename, "path": str(filepath)}
         raise HTTPException(status_code=500, detail="Error guardando snapshot")
     except HTTPException:
@@ -655,23 +778,29 @@ async def save_snapshot(name: str = "auto"):
 @app.post("/api/ianae/snapshot/load")
 async def load_snapshot(filename: str):
     """Carga un snapshot guardado"""
-    global _ianae_system, _ianae_pensamiento
     try:
         filepath = SNAPSHOTS_DIR / filename
         if not filepath.exists():
             raise HTTPException(status_code=404, detail=f"Snapshot '{filename}' no encontrado")
-        loaded = ConceptosLucas.cargar(str(filepath))
+        loaded = await asyncio.to_thread(ConceptosLucas.cargar, str(filepath))
         if loaded is None:
             raise HTTPException(status_code=500, detail="Error cargando snapshot")
-        _ianae_system = loaded
-        _ianae_pensamiento = PensamientoLucas(_ianae_system)
+        def _enlazar():
+            global _ianae_system, _ianae_pensamiento
+            _ianae_system = loaded
+            _ianae_pensamiento = PensamientoLucas(loaded)
+            if _nlp_pipeline is not None:
+                _nlp_pipeline.sistema = loaded
 
+        await asyncio.to_thread(get_concurrente().reemplazar, loaded, al_reemplazar=_enlazar)
+
+        network = await asyncio.to_thread(red_actual)
         await ws_manager.broadcast({
             "type": "snapshot_loaded",
-            "data": build_network_data(_ianae_system)
+            "data": network
         })
 
-        return {"loaded": True, "filename": filename, "conceptos": len(_ianae_system.conceptos)}
+        return {"loaded": True, "filename": filename, "conceptos": len(network["nodes"])}
     except HTTPException:
         raise
     except Exception as e:
@@ -695,8 +824,10 @@ async def list_snapshots():
 
 # ==================== Network Data Builder ====================
 
-def build_network_data(sistema: ConceptosLucas, activaciones: dict = None) -> dict:
-    """Construye datos de red para D3.js"""
+def build_network_data(sistema, activaciones: dict = None) -> dict:
+    """Construye datos de red para D3.js desde una InstantaneaLucas (o un ConceptosLucas)"""
+    if not isinstance(sistema, InstantaneaLucas):
+        sistema = InstantaneaLucas.desde_sistema(sistema)
     colores = {
         'tecnologias': '#FF6B6B',
         'proyectos': '#4ECDC4',
@@ -722,17 +853,10 @@ def build_network_data(sistema: ConceptosLucas, activaciones: dict = None) -> di
             "size": 8 + (activacion * 30) if activacion > 0 else 6 + min(datos['activaciones'], 20)
         })
 
-    links = []
-    seen = set()
-    for u, v, d in sistema.grafo.edges(data=True):
-        key = tuple(sorted([u, v]))
-        if key not in seen:
-            seen.add(key)
-            links.append({
-                "source": u,
-                "target": v,
-                "weight": round(d['weight'], 3)
-            })
+    links = [
+        {"source": u, "target": v, "weight": round(peso, 3)}
+        for u, v, peso in sistema.aristas()
+    ]
 
     return {
         "nodes": nodes,
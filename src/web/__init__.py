@@ -1 +1 @@
-"""IANAE  src/web"""
+"""IANAE — src/web"""
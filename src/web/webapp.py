@@ -16,6 +16,8 @@ from datetime import datetime
 import requests
 import time
 
+from src.framework.llm.context_builder import ContextBuilder, ContextCandidate, ContextSection
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,12 +44,20 @@ CONFIG = {
     "llm_endpoint": "http://localhost:1234/v1/chat/completions",
     "llm_model": "local-model",
     "max_conceptos_busqueda": 8,
+    "max_tokens_contexto": 700,
     "timeout_llm": 60
 }
 
 # Conexión global a BD
 db_conn = None
 
+# Contexto para el LLM: fragmentos por concepto cacheados entre peticiones
+constructor_contexto = ContextBuilder(
+    max_tokens=CONFIG["max_tokens_contexto"],
+    header="MEMORIA PERSONAL DE LUCAS (desde tus 308 conversaciones):\n",
+    empty_message="No se encontró información relevante en tu memoria personal."
+)
+
 class ChatMessage(BaseModel):
     query: str
     conversacion_id: str = "default"
@@ -228,48 +238,60 @@ def obtener_contexto_relacionado(conceptos_principales: list) -> list:
         logger.error(f"❌ Error obteniendo relacionados: {e}")
         return []
 
-def generar_contexto_para_llm(conceptos_principales: list, conceptos_relacionados: list = None) -> str:
-    """Genera contexto rico para el LLM"""
-    if not conceptos_principales:
-        return "No se encontró información relevante en tu memoria personal."
+def _fragmento_concepto(concepto: dict) -> str:
+    """Fragmento de contexto de un concepto principal (sin numerar)"""
+    partes = [concepto['concepto'].replace('_', ' ').title()]
+    partes.append(f"   📁 Categoría: {concepto['categoria']}")
     
-    contexto_partes = [
-        "MEMORIA PERSONAL DE LUCAS (desde tus 308 conversaciones):",
-        ""
-    ]
+    fuente = concepto['fuente']
+    if fuente:
+        fuente_limpio = fuente.replace('.json', '').replace('_', ' ')
+        partes.append(f"   📄 De conversación: {fuente_limpio}")
     
-    # Conceptos principales
-    for i, concepto in enumerate(conceptos_principales[:5], 1):
-        nombre_legible = concepto['concepto'].replace('_', ' ').title()
-        categoria = concepto['categoria']
-        contexto_texto = concepto['contexto']
-        fuente = concepto['fuente']
-        
-        contexto_partes.append(f"{i}. {nombre_legible}")
-        contexto_partes.append(f"   📁 Categoría: {categoria}")
-        
-        if fuente:
-            fuente_limpio = fuente.replace('.json', '').replace('_', ' ')
-            contexto_partes.append(f"   📄 De conversación: {fuente_limpio}")
-        
-        if contexto_texto and len(contexto_texto) > 20:
-            # Limpiar y truncar contexto
-            contexto_limpio = contexto_texto.replace('\n', ' ').strip()
-            if len(contexto_limpio) > 200:
-                contexto_limpio = contexto_limpio[:200] + "..."
-            contexto_partes.append(f"   💡 Contexto: {contexto_limpio}")
-        
-        contexto_partes.append("")
+    contexto_texto = concepto['contexto']
+    if contexto_texto and len(contexto_texto) > 20:
+        # Limpiar y truncar contexto
+        contexto_limpio = contexto_texto.replace('\n', ' ').strip()
+        if len(contexto_limpio) > 200:
+            contexto_limpio = contexto_limpio[:200] + "..."
+        partes.append(f"   💡 Contexto: {contexto_limpio}")
     
-    # Conceptos relacionados si los hay
-    if conceptos_relacionados:
-        contexto_partes.append("CONCEPTOS RELACIONADOS:")
-        for concepto in conceptos_relacionados[:3]:
-            nombre_rel = concepto['concepto'].replace('_', ' ').title()
-            contexto_partes.append(f"• {nombre_rel} ({concepto['categoria']})")
-        contexto_partes.append("")
+    return '\n'.join(partes) + '\n'
+
+def _fragmento_relacionado(concepto: dict) -> str:
+    """Línea de un concepto relacionado"""
+    return f"{concepto['concepto'].replace('_', ' ').title()} ({concepto['categoria']})"
+
+def _candidato_contexto(concepto: dict, render) -> ContextCandidate:
+    """
+    Candidato cacheado por concepto; la versión son los campos que se renderizan.
+
+    La clave es solo el concepto para que no se repita entre secciones; el
+    formato va en la versión, así un fragmento no se sirve con el de otra sección.
+    """
+    return ContextCandidate(
+        key=concepto['concepto'],
+        score=concepto.get('puntuacion', 0.0),
+        render=lambda: render(concepto),
+        version=(render.__name__, concepto['categoria'], concepto['fuente'], concepto['contexto'])
+    )
+
+def generar_contexto_para_llm(conceptos_principales: list, conceptos_relacionados: list = None) -> str:
+    """Genera contexto rico para el LLM dentro del presupuesto de tokens"""
+    if not conceptos_principales:
+        return constructor_contexto.empty_message
     
-    return '\n'.join(contexto_partes)
+    principales = ContextSection(
+        [_candidato_contexto(c, _fragmento_concepto) for c in conceptos_principales],
+        max_items=5
+    )
+    relacionados = ContextSection(
+        [_candidato_contexto(c, _fragmento_relacionado) for c in conceptos_relacionados or []],
+        title="CONCEPTOS RELACIONADOS:",
+        item_format="• {text}",
+        max_items=3
+    )
+    return constructor_contexto.build(principales, relacionados)
 
 def consultar_llm(query: str, contexto: str = "") -> str:
     """Consulta al LLM con contexto de Lucas"""
@@ -0,0 +1,51 @@
+"""Benchmark de busqueda de conceptos en texto con 100k conceptos."""
+import time
+
+import numpy as np
+import pytest
+
+from src.core.automata import BuscadorConceptos
+
+
+@pytest.mark.benchmark
+@pytest.mark.slow
+class TestBenchmarkAutomata:
+
+    def test_100k_conceptos(self):
+        rng = np.random.default_rng(0)
+        letras = list("abcdefghijklmnopqrstuvwxyz")
+        formas = {}
+        while len(formas) < 100_000:
+            forma = "".join(rng.choice(letras, size=int(rng.integers(6, 14))))
+            formas[forma] = forma.capitalize()
+
+        buscador = BuscadorConceptos()
+        start = time.perf_counter()
+        buscador.sincronizar(formas)
+        t_construccion = time.perf_counter() - start
+
+        nombres = list(formas)
+        texto = " ".join(rng.choice(nombres, size=2000)) + " " + "x" * 20_000
+
+        start = time.perf_counter()
+        encontrados = buscador.conceptos_en(texto)
+        t_busqueda = time.perf_counter() - start
+
+        start = time.perf_counter()
+        texto_lower = texto.lower()
+        lineal = [formas[f] for f in nombres if f in texto_lower]
+        t_recorrido = time.perf_counter() - start
+
+        # Alta incremental: un concepto nuevo no reconstruye el automata base
+        formas["conceptonuevo"] = "ConceptoNuevo"
+        start = time.perf_counter()
+        buscador.sincronizar(formas)
+        t_incremental = time.perf_counter() - start
+
+        print(f"\n  construcción: {t_construccion:.2f}s  búsqueda: {t_busqueda * 1000:.1f}ms  "
+              f"recorrido de nombres: {t_recorrido * 1000:.1f}ms  alta incremental: {t_incremental * 1000:.1f}ms")
+        assert set(lineal) <= set(encontrados)
+        assert "ConceptoNuevo" in buscador.conceptos_en("un conceptonuevo")
+        assert buscador.reconstrucciones == 1
+        assert t_busqueda < t_recorrido
+        assert t_incremental < t_construccion / 5
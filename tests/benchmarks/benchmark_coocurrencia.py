@@ -0,0 +1,70 @@
+"""Benchmark de relaciones por co-ocurrencia: pasada lineal vs implementación cuadrática."""
+import time
+
+import numpy as np
+import pytest
+
+from src.nlp.extractor import ExtractorConceptos
+
+
+def _coocurrencia_cuadratica(texto, conceptos, ventana=10):
+    """Versión anterior: palabra x concepto x ventana x concepto con subcadenas."""
+    from collections import Counter
+    nombres = [c["nombre"].lower() for c in conceptos]
+    palabras = texto.lower().split()
+    coocurrencias = Counter()
+    for i, palabra in enumerate(palabras):
+        for nombre in nombres:
+            if nombre in palabra:
+                ventana_texto = palabras[max(0, i - ventana):i + ventana]
+                for otro in nombres:
+                    if otro != nombre and any(otro in p for p in ventana_texto):
+                        coocurrencias[tuple(sorted([nombre, otro]))] += 1
+    return coocurrencias
+
+
+def _texto(n_palabras, conceptos, rng):
+    relleno = [f"palabra{i}" for i in range(2000)]
+    vocab = relleno + conceptos
+    return " ".join(rng.choice(vocab, size=n_palabras))
+
+
+@pytest.mark.benchmark
+@pytest.mark.slow
+class TestBenchmarkCoocurrencia:
+
+    def test_lineal_vs_cuadratica(self):
+        rng = np.random.default_rng(0)
+        nombres = [f"concepto{i}" for i in range(50)]
+        conceptos = [{"nombre": n} for n in nombres]
+        texto = _texto(20_000, nombres, rng)
+        extractor = ExtractorConceptos(modo="basico")
+
+        start = time.perf_counter()
+        _coocurrencia_cuadratica(texto, conceptos)
+        t_cuadratica = time.perf_counter() - start
+
+        start = time.perf_counter()
+        extractor._relaciones_por_coocurrencia(texto, conceptos)
+        t_lineal = time.perf_counter() - start
+
+        print(f"\n  cuadrática: {t_cuadratica:.3f}s  lineal: {t_lineal:.3f}s  "
+              f"({t_cuadratica / max(t_lineal, 1e-9):.0f}x)")
+        assert t_lineal * 10 < t_cuadratica
+
+    def test_texto_multimegabyte_escala_lineal(self):
+        rng = np.random.default_rng(1)
+        nombres = [f"concepto{i}" for i in range(50)]
+        conceptos = [{"nombre": n} for n in nombres]
+        extractor = ExtractorConceptos(modo="basico")
+        tiempos = {}
+        for n_palabras in (200_000, 800_000):
+            texto = _texto(n_palabras, nombres, rng)
+            start = time.perf_counter()
+            relaciones = extractor._relaciones_por_coocurrencia(texto, conceptos)
+            tiempos[n_palabras] = time.perf_counter() - start
+            assert relaciones
+        assert len(texto) > 5_000_000
+        # 4x palabras -> ~4x tiempo (margen para ruido)
+        assert tiempos[800_000] < tiempos[200_000] * 8
+        assert tiempos[800_000] < 30.0, f"Texto de {len(texto)} bytes tardó {tiempos[800_000]:.2f}s"
@@ -0,0 +1,33 @@
+"""Benchmark de fusión masiva de conceptos duplicados."""
+import time
+
+import numpy as np
+import pytest
+
+from src.core.nucleo import ConceptosLucas
+
+
+@pytest.mark.benchmark
+@pytest.mark.slow
+class TestBenchmarkFusion:
+    """Deduplicación de un universo ruidoso de 5000 conceptos (~4 variantes por concepto)."""
+
+    def test_fusion_5000_conceptos(self):
+        rng = np.random.default_rng(0)
+        s = ConceptosLucas(dim_vector=64, incertidumbre_base=0.0)
+        semillas = rng.normal(size=(1250, 64))
+        for i in range(5000):
+            vector = semillas[i % 1250] + rng.normal(0, 0.02, 64)
+            s.añadir_concepto(f'c_{i}', atributos=vector)
+        for i in range(5000):
+            for j in rng.choice(5000, size=10, replace=False):
+                if j != i:
+                    s.relacionar(f'c_{i}', f'c_{j}', fuerza=float(rng.uniform(0.1, 1.0)))
+
+        start = time.perf_counter()
+        stats = s.fusionar_similares(umbral=0.95)
+        elapsed = time.perf_counter() - start
+
+        assert s._n == 1250
+        assert stats['fusionados'] == 3750
+        assert elapsed < 10.0, f"Fusión de 5000 conceptos tardó {elapsed:.3f}s (max 10s)"
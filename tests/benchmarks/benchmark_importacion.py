@@ -0,0 +1,77 @@
+"""Benchmark de importación masiva en la base de datos del framework."""
+import importlib.util
+import logging
+import os
+import sqlite3
+import time
+
+import pytest
+
+_RAIZ = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+def _modulo_database():
+    # src/framework/core/__init__ importa manager, que usa imports planos;
+    # database.py solo depende de la stdlib y se carga directamente
+    ruta = os.path.join(_RAIZ, 'src', 'framework', 'core', 'database.py')
+    spec = importlib.util.spec_from_file_location('framework_database', ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def _conversaciones(n, mensajes=4, version=0):
+    return [{
+        'id': f'conv_{i}',
+        'titulo': f'Conversación {i} v{version}',
+        'plataforma': ('chatgpt', 'claude', 'cline')[i % 3],
+        'timestamp': f'2024-{i % 12 + 1:02d}-01T00:00:00Z',
+        'mensajes': [{
+            'id': f'conv_{i}_m{k}',
+            'role': 'user' if k % 2 == 0 else 'assistant',
+            'content': f'mensaje {k} de la conversación {i} sobre python y opencv v{version}',
+            'timestamp': None
+        } for k in range(mensajes)],
+        'metadata': {'source_file': f'export_{i // 1000}.json'}
+    } for i in range(n)]
+
+
+@pytest.mark.benchmark
+@pytest.mark.slow
+class TestBenchmarkImportacion:
+    """add_conversations_batch con 100k conversaciones (400k mensajes)."""
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        logging.getLogger('framework_database').setLevel(logging.WARNING)
+        return _modulo_database().IANAEDatabase(str(tmp_path / 'importacion.db'))
+
+    def test_importacion_inicial_100k(self, db):
+        conversaciones = _conversaciones(100_000)
+        start = time.perf_counter()
+        stats = db.add_conversations_batch(conversaciones, rebuild_indexes=True)
+        elapsed = time.perf_counter() - start
+
+        assert stats['conversations_added'] == 100_000
+        assert stats['errors'] == 0
+        conn = sqlite3.connect(db.db_path)
+        assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 400_000
+        indices = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert 'idx_messages_conversation' in indices
+        conn.close()
+        assert len(db.search_conversations('opencv', limit=5)) == 5
+        assert elapsed < 60.0, f"Importación de 100k conversaciones tardó {elapsed:.1f}s (max 60s)"
+
+    def test_reimportacion_100k(self, db):
+        db.add_conversations_batch(_conversaciones(100_000), rebuild_indexes=True)
+        # Segunda pasada: la mitad sin cambios, la mitad modificada
+        conversaciones = _conversaciones(100_000, version=1)
+        conversaciones[::2] = _conversaciones(100_000)[::2]
+
+        start = time.perf_counter()
+        stats = db.add_conversations_batch(conversaciones)
+        elapsed = time.perf_counter() - start
+
+        assert stats['conversations_skipped'] == 50_000
+        assert stats['conversations_updated'] == 50_000
+        assert elapsed < 90.0, f"Reimportación de 100k conversaciones tardó {elapsed:.1f}s (max 90s)"
@@ -0,0 +1,36 @@
+"""Benchmark de poda vectorizada sobre grafos de 100k aristas."""
+import time
+
+import numpy as np
+import pytest
+
+from src.core.nucleo import ConceptosLucas
+
+
+def _crear_sistema_denso(n_conceptos, aristas_por_concepto):
+    """Sistema con ~n_conceptos * aristas_por_concepto aristas no dirigidas."""
+    s = ConceptosLucas(dim_vector=15, incertidumbre_base=0.1)
+    for i in range(n_conceptos):
+        s.añadir_concepto(f'c_{i}', atributos=np.random.rand(15))
+    rng = np.random.default_rng(0)
+    for i in range(n_conceptos):
+        for j in rng.choice(n_conceptos, size=aristas_por_concepto, replace=False):
+            if j != i:
+                s.relacionar(f'c_{i}', f'c_{j}', fuerza=float(rng.uniform(0.0, 1.0)))
+    return s
+
+
+@pytest.mark.benchmark
+@pytest.mark.slow
+class TestBenchmarkPoda:
+    """Poda por umbral + límite por concepto en un grafo de ~100k aristas."""
+
+    def test_poda_100k_aristas(self):
+        s = _crear_sistema_denso(5000, 20)
+        start = time.perf_counter()
+        stats = s.podar_conexiones(umbral=0.05, max_por_concepto=10)
+        elapsed = time.perf_counter() - start
+        assert stats['conexiones_antes'] >= 150_000
+        n = s._n
+        assert np.count_nonzero(s._adj[:n, :n], axis=1).max() <= 10
+        assert elapsed < 10.0, f"Poda de 100k aristas tardó {elapsed:.3f}s (max 10s)"
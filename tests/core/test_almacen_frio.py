@@ -0,0 +1,229 @@
+"""Tests para AlmacenFrio y la paginación caliente/frío de ConceptosLucas."""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.core.almacen_frio import AlmacenFrio
+from src.core.nucleo import ConceptosLucas
+from src.core.optimizador import IANAEOptimizado
+
+
+def _registro(valor, conexiones=()):
+    return {
+        'base': np.full(4, valor), 'actual': np.full(4, valor + 0.5),
+        'creado': 0, 'activaciones': 2, 'ultima_activacion': 0, 'fuerza': 1.0,
+        'categoria': 'emergentes', 'conexiones_proyecto': 0,
+        'conexiones': list(conexiones),
+    }
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    return AlmacenFrio(str(tmp_path / "frio"), dim_vector=4)
+
+
+@pytest.fixture
+def sistema_en_niveles(tmp_path):
+    """Cadena A-B-C-D con D y C en el almacén frío."""
+    s = ConceptosLucas(dim_vector=4, incertidumbre_base=0.0)
+    for nombre in 'ABCD':
+        s.añadir_concepto(nombre, atributos=np.random.rand(4))
+    s.relacionar('A', 'B', fuerza=0.9)
+    s.relacionar('B', 'C', fuerza=0.9)
+    s.relacionar('C', 'D', fuerza=0.9)
+    s.almacen_frio = AlmacenFrio(str(tmp_path / "frio"), dim_vector=4)
+    s.expulsar_conceptos(['C', 'D'])
+    return s
+
+
+class TestAlmacenFrio:
+
+    def test_guardar_y_leer(self, almacen):
+        almacen.guardar_lote({'X': _registro(1.0, [('Y', 0.7)])})
+        assert 'X' in almacen and len(almacen) == 1
+        reg = almacen.leer('X')
+        np.testing.assert_array_equal(reg['base'], np.full(4, 1.0))
+        np.testing.assert_array_equal(reg['actual'], np.full(4, 1.5))
+        assert reg['conexiones'] == [('Y', 0.7)]
+        assert reg['activaciones'] == 2
+
+    def test_extraer_marca_muerto_y_persiste(self, almacen, tmp_path):
+        almacen.guardar_lote({'X': _registro(1.0), 'Y': _registro(2.0)})
+        assert almacen.extraer('X') is not None
+        assert 'X' not in almacen
+
+        reabierto = AlmacenFrio(str(tmp_path / "frio"), dim_vector=4)
+        assert reabierto.nombres() == ['Y']
+
+    def test_guardar_no_reescribe_segmentos_previos(self, almacen, tmp_path):
+        almacen.guardar_lote({'X': _registro(1.0)})
+        ruta = os.path.join(str(tmp_path / "frio"), "seg_000001.vec.npy")
+        mtime = os.stat(ruta).st_mtime_ns
+        almacen.guardar_lote({'Y': _registro(2.0)})
+        assert os.stat(ruta).st_mtime_ns == mtime
+        assert len(almacen) == 2
+
+    def test_vecinos_frios(self, almacen):
+        almacen.guardar_lote({'X': _registro(1.0, [('H', 0.5)])})
+        assert almacen.vecinos_frios('H') == {'X'}
+        almacen.extraer('X')
+        assert almacen.vecinos_frios('H') == set()
+
+    def test_compactar(self, almacen):
+        almacen.umbral_compactacion = 1.0  # desactivar compactación automática
+        almacen.guardar_lote({f'c{i}': _registro(float(i)) for i in range(4)})
+        almacen.guardar_lote({'otro': _registro(9.0)})
+        for i in range(3):
+            almacen.extraer(f'c{i}')
+        assert almacen.compactar() == 3
+        assert sorted(almacen.nombres()) == ['c3', 'otro']
+        np.testing.assert_array_equal(almacen.leer('c3')['base'], np.full(4, 3.0))
+
+    def test_compactar_escribe_antes_de_borrar(self, almacen, tmp_path, monkeypatch):
+        almacen.umbral_compactacion = 1.0
+        almacen.guardar_lote({'X': _registro(1.0), 'Y': _registro(2.0)})
+        almacen.extraer('Y')
+
+        def disco_lleno(registros):
+            raise OSError("disco lleno")
+
+        monkeypatch.setattr(almacen, '_escribir_segmento', disco_lleno)
+        with pytest.raises(OSError):
+            almacen.compactar()
+        monkeypatch.undo()
+        np.testing.assert_array_equal(almacen.leer('X')['base'], np.full(4, 1.0))
+        reabierto = AlmacenFrio(str(tmp_path / "frio"), dim_vector=4)
+        assert reabierto.nombres() == ['X']
+
+    def test_segmentos_antiguos_tras_caida_pierden(self, almacen, tmp_path, monkeypatch):
+        almacen.umbral_compactacion = 1.0
+        almacen.guardar_lote({'X': _registro(1.0), 'Y': _registro(2.0)})
+        almacen.extraer('Y')
+        # Caída justo después de escribir el segmento nuevo
+        monkeypatch.setattr(almacen, '_eliminar_segmento', lambda seg_id: None)
+        almacen.compactar()
+        reabierto = AlmacenFrio(str(tmp_path / "frio"), dim_vector=4)
+        assert reabierto.nombres() == ['X']
+        assert reabierto._ubicacion['X'][0] == 2
+
+    def test_compactacion_incremental_acotada(self, almacen):
+        escritas = []
+        original = almacen._escribir_segmento
+
+        def cuenta(registros):
+            escritas.append(len(registros))
+            return original(registros)
+
+        almacen._escribir_segmento = cuenta
+        for i in range(200):  # un segmento pequeño por cada activación sobre presupuesto
+            almacen.guardar_lote({f'c{i}': _registro(float(i))})
+        assert len(almacen) == 200
+        assert len(almacen._segmentos) < 3 * almacen.factor_fusion
+        # Cada fila se reescribe O(log n) veces, no en cada escritura
+        assert sum(escritas) <= 200 * 4
+        assert max(escritas[-5:]) < 200
+
+    def test_importar_json_antiguo(self, almacen, tmp_path):
+        ruta = str(tmp_path / "conceptos_apartados.json")
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump({'X': {'vector': [1.0] * 4, 'actual': [1.0] * 4, 'activaciones': 1,
+                             'creado': 0, 'edad_cuando_apartado': 5,
+                             'conexiones': [['Y', 0.3]]}}, f)
+        assert almacen.importar_json(ruta) == 1
+        assert almacen.leer('X')['conexiones'] == [('Y', 0.3)]
+
+
+class TestPaginacion:
+
+    def test_eliminar_concepto_limpia_todas_las_representaciones(self, sistema_minimo):
+        sistema_minimo.grafo  # construir el grafo para comprobar que se sincroniza
+        reg = sistema_minimo.eliminar_concepto('A')
+        assert reg['conexiones'] == [('B', 0.8)]
+        assert 'A' not in sistema_minimo._idx
+        assert sistema_minimo._n == 2
+        assert all(d != 'A' for d, _ in sistema_minimo.relaciones['B'])
+        assert not sistema_minimo.grafo.has_node('A')
+        i, j = sistema_minimo._idx['B'], sistema_minimo._idx['C']
+        assert sistema_minimo._adj[i, j] == pytest.approx(0.6)
+        assert sistema_minimo.activar('B', pasos=2)
+
+    def test_expulsar_y_activar_concepto_frio(self, sistema_en_niveles):
+        s = sistema_en_niveles
+        assert 'D' not in s.conceptos and 'D' in s.almacen_frio
+        assert s.activar('D', pasos=1)
+        assert 'D' in s.conceptos and 'D' not in s.almacen_frio
+
+    def test_activacion_alcanza_concepto_frio(self, sistema_en_niveles):
+        s = sistema_en_niveles
+        np.random.seed(0)
+        resultados = s.activar('B', pasos=3, temperatura=0.0)
+        assert 'C' in s.conceptos
+        assert 'C' in resultados[-1]
+        i, j = s._idx['B'], s._idx['C']
+        assert s._adj[i, j] == pytest.approx(0.9)
+
+    def test_paginar_no_infla_contadores_de_conexion(self, tmp_path):
+        s = ConceptosLucas(dim_vector=4, incertidumbre_base=0.0)
+        for nombre in 'abc':
+            s.añadir_concepto(nombre, atributos=np.random.rand(4))
+        s.relacionar('a', 'b', fuerza=0.5)
+        s.relacionar('a', 'c', fuerza=0.5)
+        s.almacen_frio = AlmacenFrio(str(tmp_path / "frio"), dim_vector=4)
+        antes = {n: s.conceptos[n]['conexiones_proyecto'] for n in 'abc'}
+        for _ in range(3):
+            s.expulsar_conceptos(['a'])
+            s.paginar_conceptos(['a'])
+        assert {n: s.conceptos[n]['conexiones_proyecto'] for n in 'abc'} == antes == \
+            {'a': 2, 'b': 1, 'c': 1}
+
+    def test_conexion_entre_frios_se_recupera(self, sistema_en_niveles):
+        s = sistema_en_niveles
+        s.paginar_conceptos(['C'])
+        s.paginar_conceptos(['D'])
+        assert s._adj[s._idx['C'], s._idx['D']] == pytest.approx(0.9)
+
+    @pytest.mark.parametrize("orden", [['A', 'B'], ['B', 'A']])
+    def test_conexion_expulsada_en_lotes_distintos(self, tmp_path, orden):
+        """A y B expulsados por separado: la arista A-B vuelve en cualquier orden."""
+        s = ConceptosLucas(dim_vector=4, incertidumbre_base=0.0)
+        for nombre in 'ABC':
+            s.añadir_concepto(nombre, atributos=np.random.rand(4))
+        s.relacionar('A', 'B', fuerza=0.7)
+        s.relacionar('B', 'C', fuerza=0.4)
+        s.almacen_frio = AlmacenFrio(str(tmp_path / "frio"), dim_vector=4)
+        s.expulsar_conceptos(['A'])
+        s.expulsar_conceptos(['B'])
+
+        for nombre in orden:
+            s.paginar_conceptos([nombre])
+        assert s._adj[s._idx['A'], s._idx['B']] == pytest.approx(0.7)
+        assert s._adj[s._idx['B'], s._idx['A']] == pytest.approx(0.7)
+        assert s._adj[s._idx['B'], s._idx['C']] == pytest.approx(0.4)
+
+    def test_aristas_hacia(self, almacen):
+        almacen.guardar_lote({'X': _registro(1.0, [('H', 0.5), ('Y', 0.2)])})
+        assert almacen.aristas_hacia('H') == [('X', 0.5)]
+        assert almacen.aristas_hacia('Z') == []
+
+    def test_presupuesto_expulsa_lru(self, tmp_path):
+        s = ConceptosLucas(dim_vector=4, incertidumbre_base=0.0)
+        s.almacen_frio = AlmacenFrio(str(tmp_path / "frio"), dim_vector=4)
+        for i, nombre in enumerate('ABCDE'):
+            s.añadir_concepto(nombre, atributos=np.random.rand(4))
+            s.conceptos[nombre]['ultima_activacion'] = i
+        s.max_conceptos_calientes = 3
+        expulsados = s.aplicar_presupuesto(protegidos=['A'])
+        assert sorted(expulsados) == ['B', 'C']
+        assert s._n == 3
+        assert set(s.almacen_frio.nombres()) == {'B', 'C'}
+
+
+def test_optimizador_presupuesto_opcional(tmp_path):
+    sin_presupuesto = IANAEOptimizado(dim_vector=4, ruta_temp=str(tmp_path / "a"))
+    assert sin_presupuesto.sistema.max_conceptos_calientes is None
+    assert sin_presupuesto.sistema.aplicar_presupuesto() == []
+    con_presupuesto = IANAEOptimizado(dim_vector=4, ruta_temp=str(tmp_path / "b"),
+                                      max_conceptos_ram=3)
+    assert con_presupuesto.sistema.max_conceptos_calientes == 3
@@ -0,0 +1,140 @@
+"""Tests de arranque en frío: imports perezosos y snapshot binario del universo."""
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from src.core import nucleo
+from src.core.nucleo import ConceptosLucas, cargar_universo_lucas
+
+RAIZ = os.path.join(os.path.dirname(__file__), '..', '..')
+
+# Presupuesto generoso para CI; en local el import ronda la décima de segundo
+PRESUPUESTO_IMPORT_S = 1.0
+
+
+def _medir_import(modulo):
+    """Importa un módulo en un intérprete limpio y devuelve (segundos, módulos pesados)."""
+    codigo = (
+        "import sys, time\n"
+        "t = time.perf_counter()\n"
+        f"import {modulo}\n"
+        "dt = time.perf_counter() - t\n"
+        "pesados = [m for m in ('matplotlib', 'networkx', 'psutil') if m in sys.modules]\n"
+        "print(dt, ','.join(pesados))\n"
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=RAIZ,
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(salida[0]), (salida[1].split(',') if len(salida) > 1 else [])
+
+
+@pytest.mark.parametrize("modulo", ["src.core.nucleo", "src.core.optimizador"])
+def test_import_no_carga_librerias_pesadas(modulo):
+    """Importar el núcleo no arrastra matplotlib, networkx ni psutil."""
+    _, pesados = _medir_import(modulo)
+    assert pesados == []
+
+
+def test_import_nucleo_dentro_de_presupuesto():
+    dt, _ = _medir_import("src.core.nucleo")
+    assert dt < PRESUPUESTO_IMPORT_S, f"import src.core.nucleo tardó {dt:.3f}s"
+
+
+def test_grafo_se_construye_bajo_demanda(sistema_minimo):
+    assert sistema_minimo._grafo is None
+    assert sistema_minimo.grafo.number_of_edges() == 2
+    assert sistema_minimo.grafo['A']['B']['weight'] == pytest.approx(0.8)
+    # Tras construirse, el grafo sigue sincronizado con relacionar
+    sistema_minimo.relacionar('A', 'C', fuerza=0.4)
+    assert sistema_minimo.grafo.has_edge('A', 'C')
+
+
+class TestSnapshotBinario:
+
+    def test_guardar_y_cargar_roundtrip(self, sistema_poblado, tmp_path):
+        ruta = str(tmp_path / "universo")
+        assert sistema_poblado.guardar_binario(ruta)
+
+        cargado = ConceptosLucas.cargar_binario(ruta)
+        assert cargado is not None
+        assert set(cargado.conceptos) == set(sistema_poblado.conceptos)
+        n = sistema_poblado._n
+        np.testing.assert_array_equal(cargado._adj, sistema_poblado._adj[:n, :n])
+        np.testing.assert_array_equal(cargado._vec_actual, sistema_poblado._vec_actual[:n])
+        assert cargado.categorias == sistema_poblado.categorias
+        assert cargado.grafo.number_of_edges() == sistema_poblado.grafo.number_of_edges()
+
+    def test_cargar_usa_mmap(self, sistema_minimo, tmp_path):
+        ruta = str(tmp_path / "universo")
+        sistema_minimo.guardar_binario(ruta)
+        cargado = ConceptosLucas.cargar_binario(ruta, mmap=True)
+        assert isinstance(cargado._adj, np.memmap)
+
+    def test_sistema_cargado_es_mutable(self, sistema_minimo, tmp_path):
+        """Activar, auto-modificar y añadir conceptos no toca el fichero."""
+        ruta = str(tmp_path / "universo")
+        sistema_minimo.guardar_binario(ruta)
+        adj_original = np.load(os.path.join(ruta, 'adj.npy')).copy()
+
+        cargado = ConceptosLucas.cargar_binario(ruta)
+        assert cargado.activar('A', pasos=2)
+        cargado.relacionar('A', 'C', fuerza=0.9)
+        cargado.añadir_concepto('D', atributos=np.ones(15))
+        cargado.relacionar('D', 'A', fuerza=0.5)
+
+        assert cargado._adj[cargado._idx['D'], cargado._idx['A']] == 0.5
+        np.testing.assert_array_equal(np.load(os.path.join(ruta, 'adj.npy')), adj_original)
+
+    def test_eliminar_tras_cargar_conserva_vectores(self, sistema_minimo, tmp_path):
+        """Los vectores del dict son copias: el swap al eliminar no los pisa."""
+        ruta = str(tmp_path / "universo")
+        sistema_minimo.guardar_binario(ruta)
+        cargado = ConceptosLucas.cargar_binario(ruta)
+        esperado = cargado.conceptos['C']['actual'].copy()
+
+        cargado.eliminar_concepto('A')
+
+        np.testing.assert_array_equal(cargado.conceptos['C']['actual'], esperado)
+        np.testing.assert_array_equal(cargado._vec_actual[cargado._idx['C']], esperado)
+        assert np.any(cargado.conceptos['C']['base'])
+
+    def test_busqueda_espacial_tras_cargar(self, sistema_poblado, tmp_path):
+        ruta = str(tmp_path / "universo")
+        sistema_poblado.guardar_binario(ruta)
+        cargado = ConceptosLucas.cargar_binario(ruta)
+        assert len(cargado.buscar_por_similitud_coseno('Python', top_k=3)) == 3
+
+    def test_cargar_inexistente(self, tmp_path):
+        assert ConceptosLucas.cargar_binario(str(tmp_path / "no_existe")) is None
+
+    def test_cargar_universo_crea_y_reutiliza(self, tmp_path):
+        ruta = str(tmp_path / "universo")
+        creado = cargar_universo_lucas(ruta)
+        assert os.path.exists(os.path.join(ruta, 'meta.json'))
+        reutilizado = cargar_universo_lucas(ruta)
+        assert isinstance(reutilizado._adj, np.memmap)
+        assert set(reutilizado.conceptos) == set(creado.conceptos)
+
+    def test_cargar_universo_reconstruye_si_cambia_la_definicion(self, tmp_path, monkeypatch):
+        ruta = str(tmp_path / "universo")
+        cargar_universo_lucas(ruta)
+        with open(os.path.join(ruta, 'meta.json'), encoding='utf-8') as f:
+            assert json.load(f)['definicion'] == nucleo.definicion_universo_lucas()
+
+        monkeypatch.setattr(nucleo, 'definicion_universo_lucas', lambda: 'otra')
+        creados = []
+        original = nucleo.crear_universo_lucas
+        monkeypatch.setattr(nucleo, 'crear_universo_lucas',
+                            lambda: creados.append(1) or original())
+        reconstruido = cargar_universo_lucas(ruta)
+        assert creados == [1]
+        assert not isinstance(reconstruido._adj, np.memmap)
+        with open(os.path.join(ruta, 'meta.json'), encoding='utf-8') as f:
+            assert json.load(f)['definicion'] == 'otra'
+        assert isinstance(cargar_universo_lucas(ruta)._adj, np.memmap)
+        assert creados == [1]
@@ -0,0 +1,127 @@
+"""Tests para el automata Aho-Corasick de busqueda de conceptos en texto."""
+import numpy as np
+import pytest
+
+from src.core.automata import AutomataAhoCorasick, BuscadorConceptos
+from src.core.concurrencia import SistemaConcurrente
+from src.core.nucleo import ConceptosLucas
+
+
+def _fuerza_bruta(formas, texto):
+    return sorted((i + len(f), fid) for fid, f in enumerate(formas)
+                  for i in range(len(texto)) if texto.startswith(f, i))
+
+
+def test_automata_encuentra_todas_las_apariciones():
+    formas = ["he", "she", "his", "hers", "python", "py", "thon"]
+    automata = AutomataAhoCorasick(formas)
+    texto = "ushers y python: shepython"
+    assert sorted(automata.buscar(texto)) == _fuerza_bruta(formas, texto)
+
+
+def test_automata_equivale_a_fuerza_bruta_aleatorio():
+    rng = np.random.default_rng(0)
+    formas = list(dict.fromkeys("".join(rng.choice(list("abc"), size=rng.integers(1, 5)))
+                                for _ in range(40)))
+    texto = "".join(rng.choice(list("abcd"), size=500))
+    automata = AutomataAhoCorasick(formas)
+    assert sorted(automata.buscar(texto)) == _fuerza_bruta(formas, texto)
+
+
+def test_automata_vacio():
+    assert list(AutomataAhoCorasick([]).buscar("texto")) == []
+
+
+def test_buscador_orden_y_palabras_completas():
+    buscador = BuscadorConceptos()
+    buscador.sincronizar({"python": "Python", "opencv": "OpenCV", "red": "Red"})
+    texto = "OpenCV con Python en redes"
+    assert buscador.conceptos_en(texto) == ["OpenCV", "Python", "Red"]
+    assert buscador.conceptos_en(texto, palabras_completas=True) == ["OpenCV", "Python"]
+    assert buscador.coincidencias("PYTHON") == [(0, 6, "Python")]
+
+
+def test_buscador_incremental_equivale_a_reconstruir():
+    buscador = BuscadorConceptos(max_delta=100)
+    formas = {f"concepto{i}": f"C{i}" for i in range(50)}
+    buscador.sincronizar(formas)
+    assert buscador.reconstrucciones == 0  # 50 cambios caben en el delta
+
+    formas = dict(formas)
+    del formas["concepto3"]
+    formas["concepto7"] = "Otro"            # misma forma, otro concepto
+    formas["nuevo"] = "Nuevo"
+    buscador.sincronizar(formas)
+    texto = "concepto3 concepto7 nuevo concepto12"
+
+    fresco = BuscadorConceptos()
+    fresco.sincronizar(formas)
+    fresco._reconstruir()
+    assert buscador.coincidencias(texto) == fresco.coincidencias(texto)
+    assert "C3" not in buscador.conceptos_en(texto)
+    assert "Otro" in buscador.conceptos_en(texto)
+
+
+def test_buscador_reconstruye_cuando_el_delta_crece():
+    buscador = BuscadorConceptos(max_delta=10, fraccion_delta=0.0)
+    buscador.sincronizar({f"f{i}": f"C{i}" for i in range(20)})
+    assert buscador.reconstrucciones == 1
+    assert not buscador.sincronizar({f"f{i}": f"C{i}" for i in range(20)})
+    assert buscador.conceptos_en("f5 f19", palabras_completas=True) == ["C5", "C19"]
+
+
+def test_buscador_por_componentes():
+    buscador = BuscadorConceptos()
+    buscador.sincronizar({"docker_compose": "Docker_Compose", "docker compose": "Docker_Compose"})
+    assert buscador.conceptos_por_palabra("usar docker") == ["Docker_Compose"]
+    buscador.sincronizar({"docker compose": "Docker_Compose"})
+    assert buscador.conceptos_por_palabra("usar docker") == ["Docker_Compose"]
+    buscador.sincronizar({})
+    assert buscador.conceptos_por_palabra("usar docker") == []
+
+
+def test_buscar_con_respaldo_por_subcadena():
+    buscador = BuscadorConceptos()
+    buscador.sincronizar({"tacografos": "Tacografos", "lm_studio": "LM_Studio",
+                          "memory_system": "Memory_System", "python": "Python"})
+    assert buscador.buscar("python y tacografos") == ["Python", "Tacografos"]
+    assert buscador.buscar("tacografo") == ["Tacografos"]
+    assert buscador.buscar("lm studio") == ["LM_Studio"]
+    assert buscador.buscar("memory") == ["Memory_System"]
+    assert buscador.buscar("ninguno") == []
+    assert buscador.conceptos_por_subcadena("un tacografo nuevo") == ["Tacografos"]
+
+
+@pytest.fixture
+def sistema():
+    s = ConceptosLucas(dim_vector=4, incertidumbre_base=0.0)
+    for nombre in ("Python", "OpenCV", "Tacógrafos"):
+        s.añadir_concepto(nombre, atributos=np.random.rand(4))
+    return s
+
+
+def test_alias_y_formas_textuales(sistema, tmp_path):
+    assert sistema.añadir_alias("Tacógrafos", "tacografo")
+    assert not sistema.añadir_alias("Python", "tacografo")  # ya es de otro concepto
+    assert not sistema.añadir_alias("Inexistente", "x")
+    formas = sistema.formas_textuales()
+    assert formas["python"] == "Python"
+    assert formas["tacografo"] == "Tacógrafos"
+
+    ruta = str(tmp_path / "estado.json")
+    sistema.guardar(ruta)
+    assert ConceptosLucas.cargar(ruta).alias == {"tacografo": "Tacógrafos"}
+    sistema.guardar_binario(str(tmp_path / "snap"))
+    assert ConceptosLucas.cargar_binario(str(tmp_path / "snap")).alias == {"tacografo": "Tacógrafos"}
+
+
+def test_sistema_concurrente_sincroniza_por_epoca(sistema):
+    concurrente = SistemaConcurrente(sistema)
+    assert concurrente.conceptos_en_texto("Python y opencv") == ["Python", "OpenCV"]
+    with concurrente.escritura() as s:
+        s.añadir_concepto("NumPy", atributos=np.random.rand(4))
+        s.añadir_alias("Tacógrafos", "tacografo")
+        s.eliminar_concepto("OpenCV")
+    assert concurrente.conceptos_en_texto("numpy, opencv y un tacografo") == ["NumPy", "Tacógrafos"]
+    buscador = concurrente.buscador_texto()
+    assert concurrente.buscador_texto() is buscador
@@ -0,0 +1,132 @@
+"""Tests para la capa de concurrencia (cerrojo RW + instantáneas por época)."""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.core.concurrencia import CerrojoLecturaEscritura, InstantaneaLucas, SistemaConcurrente
+
+
+@pytest.fixture
+def concurrente(sistema_minimo):
+    return SistemaConcurrente(sistema_minimo)
+
+
+class TestCerrojo:
+
+    def test_lectores_simultaneos(self):
+        cerrojo = CerrojoLecturaEscritura()
+        dentro = []
+        barrera = threading.Barrier(3, timeout=2)
+
+        def leer():
+            with cerrojo.lectura():
+                dentro.append(1)
+                barrera.wait()  # los tres lectores deben coincidir dentro
+
+        hilos = [threading.Thread(target=leer) for _ in range(3)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join(timeout=3)
+        assert len(dentro) == 3
+
+    def test_escritor_excluye_lectores(self):
+        cerrojo = CerrojoLecturaEscritura()
+        eventos = []
+
+        def leer():
+            with cerrojo.lectura():
+                eventos.append('lectura')
+
+        with cerrojo.escritura():
+            hilo = threading.Thread(target=leer)
+            hilo.start()
+            time.sleep(0.05)
+            eventos.append('fin_escritura')
+        hilo.join(timeout=2)
+        assert eventos == ['fin_escritura', 'lectura']
+
+
+class TestInstantaneas:
+
+    def test_instantanea_aislada_de_escrituras(self, concurrente):
+        antes = concurrente.instantanea()
+        with concurrente.escritura() as sistema:
+            sistema.relacionar('A', 'C', fuerza=0.5)
+        despues = concurrente.instantanea()
+        assert despues is not antes
+        assert despues.epoca == antes.epoca + 1
+        assert antes.adj[antes.idx['A'], antes.idx['C']] == 0
+        assert despues.adj[despues.idx['A'], despues.idx['C']] == pytest.approx(0.5)
+
+    def test_instantanea_reutilizada_sin_escrituras(self, concurrente):
+        assert concurrente.instantanea() is concurrente.instantanea()
+
+    def test_instantanea_es_inmutable(self, concurrente):
+        with pytest.raises(ValueError):
+            concurrente.instantanea().adj[0, 1] = 1.0
+
+    def test_propagar_equivale_a_activar_sin_ruido(self, sistema_minimo):
+        instantanea = InstantaneaLucas.desde_sistema(sistema_minimo)
+        activaciones_antes = sistema_minimo.conceptos['A']['activaciones']
+        esperado = instantanea.propagar('A', pasos=3)
+        assert sistema_minimo.conceptos['A']['activaciones'] == activaciones_antes
+        obtenido = sistema_minimo.activar('A', pasos=3, temperatura=0.0)
+        for paso_e, paso_o in zip(esperado, obtenido):
+            for nombre in paso_e:
+                assert paso_e[nombre] == pytest.approx(paso_o[nombre])
+
+    def test_buscar_similares_igual_que_sistema(self, sistema_minimo):
+        instantanea = InstantaneaLucas.desde_sistema(sistema_minimo)
+        assert [c for c, _ in instantanea.buscar_similares('A', top_k=2)] == \
+               [c for c, _ in sistema_minimo.buscar_similares('A', top_k=2)]
+
+    def test_aristas(self, sistema_minimo):
+        instantanea = InstantaneaLucas.desde_sistema(sistema_minimo)
+        aristas = {frozenset((u, v)): p for u, v, p in instantanea.aristas()}
+        assert aristas == {frozenset(('A', 'B')): pytest.approx(0.8),
+                           frozenset(('B', 'C')): pytest.approx(0.6)}
+        assert instantanea.num_aristas() == 2
+
+    def test_lectores_y_escritor_en_paralelo(self, concurrente):
+        errores = []
+        parar = threading.Event()
+
+        def escritor():
+            np.random.seed(0)
+            while not parar.is_set():
+                with concurrente.escritura() as sistema:
+                    sistema.activar('A', pasos=2)
+                    sistema.auto_modificar(fuerza=0.3)
+
+        def lector():
+            try:
+                for _ in range(50):
+                    inst = concurrente.instantanea()
+                    inst.propagar('B', pasos=2)
+                    inst.buscar_similares('B')
+                    assert len(inst.nombres) == inst.adj.shape[0]
+            except Exception as e:  # pragma: no cover - solo si hay carrera
+                errores.append(e)
+
+        hilo_escritor = threading.Thread(target=escritor)
+        hilo_escritor.start()
+        lectores = [threading.Thread(target=lector) for _ in range(4)]
+        for h in lectores:
+            h.start()
+        for h in lectores:
+            h.join(timeout=10)
+        lectores_vivos = [h for h in lectores if h.is_alive()]
+        parar.set()
+        hilo_escritor.join(timeout=10)
+        assert lectores_vivos == []
+        assert errores == []
+        assert concurrente.epoca > 0
+
+    def test_reemplazar(self, concurrente, sistema_vacio):
+        llamadas = []
+        concurrente.reemplazar(sistema_vacio, al_reemplazar=lambda: llamadas.append(1))
+        assert llamadas == [1]
+        assert len(concurrente.instantanea()) == 0
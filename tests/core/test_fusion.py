@@ -0,0 +1,70 @@
+"""Tests para la fusión masiva ConceptosLucas.fusionar_similares."""
+import numpy as np
+import pytest
+
+from src.core.nucleo import ConceptosLucas
+
+
+@pytest.fixture
+def duplicados():
+    """A, A2, A3 casi idénticos (cadena de similitud), B distinto y X vecino de A2."""
+    s = ConceptosLucas(dim_vector=4, incertidumbre_base=0.0)
+    base = np.array([1.0, 0.0, 0.0, 0.0])
+    s.añadir_concepto('A', atributos=base)
+    s.añadir_concepto('A2', atributos=base + np.array([0, 0.05, 0, 0]))
+    s.añadir_concepto('A3', atributos=base + np.array([0, 0.1, 0, 0]))
+    s.añadir_concepto('B', atributos=np.array([0.0, 0.0, 1.0, 0.0]))
+    s.añadir_concepto('X', atributos=np.array([0.0, 0.0, 0.0, 1.0]))
+    s.conceptos['A2']['activaciones'] = 5
+    s.relacionar('A', 'B', fuerza=0.3)
+    s.relacionar('A3', 'B', fuerza=0.7)
+    s.relacionar('A2', 'X', fuerza=0.5)
+    s.relacionar('A', 'A2', fuerza=0.9)
+    return s
+
+
+def test_grupo_completo_en_representante(duplicados):
+    s = duplicados
+    stats = s.fusionar_similares(umbral=0.95)
+    assert stats['grupos'] == 1
+    assert stats['fusionados'] == 2
+    # A2 tiene más activaciones: es el representante
+    assert stats['mapa'] == {'A': 'A2', 'A3': 'A2'}
+    assert set(s.conceptos) == {'A2', 'B', 'X'}
+    assert s.conceptos['A2']['activaciones'] == 5
+    assert np.linalg.norm(s.conceptos['A2']['base']) == pytest.approx(1.0)
+
+
+def test_adyacencia_y_relaciones_reescritas(duplicados):
+    s = duplicados
+    s.grafo
+    s.fusionar_similares(umbral=0.95)
+    assert s._n == 3
+    i, b, x = s._idx['A2'], s._idx['B'], s._idx['X']
+    # agregación por máximo de A-B (0.3) y A3-B (0.7)
+    assert s._adj[i, b] == pytest.approx(0.7)
+    assert s._adj[b, i] == pytest.approx(0.7)
+    assert s._adj[i, x] == pytest.approx(0.5)
+    assert s._adj[i, i] == 0
+    assert dict(s.relaciones['B']) == {'A2': pytest.approx(0.7)}
+    assert dict(s.relaciones['A2']) == {'B': pytest.approx(0.7), 'X': pytest.approx(0.5)}
+    assert s.grafo.has_edge('A2', 'B') and 'A' not in s.grafo
+    assert s.indice.size == 3
+    assert s.activar('A2', pasos=2)
+
+
+def test_agregacion_suma(duplicados):
+    s = duplicados
+    s.fusionar_similares(umbral=0.95, agregacion='suma')
+    assert s._adj[s._idx['A2'], s._idx['B']] == pytest.approx(1.0)
+
+
+def test_bloques_pequenos_mismo_resultado(duplicados):
+    stats = duplicados.fusionar_similares(umbral=0.95, tam_bloque=1)
+    assert stats['mapa'] == {'A': 'A2', 'A3': 'A2'}
+
+
+def test_sin_pares(duplicados):
+    stats = duplicados.fusionar_similares(umbral=0.9999)
+    assert stats['fusionados'] == 0
+    assert duplicados._n == 5
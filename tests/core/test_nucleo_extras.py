@@ -118,3 +118,37 @@ class TestRebuildNumpy:
         # Verificar que la matriz de adyacencia tiene pesos
         n = cargado._n
         assert np.sum(cargado._adj[:n, :n]) > 0
+
+
+class TestAltasEnLote:
+    """Tests para añadir_conceptos_lote y relacionar_lote."""
+
+    def test_añadir_conceptos_lote(self, sistema_minimo):
+        nuevos = sistema_minimo.añadir_conceptos_lote(
+            ['X', 'Y', 'A', 'X'], np.random.rand(4, 15), categoria='tecnologias')
+        assert nuevos == ['X', 'Y']  # A ya existe y X está repetido
+        assert sistema_minimo._n == 5
+        for nombre in nuevos:
+            i = sistema_minimo._idx[nombre]
+            np.testing.assert_array_almost_equal(sistema_minimo._vec_base[i],
+                                                 sistema_minimo.conceptos[nombre]['base'])
+            assert np.linalg.norm(sistema_minimo.conceptos[nombre]['base']) == pytest.approx(1.0)
+            assert sistema_minimo.indice.contiene(nombre)
+        assert 'X' in sistema_minimo.categorias['tecnologias']
+
+    def test_añadir_lote_amplia_capacidad(self, sistema_vacio):
+        nombres = [f'c{i}' for i in range(200)]
+        sistema_vacio.añadir_conceptos_lote(nombres, np.random.rand(200, 15))
+        assert sistema_vacio._n == 200
+        assert sistema_vacio._cap >= 200
+        assert sistema_vacio._names[-1] == 'c199'
+
+    def test_relacionar_lote(self, sistema_minimo):
+        sistema_minimo.grafo
+        creadas = sistema_minimo.relacionar_lote([('A', 'C', 0.4), ('A', 'Z', 0.9)])
+        assert creadas == 1
+        i, j = sistema_minimo._idx['A'], sistema_minimo._idx['C']
+        assert sistema_minimo._adj[i, j] == pytest.approx(0.4)
+        assert sistema_minimo._adj[j, i] == pytest.approx(0.4)
+        assert ('C', 0.4) in sistema_minimo.relaciones['A']
+        assert sistema_minimo.grafo.has_edge('A', 'C')
@@ -0,0 +1,65 @@
+"""Tests para la poda vectorizada ConceptosLucas.podar_conexiones."""
+import numpy as np
+import pytest
+
+from src.core.nucleo import ConceptosLucas
+
+
+@pytest.fixture
+def estrella():
+    """Hub H conectado a 5 hojas con pesos crecientes, más una arista L0-L1."""
+    s = ConceptosLucas(dim_vector=4, incertidumbre_base=0.0)
+    s.añadir_concepto('H', atributos=np.ones(4))
+    for i in range(5):
+        s.añadir_concepto(f'L{i}', atributos=np.random.rand(4))
+        s.relacionar('H', f'L{i}', fuerza=0.1 * (i + 1))
+    s.relacionar('L0', 'L1', fuerza=0.9)
+    return s
+
+
+def _vecinos(s, nombre):
+    return {d for d, _ in s.relaciones[nombre]}
+
+
+def test_poda_por_umbral(estrella):
+    estrella.grafo  # construir grafo para verificar la sincronización
+    stats = estrella.podar_conexiones(umbral=0.25)
+    # H-L0 (0.1) y H-L1 (0.2) caen, en ambas direcciones
+    assert stats['podadas_umbral'] == 4
+    assert stats['podadas_limite'] == 0
+    assert stats['conexiones_despues'] == stats['conexiones_antes'] - 4
+    assert _vecinos(estrella, 'H') == {'L2', 'L3', 'L4'}
+    assert 'H' not in _vecinos(estrella, 'L0')
+    assert estrella._adj[estrella._idx['H'], estrella._idx['L0']] == 0
+    assert not estrella.grafo.has_edge('H', 'L1')
+    assert estrella.grafo.has_edge('L0', 'L1')
+
+
+def test_limite_por_concepto(estrella):
+    stats = estrella.podar_conexiones(max_por_concepto=2)
+    assert _vecinos(estrella, 'H') == {'L3', 'L4'}
+    n = estrella._n
+    assert np.count_nonzero(estrella._adj[:n, :n], axis=1).max() <= 2
+    assert stats['podadas_limite'] == 6
+    assert stats['conceptos_afectados'] == 4
+
+
+def test_umbral_y_limite_juntos(estrella):
+    stats = estrella.podar_conexiones(umbral=0.15, max_por_concepto=3)
+    assert _vecinos(estrella, 'H') == {'L2', 'L3', 'L4'}
+    assert stats['podadas_umbral'] == 2
+    assert stats['podadas_limite'] == 2
+
+
+def test_propagacion_no_usa_aristas_podadas(estrella):
+    estrella.podar_conexiones(umbral=0.25)
+    np.random.seed(1)
+    resultado = estrella.activar('L0', pasos=1, temperatura=0.0)
+    # L0 solo conserva L1; H no recibe propagación directa
+    assert resultado[-1]['H'] < resultado[-1]['L1']
+
+
+def test_sin_cambios(estrella):
+    stats = estrella.podar_conexiones()
+    assert stats['conexiones_antes'] == stats['conexiones_despues']
+    assert stats['conceptos_afectados'] == 0
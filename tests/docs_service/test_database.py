@@ -0,0 +1,143 @@
+"""
+Tests para database.py de docs-service — conexiones por hilo y pool de la BD.
+
+Verifica:
+- Una conexión persistente por hilo, en modo WAL y con busy_timeout
+- close() devuelve la conexión sin cerrarla y deshace lo no confirmado
+- Las consultas corren en el pool sin bloquear el event loop
+- Los endpoints siguen funcionando sobre el pool
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "orchestra", "docs-service"))
+
+from app import database
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """BD temporal con el esquema creado."""
+    path = str(tmp_path / "data" / "docs.db")
+    monkeypatch.setattr(database, "DB_PATH", path)
+    database.init_db()
+    yield path
+    database.close_connection()
+
+
+def _insert(conn, title, tags="[]"):
+    conn.execute(
+        "INSERT INTO documents (title, content, category, author, tags, created_at, updated_at) "
+        "VALUES (?, 'c', 'general', 'test', ?, '2026-01-01', '2026-01-01')",
+        (title, tags)
+    )
+
+
+class TestConexiones:
+
+    def test_conexion_reutilizada(self, db_path):
+        conn = database.get_connection()
+        conn.close()
+        assert database.get_connection() is conn
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+
+    def test_wal_y_busy_timeout(self, db_path):
+        conn = database.get_connection()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == database.BUSY_TIMEOUT_MS
+
+    def test_una_conexion_por_hilo(self, db_path):
+        conexiones = []
+
+        def abrir():
+            conexiones.append(database.get_connection())
+            database.close_connection()
+
+        hilo = threading.Thread(target=abrir)
+        hilo.start()
+        hilo.join()
+        assert conexiones[0] is not database.get_connection()
+
+    def test_close_deshace_lo_pendiente(self, db_path):
+        conn = database.get_connection()
+        _insert(conn, "sin commit")
+        conn.close()
+        assert conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 0
+
+    def test_cambio_de_ruta(self, db_path, tmp_path, monkeypatch):
+        conn = database.get_connection()
+        monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "otra" / "docs.db"))
+        assert database.get_connection() is not conn
+
+
+class TestPool:
+
+    @pytest.mark.asyncio
+    async def test_no_bloquea_el_event_loop(self, db_path):
+        ticks = []
+
+        async def latido():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.02)
+
+        start = time.perf_counter()
+        await asyncio.gather(database.run_db(time.sleep, 0.2), latido())
+        assert ticks[-1] - start < 0.2
+
+    @pytest.mark.asyncio
+    async def test_consultas_en_paralelo(self, db_path):
+        def consulta_lenta():
+            conn = database.get_connection()
+            conn.execute("SELECT COUNT(*) FROM documents").fetchone()
+            time.sleep(0.1)
+            return threading.get_ident()
+
+        start = time.perf_counter()
+        hilos = await asyncio.gather(*(database.run_db(consulta_lenta) for _ in range(4)))
+        assert time.perf_counter() - start < 0.35
+        assert len(set(hilos)) > 1
+
+    @pytest.mark.asyncio
+    async def test_escrituras_concurrentes(self, db_path):
+        def escribir(i):
+            conn = database.get_connection()
+            _insert(conn, f"doc {i}")
+            conn.commit()
+
+        await asyncio.gather(*(database.run_db(escribir, i) for i in range(20)))
+        conn = database.get_connection()
+        assert conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 20
+
+
+class TestEndpoints:
+
+    @pytest.fixture
+    def client(self, db_path):
+        pytest.importorskip("fastapi")
+        pytest.importorskip("httpx")
+        from fastapi.testclient import TestClient
+        from app.main import app
+        with TestClient(app) as client:
+            yield client
+
+    def test_crear_y_leer(self, client):
+        creado = client.post("/api/v1/docs", json={
+            "title": "Orden", "content": "hacer algo", "author": "arquitecto",
+            "tags": ["worker-core"]
+        }).json()
+        assert client.get(f"/api/v1/docs/{creado['id']}").json()["title"] == "Orden"
+        assert client.get("/api/v1/docs").json()["count"] == 1
+        assert client.get("/api/v1/worker/worker-core/pendientes").json()["count"] == 1
+        assert client.get("/api/v1/docs/999").status_code == 404
+
+    def test_snapshot_y_notificaciones(self, client):
+        client.post("/api/v1/docs", json={"title": "A", "content": "x", "author": "a"})
+        assert client.get("/api/v1/context/snapshot").json()["total_docs"] == 1
+        assert client.get("/api/v1/notifications/since", params={"t": "2000-01-01"}).json()["count"] == 1
@@ -0,0 +1,81 @@
+"""
+Fixtures compartidas para tests del framework.
+
+core/__init__ importa manager, que usa imports planos de los procesadores,
+y processors/__init__ importa módulos que viven en ai_platforms/. Los
+módulos que se prueban aquí solo dependen de la stdlib y se cargan desde
+su ruta, sin pasar por esos __init__.
+"""
+import importlib
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+RAIZ_FRAMEWORK = os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'framework')
+
+
+def _cargar(ruta_relativa: str, nombre: str):
+    """Carga un módulo suelto desde su archivo."""
+    ruta = os.path.join(RAIZ_FRAMEWORK, ruta_relativa)
+    spec = importlib.util.spec_from_file_location(nombre, ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def _cargar_de_paquete(directorio: str, modulo: str, paquete: str):
+    """Carga un módulo con imports relativos bajo un paquete sin __init__."""
+    if paquete not in sys.modules:
+        vacio = types.ModuleType(paquete)
+        vacio.__path__ = [os.path.join(RAIZ_FRAMEWORK, directorio)]
+        sys.modules[paquete] = vacio
+    return importlib.import_module(f"{paquete}.{modulo}")
+
+
+@pytest.fixture(scope="session")
+def framework_db():
+    """Módulo src/framework/core/database.py."""
+    return _cargar(os.path.join('core', 'database.py'), 'framework_database')
+
+
+@pytest.fixture(scope="session")
+def processors_base():
+    """Módulo src/framework/processors/base.py."""
+    return _cargar_de_paquete('processors', 'base', 'framework_processors')
+
+
+@pytest.fixture(scope="session")
+def auto_detector():
+    """Módulo src/framework/processors/auto_detector.py."""
+    return _cargar_de_paquete('processors', 'auto_detector', 'framework_processors')
+
+
+@pytest.fixture(scope="session")
+def framework_exporter():
+    """Módulo src/framework/core/exporter.py."""
+    return _cargar(os.path.join('core', 'exporter.py'), 'framework_exporter')
+
+
+def _nueva_conversacion(i, plataforma='chatgpt', textos=None, titulo=None, mensajes=2):
+    """Conversación normalizada, como la entregan los procesadores."""
+    if textos is None:
+        textos = [f'mensaje {k} sobre python número {i} en {plataforma} ñ' for k in range(mensajes)]
+    return {
+        'id': f'conv_{i:03d}',
+        'titulo': titulo or f'Conversación {i}',
+        'plataforma': plataforma,
+        'timestamp': f'2024-01-{i % 28 + 1:02d}T00:00:00Z',
+        'mensajes': [{'id': f'conv_{i:03d}_m{k}', 'role': ('user', 'assistant')[k % 2],
+                      'content': texto, 'timestamp': f'2024-01-01T00:00:{k:02d}'}
+                     for k, texto in enumerate(textos)],
+        'metadata': {'source_file': 'export.json'}
+    }
+
+
+@pytest.fixture(scope="session")
+def nueva_conversacion():
+    """Fábrica de conversaciones: nueva_conversacion(i, plataforma, textos, titulo, mensajes)."""
+    return _nueva_conversacion
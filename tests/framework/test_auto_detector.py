@@ -0,0 +1,119 @@
+"""Tests para la detección de formato leyendo solo un prefijo acotado."""
+import json
+import os
+
+import pytest
+
+
+def _chatgpt(i, relleno=0):
+    return {
+        'id': f'conv_{i}', 'title': f'Conversación {i}', 'create_time': 1700000000 + i,
+        'mapping': {
+            f'n{k}': {'message': {'id': f'm{i}_{k}', 'author': {'role': ('user', 'assistant')[k % 2]},
+                                  'content': {'parts': [f'mensaje {k} ' + 'x' * relleno]}}}
+            for k in range(2)
+        }
+    }
+
+
+def _claude(i):
+    return {'conversation_id': f'c{i}', 'name': f'Chat {i}', 'created_at': '2024-01-01',
+            'chat_messages': [{'sender': 'human', 'text': 'hola', 'uuid': f'u{i}'}]}
+
+
+def _escribir(tmp_path, nombre, datos):
+    ruta = tmp_path / nombre
+    ruta.write_text(json.dumps(datos), encoding='utf-8')
+    return str(ruta)
+
+
+class TestScanJsonPrefix:
+
+    def test_claves_del_primer_registro(self, auto_detector):
+        texto = json.dumps([{'mapping': {'a': {'id': 1}}, 'title': 't'}, {'otra': 1}])
+        scan = auto_detector.scan_json_prefix(texto[:-5])
+        assert scan['root'] == 'array'
+        assert scan['keys'] == ['mapping', 'title']  # no las anidadas ni las del segundo
+        assert scan['first_complete'] and scan['items'] == 1
+        assert not scan['complete']
+
+    def test_registro_cortado(self, auto_detector):
+        scan = auto_detector.scan_json_prefix('[{"mapping": {"a": "texto cort')
+        assert scan['keys'] == ['mapping']
+        assert not scan['first_complete']
+
+    def test_llaves_dentro_de_cadenas(self, auto_detector):
+        scan = auto_detector.scan_json_prefix('{"t": "} ] \\" {", "id": 1}')
+        assert scan['root'] == 'object' and scan['complete']
+        assert scan['keys'] == ['t', 'id']
+
+    @pytest.mark.parametrize("texto", ["", "   ", "## Human: hola", '"cadena"'])
+    def test_no_json(self, auto_detector, texto):
+        assert auto_detector.scan_json_prefix(texto)['root'] is None
+
+
+class TestDeteccionPorPrefijo:
+
+    @pytest.fixture
+    def prefijo_pequeno(self, auto_detector, monkeypatch):
+        monkeypatch.setattr(auto_detector, 'SNIFF_CHARS', 512)
+        monkeypatch.setattr(auto_detector, 'SNIFF_MAX_CHARS', 4096)
+
+    def test_archivo_pequeno_deteccion_exacta(self, auto_detector, tmp_path):
+        ruta = _escribir(tmp_path, 'c.json', [_chatgpt(i) for i in range(3)])
+        formato, confianza, meta = auto_detector.AutoDetector().detect_format(ruta)
+        assert formato == 'chatgpt' and confianza == 1.0
+        assert meta['conversations_detected'] == 3 and 'estimated' not in meta
+
+    def test_archivo_grande_solo_lee_el_prefijo(self, auto_detector, tmp_path, prefijo_pequeno):
+        ruta = _escribir(tmp_path, 'c.json', [_chatgpt(i) for i in range(500)])
+        formato, _, meta = auto_detector.AutoDetector().detect_format(ruta)
+        assert formato == 'chatgpt'
+        assert meta['estimated']
+        assert 100 < meta['conversations_detected'] < 2000
+
+    def test_claude_por_prefijo(self, auto_detector, tmp_path, prefijo_pequeno):
+        ruta = _escribir(tmp_path, 'k.json', [_claude(i) for i in range(200)])
+        assert auto_detector.AutoDetector().detect_format(ruta)[0] == 'claude'
+
+    def test_primer_registro_mayor_que_el_prefijo(self, auto_detector, tmp_path, prefijo_pequeno):
+        """Las claves que deciden llegan tras el prefijo inicial: se amplía la lectura."""
+        datos = [{'title': 'x' * 1500, **_chatgpt(i)} for i in range(5)]
+        datos += [_chatgpt(i) for i in range(5, 200)]
+        ruta = _escribir(tmp_path, 'c.json', datos)
+        assert auto_detector.AutoDetector().detect_format(ruta)[0] == 'chatgpt'
+
+    def test_veredicto_cacheado_hasta_que_cambia(self, auto_detector, tmp_path):
+        detector = auto_detector.AutoDetector()
+        ruta = _escribir(tmp_path, 'c.json', [_chatgpt(0)])
+        assert detector.detect_format(ruta)[0] == 'chatgpt'
+        assert len(detector._detection_cache) == 1
+        assert detector.detect_format(ruta)[0] == 'chatgpt'
+        assert len(detector._detection_cache) == 1
+
+        _escribir(tmp_path, 'c.json', [_claude(0), _claude(1)])
+        os.utime(ruta, ns=(0, 10 ** 9))
+        assert detector.detect_format(ruta)[0] == 'claude'
+
+    def test_process_file_continua_tras_el_prefijo(self, auto_detector, tmp_path, prefijo_pequeno):
+        ruta = _escribir(tmp_path, 'c.json', [_chatgpt(i, relleno=50) for i in range(100)])
+        resultado = auto_detector.AutoDetector().process_file(ruta)
+        assert resultado['format'] == 'chatgpt'
+        assert resultado['total_conversations'] == 100
+        assert resultado['conversations'][-1]['id'] == 'conv_99'
+
+    def test_iter_file_procesa_bajo_demanda(self, auto_detector, tmp_path, monkeypatch):
+        ruta = _escribir(tmp_path, 'c.json', [_chatgpt(i) for i in range(50)])
+        detector = auto_detector.AutoDetector()
+        original = detector._process_chatgpt_conversation
+        llamadas = []
+
+        def cuenta(*args, **kwargs):
+            llamadas.append(1)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(detector, '_process_chatgpt_conversation', cuenta)
+        conversaciones = detector.iter_file(ruta)
+        assert next(conversaciones)['id'] == 'conv_0'
+        assert len(llamadas) == 1
+        assert sum(1 for _ in conversaciones) == 49
@@ -0,0 +1,361 @@
+"""Tests para IANAEDatabase: búsqueda, importación, archivos y estadísticas."""
+import hashlib
+import os
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def db(framework_db, tmp_path):
+    return framework_db.IANAEDatabase(str(tmp_path / 'ianae.db'))
+
+
+def _ids(resultados):
+    return [r['id'] for r in resultados]
+
+
+class TestBusquedaFTS:
+
+    def test_busca_por_mensaje_y_titulo(self, db, nueva_conversacion):
+        db.add_conversations_batch([
+            nueva_conversacion(1, textos=['instalar OpenCV en Windows']),
+            nueva_conversacion(2, titulo='Dudas de OpenCV'),
+            nueva_conversacion(3, textos=['nada que ver']),
+        ])
+        resultados = db.search_conversations('opencv')
+        assert set(_ids(resultados)) == {'conv_001', 'conv_002'}
+        assert all(r['score'] > 0 for r in resultados)
+
+    def test_sin_distinguir_acentos(self, db, nueva_conversacion):
+        db.add_conversation(nueva_conversacion(1, textos=['programación orientada a objetos']))
+        assert _ids(db.search_conversations('programacion')) == ['conv_001']
+
+    def test_fragmento_resaltado(self, db, nueva_conversacion):
+        db.add_conversation(nueva_conversacion(1, textos=['hablemos de docker y kubernetes']))
+        resultado = db.search_conversations('docker')[0]
+        assert '<mark>docker</mark>' in resultado['snippet']
+
+    def test_reemplazar_conversacion_no_duplica_ni_deja_terminos(self, db, nueva_conversacion):
+        db.add_conversation(nueva_conversacion(1, textos=['tema antiguo']))
+        db.add_conversation(nueva_conversacion(1, textos=['tema nuevo']))
+        assert _ids(db.search_conversations('nuevo')) == ['conv_001']
+        assert db.search_conversations('antiguo') == []
+        assert len(db.search_conversations('tema')) == 1
+
+    def test_actualizar_por_lote_reindexa(self, db, nueva_conversacion):
+        db.add_conversations_batch([nueva_conversacion(1, textos=['primera versión'])])
+        db.add_conversations_batch([nueva_conversacion(1, textos=['segunda versión'])])
+        assert _ids(db.search_conversations('segunda')) == ['conv_001']
+        assert db.search_conversations('primera') == []
+
+    def test_borrar_mensajes_los_saca_del_indice(self, db, nueva_conversacion):
+        db.add_conversation(nueva_conversacion(1, textos=['efímero']))
+        conn = sqlite3.connect(db.db_path)
+        conn.execute("DELETE FROM messages")
+        conn.commit()
+        conn.close()
+        assert db.search_conversations('efímero') == []
+
+    def test_paginacion_por_cursor(self, db, nueva_conversacion):
+        db.add_conversations_batch([nueva_conversacion(i) for i in range(7)])
+        vistos = []
+        after = None
+        while True:
+            pagina = db.search_conversations('python', limit=3, after=after)
+            if not pagina:
+                break
+            vistos.extend(_ids(pagina))
+            after = pagina[-1]['cursor']
+        assert sorted(vistos) == sorted(f'conv_{i:03d}' for i in range(7))
+
+    def test_migracion_indexa_datos_existentes(self, framework_db, db, nueva_conversacion):
+        db.add_conversation(nueva_conversacion(1, textos=['anterior al índice']))
+        conn = sqlite3.connect(db.db_path)
+        conn.execute("DROP TABLE messages_fts")
+        conn.execute("DROP TABLE conversations_fts")
+        conn.commit()
+        conn.close()
+        reabierta = framework_db.IANAEDatabase(db.db_path)
+        assert _ids(reabierta.search_conversations('anterior')) == ['conv_001']
+
+
+class TestImportacionMasiva:
+
+    def test_anade_actualiza_y_omite(self, db, nueva_conversacion):
+        stats = db.add_conversations_batch([nueva_conversacion(i) for i in range(5)], batch_size=2)
+        assert stats['conversations_added'] == 5 and stats['messages_added'] == 10
+        cambiada = nueva_conversacion(0, textos=['otro contenido', 'y otra respuesta'])
+        stats = db.add_conversations_batch([cambiada, nueva_conversacion(1)])
+        assert stats['conversations_updated'] == 1
+        assert stats['conversations_skipped'] == 1
+        detalle = db.get_conversation_details('conv_000')
+        assert [m['content'] for m in detalle['messages']] == ['otro contenido', 'y otra respuesta']
+
+    def test_repetida_en_el_lote_gana_la_ultima(self, db, nueva_conversacion):
+        stats = db.add_conversations_batch([nueva_conversacion(1, textos=['v1']),
+                                            nueva_conversacion(1, textos=['v2'])])
+        assert stats['conversations_added'] == 1 and stats['conversations_updated'] == 1
+        assert db.get_conversation_details('conv_001')['messages'][0]['content'] == 'v2'
+
+    def test_conversacion_erronea_no_tumba_el_lote(self, db, nueva_conversacion):
+        rota = nueva_conversacion(2)
+        del rota['titulo']
+        stats = db.add_conversations_batch([nueva_conversacion(1), rota, nueva_conversacion(3)])
+        assert stats['errors'] == 1
+        assert db.get_conversation_details('conv_001') is not None
+        assert db.get_conversation_details('conv_003') is not None
+
+    def test_filas_preparadas_en_los_workers(self, framework_db, db, nueva_conversacion):
+        conversacion = framework_db.prepare_conversation(nueva_conversacion(1))
+        assert '_message_rows' in conversacion and '_content_hash' in conversacion
+        db.add_conversations_batch([conversacion])
+        assert len(db.get_conversation_details('conv_001')['messages']) == 2
+        assert db.add_conversations_batch([nueva_conversacion(1)])['conversations_skipped'] == 1
+
+    def test_rebuild_indexes_restaura_indices_triggers_y_busqueda(self, db, nueva_conversacion):
+        def esquema():
+            conn = sqlite3.connect(db.db_path)
+            filas = set(conn.execute("SELECT type, name FROM sqlite_master WHERE type IN ('index', 'trigger')"))
+            conn.close()
+            return filas
+
+        antes = esquema()
+        db.add_conversations_batch([nueva_conversacion(i) for i in range(20)], batch_size=7,
+                                   rebuild_indexes=True)
+        assert esquema() == antes
+        assert len(db.search_conversations('python', limit=50)) == 20
+        assert db.get_statistics()['total_messages'] == 40
+
+
+class TestArchivosProcesados:
+
+    @pytest.fixture
+    def export(self, tmp_path):
+        def crear(directorio, contenido='[{"id": 1}]', nombre='conversations.json'):
+            ruta = tmp_path / directorio / nombre
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            ruta.write_text(contenido, encoding='utf-8')
+            return str(ruta)
+        return crear
+
+    def test_registrado_sin_cambios(self, db, export):
+        ruta = export('a')
+        assert db.is_file_processed(ruta) == (False, {})
+        db.register_file_processing(ruta, 'chatgpt', {'conversations_processed': 3})
+        procesado, info = db.is_file_processed(ruta)
+        assert procesado and info['conversations_extracted'] == 3
+
+    def test_stat_igual_no_relee_el_archivo(self, db, export, monkeypatch):
+        ruta = export('a')
+        db.register_file_processing(ruta, 'chatgpt', {})
+        db._file_hash_cache.clear()
+        monkeypatch.setattr(db, '_calculate_file_hash',
+                            lambda *a, **k: pytest.fail("no debe leer el archivo"))
+        assert db.is_file_processed(ruta)[0]
+
+    def test_contenido_cambiado(self, db, export):
+        ruta = export('a')
+        db.register_file_processing(ruta, 'chatgpt', {})
+        export('a', contenido='[{"id": 2}, {"id": 3}]')
+        procesado, info = db.is_file_processed(ruta)
+        assert not procesado and info['file_changed']
+
+    def test_tocado_pero_identico_sigue_procesado(self, db, export):
+        ruta = export('a')
+        db.register_file_processing(ruta, 'chatgpt', {})
+        st = os.stat(ruta)
+        os.utime(ruta, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        assert db.is_file_processed(ruta)[0]
+
+    def test_mismo_nombre_en_directorios_distintos(self, db, export):
+        """La clave es la ruta: dos exportaciones homónimas no se pisan."""
+        ruta_a = export('a')
+        ruta_b = export('b', contenido='[{"id": "otro"}]')
+        db.register_file_processing(ruta_a, 'chatgpt', {'conversations_processed': 1})
+        assert not db.is_file_processed(ruta_b)[0]
+        db.register_file_processing(ruta_b, 'claude', {'conversations_processed': 2})
+
+        procesado_a, info_a = db.is_file_processed(ruta_a)
+        procesado_b, info_b = db.is_file_processed(ruta_b)
+        assert procesado_a and info_a['processor_used'] == 'chatgpt'
+        assert procesado_b and info_b['processor_used'] == 'claude'
+        assert db.get_statistics()['total_files_processed'] == 2
+
+    def test_migra_tabla_con_clave_por_nombre(self, framework_db, tmp_path, export):
+        ruta = export('a')
+        db_path = str(tmp_path / 'antigua.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE processed_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT UNIQUE NOT NULL,
+                file_path TEXT,
+                file_hash TEXT,
+                file_size INTEGER,
+                processor_used TEXT,
+                conversations_extracted INTEGER DEFAULT 0,
+                messages_extracted INTEGER DEFAULT 0,
+                processing_time REAL DEFAULT 0.0,
+                processed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                status TEXT DEFAULT 'completed'
+            )
+        ''')
+        md5 = hashlib.md5(open(ruta, 'rb').read()).hexdigest()
+        conn.execute("INSERT INTO processed_files (filename, file_path, file_hash, processor_used) "
+                     "VALUES ('conversations.json', 'relativa/conversations.json', ?, 'chatgpt')", (md5,))
+        conn.commit()
+        conn.close()
+
+        db = framework_db.IANAEDatabase(db_path)
+        assert db.get_statistics()['total_files_processed'] == 1
+        # Registro antiguo con ruta relativa: se reconoce por nombre y MD5 y se migra
+        assert db.is_file_processed(ruta)[0]
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT file_path FROM processed_files").fetchall() == [(ruta,)]
+        conn.close()
+
+        otra = export('b')
+        db.register_file_processing(otra, 'chatgpt', {})
+        assert db.get_statistics()['total_files_processed'] == 2
+
+
+class TestEstadisticas:
+
+    @staticmethod
+    def _recuento(db):
+        """Totales calculados recorriendo las tablas (lo que evitan los triggers)."""
+        conn = sqlite3.connect(db.db_path)
+        plataformas = {p: {'conversations': c, 'messages': m} for p, c, m in conn.execute(
+            "SELECT platform, COUNT(*), SUM(total_messages) FROM conversations GROUP BY platform")}
+        recuento = {
+            'total_conversations': conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0],
+            'total_messages': conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0],
+            'total_concepts': conn.execute("SELECT COUNT(*) FROM concepts").fetchone()[0],
+            'total_files_processed': conn.execute("SELECT COUNT(*) FROM processed_files").fetchone()[0],
+            'duplicate_conversations': conn.execute(
+                "SELECT COUNT(*) - COUNT(DISTINCT content_hash) FROM conversations").fetchone()[0],
+            'by_platform': plataformas,
+        }
+        conn.close()
+        return recuento
+
+    @staticmethod
+    def _materializadas(db):
+        stats = db.get_statistics()
+        return {clave: stats[clave] for clave in ('total_conversations', 'total_messages',
+                                                  'total_concepts', 'total_files_processed',
+                                                  'duplicate_conversations', 'by_platform')}
+
+    def test_triggers_siguen_cada_escritura(self, db, tmp_path, nueva_conversacion):
+        db.add_conversations_batch([nueva_conversacion(i, ('chatgpt', 'claude')[i % 2]) for i in range(6)])
+        assert self._materializadas(db) == self._recuento(db)
+
+        db.add_conversation(nueva_conversacion(0, textos=['uno', 'dos', 'tres']))  # INSERT OR REPLACE
+        db.add_conversations_batch([nueva_conversacion(1, plataforma='claude', textos=['solo uno'])])
+        # Misma conversación con otro id: duplicado por content_hash
+        copia = nueva_conversacion(2)
+        copia['id'] = 'copia_2'
+        db.add_conversation(copia)
+        assert self._materializadas(db)['duplicate_conversations'] == 1
+
+        conn = sqlite3.connect(db.db_path)
+        conn.execute("DELETE FROM messages WHERE conversation_id = 'conv_003'")
+        conn.execute("DELETE FROM conversations WHERE id = 'conv_003'")
+        conn.execute("INSERT INTO concepts (name) VALUES ('python'), ('opencv')")
+        conn.execute("INSERT OR REPLACE INTO concepts (name, usage_count) VALUES ('python', 5)")
+        conn.commit()
+        conn.close()
+
+        ruta = tmp_path / 'export.json'
+        ruta.write_text('[]', encoding='utf-8')
+        db.register_file_processing(str(ruta), 'chatgpt', {})
+        db.register_file_processing(str(ruta), 'chatgpt', {})  # REPLACE por ruta
+
+        assert self._materializadas(db) == self._recuento(db)
+
+    def test_rebuild_statistics_coincide(self, db, nueva_conversacion):
+        db.add_conversations_batch([nueva_conversacion(i) for i in range(4)])
+        antes = self._materializadas(db)
+        conn = sqlite3.connect(db.db_path)
+        conn.execute("UPDATE stats_counters SET value = 999 WHERE key = 'messages'")
+        conn.commit()
+        conn.close()
+        assert db.rebuild_statistics()
+        assert self._materializadas(db) == antes
+
+    def test_derivadas_solo_se_recalculan_si_estan_sucias(self, db, tmp_path):
+        assert db.get_statistics()['recent_files'] == []
+        conn = sqlite3.connect(db.db_path)
+        assert conn.execute("SELECT value FROM stats_counters WHERE key = 'derived_dirty'").fetchone() == (0,)
+        conn.close()
+
+        ruta = tmp_path / 'export.json'
+        ruta.write_text('[]', encoding='utf-8')
+        db.register_file_processing(str(ruta), 'chatgpt', {'conversations_processed': 4})
+        recientes = db.get_statistics()['recent_files']
+        assert [(f['filename'], f['conversations']) for f in recientes] == [('export.json', 4)]
+
+    def test_derivadas_con_la_base_ocupada(self, db, tmp_path):
+        ruta = tmp_path / 'export.json'
+        ruta.write_text('[]', encoding='utf-8')
+        db.register_file_processing(str(ruta), 'chatgpt', {'conversations_processed': 2})
+
+        escritor = sqlite3.connect(db.db_path, isolation_level=None)
+        escritor.execute("BEGIN IMMEDIATE")
+        try:
+            stats = db.get_statistics()
+        finally:
+            escritor.execute("ROLLBACK")
+            escritor.close()
+        # Se sirven recalculadas aunque no se puedan guardar; el indicador sigue sucio
+        assert [f['filename'] for f in stats['recent_files']] == ['export.json']
+        conn = sqlite3.connect(db.db_path)
+        assert conn.execute("SELECT value FROM stats_counters WHERE key = 'derived_dirty'").fetchone() != (0,)
+        conn.close()
+        db.get_statistics()
+        conn = sqlite3.connect(db.db_path)
+        assert conn.execute("SELECT value FROM stats_counters WHERE key = 'derived_dirty'").fetchone() == (0,)
+        conn.close()
+
+    def test_escritura_durante_el_recalculo_deja_sucio(self, db, tmp_path):
+        ruta = tmp_path / 'a.json'
+        ruta.write_text('[]', encoding='utf-8')
+        db.register_file_processing(str(ruta), 'chatgpt', {})
+        otra = tmp_path / 'b.json'
+        otra.write_text('[]', encoding='utf-8')
+
+        class CursorConEscrituraIntercalada:
+            """Registra otro archivo justo entre el cálculo y el guardado"""
+            def __init__(self, cursor):
+                self._cursor = cursor
+
+            def execute(self, sql, *args):
+                if sql.startswith("PRAGMA busy_timeout"):
+                    db.register_file_processing(str(otra), 'chatgpt', {})
+                return self._cursor.execute(sql, *args)
+
+            def __getattr__(self, nombre):
+                return getattr(self._cursor, nombre)
+
+        conn = sqlite3.connect(db.db_path, isolation_level=None)
+        derivadas = db._derived_statistics(CursorConEscrituraIntercalada(conn.cursor()), True)
+        assert [f['filename'] for f in derivadas['recent_files']] == ['a.json']
+        assert conn.execute("SELECT value FROM stats_counters WHERE key = 'derived_dirty'").fetchone() != (0,)
+        conn.close()
+        nombres = {f['filename'] for f in db.get_statistics()['recent_files']}
+        assert nombres == {'a.json', 'b.json'}
+
+    def test_duplicados_incrementales(self, db, nueva_conversacion):
+        copias = []
+        for i in range(3):
+            conv = nueva_conversacion(1)
+            conv['id'] = f'copia_{i}'
+            copias.append(conv)
+        db.add_conversations_batch(copias + [nueva_conversacion(2)])
+        grupos = list(db.find_duplicate_conversations())
+        assert len(grupos) == 1 and grupos[0][1] == ['copia_0', 'copia_1', 'copia_2']
+        resultado = db.cleanup_database(dry_run=False)
+        assert resultado['duplicate_conversations'] == 2
+        assert list(db.find_duplicate_conversations()) == []
+        assert self._materializadas(db) == self._recuento(db)
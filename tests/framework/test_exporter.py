@@ -0,0 +1,75 @@
+"""Tests para la exportación en streaming (iter_conversations + write_export)."""
+import csv
+import gzip
+import json
+
+import pytest
+
+
+@pytest.fixture
+def db(framework_db, tmp_path, nueva_conversacion):
+    db = framework_db.IANAEDatabase(str(tmp_path / 'ianae.db'))
+    db.add_conversations_batch(
+        [nueva_conversacion(i, ('chatgpt', 'claude')[i % 2], mensajes=3) for i in range(10)]
+        + [nueva_conversacion(10, mensajes=0)])
+    return db
+
+
+class TestIterConversations:
+
+    def test_igual_que_get_conversation_details(self, db):
+        conversaciones = list(db.iter_conversations(chunk_size=4))
+        assert [c['id'] for c in conversaciones] == sorted(f'conv_{i:03d}' for i in range(11))
+        for conv in conversaciones:
+            assert conv == db.get_conversation_details(conv['id'])
+
+    def test_sin_mensajes_y_filtros(self, db):
+        claude = list(db.iter_conversations(platform='claude', include_messages=False))
+        assert len(claude) == 5
+        assert all(c['platform'] == 'claude' and 'messages' not in c for c in claude)
+        assert [c['id'] for c in db.iter_conversations(query='Conversación 7')] == ['conv_007']
+
+    def test_es_perezoso(self, db):
+        iterador = db.iter_conversations(chunk_size=2)
+        assert next(iterador)['id'] == 'conv_000'
+        iterador.close()
+
+
+class TestWriteExport:
+
+    def test_json_es_un_array_valido(self, framework_exporter, db, tmp_path):
+        ruta = str(tmp_path / 'out.json')
+        stats = framework_exporter.write_export(db.iter_conversations(), ruta, 'json')
+        assert stats == {'conversations_exported': 11, 'messages_exported': 30}
+        datos = json.loads(open(ruta, encoding='utf-8').read())
+        assert len(datos) == 11 and datos[0]['messages'][0]['content'].endswith('ñ')
+
+    def test_json_vacio(self, framework_exporter, tmp_path):
+        ruta = str(tmp_path / 'vacio.json')
+        framework_exporter.write_export(iter(()), ruta, 'json')
+        assert json.load(open(ruta, encoding='utf-8')) == []
+
+    def test_jsonl_comprimido(self, framework_exporter, db, tmp_path):
+        ruta = str(tmp_path / 'out.jsonl.gz')
+        framework_exporter.write_export(db.iter_conversations(), ruta, 'jsonl')
+        with gzip.open(ruta, 'rt', encoding='utf-8') as f:
+            lineas = [json.loads(linea) for linea in f]
+        assert [c['id'] for c in lineas] == [c['id'] for c in db.iter_conversations()]
+
+    def test_csv(self, framework_exporter, db, tmp_path):
+        ruta = str(tmp_path / 'out.csv')
+        framework_exporter.write_export(db.iter_conversations(include_messages=False), ruta, 'csv')
+        filas = list(csv.reader(open(ruta, encoding='utf-8', newline='')))
+        assert filas[0] == ['ID', 'Título', 'Plataforma', 'Fecha', 'Mensajes']
+        assert len(filas) == 12 and filas[1][4] == '3'
+
+    def test_txt(self, framework_exporter, db, tmp_path):
+        ruta = str(tmp_path / 'out.txt')
+        framework_exporter.write_export(db.iter_conversations(platform='chatgpt'), ruta, 'txt')
+        texto = open(ruta, encoding='utf-8').read()
+        assert texto.count('=== Conversación') == 6
+        assert 'USER: mensaje 0 sobre python número 0 en chatgpt ñ' in texto
+
+    def test_formato_no_soportado(self, framework_exporter, tmp_path):
+        with pytest.raises(ValueError):
+            framework_exporter.write_export(iter(()), str(tmp_path / 'o.xml'), 'xml')
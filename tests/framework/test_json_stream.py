@@ -0,0 +1,67 @@
+"""Tests para JSONArrayStream: parseo incremental del array de una exportación."""
+import io
+import json
+
+import pytest
+
+
+def _stream(processors_base, texto, chunk_size=8, prefix=''):
+    return processors_base.JSONArrayStream(io.StringIO(texto), chunk_size, prefix)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 8, 1 << 20])
+def test_array_igual_que_json_load(processors_base, chunk_size):
+    datos = [{"id": i, "titulo": f"conv {i}", "valor": -2500.5 * i, "ok": i % 2 == 0,
+              "texto": "llaves {} y corchetes [] \"entre comillas\""} for i in range(20)]
+    stream = _stream(processors_base, json.dumps(datos, indent=2), chunk_size)
+    assert stream.root_type == 'array'
+    assert list(stream) == datos
+
+
+def test_numero_cortado_por_el_bloque(processors_base):
+    assert list(_stream(processors_base, "[-2500.5, 12345678, 1e10]", chunk_size=3)) == [-2500.5, 12345678, 1e10]
+
+
+def test_objeto_raiz_es_un_unico_elemento(processors_base):
+    stream = _stream(processors_base, '{"mapping": {"a": 1}}')
+    assert stream.root_type == 'object'
+    assert list(stream) == [{"mapping": {"a": 1}}]
+
+
+def test_array_vacio(processors_base):
+    assert list(_stream(processors_base, "  [ ]  ")) == []
+
+
+def test_continua_tras_prefijo_leido(processors_base):
+    texto = '[{"id": 1}, {"id": 2}, {"id": 3}]'
+    f = io.StringIO(texto)
+    prefijo = f.read(13)
+    stream = processors_base.JSONArrayStream(f, 4, prefijo)
+    assert [d["id"] for d in stream] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("texto", ["", "   ", '"texto"', "42"])
+def test_raiz_no_valida(processors_base, texto):
+    with pytest.raises(json.JSONDecodeError):
+        _stream(processors_base, texto)
+
+
+@pytest.mark.parametrize("texto", ['[{"id": 1} {"id": 2}]', '[{"id": 1}, {"id": ', '[1, 2] extra'])
+def test_documento_mal_formado(processors_base, texto):
+    with pytest.raises(json.JSONDecodeError):
+        list(_stream(processors_base, texto))
+
+
+def test_elementos_se_producen_antes_de_leer_todo(processors_base):
+    """Con bloques pequeños el primer elemento sale sin haber leído el archivo entero."""
+    f = io.StringIO(json.dumps([{"id": i, "relleno": "x" * 100} for i in range(50)]))
+    stream = processors_base.JSONArrayStream(f, 64)
+    assert next(iter(stream))["id"] == 0
+    assert f.tell() < len(f.getvalue()) // 10
+
+
+def test_open_json_stream(processors_base, tmp_path):
+    ruta = tmp_path / "export.json"
+    ruta.write_text(json.dumps([{"id": "á"}, {"id": "ñ"}]), encoding="utf-8")
+    with processors_base.open_json_stream(str(ruta), chunk_size=4) as stream:
+        assert [d["id"] for d in stream] == ["á", "ñ"]
@@ -0,0 +1,175 @@
+"""Tests de los middleware de etapa: cache por contenido y limitación de ritmo."""
+import sqlite3
+
+import pytest
+
+from src.framework.pipeline import (
+    CachingMiddleware, Middleware, Pipeline, RateLimitMiddleware, Stage, TokenBucket,
+    compose, get_bucket
+)
+
+
+class _Contador:
+    """Función de etapa que cuenta los elementos que le llegan."""
+
+    def __init__(self):
+        self.vistos = []
+
+    def __call__(self, lote):
+        self.vistos.extend(lote)
+        return [x * 10 if isinstance(x, int) else x for x in lote]
+
+
+def test_middleware_es_abstracto():
+    with pytest.raises(TypeError):
+        Middleware()
+
+
+def test_compose_deja_el_primero_por_fuera():
+    orden = []
+
+    class _Marca(Middleware):
+        def __init__(self, nombre):
+            super().__init__()
+            self.nombre = nombre
+
+        def wrap(self, func, stage_name=""):
+            def envuelta(lote):
+                orden.append(self.nombre)
+                return func(lote)
+            return envuelta
+
+    funcion = compose(lambda lote: lote, [_Marca('fuera'), _Marca('dentro')])
+    assert funcion([1]) == [1]
+    assert orden == ['fuera', 'dentro']
+
+
+class TestCachingMiddleware:
+
+    def test_aciertos_en_memoria_y_duplicados(self):
+        etapa = _Contador()
+        cache = CachingMiddleware()
+        cacheada = cache.wrap(etapa, 'x')
+
+        assert cacheada([1, 2, 1]) == [10, 20, 10]
+        assert etapa.vistos == [1, 2]
+        assert cacheada([2, 3]) == [20, 30]
+        assert etapa.vistos == [1, 2, 3]
+
+        stats = cache.stats()
+        assert stats['hits_memory'] == 1
+        assert stats['misses'] == 3
+
+    def test_no_cacheables_siempre_se_calculan(self):
+        etapa = _Contador()
+        cacheada = CachingMiddleware(key=lambda x: None if x < 0 else str(x)).wrap(etapa, 'x')
+        cacheada([-1, 1])
+        cacheada([-1, 1])
+        assert etapa.vistos == [-1, 1, -1]
+
+    def test_numero_de_resultados_incorrecto(self):
+        cacheada = CachingMiddleware().wrap(lambda lote: [], 'x')
+        with pytest.raises(ValueError):
+            cacheada([1])
+
+    def test_persistencia_en_disco(self, tmp_path):
+        ruta = str(tmp_path / "cache.db")
+        primera = CachingMiddleware(db_path=ruta)
+        primera.wrap(_Contador(), 'analisis')([1, 2])
+        primera.close()
+
+        etapa = _Contador()
+        segunda = CachingMiddleware(db_path=ruta)
+        assert segunda.wrap(etapa, 'analisis')([1, 2, 3]) == [10, 20, 30]
+        assert etapa.vistos == [3]
+        assert segunda.stats()['hits_disk'] == 2
+        # Otro namespace no ve esas entradas
+        otra = _Contador()
+        segunda.wrap(otra, 'otra_etapa')([1])
+        assert otra.vistos == [1]
+        segunda.close()
+
+    def test_ttl_caduca_entradas_en_disco(self, tmp_path):
+        ruta = str(tmp_path / "cache.db")
+        CachingMiddleware(db_path=ruta).wrap(_Contador(), 'x')([1])
+
+        etapa = _Contador()
+        CachingMiddleware(db_path=ruta, ttl=1e-9).wrap(etapa, 'x')([1])
+        assert etapa.vistos == [1]
+
+    def test_poda_en_disco(self, tmp_path):
+        cache = CachingMiddleware(db_path=str(tmp_path / "cache.db"), max_disk_entries=5)
+        cacheada = cache.wrap(_Contador(), 'x')
+        for i in range(4):
+            cacheada(list(range(i * 3, i * 3 + 3)))
+        assert cache._count_disk('x') == 5
+
+    def test_fallo_de_escritura_deshace_la_transaccion(self, tmp_path):
+        ruta = str(tmp_path / "cache.db")
+        cache = CachingMiddleware(db_path=ruta, key=str)
+        cache._conn.execute('''
+            CREATE TRIGGER rechaza BEFORE INSERT ON stage_cache
+            WHEN new.key = 'malo' BEGIN SELECT RAISE(ABORT, 'rechazado'); END
+        ''')
+        cacheada = cache.wrap(_Contador(), 'x')
+
+        # El error de disco se registra; el lote se devuelve igualmente
+        assert cacheada(['bueno', 'malo']) == ['bueno', 'malo']
+        assert not cache._conn.in_transaction
+        cacheada(['otro'])
+        claves = {k for (k,) in sqlite3.connect(ruta).execute("SELECT key FROM stage_cache")}
+        assert claves == {'otro'}
+
+    def test_en_un_pipeline(self):
+        etapa = _Contador()
+        cache = CachingMiddleware()
+        pipeline = Pipeline([Stage('x', etapa, batch_size=4, middleware=[cache])])
+        assert sorted(pipeline.run([1, 2, 1, 2, 3] * 4)) == sorted([10, 20, 10, 20, 30] * 4)
+        assert sorted(etapa.vistos) == [1, 2, 3]
+
+
+class TestTokenBucket:
+
+    def test_rafaga_y_recarga(self):
+        cubo = TokenBucket(rate=1000, capacity=2)
+        assert cubo.try_acquire()
+        assert cubo.try_acquire()
+        assert not cubo.try_acquire()
+        assert cubo.acquire() > 0
+
+    def test_timeout(self):
+        cubo = TokenBucket(rate=1, capacity=1)
+        cubo.acquire()
+        with pytest.raises(TimeoutError):
+            cubo.acquire(timeout=0.01)
+
+    def test_rate_no_valido(self):
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
+
+    def test_get_bucket_comparte_por_nombre(self):
+        assert get_bucket('test_compartido', 5) is get_bucket('test_compartido', 50)
+
+
+class TestRateLimitMiddleware:
+
+    def test_cubo_por_clave(self):
+        limite = RateLimitMiddleware(rate=1000, key=lambda x: x['p'], rates={'lento': 1})
+        limitada = limite.wrap(lambda lote: lote, 'llm')
+        limitada([{'p': 'rapido'}, {'p': 'lento'}])
+
+        assert limite.bucket_for('rapido') is not limite.bucket_for('lento')
+        assert limite.bucket_for('lento').rate == 1
+        assert limite.stats()['batches'] == 1
+
+    def test_clave_none_usa_el_cubo_de_la_etapa(self):
+        limite = RateLimitMiddleware(rate=1000, key=lambda x: x.get('p'))
+        limitada = limite.wrap(lambda lote: lote, 'llm')
+        assert limitada([{'p': None}, {}]) == [{'p': None}, {}]
+        assert limite.bucket_for(None) is limite._bucket
+
+    def test_timeout_pasa_a_on_error(self):
+        limite = RateLimitMiddleware(rate=1, capacity=1, timeout=0.01)
+        pipeline = Pipeline([Stage('x', lambda lote: lote, middleware=[limite],
+                                   on_error=lambda lote, e: ['limitado'] * len(lote))])
+        assert sorted(pipeline.run([1, 2]), key=str) == [1, 'limitado']
@@ -0,0 +1,236 @@
+"""Tests para el motor del pipeline: colas acotadas, etapas y drenado."""
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from src.framework.pipeline import Pipeline, PipelineError, QueueClosed, Stage, TaskQueue
+
+
+def _doble(lote):
+    return [x * 2 for x in lote]
+
+
+_producidos = None
+
+
+def _cuenta_producidos(contador):
+    global _producidos
+    _producidos = contador
+
+
+def _expande(lote):
+    """Etapa generadora: 100 resultados por elemento, contados al producirse"""
+    for x in lote:
+        for k in range(100):
+            if _producidos is not None:
+                with _producidos.get_lock():
+                    _producidos.value += 1
+            yield x * 100 + k
+
+
+class TestTaskQueue:
+
+    def test_fifo_y_lotes(self):
+        cola = TaskQueue(10)
+        for i in range(5):
+            cola.put(i)
+        assert cola.get_batch(3) == [0, 1, 2]
+        assert cola.get_batch(3) == [3, 4]
+
+    def test_cerrar_permite_vaciar(self):
+        cola = TaskQueue()
+        cola.put('a')
+        cola.close()
+        with pytest.raises(QueueClosed):
+            cola.put('b')
+        assert cola.get_batch(5) == ['a']
+        assert cola.get_batch(5) == []
+
+    def test_abortar_descarta(self):
+        cola = TaskQueue()
+        cola.put(1)
+        cola.put(2)
+        assert cola.abort() == 2
+        assert cola.get_batch() == []
+
+    def test_llena_bloquea_hasta_timeout(self):
+        cola = TaskQueue(1)
+        cola.put(1)
+        with pytest.raises(TimeoutError):
+            cola.put(2, timeout=0.01)
+
+    def test_max_wait_completa_el_lote(self):
+        cola = TaskQueue()
+        cola.put(1)
+        threading.Timer(0.02, cola.put, args=(2,)).start()
+        assert cola.get_batch(2, max_wait=1.0) == [1, 2]
+
+
+class TestPipeline:
+
+    def test_etapas_en_cadena(self):
+        pipeline = Pipeline([
+            Stage('doble', _doble, workers=3, batch_size=4),
+            Stage('pares', lambda lote: [x for x in lote if x % 4 == 0]),
+            Stage('expande', lambda lote: [y for x in lote for y in (x, -x)], batch_size=10),
+        ], queue_size=4)
+        resultados = list(pipeline.run(range(100)))
+        esperado = [y for x in range(100) if (2 * x) % 4 == 0 for y in (2 * x, -2 * x)]
+        assert sorted(resultados) == sorted(esperado)
+
+        etapas = {s['name']: s for s in pipeline.stats()['stages']}
+        assert etapas['doble']['items_in'] == 100
+        assert etapas['pares']['items_out'] == 50
+        assert etapas['expande']['items_out'] == 100
+
+    def test_contrapresion(self):
+        """Una etapa lenta frena a la anterior: ninguna cola pasa de su capacidad."""
+        def lenta(lote):
+            time.sleep(0.002)
+            return lote
+
+        pipeline = Pipeline([Stage('rapida', _doble), Stage('lenta', lenta)], queue_size=3)
+        assert len(list(pipeline.run(range(40)))) == 40
+        for etapa in pipeline.stats()['stages']:
+            assert etapa['queue']['high_water'] <= 3
+
+    def test_on_error_sustituye_el_lote(self):
+        def falla_con_impares(lote):
+            if lote[0] % 2:
+                raise ValueError("impar")
+            return lote
+
+        pipeline = Pipeline([Stage('f', falla_con_impares,
+                                   on_error=lambda lote, e: [('error', x) for x in lote])])
+        resultados = list(pipeline.run(range(6)))
+        assert sorted(r for r in resultados if not isinstance(r, tuple)) == [0, 2, 4]
+        assert sorted(r[1] for r in resultados if isinstance(r, tuple)) == [1, 3, 5]
+        assert pipeline.stats()['stages'][0]['errors'] == 3
+
+    def test_on_finish_al_vaciar_la_entrada(self):
+        acumulados = []
+
+        def acumula(lote):
+            acumulados.extend(lote)
+            return []
+
+        pipeline = Pipeline([Stage('acumula', acumula, on_finish=lambda: [sum(acumulados)])])
+        assert list(pipeline.run(range(10))) == [45]
+
+    def test_error_no_controlado_cancela(self):
+        def on_error(lote, e):
+            raise RuntimeError("on_error roto")
+
+        pipeline = Pipeline([Stage('f', lambda lote: 1 / 0, on_error=on_error), Stage('g', _doble)])
+        with pytest.raises(PipelineError):
+            list(pipeline.run(range(5)))
+        assert pipeline.stats()['cancelled']
+
+    def test_dejar_de_iterar_cancela(self):
+        producidos = []
+
+        def fuente():
+            for i in range(10_000):
+                producidos.append(i)
+                yield i
+
+        pipeline = Pipeline([Stage('doble', _doble)], queue_size=2)
+        resultados = pipeline.run(fuente())
+        assert next(resultados) == 0
+        resultados.close()
+        assert pipeline.stats()['cancelled']
+        assert len(producidos) < 10_000
+
+    def test_modo_proceso(self):
+        pipeline = Pipeline([Stage('doble', _doble, workers=2, mode='process', batch_size=5)])
+        assert sorted(pipeline.run(range(20))) == [2 * x for x in range(20)]
+
+    def test_generador_emite_segun_produce(self):
+        producidos = []
+
+        def expande(lote):
+            for x in lote:
+                for k in range(1000):
+                    producidos.append(k)
+                    yield x * 1000 + k
+
+        pipeline = Pipeline([Stage('expande', expande), Stage('doble', _doble)], queue_size=2)
+        en_vuelo = []
+        total = 0
+        for _ in pipeline.run(range(3)):
+            total += 1
+            en_vuelo.append(len(producidos) - total)
+        assert total == 3000
+        # cola intermedia + lote en curso + cola de salida, no los 1000 del elemento
+        assert max(en_vuelo) <= 20
+        assert pipeline.stats()['stages'][0]['items_out'] == 3000
+
+    def test_generador_en_proceso_acotado(self):
+        contador = multiprocessing.Value('i', 0)
+        pipeline = Pipeline([Stage('expande', _expande, workers=2, mode='process',
+                                   initializer=_cuenta_producidos, initargs=(contador,))],
+                            queue_size=2)
+        resultados = []
+        en_vuelo = []
+        for r in pipeline.run(range(6)):
+            resultados.append(r)
+            en_vuelo.append(contador.value - len(resultados))
+        assert sorted(resultados) == list(range(600))
+        # workers * (STREAM_BUFFER + 2) + cola de salida
+        assert max(en_vuelo) <= 20
+
+    def test_generador_en_proceso_cancelado(self):
+        contador = multiprocessing.Value('i', 0)
+        pipeline = Pipeline([Stage('expande', _expande, mode='process',
+                                   initializer=_cuenta_producidos, initargs=(contador,))],
+                            queue_size=2)
+        resultados = pipeline.run(range(100))
+        assert next(resultados) == 0
+        resultados.close()
+        assert pipeline.stats()['cancelled']
+        assert contador.value < 10_000
+
+    def test_generador_que_falla_a_medias(self):
+        def expande(lote):
+            yield from lote
+            raise RuntimeError("corte")
+
+        pipeline = Pipeline([Stage('expande', expande, batch_size=3,
+                                   on_error=lambda lote, e: ['error'])])
+        assert list(pipeline.run(range(3))) == [0, 1, 2, 'error']
+        assert pipeline.stats()['stages'][0]['errors'] == 1
+
+    def test_finalizer_en_cada_hilo(self):
+        hilos = set()
+        finalizados = []
+
+        def registra(lote):
+            hilos.add(threading.get_ident())
+            time.sleep(0.01)
+            return lote
+
+        def finaliza():
+            finalizados.append(threading.get_ident())
+
+        pipeline = Pipeline([Stage('f', registra, workers=3, finalizer=finaliza)])
+        assert sorted(pipeline.run(range(9))) == list(range(9))
+        assert len(finalizados) == 3 and hilos <= set(finalizados)
+
+        finalizados.clear()
+        pipeline = Pipeline([Stage('f', lambda lote: 1 / 0, workers=2, finalizer=finaliza,
+                                   on_error=lambda lote, e: 1 / 0)])
+        with pytest.raises(PipelineError):
+            list(pipeline.run(range(5)))
+        assert len(finalizados) == 2
+
+    def test_etapa_no_valida(self):
+        with pytest.raises(ValueError):
+            Stage('x', _doble, mode='gpu')
+        with pytest.raises(ValueError):
+            Stage('x', _doble, workers=0)
+        with pytest.raises(ValueError):
+            Stage('x', _doble, mode='process', finalizer=print)
+        with pytest.raises(ValueError):
+            Pipeline([])
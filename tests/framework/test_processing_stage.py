@@ -0,0 +1,238 @@
+"""Tests para las etapas de procesamiento y almacenamiento de la ingesta."""
+import threading
+import time
+
+import pytest
+
+from src.framework.pipeline.orchestrator import Pipeline
+from src.framework.pipeline.stages import (StorageWriter, ingestion_stage, iter_parse_file,
+                                           new_parsed, parse_file, processing_stage,
+                                           storage_stage)
+from src.framework.pipeline.stages import processing
+
+
+class _Detector:
+    def detect_file_type(self, file_path):
+        if file_path.endswith('.txt'):
+            return {'success': False, 'error': 'Tipo no soportado'}
+        return {'success': True, 'processor': 'fake', 'confidence': 90.0}
+
+
+class _Procesador:
+    """Procesador cuyo iter_file produce n conversaciones por archivo (n en el nombre)."""
+
+    def __init__(self, fabrica, falla_tras=None):
+        self.fabrica = fabrica
+        self.falla_tras = falla_tras
+        self.leidas = 0
+
+    def iter_file(self, file_path):
+        n = int(file_path.rsplit('_', 1)[1].split('.')[0])
+        for i in range(n):
+            if self.falla_tras is not None and i == self.falla_tras:
+                raise processing.ProcessingError("archivo cortado")
+            self.leidas += 1
+            yield self.fabrica(i)
+
+    def process_file(self, file_path):
+        raise AssertionError("la etapa debe consumir iter_file")
+
+
+class _BaseDatos:
+    def __init__(self, falla=False):
+        self.falla = falla
+        self.lotes = []
+        self.registrados = []
+
+    def add_conversations_batch(self, conversaciones):
+        # Como IANAEDatabase: no lanza, cuenta las conversaciones no escritas
+        self.lotes.append([c['id'] for c in conversaciones])
+        errores = len(conversaciones) if self.falla else 0
+        return {'conversations_added': len(conversaciones) - errores, 'conversations_updated': 0,
+                'conversations_skipped': 0, 'messages_added': 0, 'errors': errores,
+                'processing_time': 0.0}
+
+    def register_file_processing(self, file_path, detected_type, stats):
+        self.registrados.append((file_path, stats['conversations_processed'],
+                                 stats['messages_processed']))
+
+
+@pytest.fixture
+def procesador(nueva_conversacion):
+    """Fábrica de procesadores falsos: procesador(falla_tras=None)."""
+    return lambda falla_tras=None: _Procesador(nueva_conversacion, falla_tras)
+
+
+class TestIterParseFile:
+
+    def test_trozos_de_tamano_fijo(self, procesador):
+        trozos = list(iter_parse_file(new_parsed('/x/a_5.json'), _Detector(),
+                                      {'fake': procesador()}, chunk_size=2))
+        assert [len(t['conversations']) for t in trozos] == [2, 2, 1]
+        assert [t['final'] for t in trozos] == [False, False, True]
+        assert all(t['status'] == 'parsed' for t in trozos)
+        assert trozos[-1]['conversation_count'] == 5
+        assert trozos[-1]['message_count'] == 10
+
+    def test_consume_el_iterador_bajo_demanda(self, procesador):
+        fake = procesador()
+        trozos = iter_parse_file(new_parsed('/x/a_100.json'), _Detector(),
+                                 {'fake': fake}, chunk_size=10)
+        next(trozos)
+        assert fake.leidas == 11  # el trozo lleno sale al llegar la siguiente
+
+    def test_trozo_final_nunca_vacio(self, procesador):
+        trozos = list(iter_parse_file(new_parsed('/x/a_4.json'), _Detector(),
+                                      {'fake': procesador()}, chunk_size=2))
+        assert [len(t['conversations']) for t in trozos] == [2, 2]
+
+    def test_rechazado(self):
+        trozos = list(iter_parse_file(new_parsed('/x/notas.txt'), _Detector(), {}))
+        assert len(trozos) == 1 and trozos[0]['final']
+        assert trozos[0]['status'] == 'rejected'
+
+    def test_fallo_a_medias(self, procesador):
+        parsed = new_parsed('/x/a_5.json')
+        trozos = list(iter_parse_file(parsed, _Detector(), {'fake': procesador(falla_tras=3)},
+                                      chunk_size=2))
+        assert trozos[-1]['final'] and trozos[-1]['status'] == 'failed'
+        assert trozos[-1]['conversations'] == []
+        assert 'archivo cortado' in parsed['error']
+
+    def test_parse_file_junta_los_trozos(self, procesador):
+        parsed = parse_file(new_parsed('/x/a_450.json'), _Detector(), {'fake': procesador()})
+        assert parsed['status'] == 'parsed'
+        assert len(parsed['conversations']) == 450
+
+
+class TestStorageWriter:
+
+    @pytest.fixture
+    def trozos(self, procesador):
+        def trozos(nombre, chunk_size=2):
+            return list(iter_parse_file(new_parsed(nombre), _Detector(),
+                                        {'fake': procesador()}, chunk_size))
+        return trozos
+
+    def test_registra_el_archivo_tras_su_ultimo_trozo(self, trozos):
+        db = _BaseDatos()
+        writer = StorageWriter(db, commit_batch=2)
+        archivo = trozos('/x/a_5.json')
+        eventos = writer(archivo[:2])
+        assert db.lotes and not db.registrados
+        assert all(e['type'] == 'commit' for e in eventos)
+        eventos = writer(archivo[2:]) + writer.flush()
+        assert db.registrados == [('/x/a_5.json', 5, 10)]
+        terminados = [e for e in eventos if e['type'] == 'file']
+        assert len(terminados) == 1 and terminados[0]['success']
+        assert terminados[0]['conversations'] == 5
+
+    def test_lote_con_errores_marca_el_archivo(self, trozos):
+        db = _BaseDatos(falla=True)
+        writer = StorageWriter(db, commit_batch=2)
+        archivo = trozos('/x/a_5.json')
+        eventos = writer(archivo[:1])  # el trozo intermedio falla sin evento de archivo
+        assert [e['type'] for e in eventos] == ['commit'] and eventos[0]['errors'] == 2
+        db.falla = False
+        eventos = writer(archivo[1:]) + writer.flush()
+        terminados = [e for e in eventos if e['type'] == 'file']
+        assert len(terminados) == 1 and not terminados[0]['success']
+        assert 'no se escribieron' in terminados[0]['error']
+        assert db.registrados == []
+
+    def test_conversacion_no_escrita_no_registra_el_archivo(self, framework_db, tmp_path,
+                                                            nueva_conversacion):
+        db = framework_db.IANAEDatabase(str(tmp_path / 'ianae.db'))
+        archivos = {}
+        for nombre, convs in (('roto.json', [0, 1, 2]), ('sano.json', [3, 4])):
+            ruta = tmp_path / nombre
+            ruta.write_text('[]', encoding='utf-8')
+            parsed = new_parsed(str(ruta))
+            parsed.update({'status': 'parsed', 'detected_type': 'chatgpt',
+                           'conversations': [nueva_conversacion(i) for i in convs]})
+            archivos[nombre] = parsed
+        del archivos['roto.json']['conversations'][1]['titulo']
+
+        writer = StorageWriter(db)
+        eventos = writer([archivos['roto.json']]) + writer.flush()
+        eventos += writer([archivos['sano.json']]) + writer.flush()
+
+        resultado = {e['filename']: e['success'] for e in eventos if e['type'] == 'file'}
+        assert resultado == {'roto.json': False, 'sano.json': True}
+        assert not db.is_file_processed(archivos['roto.json']['file_path'])[0]
+        assert db.is_file_processed(archivos['sano.json']['file_path'])[0]
+        # Las conversaciones válidas del lote sí se escribieron
+        assert db.get_conversation_details('conv_000') is not None
+
+
+def test_pipeline_envia_trozos_a_almacenamiento(procesador):
+    db = _BaseDatos()
+    writer = StorageWriter(db, commit_batch=3, total=2)
+    pipeline = Pipeline([
+        processing_stage(_Detector, lambda: {'fake': procesador()}, workers=1,
+                         mode='thread', chunk_size=2),
+        storage_stage(writer)
+    ], name="test-ingesta")
+    entrada = [new_parsed('/x/a_5.json', 0), new_parsed('/x/b_3.json', 1)]
+    eventos = list(pipeline.run(entrada))
+
+    assert pipeline.stats()['stages'][0]['items_out'] == 5  # 3 + 2 trozos
+    assert sorted(r[:2] for r in db.registrados) == [('/x/a_5.json', 5), ('/x/b_3.json', 3)]
+    assert sum(len(lote) for lote in db.lotes) == 8
+    assert max(len(lote) for lote in db.lotes) <= 4
+    assert sum(e['type'] == 'file' for e in eventos) == 2
+
+
+def test_conversaciones_en_vuelo_acotadas(procesador):
+    """Un archivo grande no se materializa: parseo y escritura avanzan a la vez."""
+    fake = procesador()
+    db = _BaseDatos()
+    escritas = []
+    en_vuelo = []
+    cerrojo = threading.Lock()
+
+    def escribe(conversaciones):
+        time.sleep(0.001)  # escritor más lento que el parseo
+        with cerrojo:
+            escritas.extend(conversaciones)
+            en_vuelo.append(fake.leidas - len(escritas))
+        return _BaseDatos.add_conversations_batch(db, conversaciones)
+
+    db.add_conversations_batch = escribe
+    writer = StorageWriter(db, commit_batch=20)
+    pipeline = Pipeline([
+        processing_stage(_Detector, lambda: {'fake': fake}, workers=1, mode='thread',
+                         chunk_size=10),
+        storage_stage(writer)
+    ], name="test-en-vuelo", queue_size=2)
+    list(pipeline.run([new_parsed('/x/grande_2000.json')]))
+
+    assert len(escritas) == 2000
+    # Trozo en curso + trozo esperando cola + cola (2) + lote del escritor (< 20 + 10)
+    assert max(en_vuelo) <= 100
+
+
+def test_ingesta_cierra_las_conexiones_de_sus_hilos(framework_db, tmp_path):
+    db = framework_db.IANAEDatabase(str(tmp_path / 'ianae.db'))
+    abiertas = []
+    original = db._thread_connection
+
+    def registra():
+        conn = original()
+        if conn not in abiertas:
+            abiertas.append(conn)
+        return conn
+
+    db._thread_connection = registra
+    rutas = []
+    for i in range(20):
+        ruta = tmp_path / f'export_{i}.json'
+        ruta.write_text('[]', encoding='utf-8')
+        rutas.append((i, str(ruta)))
+
+    pipeline = Pipeline([ingestion_stage(db, workers=2)])
+    assert all(p['status'] == 'pending' for p in pipeline.run(rutas))
+    assert 1 <= len(abiertas) <= 2
+    for conn in abiertas:
+        with pytest.raises(framework_db.sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
@@ -0,0 +1,176 @@
+"""Tests del constructor de contexto con presupuesto de tokens."""
+import pytest
+
+from src.framework.llm.context_builder import (ContextBuilder, ContextCandidate, ContextSection,
+                                               estimate_tokens)
+
+
+def _candidato(nombre, score, texto, version=1, renders=None):
+    def render():
+        if renders is not None:
+            renders.append(nombre)
+        return texto
+    return ContextCandidate(key=nombre, score=score, render=render, version=version)
+
+
+class TestEstimador:
+
+    def test_vacio(self):
+        assert estimate_tokens('') == 0
+
+    def test_palabras_y_signos(self):
+        assert estimate_tokens('hola, mundo') == 4  # hola , mund o
+        assert estimate_tokens('optimización') == 3
+
+    def test_crece_con_el_texto(self):
+        assert estimate_tokens('python ' * 100) == 2 * estimate_tokens('python ' * 50)
+
+
+class TestEmpaquetado:
+
+    def test_ordena_por_puntuacion(self):
+        builder = ContextBuilder(max_tokens=1000, header='CABECERA')
+        contexto = builder.build(ContextSection([
+            _candidato('a', 0.1, 'bajo'), _candidato('b', 0.9, 'alto'), _candidato('c', 0.5, 'medio')
+        ]))
+        assert contexto == 'CABECERA\n1. alto\n2. medio\n3. bajo'
+
+    def test_respeta_presupuesto(self):
+        builder = ContextBuilder(max_tokens=60)
+        candidatos = [_candidato(f'c{i}', 10 - i, f'concepto {i} ' + 'palabra ' * 8) for i in range(10)]
+        contexto = builder.build(ContextSection(candidatos))
+        assert estimate_tokens(contexto) <= 60
+        assert builder.stats['last_packed'] < 10
+        assert '1. concepto 0' in contexto
+
+    def test_salta_los_que_no_caben(self):
+        builder = ContextBuilder(max_tokens=30)
+        contexto = builder.build(ContextSection([
+            _candidato('a', 3, 'corto uno'),
+            _candidato('b', 2, 'largo ' * 50),
+            _candidato('c', 1, 'corto dos')
+        ], item_format='{text}'))
+        assert contexto == 'corto uno\ncorto dos'
+        assert builder.stats['last_dropped'] == 1
+
+    def test_trunca_el_primero(self):
+        builder = ContextBuilder(max_tokens=40)
+        contexto = builder.build(ContextSection([_candidato('a', 1, 'palabra ' * 100)]))
+        assert contexto.endswith('...')
+        assert estimate_tokens(contexto) <= 40
+
+    def test_secciones_sin_duplicados(self):
+        builder = ContextBuilder(max_tokens=1000)
+        contexto = builder.build(
+            ContextSection([_candidato('a', 1, 'A'), _candidato('b', 0.5, 'B')], max_items=1),
+            ContextSection([_candidato('a', 1, 'A'), _candidato('c', 1, 'C')],
+                           title='RELACIONADOS:', item_format='• {text}')
+        )
+        assert contexto == '1. A\nRELACIONADOS:\n• C'
+
+    def test_vacio(self):
+        builder = ContextBuilder(empty_message='nada')
+        assert builder.build(ContextSection([])) == 'nada'
+
+
+class TestCache:
+
+    def test_reutiliza_fragmentos(self):
+        builder = ContextBuilder()
+        renders = []
+        for _ in range(3):
+            builder.build(ContextSection([_candidato('a', 1, 'A', renders=renders),
+                                          _candidato('b', 1, 'B', renders=renders)]))
+        assert renders == ['a', 'b']
+        assert builder.get_stats()['hit_rate'] == pytest.approx(4 / 6)
+
+    def test_version_nueva_renderiza(self):
+        builder = ContextBuilder()
+        builder.build(ContextSection([_candidato('a', 1, 'viejo', version='2024-01-01')]))
+        contexto = builder.build(ContextSection([_candidato('a', 1, 'nuevo', version='2024-02-01')]))
+        assert contexto == '1. nuevo'
+
+    def test_sin_version_no_cachea(self):
+        builder = ContextBuilder()
+        renders = []
+        for _ in range(2):
+            builder.build(ContextSection([_candidato('a', 1, 'A', version=None, renders=renders)]))
+        assert renders == ['a', 'a']
+        assert builder.get_stats()['cache_entries'] == 0
+
+    def test_lru(self):
+        builder = ContextBuilder(cache_size=2)
+        builder.build(ContextSection([_candidato(k, 1, k) for k in 'abc']))
+        assert builder.get_stats()['cache_entries'] == 2
+
+
+class TestMemoriaDatabase:
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        from src.memory.database import IANAEDatabase
+        db = IANAEDatabase(str(tmp_path / 'memoria.db'))
+        yield db
+        db.cerrar()
+
+    def _concepto(self, nombre, puntuacion, updated_at='2024-01-01 00:00:00'):
+        return {'concepto': nombre, 'categoria': 'tecnologias', 'contexto': f'{nombre} ' * 20,
+                'fuente': 'conv.json', 'puntuacion': puntuacion, 'updated_at': updated_at}
+
+    def test_contexto_cacheado(self, db):
+        conceptos = [self._concepto(f'c{i}', i) for i in range(8)]
+        primero = db.generar_contexto_para_llm(conceptos)
+        assert primero == db.generar_contexto_para_llm(conceptos)
+        assert primero.startswith('MEMORIA PERSONAL DE LUCAS:\n')
+        assert '1. C7' in primero and '6.' not in primero
+        assert db._constructor_contexto.stats['cache_hits'] == 5
+
+    def test_presupuesto(self, db):
+        conceptos = [self._concepto(f'c{i}', i) for i in range(8)]
+        assert estimate_tokens(db.generar_contexto_para_llm(conceptos, max_tokens=120)) <= 120
+
+    def test_sin_conceptos(self, db):
+        assert db.generar_contexto_para_llm([]) == \
+            "No se encontró contexto relevante en la memoria de Lucas."
+
+    def test_busqueda_fts_puntua_mayor_es_mejor(self, db):
+        db.conn.executemany(
+            "INSERT INTO conceptos (nombre, categoria, fuente, contexto, palabras_clave) "
+            "VALUES (?, 'tecnologias', 'conv.json', ?, '[]')",
+            [('opencv_vision', 'opencv ' * 10 + 'detección'),
+             ('python_scripts', 'python con un uso suelto de opencv ' + 'texto ' * 40)]
+        )
+        db.conn.execute("INSERT INTO conceptos_fts(conceptos_fts) VALUES ('rebuild')")
+
+        resultados = db.buscar_conceptos_rapido('opencv', limite=2)
+        assert [r['concepto'] for r in resultados] == ['opencv_vision', 'python_scripts']
+        assert resultados[0]['puntuacion'] > resultados[1]['puntuacion']
+        # El constructor ordena de mayor a menor: el mejor resultado va primero
+        contexto = db.generar_contexto_para_llm(resultados)
+        assert contexto.index('OPENCV VISION') < contexto.index('PYTHON SCRIPTS')
+
+
+class TestWebapp:
+
+    @pytest.fixture
+    def webapp(self):
+        webapp = pytest.importorskip('src.web.webapp')
+        webapp.constructor_contexto.clear_cache()
+        return webapp
+
+    def _concepto(self, nombre, puntuacion):
+        return {'concepto': nombre, 'categoria': 'tecnologias', 'fuente': 'conv.json',
+                'contexto': f'{nombre} ' * 10, 'puntuacion': puntuacion}
+
+    def test_concepto_no_se_repite_entre_secciones(self, webapp):
+        principales = [self._concepto('opencv', 3.0)]
+        relacionados = [self._concepto('opencv', 0.9), self._concepto('python', 0.8)]
+        contexto = webapp.generar_contexto_para_llm(principales, relacionados)
+        assert contexto.count('Opencv') == 1
+        assert 'Python (tecnologias)' in contexto
+
+    def test_cache_distingue_el_formato_de_cada_seccion(self, webapp):
+        webapp.generar_contexto_para_llm([self._concepto('opencv', 3.0)])
+        contexto = webapp.generar_contexto_para_llm([self._concepto('python', 3.0)],
+                                                    [self._concepto('opencv', 0.9)])
+        assert 'Opencv (tecnologias)' in contexto
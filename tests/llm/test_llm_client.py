@@ -0,0 +1,299 @@
+"""Tests de la capa LLM asíncrona contra un servidor HTTP local de prueba."""
+import asyncio
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('httpx')
+
+from src.framework.llm import (AnthropicProvider, BaseProvider, LLMClient, LLMError,
+                               LMStudioProvider, OllamaProvider, OpenAIProvider, create_provider)
+from src.llm.integration import IANAELLMConnector
+
+TOKENS = ['Hola', ' Lucas', ', ', 'OpenCV']
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """OpenAI (/v1/...), Ollama (/api/...) y Anthropic (/v1/messages)"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _lines(self, lines):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for line in lines:
+            self.wfile.write(line.encode() + b'\n')
+            self.wfile.flush()
+        self.close_connection = True
+
+    def _enter(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            server.requests.append(self.path)
+        time.sleep(server.delay)
+
+    def _leave(self):
+        with self.server.lock:
+            self.server.active -= 1
+
+    def do_GET(self):
+        if self.path == '/v1/models':
+            self._json({'data': [{'id': m} for m in self.server.models]})
+        elif self.path == '/api/tags':
+            self._json({'models': [{'name': 'llama3'}]})
+        else:
+            self._json({'error': 'no encontrado'}, 404)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.payloads.append((self.path, dict(self.headers), payload))
+        self._enter()
+        try:
+            if self.path == '/v1/chat/completions':
+                if payload['stream']:
+                    self._lines([f"data: {json.dumps({'choices': [{'delta': {'content': t}}]})}\n"
+                                 for t in TOKENS] + ['data: [DONE]'])
+                else:
+                    self._json({'model': payload['model'],
+                                'choices': [{'message': {'content': ' respuesta '}}],
+                                'usage': {'prompt_tokens': 7, 'completion_tokens': 3}})
+            elif self.path == '/api/chat':
+                if payload['stream']:
+                    self._lines([json.dumps({'message': {'content': t}, 'done': False}) for t in TOKENS]
+                                + [json.dumps({'message': {'content': ''}, 'done': True})])
+                else:
+                    self._json({'model': payload['model'], 'message': {'content': 'ollama'},
+                                'prompt_eval_count': 5, 'eval_count': 2})
+            elif self.path == '/v1/messages':
+                if payload['stream']:
+                    events = [{'type': 'message_start'}]
+                    events += [{'type': 'content_block_delta', 'delta': {'text': t}} for t in TOKENS]
+                    events += [{'type': 'message_stop'}]
+                    self._lines(line for e in events
+                                for line in (f"event: {e['type']}", f"data: {json.dumps(e)}", ''))
+                else:
+                    self._json({'model': payload['model'],
+                                'content': [{'type': 'text', 'text': 'claude'}],
+                                'usage': {'input_tokens': 4, 'output_tokens': 1}})
+            else:
+                self._json({'error': 'no encontrado'}, 404)
+        finally:
+            self._leave()
+
+
+@pytest.fixture
+def servidor():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.delay = 0.0
+    server.active = server.max_active = 0
+    server.requests, server.payloads = [], []
+    server.models = ['modelo-local']
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def puerto_cerrado():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+MENSAJES = [{'role': 'user', 'content': 'hola'}]
+
+
+class TestProveedores:
+
+    def test_base_es_abstracta(self):
+        with pytest.raises(TypeError):
+            BaseProvider()
+
+    @pytest.mark.asyncio
+    async def test_chat_openai(self, servidor):
+        async with OpenAIProvider(endpoint=servidor.url + '/v1', api_key='k', model='m') as llm:
+            r = await llm.chat(MENSAJES, system='sistema')
+        assert r.text == ' respuesta '
+        assert (r.input_tokens, r.output_tokens, r.total_tokens) == (7, 3, 10)
+        _, headers, payload = servidor.payloads[0]
+        assert headers['Authorization'] == 'Bearer k'
+        assert payload['messages'][0] == {'role': 'system', 'content': 'sistema'}
+
+    @pytest.mark.asyncio
+    async def test_stream_openai(self, servidor):
+        async with LMStudioProvider(endpoint=servidor.url + '/v1') as llm:
+            tokens = [t async for t in llm.stream(MENSAJES)]
+        assert tokens == TOKENS
+        assert llm.get_stats()['streams'] == 1
+
+    @pytest.mark.asyncio
+    async def test_ollama(self, servidor):
+        async with OllamaProvider(endpoint=servidor.url) as llm:
+            r = await llm.chat(MENSAJES)
+            tokens = [t async for t in llm.stream(MENSAJES)]
+            modelos = await llm.list_models()
+        assert (r.text, r.total_tokens) == ('ollama', 7)
+        assert tokens == TOKENS
+        assert modelos == ['llama3']
+
+    @pytest.mark.asyncio
+    async def test_anthropic(self, servidor):
+        async with AnthropicProvider(endpoint=servidor.url + '/v1', api_key='k') as llm:
+            r = await llm.chat(MENSAJES, system='sistema')
+            tokens = [t async for t in llm.stream(MENSAJES)]
+        assert (r.text, r.total_tokens) == ('claude', 5)
+        assert tokens == TOKENS
+        _, headers, payload = servidor.payloads[0]
+        assert headers['x-api-key'] == 'k'
+        assert payload['system'] == 'sistema'
+
+    @pytest.mark.asyncio
+    async def test_http_error(self, servidor):
+        async with OpenAIProvider(endpoint=servidor.url + '/otro', api_key='k') as llm:
+            with pytest.raises(LLMError) as info:
+                await llm.chat(MENSAJES)
+        assert info.value.status == 404
+
+    @pytest.mark.asyncio
+    async def test_conexion_rechazada(self, puerto_cerrado):
+        async with LMStudioProvider(endpoint=f'http://127.0.0.1:{puerto_cerrado}/v1') as llm:
+            with pytest.raises(LLMError) as info:
+                await llm.chat(MENSAJES)
+            estado = await llm.health_check(timeout=1)
+        assert info.value.connection
+        assert not estado['available'] and estado['error']
+
+    @pytest.mark.asyncio
+    async def test_timeout_por_peticion(self, servidor):
+        servidor.delay = 1.0
+        async with LMStudioProvider(endpoint=servidor.url + '/v1') as llm:
+            start = time.perf_counter()
+            with pytest.raises(LLMError) as info:
+                await llm.chat(MENSAJES, timeout=0.2)
+        assert info.value.timeout
+        assert time.perf_counter() - start < 0.9
+        assert llm.get_stats()['timeouts'] == 1
+
+    def test_proveedor_desconocido(self):
+        with pytest.raises(ValueError):
+            create_provider('inexistente')
+
+
+class TestConcurrencia:
+
+    @pytest.mark.asyncio
+    async def test_peticiones_en_paralelo(self, servidor):
+        servidor.delay = 0.3
+        async with LMStudioProvider(endpoint=servidor.url + '/v1', max_concurrency=8) as llm:
+            start = time.perf_counter()
+            respuestas = await asyncio.gather(*(llm.chat(MENSAJES) for _ in range(6)))
+            elapsed = time.perf_counter() - start
+        assert len(respuestas) == 6
+        assert elapsed < 6 * 0.3 / 2, f"6 peticiones tardaron {elapsed:.2f}s (se serializaron)"
+        assert servidor.max_active > 1
+
+    @pytest.mark.asyncio
+    async def test_limite_de_concurrencia(self, servidor):
+        servidor.delay = 0.1
+        async with LMStudioProvider(endpoint=servidor.url + '/v1', max_concurrency=2) as llm:
+            await asyncio.gather(*(llm.chat(MENSAJES) for _ in range(6)))
+        assert servidor.max_active <= 2
+
+    @pytest.mark.asyncio
+    async def test_fallback(self, servidor, puerto_cerrado):
+        caido = LMStudioProvider(endpoint=f'http://127.0.0.1:{puerto_cerrado}/v1')
+        sano = OllamaProvider(endpoint=servidor.url)
+        async with LLMClient([caido, sano]) as client:
+            r = await client.chat(MENSAJES)
+            tokens = [t async for t in client.stream(MENSAJES)]
+        assert r.provider == 'ollama'
+        assert tokens == TOKENS
+        assert 'lmstudio' in client.last_errors
+
+
+class TestConector:
+
+    @pytest.fixture
+    def conector(self, servidor, monkeypatch):
+        monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+        conector = IANAELLMConnector()
+        conector.lm_studio = LMStudioProvider(endpoint=servidor.url + '/v1',
+                                              model=conector.lm_studio_model)
+        conector.openai = OpenAIProvider(endpoint=servidor.url + '/v1', api_key='')
+        return conector
+
+    @pytest.mark.asyncio
+    async def test_respuesta(self, conector):
+        r = await conector.get_intelligent_response('¿OpenCV?', [{'name': 'OpenCV'}], [])
+        await conector.aclose()
+        assert r['success'] and r['provider'] == 'LM Studio'
+        assert r['response'] == 'respuesta'
+        assert r['tokens_used'] == 10
+
+    @pytest.mark.asyncio
+    async def test_no_serializa(self, conector, servidor):
+        servidor.delay = 0.3
+        start = time.perf_counter()
+        resultados = await asyncio.gather(*(
+            conector.get_intelligent_response(f'pregunta {i}', [], []) for i in range(4)))
+        elapsed = time.perf_counter() - start
+        await conector.aclose()
+        assert all(r['success'] for r in resultados)
+        assert elapsed < 4 * 0.3 * 0.75
+        assert servidor.max_active == 2  # max_concurrency de LM Studio
+
+    @pytest.mark.asyncio
+    async def test_sin_llm(self, puerto_cerrado, monkeypatch):
+        monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+        conector = IANAELLMConnector()
+        conector.lm_studio = LMStudioProvider(endpoint=f'http://127.0.0.1:{puerto_cerrado}/v1')
+        r = await conector.get_intelligent_response('hola', [], [])
+        estado = await conector.health_check()
+        await conector.aclose()
+        assert not r['success']
+        assert estado['recommended'] == 'none'
+
+    @pytest.mark.asyncio
+    async def test_health_check(self, conector, servidor):
+        estado = await conector.health_check()
+        assert estado['lm_studio']['available']
+        assert estado['lm_studio']['model'] == 'modelo-local'
+        assert estado['recommended'] == 'lm_studio'
+
+        # LM Studio responde pero sin modelo cargado
+        servidor.models = []
+        estado = await conector.health_check()
+        await conector.aclose()
+        assert not estado['lm_studio']['available']
+        assert estado['lm_studio']['error']
+        assert estado['recommended'] == 'none'
+
+    @pytest.mark.asyncio
+    async def test_stream(self, conector):
+        tokens = [t async for t in conector.stream_intelligent_response('hola', [], [])]
+        await conector.aclose()
+        assert tokens == TOKENS
@@ -0,0 +1,51 @@
+"""
+Fixtures compartidas para tests de NLP: un spaCy simulado.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+
+class _Token:
+    def __init__(self, texto, i):
+        self.text = texto
+        self.lemma_ = texto.lower()
+        self.pos_ = "PROPN" if texto[0].isupper() else "NOUN"
+        self.is_stop = False
+        self.i = i
+
+
+class _Doc(list):
+    def __init__(self, texto):
+        super().__init__(_Token(p, i) for i, p in enumerate(texto.split()))
+        self.text = texto
+        self.ents = []
+        self.noun_chunks = []
+        self.sents = [self]
+
+
+class _NlpFalso:
+    """Imita la API de spaCy usada por el extractor y cuenta los análisis."""
+    pipe_names = ["tok2vec", "parser", "ner", "textcat"]
+    vocab = SimpleNamespace(vectors=np.zeros((0, 0)))  # sin vectores estáticos
+
+    def __init__(self):
+        self.analizados = 0
+        self.llamadas_pipe = []
+
+    def __call__(self, texto):
+        self.analizados += 1
+        return _Doc(texto)
+
+    def pipe(self, textos, as_tuples=False, batch_size=64, n_process=1, disable=()):
+        self.llamadas_pipe.append({"n_process": n_process, "disable": list(disable)})
+        for texto, contexto in textos:
+            self.analizados += 1
+            yield _Doc(texto), contexto
+
+
+@pytest.fixture
+def nlp_falso():
+    """spaCy falso que cuenta análisis y llamadas a pipe."""
+    return _NlpFalso()
@@ -0,0 +1,108 @@
+"""Tests para CacheEmbeddings (LRU en RAM + matriz mmap append-only)."""
+import multiprocessing
+import os
+
+import numpy as np
+
+from src.nlp.cache_embeddings import CacheEmbeddings
+from src.nlp.extractor import ExtractorConceptos
+
+
+def _codificador(llamadas):
+    def calcular(textos):
+        llamadas.append(list(textos))
+        return np.array([np.full(4, float(len(t))) for t in textos], dtype=np.float32)
+    return calcular
+
+
+def _escribir_en_proceso(args):
+    ruta, inicio = args
+    cache = CacheEmbeddings(ruta, nombre_modelo="m")
+    textos = [f"t{i}" for i in range(inicio, inicio + 50)]
+    cache.guardar_lote(textos, np.array([[i] * 4 for i in range(inicio, inicio + 50)], dtype=np.float32))
+    return len(textos)
+
+
+class TestCacheEmbeddings:
+
+    def test_solo_calcula_faltantes(self, tmp_path):
+        llamadas = []
+        cache = CacheEmbeddings(str(tmp_path), nombre_modelo="m")
+        cache.obtener_o_calcular(["python", "numpy"], _codificador(llamadas))
+        matriz = cache.obtener_o_calcular(["numpy", "docker", "python"], _codificador(llamadas))
+        assert llamadas == [["python", "numpy"], ["docker"]]
+        assert matriz.shape == (3, 4)
+        assert matriz[1][0] == 6.0  # len("docker")
+
+    def test_persistente_entre_instancias(self, tmp_path):
+        llamadas = []
+        CacheEmbeddings(str(tmp_path), nombre_modelo="m").obtener_o_calcular(
+            ["python"], _codificador(llamadas))
+        reabierta = CacheEmbeddings(str(tmp_path), nombre_modelo="m")
+        np.testing.assert_array_equal(reabierta.obtener("python"), np.full(4, 6.0))
+        assert reabierta.estadisticas["aciertos_disco"] == 1
+        assert len(reabierta) == 1
+
+    def test_clave_normalizada_y_por_modelo(self, tmp_path):
+        cache = CacheEmbeddings(str(tmp_path), nombre_modelo="m")
+        cache.guardar_lote(["Ciencia  de Datos"], np.ones((1, 4)))
+        assert cache.obtener(" ciencia de datos ") is not None
+        assert CacheEmbeddings(str(tmp_path), nombre_modelo="otro").obtener("ciencia de datos") is None
+
+    def test_lru_acotado(self):
+        cache = CacheEmbeddings(None, max_ram=2)
+        cache.guardar_lote(["a", "b", "c"], np.eye(3))
+        assert len(cache) == 2
+        assert cache.obtener("a") is None
+
+    def test_otra_instancia_ve_escrituras_nuevas(self, tmp_path):
+        lectora = CacheEmbeddings(str(tmp_path), nombre_modelo="m")
+        escritora = CacheEmbeddings(str(tmp_path), nombre_modelo="m")
+        assert lectora.obtener("x") is None
+        escritora.guardar_lote(["x"], np.full((1, 4), 2.0))
+        np.testing.assert_array_equal(lectora.obtener("x"), np.full(4, 2.0))
+
+    def test_fila_incompleta_se_descarta(self, tmp_path):
+        cache = CacheEmbeddings(str(tmp_path), nombre_modelo="m")
+        cache.guardar_lote(["a"], np.full((1, 4), 1.0))
+        with open(os.path.join(cache.ruta, "vectores.f32"), "ab") as f:
+            f.write(b"\x00\x01\x02")  # escritura cortada de otro proceso
+        cache.guardar_lote(["b"], np.full((1, 4), 3.0))
+        reabierta = CacheEmbeddings(str(tmp_path), nombre_modelo="m")
+        np.testing.assert_array_equal(reabierta.obtener("b"), np.full(4, 3.0))
+        np.testing.assert_array_equal(reabierta.obtener("a"), np.full(4, 1.0))
+
+    def test_registro_incompleto_del_indice_se_descarta(self, tmp_path):
+        cache = CacheEmbeddings(str(tmp_path), nombre_modelo="m")
+        cache.guardar_lote(["a"], np.full((1, 4), 1.0))
+        with open(os.path.join(cache.ruta, "indice.bin"), "ab") as f:
+            f.write(b"\x00" * 5)
+        cache.guardar_lote(["b"], np.full((1, 4), 3.0))
+        reabierta = CacheEmbeddings(str(tmp_path), nombre_modelo="m")
+        np.testing.assert_array_equal(reabierta.obtener("b"), np.full(4, 3.0))
+        assert len(reabierta) == 2
+
+    def test_dtype_float32_en_ram_y_disco(self, tmp_path):
+        cache = CacheEmbeddings(str(tmp_path), nombre_modelo="m")
+        matriz = cache.obtener_o_calcular(["a"], lambda textos: np.ones((len(textos), 4)))
+        assert matriz.dtype == np.float32
+        assert cache.obtener("a").dtype == np.float32
+        assert CacheEmbeddings(str(tmp_path), nombre_modelo="m").obtener("a").dtype == np.float32
+
+    def test_varios_procesos(self, tmp_path):
+        ctx = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+        with ctx.Pool(3) as pool:
+            pool.map(_escribir_en_proceso, [(str(tmp_path), 0), (str(tmp_path), 25), (str(tmp_path), 50)])
+        cache = CacheEmbeddings(str(tmp_path), nombre_modelo="m")
+        assert len(cache) == 100
+        for i in (0, 30, 99):
+            np.testing.assert_array_equal(cache.obtener(f"t{i}"), np.full(4, float(i)))
+
+
+def test_extractor_usa_cache(tmp_path):
+    extractor = ExtractorConceptos(modo="basico",
+                                   cache_embeddings=CacheEmbeddings(str(tmp_path), "basico"))
+    e1 = extractor.generar_embedding("concepto")
+    otro = ExtractorConceptos(modo="basico", cache_embeddings=CacheEmbeddings(str(tmp_path), "basico"))
+    np.testing.assert_array_almost_equal(otro.generar_embedding("concepto"), e1)
+    assert otro.cache.estadisticas["aciertos_disco"] == 1
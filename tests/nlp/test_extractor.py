@@ -83,8 +83,149 @@ def test_relaciones_coocurrencia(extractor):
         assert all(0 <= r[2] <= 1 for r in relaciones)
 
 
+def _coocurrencia_referencia(texto, conceptos, ventana=10):
+    """Implementación original (cuadrática) como oráculo."""
+    from collections import Counter
+    nombres = [c["nombre"].lower() for c in conceptos]
+    palabras = texto.lower().split()
+    coocurrencias = Counter()
+    for i, palabra in enumerate(palabras):
+        for nombre in nombres:
+            if nombre in palabra:
+                ventana_texto = palabras[max(0, i - ventana):i + ventana]
+                for otro in nombres:
+                    if otro != nombre and any(otro in p for p in ventana_texto):
+                        coocurrencias[tuple(sorted([nombre, otro]))] += 1
+    if not coocurrencias:
+        return []
+    max_co = max(coocurrencias.values())
+    return [(c1, c2, round(n / max_co, 3)) for (c1, c2), n in coocurrencias.most_common()
+            if round(n / max_co, 3) > 0.1]
+
+
+def test_coocurrencia_equivale_a_referencia(extractor):
+    rng = np.random.default_rng(3)
+    vocab = ["python", "numpy", "pythonista", "datos", "docker", "red", "el", "de", "vectores"]
+    texto = " ".join(rng.choice(vocab, size=400))
+    conceptos = [{"nombre": n} for n in ["python", "numpy", "datos", "docker", "red", "vectores"]]
+    obtenido = extractor._relaciones_por_coocurrencia(texto, conceptos)
+    esperado = _coocurrencia_referencia(texto, conceptos)
+    assert sorted(obtenido) == sorted(esperado)
+    assert [r[2] for r in obtenido] == [r[2] for r in esperado]
+
+
+def test_coocurrencia_respeta_ventana(extractor):
+    relleno = " ".join(["x"] * 15)
+    texto = f"python numpy {relleno} docker"
+    conceptos = [{"nombre": "python"}, {"nombre": "numpy"}, {"nombre": "docker"}]
+    assert extractor._relaciones_por_coocurrencia(texto, conceptos) == [("numpy", "python", 1.0)]
+
+
 def test_relaciones_texto_corto(extractor):
     texto = "solo una palabra"
     conceptos = extractor.extraer_conceptos(texto, max_conceptos=5)
     relaciones = extractor.extraer_relaciones(texto, conceptos)
     assert isinstance(relaciones, list)
+
+
+# --- Modo corpus (nlp.pipe) con un spaCy simulado ---
+
+@pytest.fixture
+def extractor_spacy(nlp_falso):
+    extractor = ExtractorConceptos(modo="basico")
+    extractor.nlp = nlp_falso
+    return extractor
+
+
+def test_corpus_un_analisis_por_texto(extractor_spacy):
+    textos = ["Python numpy vectores", "Docker despliegue Python"]
+    resultados = list(extractor_spacy.analizar_corpus(textos, n_process=2))
+    assert [t for t, _, _ in resultados] == textos
+    assert {c["nombre"] for c in resultados[1][1]} == {"docker", "despliegue", "python"}
+    for texto, conceptos, doc in resultados:
+        extractor_spacy.extraer_relaciones(texto, conceptos, doc=doc)
+    # Un único pipe, un análisis por texto (las relaciones reutilizan el Doc)
+    assert extractor_spacy.nlp.analizados == 2
+    assert extractor_spacy.nlp.llamadas_pipe == [{"n_process": 2, "disable": ["textcat"]}]
+
+
+def test_corpus_sin_spacy_usa_basico(extractor):
+    resultados = list(extractor.analizar_corpus(["Python numpy vectores", ""]))
+    assert len(resultados) == 2
+    assert resultados[0][2] is None
+    assert resultados[1][1] == []
+
+
+# --- Carga perezosa de modelos ---
+
+@pytest.fixture
+def carga_lenta(monkeypatch, nlp_falso):
+    """_inicializar simulado que espera a una señal y deja un spaCy falso."""
+    import threading
+    permiso = threading.Event()
+    cargas = []
+
+    def _inicializar(self, modo):
+        permiso.wait(5)
+        cargas.append(modo)
+        self.nlp = nlp_falso
+        self.modo = "spacy"
+
+    monkeypatch.setattr(ExtractorConceptos, "_inicializar", _inicializar)
+    return permiso, cargas
+
+
+def test_perezoso_no_carga_al_construir(carga_lenta):
+    permiso, cargas = carga_lenta
+    extractor = ExtractorConceptos(modo="auto", carga_perezosa=True)
+    assert cargas == []
+    assert not extractor.listo
+    assert extractor.estado_carga == "pendiente"
+
+
+def test_perezoso_carga_en_primer_uso(carga_lenta):
+    permiso, cargas = carga_lenta
+    permiso.set()
+    extractor = ExtractorConceptos(modo="auto", carga_perezosa=True)
+    extractor.extraer_conceptos("Python numpy vectores")
+    assert cargas == ["auto"]
+    assert extractor.listo and extractor.modo == "spacy"
+    assert extractor.nlp.analizados == 1
+
+
+def test_calentamiento_en_segundo_plano_usa_basico_mientras_carga(carga_lenta):
+    permiso, cargas = carga_lenta
+    extractor = ExtractorConceptos(modo="auto", carga_perezosa=True)
+    hilo = extractor.calentar_en_segundo_plano()
+    assert extractor.estado_carga == "cargando"
+    assert extractor.calentar_en_segundo_plano() is None  # un solo hilo de carga
+    # No bloquea: extracción básica mientras el modelo carga
+    conceptos = extractor.extraer_conceptos("Python numpy vectores")
+    assert conceptos and extractor.nlp is None
+    permiso.set()
+    hilo.join(5)
+    assert extractor.esperar_listo(0) and extractor.estado_carga == "listo"
+    assert cargas == ["auto"]
+    extractor.extraer_conceptos("Python numpy vectores")
+    assert extractor.nlp.analizados == 1
+
+
+def test_error_de_carga_libera_a_quien_espera(monkeypatch):
+    def _inicializar(self, modo):
+        raise RuntimeError("modelo corrupto")
+
+    monkeypatch.setattr(ExtractorConceptos, "_inicializar", _inicializar)
+    extractor = ExtractorConceptos(modo="auto", carga_perezosa=True)
+    hilo = extractor.calentar_en_segundo_plano()
+    assert extractor.esperar_listo(5) is False
+    hilo.join(5)
+    assert extractor.estado_carga == "error"
+    assert str(extractor.error_carga) == "modelo corrupto"
+    assert not extractor.listo and extractor.modo == "basico"
+    assert extractor.extraer_conceptos("Python numpy vectores")
+
+
+def test_basico_no_es_perezoso():
+    extractor = ExtractorConceptos(modo="basico", carga_perezosa=True)
+    assert extractor.listo
+    assert extractor.calentar_en_segundo_plano() is None
@@ -1,6 +1,7 @@
 """Tests para PipelineNLP y ReduccionDimensional."""
 import pytest
 import numpy as np
+from src.nlp.extractor import ExtractorConceptos
 from src.nlp.pipeline import PipelineNLP, ReduccionDimensional
 from src.core.nucleo import ConceptosLucas
 
@@ -53,6 +54,57 @@ class TestReduccionDimensional:
         np.testing.assert_array_almost_equal(r1[0], r2)
 
 
+class TestReduccionIncremental:
+    def test_partial_fit_equivale_a_ajuste_completo(self):
+        rng = np.random.RandomState(0)
+        embeddings = rng.normal(0, 1, (200, 40)) * np.linspace(3, 0.1, 40)
+        completo = ReduccionDimensional(dim_target=5)
+        completo.ajustar(embeddings)
+        incremental = ReduccionDimensional(dim_target=5)
+        for lote in np.array_split(embeddings, 7):
+            incremental.partial_fit(lote)
+        assert incremental.n_muestras == 200
+        a = completo.transformar_lote(embeddings)
+        b = incremental.transformar_lote(embeddings)
+        # Los autovectores pueden diferir en signo
+        np.testing.assert_array_almost_equal(np.abs(a), np.abs(b))
+
+    def test_transformar_lote_igual_que_individual(self):
+        rng = np.random.RandomState(1)
+        reductor = ReduccionDimensional(dim_target=10)
+        embeddings = rng.normal(0, 1, (30, 64))
+        reductor.partial_fit(embeddings)
+        lote = reductor.transformar_lote(embeddings[:4])
+        for i in range(4):
+            np.testing.assert_array_almost_equal(lote[i], reductor.transformar(embeddings[i]))
+
+    def test_congelada_no_cambia(self):
+        rng = np.random.RandomState(2)
+        reductor = ReduccionDimensional(dim_target=10)
+        reductor.partial_fit(rng.normal(0, 1, (50, 64)))
+        reductor.congelar()
+        x = rng.normal(0, 1, 64)
+        antes = reductor.transformar(x)
+        reductor.partial_fit(rng.normal(5, 1, (50, 64)))
+        np.testing.assert_array_equal(reductor.transformar(x), antes)
+        assert reductor.n_muestras == 50
+
+    def test_guardar_y_cargar(self, tmp_path):
+        rng = np.random.RandomState(3)
+        reductor = ReduccionDimensional(dim_target=10)
+        reductor.partial_fit(rng.normal(0, 1, (50, 64)))
+        reductor.congelar()
+        ruta = str(tmp_path / "reduccion.npz")
+        reductor.guardar(ruta, nombre_modelo="m")
+
+        cargado = ReduccionDimensional.cargar(ruta, nombre_modelo="m")
+        assert cargado.congelado and cargado.n_muestras == 50
+        x = rng.normal(0, 1, (3, 64))
+        np.testing.assert_array_almost_equal(cargado.transformar_lote(x), reductor.transformar_lote(x))
+        assert ReduccionDimensional.cargar(ruta, nombre_modelo="otro") is None
+        assert ReduccionDimensional.cargar(str(tmp_path / "no_existe.npz")) is None
+
+
 # --- PipelineNLP ---
 
 class TestPipelineNLP:
@@ -87,7 +139,7 @@ class TestPipelineNLP:
             "OpenCV procesa imagenes y detecta patrones",
             "Docker facilita el despliegue de aplicaciones",
         ]
-        resultados = pipeline.procesar_batch(textos, max_conceptos=3)
+        resultados = list(pipeline.procesar_batch(textos, max_conceptos=3))
         assert len(resultados) == 3
         assert all(len(r["conceptos"]) > 0 for r in resultados)
 
@@ -149,3 +201,144 @@ class TestPipelineIntegracion:
 
         for nombre, data in sistema.conceptos.items():
             assert len(data["actual"]) == 15, f"{nombre}: dim={len(data['actual'])}"
+
+
+# --- Procesamiento en streaming por lotes ---
+
+class _ModeloContador:
+    """Modelo de embeddings falso que cuenta las llamadas a encode."""
+
+    def __init__(self):
+        self.llamadas = []
+
+    def encode(self, textos, batch_size=32):
+        self.llamadas.append(list(textos) if isinstance(textos, list) else textos)
+        if isinstance(textos, str):
+            return np.random.RandomState(len(textos)).normal(0, 1, 32)
+        return np.array([np.random.RandomState(len(t)).normal(0, 1, 32) for t in textos])
+
+
+class TestPipelineStreaming:
+    def _pipeline(self, sistema=None):
+        pipeline = PipelineNLP(sistema_ianae=sistema, modo_nlp="basico")
+        pipeline.extractor.modelo_embeddings = _ModeloContador()
+        return pipeline
+
+    def test_devuelve_generador_perezoso(self):
+        pipeline = self._pipeline()
+        consumidos = []
+
+        def textos():
+            for t in ["python datos numpy", "docker despliegue contenedores", "opencv imagenes"]:
+                consumidos.append(t)
+                yield t
+
+        resultados = pipeline.procesar_batch(textos(), tam_lote=1)
+        assert consumidos == []
+        primero = next(resultados)
+        assert len(primero["conceptos"]) > 0
+        assert len(consumidos) == 1
+
+    def test_una_codificacion_por_lote(self):
+        pipeline = self._pipeline()
+        textos = ["python datos numpy", "python docker despliegue", "opencv imagenes patrones"]
+        resultados = list(pipeline.procesar_batch(textos, tam_lote=10))
+        assert len(resultados) == 3
+        modelo = pipeline.extractor.modelo_embeddings
+        # Una sola llamada con todos los nombres únicos; las relaciones no recodifican
+        assert len(modelo.llamadas) == 1
+        assert len(modelo.llamadas[0]) == len(set(modelo.llamadas[0]))
+        assert "python" in modelo.llamadas[0]
+
+    def test_cache_entre_lotes(self):
+        pipeline = self._pipeline()
+        list(pipeline.procesar_batch(["python datos numpy"]))
+        list(pipeline.procesar_batch(["python datos numpy"]))
+        assert len(pipeline.extractor.modelo_embeddings.llamadas) == 1
+
+    def test_inyeccion_en_lote(self):
+        sistema = ConceptosLucas(dim_vector=15, incertidumbre_base=0.0)
+        pipeline = self._pipeline(sistema)
+        textos = ["python datos numpy", "python docker despliegue"]
+        resultados = list(pipeline.procesar_batch(textos, umbral_relacion=0.0, categoria="lote"))
+        nombres = {c["nombre"] for r in resultados for c in r["conceptos"]}
+        assert nombres <= set(sistema.conceptos)
+        assert sistema._n == len(sistema.conceptos)
+        assert "lote" in sistema.categorias
+
+    def test_cache_persistente_entre_reinicios(self, tmp_path):
+        textos = ["python datos numpy"]
+        primero = PipelineNLP(modo_nlp="basico", ruta_cache_embeddings=str(tmp_path))
+        primero.extractor.modelo_embeddings = _ModeloContador()
+        list(primero.procesar_batch(textos))
+
+        reiniciado = PipelineNLP(modo_nlp="basico", ruta_cache_embeddings=str(tmp_path))
+        reiniciado.extractor.modelo_embeddings = _ModeloContador()
+        list(reiniciado.procesar_batch(textos))
+        assert reiniciado.extractor.modelo_embeddings.llamadas == []
+
+    def test_espacio_estable_y_persistente(self, tmp_path, monkeypatch):
+        # Modelo presente desde la construcción, como en producción
+        monkeypatch.setattr(ExtractorConceptos, "_inicializar",
+                            lambda self, modo: setattr(self, "modelo_embeddings", _ModeloContador()))
+        ruta = str(tmp_path / "reduccion.npz")
+        pipeline = PipelineNLP(modo_nlp="basico", ruta_reduccion=ruta, muestras_congelar=5)
+        texto = "python datos numpy docker despliegue opencv"
+        r1 = pipeline.procesar(texto)
+        assert pipeline.reductor.congelado
+        r2 = pipeline.procesar("python imagenes")
+        np.testing.assert_array_almost_equal(r1["vectores_reducidos"]["python"],
+                                             r2["vectores_reducidos"]["python"])
+
+        reiniciado = PipelineNLP(modo_nlp="basico", ruta_reduccion=ruta)
+        assert reiniciado.reductor.congelado
+        r3 = reiniciado.procesar("python imagenes")
+        np.testing.assert_array_almost_equal(r3["vectores_reducidos"]["python"],
+                                             r1["vectores_reducidos"]["python"])
+
+    def test_conceptos_previos_se_reproyectan_al_congelar(self, monkeypatch):
+        monkeypatch.setattr(ExtractorConceptos, "_inicializar",
+                            lambda self, modo: setattr(self, "modelo_embeddings", _ModeloContador()))
+        sistema = ConceptosLucas(dim_vector=15, incertidumbre_base=0.0)
+        pipeline = PipelineNLP(sistema_ianae=sistema, modo_nlp="basico", muestras_congelar=6)
+        r1 = pipeline.procesar("python datos")  # por debajo de dim_target: proyección aleatoria
+        assert not pipeline.reductor.congelado
+        pipeline.procesar("docker despliegue contenedores opencv imagenes servidores")
+        assert pipeline.reductor.congelado
+
+        for concepto in r1["conceptos"]:
+            nombre = concepto["nombre"]
+            embedding = pipeline.extractor.generar_embeddings([nombre])[0]
+            np.testing.assert_array_almost_equal(sistema.conceptos[nombre]["base"],
+                                                 pipeline.reductor.transformar(embedding))
+            np.testing.assert_array_almost_equal(sistema._vec_actual[sistema._idx[nombre]],
+                                                 sistema.conceptos[nombre]["actual"])
+
+    def test_procesar_sin_inyectar_y_despues_inyectar(self, monkeypatch):
+        monkeypatch.setattr(ExtractorConceptos, "_inicializar",
+                            lambda self, modo: setattr(self, "modelo_embeddings", _ModeloContador()))
+        sistema = ConceptosLucas(dim_vector=15, incertidumbre_base=0.0)
+        pipeline = PipelineNLP(sistema_ianae=sistema, modo_nlp="basico", muestras_congelar=6)
+        r1 = pipeline.procesar("python datos", inyectar=False)
+        r2 = pipeline.procesar("docker despliegue contenedores opencv imagenes servidores",
+                               inyectar=False)
+        assert pipeline.reductor.congelado
+        assert len(sistema.conceptos) == 0  # nada toca el sistema fuera de inyectar()
+
+        assert pipeline.inyectar([r1, r2]) == len(r1["conceptos"]) + len(r2["conceptos"])
+        for concepto in r1["conceptos"] + r2["conceptos"]:
+            nombre = concepto["nombre"]
+            embedding = pipeline.extractor.generar_embeddings([nombre])[0]
+            np.testing.assert_array_almost_equal(sistema.conceptos[nombre]["base"],
+                                                 pipeline.reductor.transformar(embedding))
+        relacionados = {(c1, c2) for c1, c2, _ in r2["relaciones"]}
+        assert all(c2 in dict(sistema.relaciones[c1]) for c1, c2 in relacionados)
+
+    def test_corpus_spacy_analiza_una_vez(self, nlp_falso):
+        pipeline = PipelineNLP(modo_nlp="basico")
+        pipeline.extractor.nlp = nlp_falso
+        textos = ["Python numpy vectores", "Docker despliegue", "OpenCV imagenes"]
+        resultados = list(pipeline.procesar_batch(textos, tam_lote=2))
+        assert len(resultados) == 3
+        assert pipeline.extractor.nlp.analizados == 3
+        assert len(pipeline.extractor.nlp.llamadas_pipe) == 1